@@ -10,7 +10,7 @@
   3. ✅ 生成 picks_latest.json (web目錄) - 安全JSON格式
   4. ✅ 生成 picks_YYYYMMDD.json (web/history目錄)
   5. ✅ 自動備份到scripts目錄
-  6. ✅ 自動清理30天前舊文件
+  6. ✅ 自動清理30天前舊文件（先寫入歷史歸檔）
   7. ✅ 完全處理NaN值，確保JSON有效性
 ======================================================================
 """
@@ -26,6 +26,17 @@ import csv
 import warnings
 warnings.filterwarnings('ignore')
 
+from price_snapshot_binary import encode_snapshot, write_binary_snapshot
+from search_index import build_index, write_search_index
+from market_summary import build_summary, write_market_summary
+from records import Record, PriceRecord, PickRecord
+from picks_archive import PicksArchive
+from pipeline_metrics import RunRecorder
+from stage_cache import StageCache, file_hash, code_version
+from eod_normalizer import get_dialect, normalize, picker_dialect, PICKER_COLUMNS
+from instrument_master import attach as attach_instruments, classify, load_master, master_version
+from sector_rotation import load_strength, sector_points, strength_version
+
 # ============================================================================
 # 配置文件路径
 # ============================================================================
@@ -42,9 +53,13 @@ BACKUP_DIR = os.path.join(SCRIPT_DIR, "backups")
 CONFIG_DIR = os.path.join(SCRIPT_DIR, "config")
 EOD_CONFIG_PATH = os.path.join(CONFIG_DIR, "eod_config.json")
 
-# 确保所有目录存在
-for directory in [WEB_DIR, HISTORY_DIR, DATA_DIR, BACKUP_DIR, CONFIG_DIR]:
-    os.makedirs(directory, exist_ok=True)
+OUTPUT_DIRS = [WEB_DIR, HISTORY_DIR, DATA_DIR, BACKUP_DIR, CONFIG_DIR]
+
+
+def ensure_output_dirs():
+    """创建输出目录（导入本模块时不做任何文件系统操作）"""
+    for directory in OUTPUT_DIRS:
+        os.makedirs(directory, exist_ok=True)
 
 # ============================================================================
 # CSV规范化功能（整合自 normalize_eod.py）
@@ -88,6 +103,7 @@ def load_config(config_path):
                 "10": "服务"
             }
         }
+        os.makedirs(os.path.dirname(config_path), exist_ok=True)
         with open(config_path, "w", encoding="utf-8") as f:
             json.dump(default_config, f, indent=2, ensure_ascii=False)
         return default_config
@@ -95,46 +111,6 @@ def load_config(config_path):
     with open(config_path, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def detect_delimiter(path):
-    """检测CSV文件的分隔符"""
-    with open(path, "r", newline="", encoding="utf-8") as f:
-        sample = f.read(4096)
-    
-    # 统计制表符和逗号的出现次数
-    tab_count = sample.count("\t")
-    comma_count = sample.count(",")
-    
-    # 如果制表符多于逗号，则使用制表符
-    if tab_count > comma_count and tab_count >= 5:  # 至少5个制表符
-        return "\t"
-    return ","
-
-def normalize_header(header, aliases):
-    """规范化列名"""
-    normalized = []
-    for col in header:
-        c = col.strip()
-        # 尝试多种可能的列名格式
-        if c in aliases:
-            normalized.append(aliases[c])
-        else:
-            # 检查是否包含关键字段
-            if any(keyword in c.lower() for keyword in ["code", "股票代码", "stock"]):
-                normalized.append("code")
-            elif any(keyword in c.lower() for keyword in ["name", "股票名称", "stock name"]):
-                normalized.append("name")
-            elif any(keyword in c.lower() for keyword in ["price", "最新价", "last"]):
-                normalized.append("last_price")
-            elif any(keyword in c.lower() for keyword in ["change", "涨跌", "涨跌幅"]):
-                normalized.append("change_percent")
-            elif any(keyword in c.lower() for keyword in ["volume", "成交量"]):
-                normalized.append("volume")
-            elif any(keyword in c.lower() for keyword in ["sector", "行业"]):
-                normalized.append("sector")
-            else:
-                normalized.append(c)
-    return normalized
-
 def normalize_csv_file(input_path, output_path=None, config_path=None):
     """
     规范化CSV文件
@@ -152,47 +128,22 @@ def normalize_csv_file(input_path, output_path=None, config_path=None):
     print(f"  📁 输入文件: {input_path}")
     
     try:
-        # 直接读取CSV
-        df = pd.read_csv(input_path)
+        # 读取并映射列名（eod_normalizer 的 picker 方言）
+        table = normalize(input_path, get_dialect('picker'))
     except Exception as e:
         print(f"  ❌ 无法读取CSV文件: {e}")
         return None, None
     
-    print(f"  📈 读取 {len(df)} 行数据")
-    print(f"  📋 原始列名: {list(df.columns)}")
+    print(f"  📈 读取 {len(table)} 行数据")
+    print(f"  📋 原始列名: {table.raw_header}")
     
-    # 清理列名：去除空格
-    df.columns = [col.strip() for col in df.columns]
-    
-    # ========== 修复列名映射问题 ==========
-    # 直接的手动映射，避免自动映射出错
-    column_mapping = {
-        'Code': 'code',
-        'Stock': 'name',           # 修复：Stock应该是name，不是code
-        'Sector': 'sector',        # 原始行业列
-        'Sector_Code': 'sector_code',  # 修复：避免重复的code
-        'Sector_Name': 'sector_name',  # 修复：避免重复的name
-        'Last': 'last_price',
-        'Open': 'open',
-        'High': 'high',
-        'Low': 'low',
-        'Prv Close': 'prev_close',
-        'Chg%': 'change_percent',
-        'Vol': 'volume'
-    }
-    
-    # 创建新的DataFrame
-    normalized_data = {}
-    
-    for orig_col, norm_col in column_mapping.items():
-        if orig_col in df.columns:
-            normalized_data[norm_col] = df[orig_col]
-            print(f"  ✅ 映射 {orig_col} → {norm_col}")
-        else:
+    for orig_col, norm_col in PICKER_COLUMNS.items():
+        if norm_col in table.missing:
             print(f"  ⚠️  列不存在: {orig_col}")
+        else:
+            print(f"  ✅ 映射 {orig_col} → {norm_col}")
     
-    # 创建新的DataFrame
-    normalized_df = pd.DataFrame(normalized_data)
+    normalized_df = table.frame
     
     # 如果sector_name不存在，但sector存在，使用sector
     if 'sector_name' not in normalized_df.columns and 'sector' in normalized_df.columns:
@@ -250,6 +201,23 @@ def normalize_csv_file(input_path, output_path=None, config_path=None):
 # AI選股核心功能
 # ============================================================================
 
+# AI評分權重（只修改權重時，規範化結果從緩存讀取，只重新評分和輸出）
+SCORING_WEIGHTS = {
+    'base': 50,
+    'change_above_5': 15,
+    'change_above_2': 10,
+    'change_above_0': 5,
+    'change_below_-5': -10,
+    'change_below_0': -5,
+    'volume_above_1m': 10,
+    'volume_above_100k': 5,
+    'volume_below_10k': -5,
+    'rsi_neutral': 5,
+    'rsi_oversold': 10,
+    'rsi_overbought': -5,
+    'above_sma5': 5,
+}
+
 def standardize_columns(df):
     """標準化列名"""
     column_mapping = {
@@ -352,57 +320,58 @@ def calculate_technical_indicators(df):
     
     return df_tech
 
-def ai_scoring(df):
+def ai_scoring(df, weights=None):
     """AI評分系統"""
     print("  🧠 AI評分系統啟動...")
     
+    w = weights or SCORING_WEIGHTS
     scores = []
     
     for idx, row in df.iterrows():
-        score = 50  # 基礎分
+        score = w['base']  # 基礎分
         
         try:
             # 價格相關評分
             if 'change_percent' in row and pd.notna(row['change_percent']):
                 change = float(row['change_percent'])
                 if change > 5:
-                    score += 15
+                    score += w['change_above_5']
                 elif change > 2:
-                    score += 10
+                    score += w['change_above_2']
                 elif change > 0:
-                    score += 5
+                    score += w['change_above_0']
                 elif change < -5:
-                    score -= 10
+                    score += w['change_below_-5']
                 elif change < 0:
-                    score -= 5
+                    score += w['change_below_0']
             
             # 成交量評分
             if 'volume' in row and pd.notna(row['volume']):
                 volume = float(row['volume'])
                 # 簡單的成交量評分
                 if volume > 1000000:
-                    score += 10
+                    score += w['volume_above_1m']
                 elif volume > 100000:
-                    score += 5
+                    score += w['volume_above_100k']
                 elif volume < 10000:
-                    score -= 5
+                    score += w['volume_below_10k']
             
             # RSI評分
             if 'rsi' in row and pd.notna(row['rsi']):
                 rsi = float(row['rsi'])
                 if 30 < rsi < 70:
-                    score += 5
+                    score += w['rsi_neutral']
                 elif rsi < 30:
-                    score += 10  # 超賣，可能反彈
+                    score += w['rsi_oversold']  # 超賣，可能反彈
                 elif rsi > 70:
-                    score -= 5   # 超買
+                    score += w['rsi_overbought']   # 超買
             
             # 移動平均線評分
             if 'last_price' in row and 'sma_5' in row and pd.notna(row['last_price']) and pd.notna(row['sma_5']):
                 price = float(row['last_price'])
                 sma5 = float(row['sma_5'])
                 if price > sma5:
-                    score += 5
+                    score += w['above_sma5']
             
             # 確保分數在合理範圍
             score = max(0, min(100, score))
@@ -460,6 +429,9 @@ def calculate_potential_score(row):
     if volume > 500000:
         potential += 5
     
+    # 所屬行業的輪動強弱（±5，見 sector_rotation.sector_points）
+    potential += row.get('sector_strength', 0)
+    
     # 限制範圍
     potential = max(0, min(100, potential))
     
@@ -478,6 +450,9 @@ def generate_potential_reasons(row):
     if row.get('score', 50) > 70:
         reasons.append("AI評分高")
     
+    if row.get('sector_strength', 0) >= 3:
+        reasons.append("所屬行業走強")
+    
     if 'rsi' in row and row['rsi'] < 40:
         reasons.append("RSI顯示可能超賣反彈")
     elif 'rsi' in row and row['rsi'] > 60:
@@ -488,13 +463,24 @@ def generate_potential_reasons(row):
     
     return "，".join(reasons[:3])
 
-def generate_stock_picks(df, max_picks=20):
-    """生成AI選股清單"""
+def generate_stock_picks(df, max_picks=20, instruments=None, strength=None):
+    """
+    生成AI選股清單
+    instruments: 證券主表；strength: 行業輪動強弱（sector_rotation.load_strength）
+    都默認從 EOD 數據庫載入
+    """
     print("  🎯 生成AI選股清單...")
     
     # 複製數據
     df_picks = df.copy()
     
+    # 行業強弱分: 沒有輪動數據或行業沒有排名時為 0
+    strength = load_strength() if strength is None else strength
+    if 'sector' in df_picks.columns:
+        df_picks['sector_strength'] = df_picks['sector'].map(sector_points(strength)).fillna(0.0)
+    else:
+        df_picks['sector_strength'] = 0.0
+    
     # 計算額外指標
     df_picks['potential_score'] = df_picks.apply(calculate_potential_score, axis=1)
     
@@ -507,16 +493,8 @@ def generate_stock_picks(df, max_picks=20):
     # 生成潛力原因
     df_picks['potential_reasons'] = df_picks.apply(generate_potential_reasons, axis=1)
     
-    # 添加樂器類型檢測（簡單版本）
-    def detect_instrument_type(code):
-        if isinstance(code, str):
-            if '-' in code or code.endswith(('WA', 'WB', 'WC', 'WR')):
-                return "Warrant"
-            elif len(code) >= 5 and code[-1].isalpha():
-                return "Preference"
-        return "Stock"
-    
-    df_picks['instrument_type'] = df_picks['code'].apply(detect_instrument_type)
+    # 證券類型和正股：按代碼合併證券主表（instrument_master.py）
+    df_picks = attach_instruments(df_picks, master=instruments)
     
     # 按潛力分數排序
     df_picks = df_picks.sort_values('potential_score', ascending=False)
@@ -528,7 +506,7 @@ def generate_stock_picks(df, max_picks=20):
     df_picks['rank'] = range(1, len(df_picks) + 1)
     
     # 重新排列列
-    pick_columns = ['rank', 'code', 'name', 'instrument_type', 'sector',
+    pick_columns = ['rank', 'code', 'name', 'instrument_type', 'instrument_class', 'underlying', 'sector',
                    'current_price', 'daily_change', 'score', 'potential_score',
                    'potential_reasons', 'recommendation', 'risk_level',
                    'rsi', 'volume', 'status']
@@ -551,6 +529,8 @@ def generate_stock_picks(df, max_picks=20):
 def save_safe_json(data, filepath, indent=2):
     """安全保存JSON文件，處理NaN值"""
     def safe_serializer(obj):
+        if isinstance(obj, Record):
+            return obj.to_dict()
         if isinstance(obj, (np.float32, np.float64)):
             if np.isnan(obj):
                 return None
@@ -564,6 +544,7 @@ def save_safe_json(data, filepath, indent=2):
         raise TypeError(f"無法序列化類型: {type(obj)}")
     
     try:
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=indent, default=safe_serializer, ensure_ascii=False)
         print(f"  💾 保存JSON文件: {filepath}")
@@ -576,35 +557,40 @@ def create_latest_price_json(df, output_dir):
     """創建latest_price.json"""
     print("  📄 創建 latest_price.json...")
     
-    # 準備數據
-    stocks_list = []
-    
-    for idx, row in df.iterrows():
-        stock_data = {
-            'code': str(row.get('code', '')),
-            'name': str(row.get('name', '')),
-            'last_price': float(row.get('last_price', 0)) if pd.notna(row.get('last_price')) else 0,
-            'change': float(row.get('change', 0)) if pd.notna(row.get('change')) else 0,
-            'change_percent': float(row.get('change_percent', 0)) if pd.notna(row.get('change_percent')) else 0,
-            'volume': int(row.get('volume', 0)) if pd.notna(row.get('volume')) else 0,
-            'sector': str(row.get('sector', 'Unknown')),
-            'open': float(row.get('open', 0)) if pd.notna(row.get('open')) else 0,
-            'high': float(row.get('high', 0)) if pd.notna(row.get('high')) else 0,
-            'low': float(row.get('low', 0)) if pd.notna(row.get('low')) else 0,
-            'last_updated': str(row.get('last_updated', '15:30:22'))
-        }
-        stocks_list.append(stock_data)
+    # 準備數據（按列轉換為 __slots__ 記錄）
+    stocks_list = PriceRecord.from_frame(df, last_updated='15:30:22')
     
     data = {
         'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         'data_date': datetime.now().strftime('%Y-%m-%d'),
         'total_stocks': len(stocks_list),
         'market': 'Bursa Malaysia',
-        'stocks': stocks_list
+        'stocks': stocks_list,
+        # 漲跌排行 / 漲跌家數 / 成交額（整體和各行業），網頁不用再對全部股票排序
+        'summary': build_summary(stocks_list)
     }
     
     filepath = os.path.join(output_dir, 'latest_price.json')
     if save_safe_json(data, filepath):
+        # 單獨的市場概要小文件，首頁只需加載這個
+        try:
+            write_market_summary(data['summary'], output_dir, data_date=data['data_date'])
+        except Exception as e:
+            print(f"  ⚠️  市場概要生成失敗: {e}")
+        # 同時輸出二進制快照，供手機端頁面快速加載
+        try:
+            write_binary_snapshot(data, output_dir)
+        except Exception as e:
+            print(f"  ⚠️  二進制快照生成失敗: {e}")
+            # 刪除舊快照，網頁回退到 latest_price.json，不會讀到過期數據
+            stale = os.path.join(output_dir, 'latest_price.bin')
+            if os.path.exists(stale):
+                os.remove(stale)
+        # 代碼 / 名稱搜索索引，網頁和投資計算器直接查索引
+        try:
+            write_search_index(stocks_list, output_dir)
+        except Exception as e:
+            print(f"  ⚠️  搜索索引生成失敗: {e}")
         return filepath
     return None
 
@@ -615,28 +601,8 @@ def create_picks_json(df_picks, output_dir, date_str=None):
     
     print(f"  📄 創建 picks_{date_str}.json...")
     
-    # 準備數據
-    picks_list = []
-    
-    for idx, row in df_picks.iterrows():
-        pick_data = {
-            'rank': int(row.get('rank', 0)),
-            'code': str(row.get('code', '')),
-            'name': str(row.get('name', '')),
-            'instrument_type': str(row.get('instrument_type', 'Stock')),
-            'sector': str(row.get('sector', '')),
-            'current_price': float(row.get('current_price', 0)) if pd.notna(row.get('current_price')) else 0,
-            'daily_change': float(row.get('daily_change', 0)) if pd.notna(row.get('daily_change')) else 0,
-            'score': float(row.get('score', 0)) if pd.notna(row.get('score')) else 0,
-            'potential_score': int(row.get('potential_score', 0)) if pd.notna(row.get('potential_score')) else 0,
-            'potential_reasons': str(row.get('potential_reasons', '')),
-            'recommendation': str(row.get('recommendation', '')),
-            'risk_level': str(row.get('risk_level', '')),
-            'rsi': float(row.get('rsi', 0)) if pd.notna(row.get('rsi')) else 0,
-            'volume': int(row.get('volume', 0)) if pd.notna(row.get('volume')) else 0,
-            'status': str(row.get('status', ''))
-        }
-        picks_list.append(pick_data)
+    # 準備數據（按列轉換為 __slots__ 記錄）
+    picks_list = PickRecord.from_frame(df_picks)
     
     data = {
         'date': datetime.now().strftime('%Y-%m-%d'),
@@ -669,12 +635,22 @@ def backup_files(source_dir, backup_dir, prefix="backup_"):
     
     return backup_path
 
+def archive_picks(filepath, archive=None):
+    """把 picks_YYYYMMDD.json 追加到歷史歸檔"""
+    if archive is None:
+        archive = PicksArchive(DATA_DIR)
+    date_key = os.path.basename(filepath)[6:14]
+    with open(filepath, 'r', encoding='utf-8') as f:
+        archive.append(date_key, json.load(f))
+    return date_key
+
 def cleanup_old_files(directory, days=30):
-    """清理舊文件"""
+    """清理舊文件（先歸檔再刪除，長期歷史保存在歸檔中）"""
     print(f"  🗑️  清理{days}天前舊文件...")
     
     cutoff_date = datetime.now() - timedelta(days=days)
     deleted_count = 0
+    archive = PicksArchive(DATA_DIR)
     
     for filename in os.listdir(directory):
         if filename.startswith('picks_') and filename.endswith('.json'):
@@ -684,17 +660,23 @@ def cleanup_old_files(directory, days=30):
             mod_time = datetime.fromtimestamp(os.path.getmtime(filepath))
             
             if mod_time < cutoff_date:
+                date_key = filename[6:14]
+                if date_key.isdigit() and date_key not in archive:
+                    archive_picks(filepath, archive)
+                    print(f"    🗄️  歸檔: {filename}")
                 os.remove(filepath)
                 deleted_count += 1
                 print(f"    🗑️  刪除舊文件: {filename}")
     
     if deleted_count > 0:
         print(f"  ✅ 刪除 {deleted_count} 個舊文件")
+        before, after = archive.compact()
+        print(f"  🗜️  壓縮歸檔: {before} → {after} bytes")
     else:
         print("  ✅ 無需清理")
 
-def main():
-    """主函數"""
+def main(csv_path=None):
+    """主函數（csv_path 為空時從命令行參數或交互輸入讀取）"""
     print("="*70)
     print("🚀 Bursa Malaysia AI選股神器 - 完整生產版 (整合CSV規範化)")
     print("="*70)
@@ -709,9 +691,9 @@ def main():
     print("="*70)
     
     # 獲取CSV文件路徑
-    if len(sys.argv) > 1:
+    if csv_path is None and len(sys.argv) > 1:
         csv_path = sys.argv[1]
-    else:
+    elif csv_path is None:
         csv_path = input("請輸入CSV文件路徑: ").strip()
     
     if not os.path.exists(csv_path):
@@ -723,48 +705,116 @@ def main():
     print("🔒 安全模式: 已啟用（完全處理NaN值）")
     
     print("\n📁 創建目錄結構...")
-    for directory in [WEB_DIR, HISTORY_DIR, DATA_DIR, BACKUP_DIR]:
+    ensure_output_dirs()
+    for directory in OUTPUT_DIRS:
         print(f"    ✅ 確保目錄存在: {directory}")
     
+    recorder = RunRecorder('ai_stock_picker_full')
+    cache = StageCache()
+    date_str = datetime.now().strftime('%Y%m%d')
+    
+    # 緩存鍵: 輸入文件 + 配置 + 階段代碼版本，下游階段包含上游的鍵
+    normalize_key = cache.key('normalize', file_hash(csv_path), file_hash(EOD_CONFIG_PATH),
+                              code_version(load_config, normalize_csv_file, normalize, picker_dialect))
+    scoring_key = cache.key('scoring', normalize_key, SCORING_WEIGHTS,
+                            code_version(standardize_columns, normalize_dataframe,
+                                         calculate_technical_indicators, ai_scoring))
+    instruments = load_master()
+    strength = load_strength()
+    picks_key = cache.key('picks', scoring_key, 20, master_version(instruments), strength_version(strength),
+                          code_version(generate_stock_picks, calculate_potential_score,
+                                       generate_recommendation, generate_potential_reasons,
+                                       attach_instruments, classify, load_strength, sector_points))
+    emit_key = cache.key('emit', normalize_key, picks_key, date_str,
+                         code_version(create_latest_price_json, create_picks_json, save_safe_json,
+                                      build_index, build_summary, encode_snapshot,
+                                      Record, PriceRecord, PickRecord))
+    
     # 步驟1: CSV規範化
     print("\n📊 CSV數據規範化...")
-    normalized_df, normalized_path = normalize_csv_file(csv_path)
+    with recorder.stage('normalize') as st:
+        normalized_df = cache.get('normalize', normalize_key)
+        if normalized_df is None:
+            normalized_df, normalized_path = normalize_csv_file(csv_path)
+            cache.put('normalize', normalize_key, normalized_df)
+            st.add_file(normalized_path)
+        if normalized_df is not None:
+            st.rows_out = len(normalized_df)
     
     if normalized_df is None:
         print("❌ CSV規範化失敗")
+        recorder.save()
         sys.exit(1)
     
     # 步驟2: 數據標準化
     print("\n🔧 數據處理流程...")
-    df_standardized = normalize_dataframe(normalized_df)
-    
-    # 步驟3: 計算技術指標
-    df_technical = calculate_technical_indicators(df_standardized)
-    
-    # 步驟4: AI評分
-    df_scored = ai_scoring(df_technical)
+    with recorder.stage('standardize', rows_in=len(normalized_df)) as st:
+        df_standardized = normalize_dataframe(normalized_df)
+        st.rows_out = len(df_standardized)
+    
+    # 步驟3-4: 技術指標 + AI評分（命中緩存時兩步都跳過）
+    df_scored = cache.get('scoring', scoring_key)
+    if df_scored is None:
+        with recorder.stage('indicators', rows_in=len(df_standardized)) as st:
+            df_technical = calculate_technical_indicators(df_standardized)
+            st.rows_out = len(df_technical)
+        
+        with recorder.stage('scoring', rows_in=len(df_technical)) as st:
+            df_scored = cache.put('scoring', scoring_key, ai_scoring(df_technical))
+            st.rows_out = len(df_scored)
     
     # 步驟5: 生成選股
-    df_picks = generate_stock_picks(df_scored, max_picks=20)
+    with recorder.stage('picks', rows_in=len(df_scored)) as st:
+        df_picks = cache.get('picks', picks_key)
+        if df_picks is None:
+            df_picks = generate_stock_picks(df_scored, max_picks=20, instruments=instruments,
+                                            strength=strength)
+            cache.put('picks', picks_key, df_picks)
+        st.rows_out = len(df_picks)
     
     # 步驟6: 生成JSON文件
     print("\n💾 生成輸出文件...")
+    latest_price_file = os.path.join(WEB_DIR, 'latest_price.json')
+    picks_latest_file = os.path.join(WEB_DIR, 'picks_latest.json')
+    picks_history_file = os.path.join(HISTORY_DIR, f'picks_{date_str}.json')
+    outputs = [latest_price_file, os.path.join(WEB_DIR, 'latest_price.bin'),
+               os.path.join(WEB_DIR, 'search_index.json'), os.path.join(WEB_DIR, 'market_summary.json'),
+               picks_latest_file, picks_history_file]
+    outputs_current = cache.outputs_current(emit_key, outputs)
+    
+    with recorder.stage('emit_json', rows_in=len(df_standardized)) as st:
+        if not outputs_current:
+            # latest_price.json
+            latest_price_file = create_latest_price_json(df_standardized, WEB_DIR)
+            
+            # picks_latest.json (在web目錄)
+            picks_latest_file = create_picks_json(df_picks, WEB_DIR, "latest")
+            
+            # picks_YYYYMMDD.json (在history目錄)
+            picks_history_file = create_picks_json(df_picks, HISTORY_DIR, date_str)
+            
+            for path in outputs:
+                st.add_file(path)
+            if latest_price_file and picks_latest_file and picks_history_file:
+                cache.record_outputs(emit_key, outputs)
     
-    # latest_price.json
-    latest_price_file = create_latest_price_json(df_standardized, WEB_DIR)
-    
-    # picks_latest.json (在web目錄)
-    picks_latest_file = create_picks_json(df_picks, WEB_DIR, "latest")
-    
-    # picks_YYYYMMDD.json (在history目錄)
-    date_str = datetime.now().strftime('%Y%m%d')
-    picks_history_file = create_picks_json(df_picks, HISTORY_DIR, date_str)
+    with recorder.stage('archive'):
+        if picks_history_file and not outputs_current:
+            archive_picks(picks_history_file)
+            print(f"  🗄️  已追加到歷史歸檔: {date_str}")
     
     # 備份
-    backup_path = backup_files(WEB_DIR, BACKUP_DIR)
+    with recorder.stage('backup') as st:
+        backup_path = backup_files(WEB_DIR, BACKUP_DIR)
+        for filename in os.listdir(backup_path):
+            st.add_file(os.path.join(backup_path, filename))
     
     # 清理舊文件
-    cleanup_old_files(HISTORY_DIR, days=30)
+    with recorder.stage('cleanup'):
+        cleanup_old_files(HISTORY_DIR, days=30)
+    
+    recorder.extra['cache_hits'] = cache.hits
+    recorder.save()
     
     # 總結
     print("\n" + "="*70)
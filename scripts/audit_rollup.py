@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+📋 審計日誌匯總 - 每個審計JSON只載入一次，按索引查詢
+======================================================================
+把 audit_logs / audit_logs_v2 / audit_final_simple / data/audit 中的審計JSON
+載入 EOD 數據庫（data/eod.sqlite）的 audit_* 表:
+  audit_files     每個審計文件一行：路徑、大小、修改時間（用於增量載入）
+  audits          每個審計文件一行：交易日、來源/輸出文件、rows_in/rows_out
+  audit_columns   原始CSV中出現的列（索引 column, trade_date）
+  audit_unmapped  未映射的行業代碼（索引 code）
+  audit_sectors   行業分佈（只有新格式審計有）
+
+已規範化輸出的審計（source_file 本身是 normalized CSV，例如 audit_20251224_normalized.json）
+不是原始文件的審計，只記錄指紋、不載入，列漂移和行數趨勢中每個目錄每天只有原始文件的一個審計
+（同一天有多個時取 timestamp 最新的）
+
+兼容三種審計格式:
+  v1      present_columns / missing_columns_filled / new_sector_codes
+  v2      original_columns / sector_distribution / unmapped_sector_codes
+  simple  has_sector_column / sector_stats / missing_codes_sample
+
+用法（代碼中）:
+    rollup = AuditRollup()
+    rollup.sync()                              # 只載入新的和改動過的審計文件
+    rollup.column_presence('DY*')              # 某列每天是否存在
+    rollup.column_drift()                      # 列的出現/消失事件
+    rollup.unmapped_days()                     # 有未映射行業代碼的交易日
+    rollup.row_trend()                         # 每天的行數及與上一天的變化
+
+命令行:
+  python audit_rollup.py sync [目錄...]
+  python audit_rollup.py column "DY*"         # 該列首次消失/重新出現的日期
+  python audit_rollup.py drift
+  python audit_rollup.py unmapped [--codes]
+  python audit_rollup.py rows [--dir audit_logs_v2]
+======================================================================
+"""
+
+import os
+import re
+import sys
+import json
+import glob
+import sqlite3
+import argparse
+from datetime import datetime
+
+import pandas as pd
+
+from eod_database import DB_PATH, DATA_DIR
+from eod_watcher import parse_trade_date
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_AUDIT_DIRS = [os.path.join(SCRIPT_DIR, d) for d in
+                      ("audit_logs", "audit_logs_v2", "audit_final_simple")] + \
+                     [os.path.join(DATA_DIR, "audit")]
+VALIDATION_SUFFIX = "_validation.json"
+# 規範化輸出的文件名（normalized_20251224.csv / 20251224_normalized.csv）
+NORMALIZED_SOURCE = re.compile(r"normali[sz]ed", re.IGNORECASE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit_files (
+    path TEXT PRIMARY KEY,
+    directory TEXT,
+    size INTEGER,
+    mtime_ns INTEGER,
+    ingested_at TEXT
+);
+CREATE TABLE IF NOT EXISTS audits (
+    path TEXT PRIMARY KEY,
+    directory TEXT,
+    trade_date TEXT,
+    format TEXT,
+    source_file TEXT,
+    output_file TEXT,
+    timestamp TEXT,
+    delimiter TEXT,
+    rows_in INTEGER,
+    rows_out INTEGER,
+    column_count INTEGER,
+    filled_count INTEGER,
+    unmapped_count INTEGER,
+    unknown_rows INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_audits_dir_date ON audits (directory, trade_date);
+CREATE INDEX IF NOT EXISTS idx_audits_date ON audits (trade_date);
+CREATE TABLE IF NOT EXISTS audit_columns (
+    path TEXT NOT NULL,
+    trade_date TEXT,
+    column_name TEXT NOT NULL,
+    filled INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (path, column_name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_audit_columns_name ON audit_columns (column_name, trade_date);
+CREATE TABLE IF NOT EXISTS audit_unmapped (
+    path TEXT NOT NULL,
+    trade_date TEXT,
+    code TEXT NOT NULL,
+    PRIMARY KEY (path, code)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_audit_unmapped_code ON audit_unmapped (code, trade_date);
+CREATE TABLE IF NOT EXISTS audit_sectors (
+    path TEXT NOT NULL,
+    trade_date TEXT,
+    sector TEXT NOT NULL,
+    row_count INTEGER,
+    PRIMARY KEY (path, sector)
+) WITHOUT ROWID;
+"""
+
+CHILD_TABLES = ("audit_columns", "audit_unmapped", "audit_sectors")
+
+
+def is_normalized_audit(audit):
+    """審計的來源文件是已規範化的輸出（再次規範化時產生），不是原始 EOD 文件"""
+    return bool(NORMALIZED_SOURCE.search(os.path.basename(str(audit.get("source_file") or ""))))
+
+
+def parse_audit(audit, path):
+    """
+    審計JSON → (audits 行字典, 列 [(列名, 是否補齊)], 未映射代碼, {行業: 行數})
+    交易日取自 source_file，其次取自審計文件名；不是 JSON 對象時拋 ValueError（sync 記錄後跳過）
+    """
+    if not isinstance(audit, dict):
+        raise ValueError(f"不是審計JSON對象（{type(audit).__name__}）")
+    trade_date = parse_trade_date(str(audit.get("source_file", ""))) or \
+        parse_trade_date(os.path.basename(path))
+
+    if "original_columns" in audit:
+        fmt = "v2"
+        columns = [(c, 0) for c in audit.get("original_columns") or []]
+        unmapped = audit.get("unmapped_sector_codes") or []
+        sectors = audit.get("sector_distribution") or {}
+        unknown = sectors.get("Unknown", 0)
+    elif "present_columns" in audit:
+        fmt = "v1"
+        filled = audit.get("missing_columns_filled") or []
+        columns = [(c, 0) for c in audit.get("present_columns") or []] + [(c, 1) for c in filled]
+        unmapped = audit.get("new_sector_codes") or []
+        sectors = {}
+        unknown = None
+    else:
+        fmt = "simple"
+        columns = []
+        unmapped = audit.get("missing_codes_sample") or []
+        sectors = audit.get("sector_distribution") or {}
+        unknown = (audit.get("sector_stats") or {}).get("unknown")
+
+    # 同名列只保留一次（補齊的列可能也在 present_columns 中）
+    seen = {}
+    for name, filled in columns:
+        seen.setdefault(str(name), filled)
+    unmapped = sorted({str(c) for c in unmapped})
+
+    row = {
+        "trade_date": trade_date.isoformat() if trade_date else None,
+        "format": fmt,
+        "source_file": audit.get("source_file"),
+        "output_file": audit.get("output_file"),
+        "timestamp": audit.get("timestamp"),
+        "delimiter": audit.get("delimiter_detected"),
+        "rows_in": audit.get("rows_in"),
+        "rows_out": audit.get("rows_out"),
+        "column_count": sum(1 for f in seen.values() if not f) if seen else None,
+        "filled_count": sum(seen.values()) if fmt == "v1" else None,
+        "unmapped_count": len(unmapped),
+        "unknown_rows": unknown,
+    }
+    return row, list(seen.items()), unmapped, {str(k): v for k, v in sectors.items()}
+
+
+class AuditRollup:
+    """審計日誌匯總（與 EODDatabase 共用同一個 SQLite 文件）"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # 載入
+    # ------------------------------------------------------------------
+
+    def _forget(self, path):
+        self.conn.execute("DELETE FROM audits WHERE path = ?", (path,))
+        self.conn.execute("DELETE FROM audit_files WHERE path = ?", (path,))
+        for table in CHILD_TABLES:
+            self.conn.execute(f"DELETE FROM {table} WHERE path = ?", (path,))
+
+    def ingest_file(self, path, known=None):
+        """載入一個審計JSON；文件未變返回 False"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        fingerprint = (stat.st_size, stat.st_mtime_ns)
+        if known is None:
+            row = self.conn.execute("SELECT size, mtime_ns FROM audit_files WHERE path = ?",
+                                    (path,)).fetchone()
+            known = {path: tuple(row)} if row else {}
+        if known.get(path) == fingerprint:
+            return False
+
+        with open(path, "r", encoding="utf-8") as f:
+            audit = json.load(f)
+        directory = os.path.dirname(path)
+        if isinstance(audit, dict) and is_normalized_audit(audit):
+            # 只記錄指紋（不再重複讀取），不進入匯總
+            with self.conn:
+                self._forget(path)
+                self.conn.execute(
+                    "INSERT INTO audit_files (path, directory, size, mtime_ns, ingested_at) VALUES (?, ?, ?, ?, ?)",
+                    (path, directory, *fingerprint, datetime.now().isoformat(timespec="seconds")))
+            return False
+        row, columns, unmapped, sectors = parse_audit(audit, path)
+        trade_date = row["trade_date"]
+
+        with self.conn:
+            self._forget(path)
+            self.conn.execute(
+                f"INSERT INTO audits (path, directory, {', '.join(row)}) "
+                f"VALUES (?, ?, {', '.join('?' * len(row))})",
+                (path, directory, *row.values()))
+            self.conn.executemany(
+                "INSERT INTO audit_columns (path, trade_date, column_name, filled) VALUES (?, ?, ?, ?)",
+                [(path, trade_date, name, filled) for name, filled in columns])
+            self.conn.executemany(
+                "INSERT INTO audit_unmapped (path, trade_date, code) VALUES (?, ?, ?)",
+                [(path, trade_date, code) for code in unmapped])
+            self.conn.executemany(
+                "INSERT INTO audit_sectors (path, trade_date, sector, row_count) VALUES (?, ?, ?, ?)",
+                [(path, trade_date, sector, count) for sector, count in sectors.items()])
+            self.conn.execute(
+                "INSERT INTO audit_files (path, directory, size, mtime_ns, ingested_at) VALUES (?, ?, ?, ?, ?)",
+                (path, directory, *fingerprint, datetime.now().isoformat(timespec="seconds")))
+        return True
+
+    def sync(self, directories=None, verbose=False):
+        """
+        增量載入審計目錄：新文件和改動過的文件重新解析，已刪除的文件從匯總中移除
+        返回 (載入文件數, 移除文件數)
+        """
+        loaded = removed = 0
+        for directory in directories or DEFAULT_AUDIT_DIRS:
+            directory = os.path.abspath(directory)
+            known = {path: (size, mtime) for path, size, mtime in self.conn.execute(
+                "SELECT path, size, mtime_ns FROM audit_files WHERE directory = ?", (directory,))}
+            present = set()
+            for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+                if path.endswith(VALIDATION_SUFFIX):
+                    # 舊版流水線寫在 data/audit 的校驗報告，不是審計日誌（已載入的按已刪除處理）
+                    continue
+                present.add(path)
+                try:
+                    if self.ingest_file(path, known):
+                        loaded += 1
+                except (OSError, ValueError) as e:
+                    print(f"  ⚠️  無法載入審計文件 {path}: {e}")
+            stale = [p for p in known if p not in present]
+            if stale:
+                with self.conn:
+                    for path in stale:
+                        self._forget(path)
+                removed += len(stale)
+        if verbose:
+            print(f"📋 審計匯總: 載入 {loaded} 個，移除 {removed} 個")
+        return loaded, removed
+
+    # ------------------------------------------------------------------
+    # 查詢
+    # ------------------------------------------------------------------
+
+    def query(self, sql, params=()):
+        """運行任意 SQL，返回 DataFrame"""
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    @staticmethod
+    def _dir_filter(directory, alias="a"):
+        if directory is None:
+            return "", ()
+        return f" AND {alias}.directory = ?", (os.path.abspath(directory),)
+
+    def audits(self, directory=None):
+        where, params = self._dir_filter(directory)
+        return self.query(f"SELECT a.* FROM audits a WHERE 1 = 1{where} ORDER BY a.directory, a.trade_date",
+                          params)
+
+    @staticmethod
+    def _daily(df):
+        """每個目錄每個交易日只保留一個審計（查詢按 directory, trade_date, timestamp 排序，取最新的）"""
+        repeated = df["trade_date"].notna() & df.duplicated(["directory", "trade_date"], keep="last")
+        return df[~repeated].reset_index(drop=True)
+
+    def column_presence(self, column, directory=None):
+        """某列在每個審計中是否存在（只統計記錄了列名的審計格式）"""
+        where, params = self._dir_filter(directory)
+        return self._daily(self.query(
+            "SELECT a.directory, a.trade_date, a.source_file, "
+            "       (c.column_name IS NOT NULL AND c.filled = 0) AS present "
+            "FROM audits a LEFT JOIN audit_columns c "
+            "     ON c.path = a.path AND c.column_name = ? "
+            f"WHERE a.column_count IS NOT NULL{where} "
+            "ORDER BY a.directory, a.trade_date, a.timestamp", (column, *params)))
+
+    def column_drift(self, directory=None):
+        """
+        列的出現/消失事件：與同一目錄的上一個審計相比新增或缺少的列
+        返回 directory, trade_date, column, change（'added' / 'removed'）
+        """
+        where, params = self._dir_filter(directory)
+        audits = self._daily(self.query(
+            "SELECT a.path, a.directory, a.trade_date FROM audits a "
+            f"WHERE a.column_count IS NOT NULL{where} ORDER BY a.directory, a.trade_date, a.timestamp",
+            params))
+        columns = self.query("SELECT path, column_name FROM audit_columns WHERE filled = 0")
+        by_path = columns.groupby("path")["column_name"].agg(frozenset).to_dict()
+
+        events = []
+        previous = {}
+        for path, directory, trade_date in audits.itertuples(index=False):
+            current = by_path.get(path, frozenset())
+            before = previous.get(directory)
+            if before is not None and current != before:
+                events.extend((directory, trade_date, c, "added") for c in sorted(current - before))
+                events.extend((directory, trade_date, c, "removed") for c in sorted(before - current))
+            previous[directory] = current
+        return pd.DataFrame(events, columns=["directory", "trade_date", "column", "change"])
+
+    def unmapped_days(self, directory=None, min_count=1):
+        """有未映射行業代碼的交易日"""
+        where, params = self._dir_filter(directory)
+        return self.query(
+            "SELECT a.directory, a.trade_date, a.source_file, a.unmapped_count, a.unknown_rows "
+            f"FROM audits a WHERE a.unmapped_count >= ?{where} "
+            "ORDER BY a.trade_date, a.directory", (min_count, *params))
+
+    def unmapped_codes(self, directory=None):
+        """每個未映射代碼出現的天數和首次/最後日期"""
+        where, params = self._dir_filter(directory)
+        return self.query(
+            "SELECT u.code, COUNT(DISTINCT u.trade_date) AS days, "
+            "       MIN(u.trade_date) AS first_seen, MAX(u.trade_date) AS last_seen "
+            f"FROM audit_unmapped u JOIN audits a ON a.path = u.path WHERE 1 = 1{where} "
+            "GROUP BY u.code ORDER BY days DESC, u.code", params)
+
+    def row_trend(self, directory=None):
+        """每天的 rows_in/rows_out 以及與同一目錄上一天相比的變化"""
+        where, params = self._dir_filter(directory)
+        df = self._daily(self.query(
+            "SELECT a.directory, a.trade_date, a.source_file, a.output_file, a.rows_in, a.rows_out "
+            f"FROM audits a WHERE 1 = 1{where} ORDER BY a.directory, a.trade_date, a.timestamp", params))
+        df["rows_change"] = df.groupby("directory")["rows_out"].diff()
+        df["dropped"] = df["rows_in"] - df["rows_out"]
+        return df
+
+    def summary(self, directory=None):
+        """趨勢摘要（字典）：行數範圍、列漂移、未映射代碼"""
+        rows = self.row_trend(directory)
+        drift = self.column_drift(directory)
+        unmapped = self.unmapped_days(directory)
+        codes = self.unmapped_codes(directory)
+        if rows.empty:
+            return {"audits": 0}
+
+        removed = drift[drift["change"] == "removed"]
+        first_removed = removed.groupby("column")["trade_date"].min().sort_values()
+        return {
+            "audits": len(rows),
+            "first_date": rows["trade_date"].min(),
+            "last_date": rows["trade_date"].max(),
+            "rows": {
+                "min": int(rows["rows_out"].min()),
+                "max": int(rows["rows_out"].max()),
+                "mean": round(float(rows["rows_out"].mean()), 1),
+                "days_with_dropped_rows": int((rows["dropped"] > 0).sum()),
+            },
+            "column_drift": {
+                "events": len(drift),
+                "first_removed": first_removed.to_dict(),
+            },
+            "unmapped": {
+                "days": len(unmapped),
+                "codes": len(codes),
+                "top_codes": codes.head(10)[["code", "days"]].values.tolist(),
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="審計日誌匯總")
+    parser.add_argument("--db", default=DB_PATH, help="數據庫文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("sync", help="載入新的審計文件")
+    p.add_argument("dirs", nargs="*", help="默認 audit_logs、audit_logs_v2、audit_final_simple、data/audit")
+
+    p = sub.add_parser("column", help="某列首次消失和重新出現的日期")
+    p.add_argument("name")
+    p.add_argument("--dir", help="只看某個審計目錄")
+
+    p = sub.add_parser("drift", help="列的出現/消失事件")
+    p.add_argument("--dir", help="只看某個審計目錄")
+
+    p = sub.add_parser("unmapped", help="有未映射行業代碼的交易日")
+    p.add_argument("--dir", help="只看某個審計目錄")
+    p.add_argument("--codes", action="store_true", help="按代碼匯總")
+
+    p = sub.add_parser("rows", help="每天的行數變化")
+    p.add_argument("--dir", help="只看某個審計目錄")
+    args = parser.parse_args()
+
+    with AuditRollup(args.db) as rollup:
+        if args.command == "sync":
+            rollup.sync(args.dirs or None, verbose=True)
+            return 0
+
+        rollup.sync()
+        if args.command == "column":
+            df = rollup.column_presence(args.name, args.dir)
+            if not df["present"].any():
+                print(f"📭 沒有審計記錄到列 {args.name}")
+                return 1
+            changes = df[df.groupby("directory")["present"].diff().fillna(0) != 0]
+            for row in changes.itertuples(index=False):
+                state = "出現" if row.present else "消失"
+                print(f"  {os.path.basename(row.directory):<20} {row.trade_date}  {state}")
+            if changes.empty:
+                print(f"✅ 列 {args.name} 在每個審計中的狀態都沒有變化")
+            return 0
+
+        if args.command == "drift":
+            df = rollup.column_drift(args.dir)
+        elif args.command == "unmapped":
+            df = rollup.unmapped_codes(args.dir) if args.codes else rollup.unmapped_days(args.dir)
+        else:
+            df = rollup.row_trend(args.dir)
+
+        if df.empty:
+            print("📭 沒有結果")
+            return 1
+        if "directory" in df.columns:
+            df["directory"] = df["directory"].map(os.path.basename)
+        print(df.to_string(index=False))
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
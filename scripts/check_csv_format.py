@@ -1,58 +1,59 @@
 #!/usr/bin/env python3
+"""
+检查CSV格式：分隔符、列名、第一行数据，然后用校验引擎（eod_validation）检查数据
+"""
+import os
 import sys
-import csv
+import json
 
-def check_format(filepath):
+from eod_normalizer import get_dialect, normalize
+from eod_validation import validate
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def check_format(filepath, config_path=None):
     print(f"检查文件: {filepath}")
     print("="*50)
     
+    config_path = config_path or os.path.join(SCRIPT_DIR, "eod_config.json")
     try:
-        # 尝试逗号分隔
-        with open(filepath, 'r', encoding='utf-8') as f:
-            sample = f.read(4096)
-            f.seek(0)
-            
-            # 检查分隔符
-            comma_count = sample.count(',')
-            tab_count = sample.count('\t')
-            print(f"逗号数量: {comma_count}")
-            print(f"制表符数量: {tab_count}")
-            
-            if tab_count > comma_count:
-                delimiter = '\t'
-                print("推测为制表符分隔文件")
-            else:
-                delimiter = ','
-                print("推测为逗号分隔文件")
-            
-            # 读取文件
-            reader = csv.reader(f, delimiter=delimiter)
-            rows = list(reader)
-            
-            if not rows:
-                print("空文件")
-                return
-            
-            print(f"总行数: {len(rows)}")
-            print(f"列数: {len(rows[0])}")
-            print("")
-            
-            print("=== 列名（原始）===")
-            for i, col in enumerate(rows[0], 1):
-                print(f"{i:2}. '{col}'")
-            
-            print("")
-            print("=== 第一行数据示例 ===")
-            if len(rows) > 1:
-                for i, (col, val) in enumerate(zip(rows[0], rows[1]), 1):
-                    print(f"{i:2}. {col}: '{val}'")
-            
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        table = normalize(filepath, get_dialect("broker", config=config))
+    except ValueError as e:
+        print(f"空文件或无法读取: {e}")
+        return None
     except Exception as e:
         print(f"错误: {e}")
+        return None
+    
+    print("推测为制表符分隔文件" if table.delimiter == '\t' else "推测为逗号分隔文件")
+    print(f"编码: {table.encoding}")
+    print(f"总行数: {len(table) + 1}")
+    print(f"列数: {len(table.raw_header)}")
+    print("")
+    
+    print("=== 列名（原始 → 规范）===")
+    for i, (col, name) in enumerate(zip(table.raw_header, table.header), 1):
+        print(f"{i:2}. '{col}'" + (f" → {name}" if name != col else ""))
+    if table.missing:
+        print(f"缺失的列: {table.missing}")
+    
+    print("")
+    print("=== 第一行数据示例 ===")
+    if len(table):
+        for i, (col, val) in enumerate(zip(table.raw_header, table.raw.iloc[0].tolist()), 1):
+            print(f"{i:2}. {col}: '{val}'")
+    
+    print("")
+    report = validate(table.frame)
+    report.print_summary()
+    return report
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("用法: python3 check_csv_format.py <csv文件路径>")
+    if len(sys.argv) not in (2, 3):
+        print("用法: python3 check_csv_format.py <csv文件路径> [eod_config.json]")
         sys.exit(1)
     
-    check_format(sys.argv[1])
+    report = check_format(*sys.argv[1:])
+    sys.exit(0 if report is not None and report.ok else 1)
@@ -10,6 +10,8 @@ import os
 import sys
 from datetime import datetime
 
+from eod_validation import validate
+
 def debug_price_issue(csv_file):
     """偵錯價格文件問題"""
     print("=" * 60)
@@ -104,47 +106,25 @@ def debug_price_issue(csv_file):
     for i, test in enumerate(test_rows):
         print(f"   行{i+1}: {test['status']} - 代碼={test['code']}, 價格={test['last_price']}")
     
-    # 7. 實際生成價格數據測試
+    # 7. 實際生成價格數據測試（整列計算，不逐行循環）
     print("\n🚀 7. 實際生成價格數據測試:")
-    price_data_list = []
-    valid_count = 0
-    invalid_reasons = {}
-    
-    for idx, row in df.iterrows():
-        try:
-            code_raw = row.get('Code', '')
-            if pd.isna(code_raw):
-                invalid_reasons['code_na'] = invalid_reasons.get('code_na', 0) + 1
-                continue
-                
-            code = str(code_raw).strip().strip('="')
-            if not code or len(code) < 2:
-                invalid_reasons['code_invalid'] = invalid_reasons.get('code_invalid', 0) + 1
-                continue
-            
-            last_price = row.get('Last', 0)
-            if pd.isna(last_price):
-                invalid_reasons['price_na'] = invalid_reasons.get('price_na', 0) + 1
-                continue
-            
-            if last_price <= 0:
-                invalid_reasons['price_zero'] = invalid_reasons.get('price_zero', 0) + 1
-                continue
-            
-            # 如果通過所有檢查
-            valid_count += 1
-            price_data_list.append({
-                'code': code,
-                'name': str(row.get('Stock', '')).strip(),
-                'last_price': float(last_price)
-            })
-            
-            # 顯示前幾個成功的
-            if valid_count <= 3:
-                print(f"   ✅ 成功 {valid_count}: {code} - 價格: {last_price}")
-                
-        except Exception as e:
-            invalid_reasons['error'] = invalid_reasons.get('error', 0) + 1
+    code = df['Code'].astype('string').str.strip().str.strip('="') if 'Code' in df.columns \
+        else pd.Series(pd.NA, index=df.index, dtype='string')
+    last_price = pd.to_numeric(df['Last'], errors='coerce') if 'Last' in df.columns \
+        else pd.Series(np.nan, index=df.index)
+    
+    code_na = code.isna().to_numpy(dtype=bool)
+    code_invalid = ~code_na & (code.str.len().fillna(0) < 2).to_numpy(dtype=bool)
+    price_na = ~code_na & ~code_invalid & last_price.isna().to_numpy()
+    price_zero = ~code_na & ~code_invalid & ~price_na & (last_price <= 0).to_numpy()
+    valid = ~(code_na | code_invalid | price_na | price_zero)
+    valid_count = int(valid.sum())
+    invalid_reasons = {reason: int(mask.sum()) for reason, mask in
+                       [('code_na', code_na), ('code_invalid', code_invalid),
+                        ('price_na', price_na), ('price_zero', price_zero)] if mask.any()}
+    
+    for i, idx in enumerate(np.flatnonzero(valid)[:3], 1):
+        print(f"   ✅ 成功 {i}: {code.iloc[idx]} - 價格: {last_price.iloc[idx]}")
     
     print(f"\n📊 8. 統計結果:")
     print(f"   總行數: {len(df)}")
@@ -153,6 +133,10 @@ def debug_price_issue(csv_file):
     for reason, count in invalid_reasons.items():
         print(f"     - {reason}: {count}")
     
+    # 校驗引擎（代碼格式、High/Low、Chg% 等，見 eod_validation.py）
+    print()
+    validate(df.assign(Code=code)).print_summary()
+    
     # 9. 生成修復建議
     print("\n💡 9. 修復建議:")
     if valid_count == 0:
@@ -1,13 +1,13 @@
 #!/usr/bin/env python3
 import os
 import sys
-import csv
 
 def diagnose():
     print("=== 诊断问题 ===")
     
     # 1. 检查文件是否存在
-    test_file = "/storage/emulated/0/eskay9761/stock_data/Myx_Data/EOD/20251223.csv"
+    test_file = sys.argv[1] if len(sys.argv) > 1 else \
+        "/storage/emulated/0/eskay9761/stock_data/Myx_Data/EOD/20251223.csv"
     print(f"1. 检查测试文件: {test_file}")
     print(f"   存在: {os.path.exists(test_file)}")
     
@@ -17,6 +17,7 @@ def diagnose():
     
     # 2. 检查配置文件
     config_file = "eod_config.json"
+    config = {"schema": []}
     print(f"\n2. 检查配置文件: {config_file}")
     print(f"   存在: {os.path.exists(config_file)}")
     
@@ -31,18 +32,26 @@ def diagnose():
         except Exception as e:
             print(f"   有效JSON: 否 - {e}")
     
-    # 3. 尝试读取CSV文件
-    print(f"\n3. 尝试读取CSV文件...")
+    # 3. 规范化并校验CSV文件（向量化规则，见 eod_validation.py）
+    print(f"\n3. 尝试读取并校验CSV文件...")
     try:
-        with open(test_file, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            rows = list(reader)
+        from eod_normalizer import get_dialect, normalize
+        from eod_validation import validate
         
-        print(f"   成功读取行数: {len(rows)}")
-        if rows:
-            print(f"   标题行: {rows[0]}")
-            print(f"   列数: {len(rows[0])}")
-            print(f"   第一行数据: {rows[1][:5]}..." if len(rows) > 1 else "   无数据行")
+        table = normalize(test_file, get_dialect("broker", config=config))
+        print(f"   成功读取行数: {len(table)}")
+        print(f"   标题行: {table.raw_header}")
+        print(f"   列数: {len(table.raw_header)}")
+        if table.missing:
+            print(f"   缺失的列: {table.missing}")
+        
+        report = validate(table.frame)
+        failed = [r for r in report.results if not r.passed_gate]
+        print(f"   校验: {'通过' if report.ok else '未通过'}（违规 {report.violations} 处）")
+        for r in report.results:
+            if r.violations:
+                rows = [e['row'] for e in r.examples]
+                print(f"     {'❌' if r in failed else '⚠️'} {r.rule.name}: {r.violations}/{r.checked} 行，例如行 {rows}")
     except Exception as e:
         print(f"   读取失败: {e}")
     
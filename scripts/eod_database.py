@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+🗄️  EOD 本地數據庫 - SQLite（單文件，無服務器）
+======================================================================
+把規範化後的EOD文件載入 data/eod.sqlite，按索引查詢，不再每次重掃CSV
+  stocks   每個代碼一行：名稱、最新行業、首次/最後出現日期
+  sectors  每個行業一行：首次/最後出現日期
+  eod      每個交易日每個代碼一行，主鍵 (code, date)，索引 (sector, date)
+  files    每個交易日的來源文件（路徑、大小、修改時間），用於增量載入
+  sector_daily  每個交易日每個行業一行的匯總（物化表，隨每天載入更新）:
+           股票數、上漲/下跌/平盤數、總成交量、成交量加權漲跌幅、
+           創52週新高/新低數（High >= Y-High / Low <= Y-Low）
+
+  • 同一交易日重新載入時整天替換；文件沒變則跳過
+  • 每個文件在一個事務內 executemany 批量寫入
+  • 日常流水線在規範化後直接寫入；歷史回填完成後 sync 一次
+  • 緊湊模式（load_history 默認、query(..., compact=True)）: 代碼/名稱/行業/狀態/日期
+    字典編碼（category），價格和指標 float32，成交量可空整數（Int32/Int64），
+    成交額保留 float64；一年全市場歷史約佔完整表示的 1/4 內存
+
+用法（代碼中）:
+    db = EODDatabase()
+    db.sync()                                  # 載入 data/normalized 中的新文件
+    db.history('5264', sessions=60)            # 最近60個交易日
+    db.volume_spikes(ratio=5, start='2025-12-01')
+    db.sector_summary()                        # 最新交易日按行業匯總
+    db.sector_series('Technology', start='2025-12-01')  # 行業每日匯總時間序列
+    db.query("SELECT ... WHERE code = ?", ('5264',))
+    db.load_history(start='2025-01-01')       # 全部代碼的歷史（緊湊表示，分塊讀取）
+    memory_report(df)                          # 每列 dtype 和內存
+
+命令行:
+  python eod_database.py ingest [路徑...]       # 文件或目錄，默認 data/normalized
+  python eod_database.py history 5264 -n 60
+  python eod_database.py spikes --ratio 5 --since 2025-12-01
+  python eod_database.py sectors [行業] --since 2025-12-01 [--rebuild]
+  python eod_database.py sql "SELECT sector, COUNT(*) FROM eod GROUP BY sector"
+  python eod_database.py stats
+  python eod_database.py memory --since 2025-01-01   # 完整 / 緊湊表示的內存對比
+======================================================================
+"""
+
+import os
+import sys
+import glob
+import sqlite3
+import argparse
+from datetime import datetime
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from eod_watcher import parse_trade_date
+from eod_normalizer import map_unique
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, "data")
+DB_PATH = os.path.join(DATA_DIR, "eod.sqlite")
+DEFAULT_SOURCES = [os.path.join(DATA_DIR, "normalized")]
+
+# 規範化文件列名 → 數據庫列名（兼容 eod_config.json 的兩種 schema）
+COLUMN_ALIASES = {
+    "Code": "code",
+    "Stock": "name",
+    "Name": "name",
+    "Sector": "sector",
+    "Open": "open",
+    "Last": "last",
+    "Close": "last",
+    "Prv Close": "prv_close",
+    "Chg": "chg",
+    "Chg%": "chg",
+    "Change%": "chg",
+    "High": "high",
+    "Low": "low",
+    "Y-High": "y_high",
+    "Y-Low": "y_low",
+    "Vol": "vol",
+    "Volume": "vol",
+    "Value": "value",
+    "DY*": "dy",
+    "B%": "b_pct",
+    "Vol MA (20)": "vol_ma20",
+    "RSI (14)": "rsi14",
+    "MACD (26, 12)": "macd",
+    "MACD (26,12)": "macd",
+    "EPS*": "eps",
+    "P/E": "pe",
+    "Status": "status",
+}
+
+TEXT_COLUMNS = ["code", "name", "sector", "status"]
+NUMERIC_COLUMNS = ["open", "last", "prv_close", "chg", "high", "low", "y_high", "y_low",
+                   "vol", "value", "dy", "b_pct", "vol_ma20", "rsi14", "macd", "eps", "pe"]
+EOD_COLUMNS = ["code", "date"] + TEXT_COLUMNS[1:] + NUMERIC_COLUMNS
+
+# 緊湊模式: 字典編碼的文字列、可空整數列、保留 float64 的列；其餘數字列 float32
+CATEGORY_COLUMNS = ["code", "date", "name", "sector", "status"]
+INTEGER_COLUMNS = ["vol"]
+FLOAT64_COLUMNS = ["value"]  # 成交額數值大，累加需要 float64 精度
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS stocks (
+    code TEXT PRIMARY KEY,
+    name TEXT,
+    sector TEXT,
+    first_seen TEXT,
+    last_seen TEXT
+);
+CREATE TABLE IF NOT EXISTS sectors (
+    name TEXT PRIMARY KEY,
+    first_seen TEXT,
+    last_seen TEXT
+);
+CREATE TABLE IF NOT EXISTS eod (
+    code TEXT NOT NULL,
+    date TEXT NOT NULL,
+    name TEXT,
+    sector TEXT,
+    status TEXT,
+    {', '.join(f'{c} REAL' for c in NUMERIC_COLUMNS)},
+    PRIMARY KEY (code, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_eod_sector_date ON eod (sector, date);
+CREATE INDEX IF NOT EXISTS idx_eod_date ON eod (date);
+CREATE TABLE IF NOT EXISTS files (
+    date TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    directory TEXT,
+    size INTEGER,
+    mtime_ns INTEGER,
+    row_count INTEGER,
+    ingested_at TEXT
+);
+CREATE TABLE IF NOT EXISTS sector_daily (
+    date TEXT NOT NULL,
+    sector TEXT NOT NULL,
+    stocks INTEGER,
+    advancers INTEGER,
+    decliners INTEGER,
+    unchanged INTEGER,
+    volume REAL,
+    vw_chg REAL,
+    avg_chg REAL,
+    new_highs INTEGER,
+    new_lows INTEGER,
+    PRIMARY KEY (date, sector)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_sector_daily_sector ON sector_daily (sector, date);
+"""
+
+# 一個交易日按行業匯總 → sector_daily（在載入該日的事務內執行）
+SECTOR_DAILY_SQL = """
+INSERT INTO sector_daily (date, sector, stocks, advancers, decliners, unchanged,
+                          volume, vw_chg, avg_chg, new_highs, new_lows)
+SELECT date, COALESCE(sector, 'Unknown'), COUNT(*),
+       TOTAL(chg > 0), TOTAL(chg < 0), TOTAL(chg = 0),
+       SUM(vol),
+       SUM(CASE WHEN chg IS NOT NULL THEN chg * vol END) / SUM(CASE WHEN chg IS NOT NULL THEN vol END),
+       AVG(chg),
+       TOTAL(y_high > 0 AND COALESCE(high, last) >= y_high),
+       TOTAL(y_low > 0 AND COALESCE(low, last) <= y_low)
+FROM eod WHERE date = ? GROUP BY COALESCE(sector, 'Unknown')
+"""
+
+
+def clean_text(value):
+    if value is None or pd.isna(value):
+        return None
+    value = str(value).strip()
+    return value if value not in ("", "-") else None
+
+
+def eod_columns(df):
+    """規範化數據 → eod 表的列（'-' 等非數字值為 NULL），保留原索引和所有行"""
+    renamed = df.rename(columns=COLUMN_ALIASES)
+    renamed = renamed.loc[:, ~renamed.columns.duplicated()]
+    out = pd.DataFrame(index=renamed.index)
+    for col in TEXT_COLUMNS:
+        if col in renamed.columns:
+            out[col] = map_unique(renamed[col], clean_text, None)
+        else:
+            out[col] = None
+    for col in NUMERIC_COLUMNS:
+        if col in renamed.columns:
+            out[col] = pd.to_numeric(renamed[col], errors="coerce")
+        else:
+            out[col] = float("nan")
+    return out
+
+
+def _nullable_int(series):
+    """整數值的列 → Int32（超出範圍時 Int64），有小數時保持原樣"""
+    values = pd.to_numeric(series, errors="coerce")
+    present = values.dropna()
+    if not (present % 1 == 0).all():
+        return values
+    return values.astype("Int32" if present.empty or present.abs().max() < 2 ** 31 else "Int64")
+
+
+def compact_frame(df):
+    """eod 形式的 DataFrame → 緊湊表示（新 DataFrame，列和索引不變；其他列原樣保留）"""
+    out = {}
+    for col in df.columns:
+        series = df[col]
+        if col in CATEGORY_COLUMNS:
+            out[col] = series.astype("category")
+        elif col in INTEGER_COLUMNS:
+            out[col] = _nullable_int(series)
+        elif col in NUMERIC_COLUMNS and col not in FLOAT64_COLUMNS:
+            out[col] = pd.to_numeric(series, errors="coerce").astype(np.float32)
+        else:
+            out[col] = series
+    return pd.DataFrame(out, index=df.index)
+
+
+def concat_compact(frames):
+    """
+    合併緊湊 DataFrame（例如逐日或分塊載入）: 每個 category 列先統一成所有塊的字典並集，
+    合併結果仍是 category（字典不同時 pd.concat 會退回 object）
+    """
+    frames = list(frames)
+    if not frames:
+        return pd.DataFrame()
+    aligned = [frame.copy(deep=False) for frame in frames]
+    for col in frames[0].columns:
+        if not all(isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames if col in f.columns):
+            continue
+        categories = reduce(pd.Index.union, (f[col].cat.categories for f in frames if col in f.columns))
+        for frame in aligned:
+            if col in frame.columns:
+                frame[col] = frame[col].cat.set_categories(categories)
+    return pd.concat(aligned, ignore_index=True)
+
+
+def memory_report(df):
+    """每列的 dtype 和內存（deep，字節），最後一行為合計"""
+    usage = df.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({"dtype": df.dtypes.astype(str), "bytes": usage})
+    report.loc["(total)"] = ["", int(usage.sum())]
+    return report
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def to_eod_frame(df):
+    """eod 表要寫入的行（去掉沒有代碼的行）"""
+    out = eod_columns(df)
+    return out[out["code"].notna()]
+
+
+class EODDatabase:
+    """EOD 數據庫"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # 舊數據庫第一次打開時補算行業匯總
+        if self.conn.execute("SELECT EXISTS (SELECT 1 FROM eod) AND NOT EXISTS (SELECT 1 FROM sector_daily)"
+                             ).fetchone()[0]:
+            self.rebuild_sector_daily()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # 載入
+    # ------------------------------------------------------------------
+
+    def is_current(self, path, trade_date):
+        """該交易日已經從同一個未改動的文件載入過"""
+        row = self.conn.execute("SELECT path, size, mtime_ns FROM files WHERE date = ?",
+                                (trade_date,)).fetchone()
+        if not row or not os.path.exists(path):
+            return False
+        stat = os.stat(path)
+        return row == (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+    def ingest_frame(self, df, trade_date, source=None):
+        """
+        把一天的規範化數據寫入數據庫（整天替換），返回寫入行數
+        trade_date 為 date 或 'YYYY-MM-DD'
+        """
+        trade_date = trade_date if isinstance(trade_date, str) else trade_date.isoformat()
+        eod = to_eod_frame(df)
+        eod.insert(1, "date", trade_date)
+        eod = eod.drop_duplicates("code", keep="last")
+        records = eod[EOD_COLUMNS].astype(object).where(eod[EOD_COLUMNS].notna(), None).values.tolist()
+
+        if source and os.path.exists(source):
+            stat = os.stat(source)
+            source = os.path.abspath(source)
+            file_row = (trade_date, source, os.path.dirname(source), stat.st_size, stat.st_mtime_ns)
+        else:
+            file_row = (trade_date, source or "<memory>", None, None, None)
+
+        placeholders = ", ".join("?" * len(EOD_COLUMNS))
+        with self.conn:
+            self.conn.execute("DELETE FROM eod WHERE date = ?", (trade_date,))
+            self.conn.executemany(f"INSERT INTO eod ({', '.join(EOD_COLUMNS)}) VALUES ({placeholders})",
+                                  records)
+            self.conn.execute(
+                """INSERT INTO stocks (code, name, sector, first_seen, last_seen)
+                   SELECT code, name, sector, date, date FROM eod WHERE date = ?
+                   ON CONFLICT(code) DO UPDATE SET
+                       name = CASE WHEN excluded.last_seen >= stocks.last_seen
+                                   THEN COALESCE(excluded.name, stocks.name) ELSE stocks.name END,
+                       sector = CASE WHEN excluded.last_seen >= stocks.last_seen
+                                     THEN COALESCE(excluded.sector, stocks.sector) ELSE stocks.sector END,
+                       first_seen = MIN(stocks.first_seen, excluded.first_seen),
+                       last_seen = MAX(stocks.last_seen, excluded.last_seen)""",
+                (trade_date,))
+            self.conn.execute(
+                """INSERT INTO sectors (name, first_seen, last_seen)
+                   SELECT DISTINCT sector, date, date FROM eod WHERE date = ? AND sector IS NOT NULL
+                   ON CONFLICT(name) DO UPDATE SET
+                       first_seen = MIN(sectors.first_seen, excluded.first_seen),
+                       last_seen = MAX(sectors.last_seen, excluded.last_seen)""",
+                (trade_date,))
+            self.conn.execute("DELETE FROM sector_daily WHERE date = ?", (trade_date,))
+            self.conn.execute(SECTOR_DAILY_SQL, (trade_date,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (date, path, directory, size, mtime_ns, row_count, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                file_row[:5] + (len(records), datetime.now().isoformat(timespec="seconds")))
+        return len(records)
+
+    def ingest_file(self, path, trade_date=None, force=False):
+        """載入一個規範化CSV，文件未變時跳過並返回 0"""
+        if trade_date is None:
+            parsed = parse_trade_date(os.path.basename(path))
+            if parsed is None:
+                print(f"  ⚠️  無法從文件名解析日期，跳過: {path}")
+                return 0
+            trade_date = parsed.isoformat()
+        elif not isinstance(trade_date, str):
+            trade_date = trade_date.isoformat()
+
+        if not force and self.is_current(path, trade_date):
+            return 0
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        return self.ingest_frame(df, trade_date, source=path)
+
+    def ingest_paths(self, paths, force=False, verbose=True):
+        """載入文件或目錄（目錄中的全部 *.csv），返回 (載入文件數, 行數)"""
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                files.extend(sorted(glob.glob(os.path.join(path, "*.csv"))))
+            elif os.path.exists(path):
+                files.append(path)
+        loaded = rows = 0
+        for path in files:
+            try:
+                count = self.ingest_file(path, force=force)
+            except Exception as e:
+                print(f"  ❌ 載入失敗 {path}: {e}")
+                continue
+            if count:
+                loaded += 1
+                rows += count
+                if verbose:
+                    print(f"  📥 {os.path.basename(path)}: {count} 行")
+        return loaded, rows
+
+    def prune_missing(self, directory=None):
+        """刪除源文件已不存在的交易日（eod、sector_daily、files），返回交易日數"""
+        files = self.files(directory)
+        gone = [d for d, path in zip(files["date"], files["path"])
+                if path != "<memory>" and not os.path.exists(path)]
+        with self.conn:
+            for table in ("eod", "sector_daily", "files"):
+                self.conn.executemany(f"DELETE FROM {table} WHERE date = ?", [(d,) for d in gone])
+        return len(gone)
+
+    def rebuild_sector_daily(self):
+        """按 eod 表重新計算全部交易日的行業匯總，返回交易日數"""
+        dates = [r[0] for r in self.conn.execute("SELECT DISTINCT date FROM eod ORDER BY date")]
+        with self.conn:
+            self.conn.execute("DELETE FROM sector_daily")
+            self.conn.executemany(SECTOR_DAILY_SQL, [(d,) for d in dates])
+        return len(dates)
+
+    def sync(self, sources=None, verbose=False):
+        """增量載入默認來源（data/normalized）中的新文件和改動過的文件"""
+        return self.ingest_paths(sources or DEFAULT_SOURCES, verbose=verbose)
+
+    # ------------------------------------------------------------------
+    # 查詢
+    # ------------------------------------------------------------------
+
+    def query(self, sql, params=(), compact=False):
+        """運行任意 SQL，返回 DataFrame（compact=True 時為緊湊表示）"""
+        df = pd.read_sql_query(sql, self.conn, params=params)
+        return compact_frame(df) if compact else df
+
+    def load_history(self, start=None, end=None, columns=None, compact=True, chunksize=20_000):
+        """
+        全部代碼在 start ~ end 的 eod 行（按日期、代碼排序）
+        compact=True 時分塊讀取、逐塊壓縮再合併，峰值內存約為一塊的完整表示 + 緊湊結果
+        """
+        sql = (f"SELECT {', '.join(columns) if columns else '*'} FROM eod "
+               "WHERE date >= COALESCE(?, '') AND date <= COALESCE(?, '9999') ORDER BY date, code")
+        if not compact:
+            return self.query(sql, (start, end))
+        chunks = pd.read_sql_query(sql, self.conn, params=(start, end), chunksize=chunksize)
+        return concat_compact(compact_frame(chunk) for chunk in chunks)
+
+    def latest_date(self):
+        row = self.conn.execute("SELECT MAX(date) FROM eod").fetchone()
+        return row[0] if row else None
+
+    def dates(self):
+        return [r[0] for r in self.conn.execute("SELECT date FROM files ORDER BY date")]
+
+    def history(self, code, sessions=60, end=None):
+        """某代碼最近 sessions 個交易日（按日期升序）"""
+        df = self.query(
+            "SELECT * FROM eod WHERE code = ? AND date <= COALESCE(?, '9999') "
+            "ORDER BY date DESC LIMIT ?", (str(code), end, sessions))
+        return df.iloc[::-1].reset_index(drop=True)
+
+    def volume_spikes(self, ratio=5.0, start=None, end=None):
+        """成交量超過 Vol MA (20) 的 ratio 倍的記錄"""
+        return self.query(
+            "SELECT date, code, name, sector, last, chg, vol, vol_ma20, vol / vol_ma20 AS ratio "
+            "FROM eod WHERE date >= COALESCE(?, '') AND date <= COALESCE(?, '9999') "
+            "AND vol_ma20 > 0 AND vol > ? * vol_ma20 ORDER BY date, ratio DESC",
+            (start, end, ratio))
+
+    def sector_summary(self, trade_date=None):
+        """某交易日（默認最新）按行業匯總：股票數、價格和漲跌幅統計"""
+        trade_date = trade_date or self.latest_date()
+        return self.query(
+            "SELECT COALESCE(sector, 'Unknown') AS sector, COUNT(*) AS stocks, "
+            "AVG(last) AS avg_last, MIN(last) AS min_last, MAX(last) AS max_last, "
+            "COUNT(last) AS priced, AVG(chg) AS avg_chg, COUNT(chg) AS changed, SUM(vol) AS volume "
+            "FROM eod WHERE date = ? GROUP BY COALESCE(sector, 'Unknown') ORDER BY stocks DESC, sector",
+            (trade_date,))
+
+    def sector_series(self, sector=None, start=None, end=None):
+        """行業每日匯總（sector_daily），按日期、行業排序；sector 為 None 時返回全部行業"""
+        return self.query(
+            "SELECT * FROM sector_daily WHERE (? IS NULL OR sector = ?) "
+            "AND date >= COALESCE(?, '') AND date <= COALESCE(?, '9999') ORDER BY date, sector",
+            (sector, sector, start, end))
+
+    def sector_distribution(self, directory=None):
+        """行業行數分佈；指定 directory 時只統計從該目錄載入的交易日"""
+        if directory is None:
+            sql, params = "SELECT sector, COUNT(*) AS row_count FROM eod GROUP BY sector", ()
+        else:
+            sql = ("SELECT e.sector, COUNT(*) AS row_count FROM eod e JOIN files f ON e.date = f.date "
+                   "WHERE f.directory = ? GROUP BY e.sector")
+            params = (os.path.abspath(directory),)
+        return self.query(sql + " ORDER BY row_count DESC, sector", params)
+
+    def files(self, directory=None):
+        if directory is None:
+            return self.query("SELECT * FROM files ORDER BY date")
+        return self.query("SELECT * FROM files WHERE directory = ? ORDER BY date",
+                          (os.path.abspath(directory),))
+
+    def stats(self):
+        """{表名: 行數}"""
+        return {table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("stocks", "sectors", "eod", "files", "sector_daily")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EOD 本地數據庫")
+    parser.add_argument("--db", default=DB_PATH, help="數據庫文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="載入規範化CSV（文件或目錄）")
+    p.add_argument("paths", nargs="*", help="默認 data/normalized")
+    p.add_argument("--force", action="store_true", help="文件沒變也重新載入")
+
+    p = sub.add_parser("history", help="某代碼最近N個交易日")
+    p.add_argument("code")
+    p.add_argument("-n", "--sessions", type=int, default=60)
+
+    p = sub.add_parser("spikes", help="成交量超過 Vol MA (20) 若干倍")
+    p.add_argument("--ratio", type=float, default=5.0)
+    p.add_argument("--since", help="開始日期 YYYY-MM-DD")
+    p.add_argument("--until", help="結束日期 YYYY-MM-DD")
+
+    p = sub.add_parser("sectors", help="行業每日匯總（上漲/下跌、成交量加權漲跌幅、新高/新低）")
+    p.add_argument("sector", nargs="?", help="行業名稱，默認全部")
+    p.add_argument("--since", help="開始日期 YYYY-MM-DD")
+    p.add_argument("--until", help="結束日期 YYYY-MM-DD")
+    p.add_argument("--rebuild", action="store_true", help="按 eod 表重新計算")
+
+    p = sub.add_parser("sql", help="運行 SQL")
+    p.add_argument("statement")
+
+    sub.add_parser("stats", help="各表行數")
+
+    p = sub.add_parser("memory", help="載入歷史，對比完整 / 緊湊表示的內存")
+    p.add_argument("--since", help="開始日期 YYYY-MM-DD")
+    p.add_argument("--until", help="結束日期 YYYY-MM-DD")
+    args = parser.parse_args()
+
+    with EODDatabase(args.db) as db:
+        if args.command == "ingest":
+            loaded, rows = db.ingest_paths(args.paths or DEFAULT_SOURCES, force=args.force)
+            print(f"✅ 載入 {loaded} 個文件，{rows} 行")
+            return 0
+
+        if args.command == "stats":
+            for table, count in db.stats().items():
+                print(f"  {table:<12} {count:>10,}")
+            print(f"  最新交易日: {db.latest_date() or '-'}")
+            return 0
+
+        if args.command == "memory":
+            full = memory_report(db.load_history(args.since, args.until, compact=False))
+            compact = db.load_history(args.since, args.until)
+            if compact.empty:
+                print("📭 沒有結果")
+                return 1
+            report = full.join(memory_report(compact), lsuffix="_full", rsuffix="_compact")
+            for col, row in report.iterrows():
+                print(f"  {col:<10} {row.dtype_full:<10} {format_bytes(row.bytes_full):>10}   →   "
+                      f"{row.dtype_compact:<10} {format_bytes(row.bytes_compact):>10}")
+            rows, days = len(compact), compact["date"].nunique()
+            total_full, total_compact = report.loc["(total)", ["bytes_full", "bytes_compact"]]
+            print(f"📊 {rows:,} 行 / {days} 個交易日: 完整 {format_bytes(total_full)}，"
+                  f"緊湊 {format_bytes(total_compact)}（{total_compact / total_full:.0%}，"
+                  f"{total_compact / rows:.0f} 字節/行）")
+            year = 250 * (compact["date"] == compact["date"].cat.categories.max()).sum()
+            print(f"   按最新交易日的代碼數估算一年（250 個交易日）: {format_bytes(year * total_compact / rows)}")
+            return 0
+
+        if args.command == "history":
+            df = db.history(args.code, args.sessions)
+        elif args.command == "spikes":
+            df = db.volume_spikes(args.ratio, args.since, args.until)
+        elif args.command == "sectors":
+            if args.rebuild:
+                print(f"✅ 重新計算 {db.rebuild_sector_daily()} 個交易日的行業匯總")
+            df = db.sector_series(args.sector, args.since, args.until)
+        else:
+            df = db.query(args.statement)
+
+        if df.empty:
+            print("📭 沒有結果")
+            return 1
+        print(df.to_string(index=False))
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
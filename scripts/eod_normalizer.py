@@ -0,0 +1,843 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+🧹 EOD 規範化核心 - 可插拔表頭方言
+======================================================================
+normalize_eod / normalize_eod_simple / reorder_eod / eod_processor 和
+ai_stock_picker_full.normalize_csv_file 共用的規範化引擎:
+  • 每個文件只讀一次（csv 模塊或 pandas C 解析器，由方言決定）
+  • 列名識別、代碼清洗、數值解析、行業映射都由方言（Dialect）描述
+  • 每列先 factorize，清洗函數只對唯一值調用一次再 take 展開，
+    重複值（價格、行業代碼、狀態）不再逐格重算
+  • 各腳本只保留自己的命令行和輸出格式，是本模塊的薄包裝
+
+內置方言（get_dialect 的名稱）:
+  broker     normalize_eod.py         eod_config.json 驅動，數值解析 + 行業前綴匹配
+  simple     normalize_eod_simple.py  字符串輸出，行業表 + 首位數字推斷
+  reorder    reorder_eod.py           pandas 類型推斷，保留 Sector_Code/Sector_Name
+  processor  eod_processor.py         模糊列名匹配 + 內置行業表
+  picker     ai_stock_picker_full     小寫列名，不做行業映射
+
+用法:
+    from eod_normalizer import get_dialect, normalize
+    dialect = get_dialect('broker', config=config, sector_mapping=mapping)
+    table = normalize('20251222.csv', dialect)
+    table.frame       # DataFrame（按方言輸出列順序）
+    table.rows()      # [[...], ...]，供 csv.writer 使用
+    table.filled      # {列名: 填充默認值的行數}
+
+新方言用 register_dialect(name, factory) 註冊；
+各腳本舊版本的輸出對比見 tests/test_normalizer_parity.py
+======================================================================
+"""
+
+import re
+import csv
+
+import numpy as np
+import pandas as pd
+
+NULL_TOKENS = ('', '-', '--', 'N/A')
+
+
+# ============================================================================
+# 分隔符檢測
+# ============================================================================
+
+def sniff_delimiter(path, encoding="utf-8"):
+    """前4KB中制表符不少於逗號時按制表符分隔（normalize_eod 規則）"""
+    with open(path, "r", newline="", encoding=encoding) as f:
+        sample = f.read(4096)
+    if "\t" in sample and sample.count("\t") >= sample.count(","):
+        return "\t"
+    return ","
+
+
+def first_line_delimiter(path, encoding="utf-8"):
+    """首行制表符多於逗號時按制表符分隔（normalize_eod_simple 規則）"""
+    with open(path, "r", encoding=encoding) as f:
+        first_line = f.readline().strip()
+    if "\t" in first_line and first_line.count("\t") > first_line.count(","):
+        return "\t"
+    return ","
+
+
+def comma_delimiter(path, encoding="utf-8"):
+    """固定逗號分隔（pd.read_csv 默認）"""
+    return ","
+
+
+# ============================================================================
+# 單元格清洗
+# ============================================================================
+
+def clean_code_value(code):
+    """清理Code列的格式（="1234" / "1234" / '1234'）"""
+    if not code:
+        return code
+
+    code = str(code).strip()
+
+    if code.startswith('="') and code.endswith('"'):
+        code = code[2:-1]
+    elif code.startswith('="'):
+        code = code[2:]
+    elif code.startswith('"') and code.endswith('"'):
+        code = code[1:-1]
+    elif code.startswith('"'):
+        code = code[1:]
+
+    return re.sub(r'^[="\']+|[="\']+$', '', code)
+
+
+def unwrap_excel_code(code):
+    """只去掉完整的 ="..." 包裝（normalize_eod_simple 規則）"""
+    if code and code.startswith('="') and code.endswith('"'):
+        return code[2:-1]
+    return code
+
+
+def clean_numeric_value(value, is_percentage=False):
+    """清理數值：去千分位逗號，能解析為 int/float 的轉成數字，否則返回字符串"""
+    if value is None:
+        return None
+
+    value = str(value).strip()
+
+    if value in NULL_TOKENS:
+        return None
+
+    if is_percentage and value.endswith('%'):
+        value = value[:-1]
+
+    value = value.replace(',', '')
+
+    try:
+        if '.' in value:
+            return float(value)
+        return int(value)
+    except ValueError:
+        return value
+
+
+# ============================================================================
+# 行業映射策略
+# ============================================================================
+
+def sector_by_prefix(sector_code, sector_mapping):
+    """精確匹配 → 前3位 → 前2位 → 首位數字 → 小寫（normalize_eod 規則）"""
+    if not sector_code:
+        return "Unknown"
+
+    sector_code = str(sector_code).strip()
+
+    if sector_code in sector_mapping:
+        return sector_mapping[sector_code]
+
+    if sector_code.isdigit():
+        for prefix in (sector_code[:3] if len(sector_code) >= 3 else None,
+                       sector_code[:2] if len(sector_code) >= 2 else None,
+                       sector_code[0]):
+            if prefix and prefix in sector_mapping:
+                return sector_mapping[prefix]
+
+    lower_code = sector_code.lower()
+    if lower_code in sector_mapping:
+        return sector_mapping[lower_code]
+
+    return "Unknown"
+
+
+def sector_by_first_digit(sector_code, sector_lookup):
+    """精確匹配，純數字代碼再按首位數字推斷（normalize_eod_simple 規則）"""
+    if sector_code:
+        if sector_code in sector_lookup:
+            return sector_lookup[sector_code]
+        if sector_code.isdigit() and sector_code[0] in sector_lookup:
+            return sector_lookup[sector_code[0]]
+    return "Unknown"
+
+
+DEFAULT_SECTOR_GROUPS = {
+    "1": "Industrial & Consumer Products",
+    "2": "Technology",
+    "3": "Property",
+    "4": "Telecommunications & Media",
+    "5": "Transportation & Logistics",
+    "6": "Utilities",
+    "7": "Medical",
+    "8": "Financial",
+    "9": "Energy",
+    "10": "Consumer"
+}
+
+
+def sector_with_groups(code, sector_mapping):
+    """
+    精確匹配 → 去前導零 → 前3位 → 前2位默認大類（reorder_eod 規則）
+    返回 (行業名稱, 原始代碼)
+    """
+    if pd.isna(code) or code in ["", "-", "N/A", "NULL"]:
+        return "Unknown", ""
+
+    code_str = str(code).strip()
+
+    if code_str in sector_mapping:
+        return sector_mapping[code_str], code_str
+
+    if code_str.startswith('0'):
+        code_no_zero = code_str.lstrip('0')
+        if code_no_zero in sector_mapping:
+            return sector_mapping[code_no_zero], code_str
+
+    if len(code_str) > 3 and code_str[:3] in sector_mapping:
+        return sector_mapping[code_str[:3]], code_str
+
+    if len(code_str) >= 2 and code_str[:2].isdigit():
+        group = str(int(code_str[:2]))
+        if group in DEFAULT_SECTOR_GROUPS:
+            return DEFAULT_SECTOR_GROUPS[group], code_str
+
+    return f"Unknown ({code_str})", code_str
+
+
+# eod_processor 內置行業表
+SECTOR_MAP = {
+    "101": "Industrial & Consumer Products",
+    "102": "Industrial & Consumer Products",
+    "103": "Industrial & Consumer Products",
+    "105": "Industrial & Consumer Products",
+    "110": "Industrial & Consumer Products",
+    "120": "Industrial & Consumer Products",
+    "125": "Industrial & Consumer Products",
+    "150": "Industrial & Consumer Products",
+    "155": "Industrial & Consumer Products",
+    "161": "Industrial & Consumer Products",
+    "162": "Industrial & Consumer Products",
+    "163": "Industrial & Consumer Products",
+    "164": "Industrial & Consumer Products",
+    "165": "Industrial & Consumer Products",
+    "166": "Industrial & Consumer Products",
+    "301": "Technology",
+    "302": "Technology",
+    "303": "Technology",
+    "305": "Technology",
+    "310": "Technology",
+    "320": "Technology",
+    "325": "Technology",
+    "358": "Technology",
+    "361": "Technology",
+    "362": "Technology",
+    "363": "Technology",
+    "364": "Technology",
+    "365": "Technology",
+    "401": "Property",
+    "402": "Property",
+    "403": "Property",
+    "405": "Property",
+    "410": "Property",
+    "420": "Property",
+    "425": "Property",
+    "461": "Property",
+    "462": "Property",
+    "463": "Property",
+    "464": "Property",
+    "465": "Property",
+    "501": "Telecommunications & Media",
+    "502": "Telecommunications & Media",
+    "520": "Telecommunications & Media",
+    "560": "Telecommunications & Media",
+    "653": "Transportation & Logistics",
+    "654": "Transportation & Logistics",
+    "656": "Transportation & Logistics",
+    "657": "Transportation & Logistics",
+    "701": "Utilities",
+    "702": "Utilities",
+    "703": "Utilities",
+    "705": "Utilities",
+    "710": "Utilities",
+    "725": "Utilities",
+    "762": "Utilities",
+    "0162": "Medical Devices & Supplies",
+    "0405": "Software & IT Services",
+    "1701": "Industrial Holding Firms",
+    "1702": "Industrial & Consumer Products",
+    "1703": "Industrial Support Services",
+    "1704": "Building Materials",
+    "1705": "Construction & Infrastructure",
+    "1706": "Transportation & Logistics",
+    "1801": "Consumer Product Holding Firms",
+    "1802": "Food, Beverage & Tobacco",
+    "1803": "Retail & Distribution",
+    "1804": "Hotel, Resort & Recreational Services",
+    "1805": "Media & Entertainment",
+    "1806": "Other Consumer Services",
+    "1807": "Health Care Equipment & Services",
+    "1808": "Pharmaceuticals & Biotechnology",
+    "1809": "Technology",
+    "1810": "Telecommunications & Media",
+    "0200": "Plantation",
+    "0501": "Property Holding Firms",
+    "0502": "Property Development",
+    "0503": "Real Estate Investment Trusts (REITs)",
+    "0504": "Other Property-related Services",
+    "1201": "Financial Holding Firms",
+    "1202": "Commercial Banks",
+    "1203": "Insurance",
+    "1204": "Investment Banks",
+    "1205": "Other Finance",
+    "0301": "Energy Holding Firms",
+    "0302": "Energy-related Equipment & Services",
+    "0303": "Oil & Gas",
+    "0401": "Utilities Holding Firms",
+    "0402": "Gas, Water & Multi-utilities",
+    "0403": "Electricity",
+    "0080": "Special Purpose Acquisition",
+
+    # 默認映射（數字代碼轉行業）
+    **DEFAULT_SECTOR_GROUPS
+}
+
+
+def sector_from_table(code, table=SECTOR_MAP):
+    """精確匹配 → 首位數字 → 範圍鍵（eod_processor 規則）"""
+    if pd.isna(code):
+        return "Unknown"
+
+    code_str = str(code).strip()
+
+    if code_str in table:
+        return table[code_str]
+
+    if code_str and code_str[0].isdigit() and code_str[0] in table:
+        return table[code_str[0]]
+
+    if code_str.isdigit():
+        code_int = int(code_str)
+        for key, value in table.items():
+            if '-' in key:
+                start, end = map(int, key.split('-'))
+                if start <= code_int <= end:
+                    return value
+
+    return f"Unknown ({code_str})"
+
+
+# ============================================================================
+# 模糊列名匹配（eod_processor）
+# ============================================================================
+
+# 標準列順序
+STANDARD_COLUMNS = [
+    "Code", "Stock", "Sector", "Open", "Last", "Prv Close", "Chg", "High", "Low",
+    "Y-High", "Y-Low", "Vol", "DY*", "B%", "Vol MA (20)", "RSI (14)", "MACD (26,12)",
+    "EPS*", "P/E", "Status"
+]
+
+# 列名變體
+COLUMN_MAPPING = {
+    "Code": ["Code", "股票代码", "代码", "Symbol", "Ticker", "代号", "证券代码", "股号"],
+    "Stock": ["Stock", "股票", "名称", "Name", "公司名称", "股票名称", "公司", "股票名"],
+    "Sector": ["Sector", "行业", "板块", "Industry", "行业分类", "所属行业", "产业", "板块分类"],
+    "Open": ["Open", "开盘价", "开盘", "Opening Price", "开市价", "今开", "开盘价格"],
+    "Last": ["Last", "最新价", "现价", "当前价", "收盘价", "最后价", "成交价", "当前价格"],
+    "Prv Close": ["Prv Close", "前收盘", "昨日收盘", "Previous Close", "前收", "昨收", "前一日收盘", "昨日收市", "Prev Close"],
+    "Chg": ["Chg", "涨跌", "变化", "Change", "涨跌幅", "变动", "涨幅", "变化率", "涨跌%", "Chg%", "Change%"],
+    "High": ["High", "最高价", "最高", "最高价", "日内最高", "当日最高"],
+    "Low": ["Low", "最低价", "最低", "最低价", "日内最低", "当日最低"],
+    "Y-High": ["Y-High", "年最高", "52周最高", "Year High", "52周高", "年度最高", "年内最高", "Year-High"],
+    "Y-Low": ["Y-Low", "年最低", "52周最低", "Year Low", "52周低", "年度最低", "年内最低", "Year-Low"],
+    "Vol": ["Vol", "成交量", "交易量", "Volume", "成交额", "量", "成交股数", "交易股数"],
+    "DY*": ["DY*", "股息率", "股息收益率", "Dividend Yield", "股息", "分红率", "股息%", "Dividend"],
+    "B%": ["B%", "贝塔系数", "Beta", "波动率", "风险系数", "β", "Beta系数"],
+    "Vol MA (20)": ["Vol MA (20)", "成交量均线20", "20日成交量均线", "Vol MA 20", "Volume MA 20", "20日均量", "成交量20日均线", "Vol MA(20)"],
+    "RSI (14)": ["RSI (14)", "RSI", "相对强弱指数", "RSI 14", "相对强弱指标", "RSI指标"],
+    "MACD (26,12)": ["MACD (26,12)", "MACD", "指数平滑异同移动平均线", "MACD指标",
+                     "MACD(26,12)", "MACD (26, 12)", "MACD(26, 12)", "MACD 26 12",
+                     "MACD(26,12,9)", "MACD (26,12,9)", "MACD 26-12"],
+    "EPS*": ["EPS*", "每股收益", "EPS", "每股盈利", "每股盈余", "Earnings Per Share", "每股收益EPS"],
+    "P/E": ["P/E", "市盈率", "PE", "股价收益比", "本益比", "市盈率(PE)", "PE Ratio", "P/E Ratio"],
+    "Status": ["Status", "状态", "交易状态", "上市状态", "股票状态", "上市情况", "交易情况"]
+}
+
+CHINESE_COLUMN_MAPPING = {
+    "Code": ["代码", "代号", "股号"],
+    "Stock": ["股票", "名称"],
+    "Sector": ["行业"],
+    "Open": ["开盘价", "开盘"],
+    "Last": ["最新价", "收盘价"],
+    "Prv Close": ["前收盘", "昨收"],
+    "Chg": ["涨跌", "涨跌幅", "变化"],
+    "High": ["最高价", "最高"],
+    "Low": ["最低价", "最低"],
+    "Y-High": ["年最高", "52周最高"],
+    "Y-Low": ["年最低", "52周最低"],
+    "Vol": ["成交量", "交易量"],
+    "DY*": ["股息率", "股息收益率"],
+    "B%": ["贝塔系数", "Beta"],
+    "Vol MA (20)": ["成交量均线20", "20日成交量均线"],
+    "RSI (14)": ["RSI", "相对强弱指数"],
+    "MACD (26,12)": ["MACD", "指数平滑异同移动平均线"],
+    "EPS*": ["每股收益", "EPS"],
+    "P/E": ["市盈率", "PE"],
+    "Status": ["状态", "交易状态"]
+}
+
+
+def check_column_match(actual_col, standard_col):
+    """實際列名與標準列名的匹配分數（0-10）"""
+    if not actual_col or not standard_col:
+        return 0
+
+    clean_actual = str(actual_col).strip().replace('\ufeff', '').lower()
+    clean_standard = str(standard_col).strip().lower()
+
+    # 1. 完全匹配（10分）
+    if clean_actual == clean_standard:
+        return 10
+
+    # 2. 列名變體（8分完全 / 7分包含）
+    for variant in COLUMN_MAPPING.get(standard_col, ()):
+        variant = variant.lower()
+        if clean_actual == variant:
+            return 8
+        if clean_actual in variant or variant in clean_actual:
+            return 7
+
+    # 3. 中文列名（7分）
+    for chinese in CHINESE_COLUMN_MAPPING.get(standard_col, ()):
+        if chinese in actual_col or actual_col in chinese:
+            return 7
+
+    # 4. 關鍵詞（6分）
+    standard_words = re.findall(r'[a-zA-Z0-9]+', clean_standard)
+    actual_words = re.findall(r'[a-zA-Z0-9]+', clean_actual)
+
+    for word in standard_words:
+        if len(word) > 2 and word in clean_actual:
+            return 6
+
+    # 5. 部分匹配（4分）
+    for word in standard_words:
+        if len(word) > 3:
+            for actual_word in actual_words:
+                if len(actual_word) > 3 and (word in actual_word or actual_word in word):
+                    return 4
+
+    return 0
+
+
+def auto_align_columns(columns, standard_columns=STANDARD_COLUMNS):
+    """
+    為每個標準列找分數最高的實際列（>=4分才算匹配）
+    返回 (target_order, mapping_info, match_rate)
+    """
+    target_order = []
+    used_columns = set()
+    mapping_info = []
+
+    for std_col in standard_columns:
+        best_match, best_score = None, 0
+        for actual_col in columns:
+            if actual_col in used_columns:
+                continue
+            score = check_column_match(actual_col, std_col)
+            if score > best_score:
+                best_match, best_score = actual_col, score
+
+        if best_match and best_score >= 4:
+            target_order.append(best_match)
+            used_columns.add(best_match)
+            mapping_info.append({
+                "standard": std_col,
+                "actual": best_match,
+                "score": best_score,
+                "status": "✓ 匹配" if best_score >= 6 else "⚠ 部分匹配"
+            })
+        else:
+            target_order.append(std_col)
+            mapping_info.append({"standard": std_col, "actual": None, "score": 0, "status": "✗ 未匹配"})
+
+    for actual_col in columns:
+        if actual_col not in used_columns:
+            target_order.append(actual_col)
+            mapping_info.append({"standard": "(额外)", "actual": actual_col, "score": 0, "status": "额外列"})
+
+    matched_count = len([m for m in mapping_info if m['score'] >= 4])
+    match_rate = (matched_count / len(standard_columns)) * 100
+    return target_order, mapping_info, match_rate
+
+
+# ============================================================================
+# 方言
+# ============================================================================
+
+def strip_header(raw_header):
+    return [str(col).strip() for col in raw_header]
+
+
+def alias_header(aliases):
+    """列名去空格、Chg% → Chg，再按配置別名映射"""
+    def resolve(raw_header):
+        normalized = []
+        for col in raw_header:
+            c = col.strip()
+            if c == "Chg%":
+                c = "Chg"
+            normalized.append(aliases.get(c, c))
+        return normalized
+    return resolve
+
+
+class Dialect:
+    """
+    表頭方言：描述一種CSV來源如何讀取和規範化
+      reader     'text'（csv 模塊，全部是字符串）或 'frame'（pd.read_csv 類型推斷）
+      delimiter  分隔符檢測函數 (path, encoding) -> str
+      header     原始列名 -> 規範列名 的函數
+      columns    輸出列；None 表示按規範列名原樣輸出
+      cells      {規範列名: 單元格清洗函數}，按唯一值調用
+      fill       {列名: 默認值}，清洗結果為 None 的單元格用它填充；None 表示不填充
+      missing    輸出列在文件中不存在時: 'cell'（None 走清洗和填充）、'blank'（填 ''）、'drop'（不輸出）
+      extra      是否把未映射的列保留在最後
+    """
+
+    def __init__(self, name, columns=None, header=strip_header, cells=None, fill=None,
+                 fill_default='-', missing='cell', extra=False, reader='text',
+                 delimiter=sniff_delimiter, encodings=('utf-8',)):
+        self.name = name
+        self.columns = columns
+        self.header = header
+        self.cells = cells or {}
+        self.fill = fill
+        self.fill_default = fill_default
+        self.missing = missing
+        self.extra = extra
+        self.reader = reader
+        self.delimiter = delimiter
+        self.encodings = encodings
+
+    def plan(self, header):
+        """
+        選擇輸出列，返回 [(輸出列名, 來源列位置或None, 是否使用未清洗的原值)]
+        同名列以後出現的為準
+        """
+        last = {name: i for i, name in enumerate(header)}
+        columns = self.columns if self.columns is not None else list(last)
+        plan = [(name, last.get(name), False) for name in columns]
+        if self.extra:
+            wanted = set(columns)
+            plan += [(name, i, False) for i, name in enumerate(header) if name not in wanted]
+        return plan
+
+    def cell_funcs(self, header):
+        """{來源列位置: 清洗函數}"""
+        return {i: self.cells[name] for i, name in enumerate(header) if name in self.cells}
+
+
+class ReorderDialect(Dialect):
+    """reorder_eod：Sector 換成行業名稱，原代碼保留在 Sector_Code"""
+
+    def plan(self, header):
+        plan = Dialect.plan(self, header)
+        if 'Sector' not in self.cells:
+            return plan
+        sector = {name: i for i, name in enumerate(header)}.get('Sector')
+        if sector is None:
+            return plan
+        return [(name, sector, name == 'Sector_Code') if name in ('Sector_Code', 'Sector_Name')
+                else (name, i, raw) for name, i, raw in plan]
+
+
+class ProcessorDialect(Dialect):
+    """eod_processor：模糊匹配標準列，第一個像 Sector 的列做行業映射"""
+
+    def align(self, header):
+        return auto_align_columns(header, self.columns)
+
+    def plan(self, header):
+        target_order, _, _ = self.align(header)
+        present = set(header)
+        position = {name: i for i, name in enumerate(header)}
+
+        # 按 target_order 順序取第一個 >=4 分的列（與舊版 reorder_dataframe 一致）
+        column_mapping = {}
+        for std_col in self.columns:
+            column_mapping[std_col] = next(
+                (col for col in target_order if col in present and check_column_match(col, std_col) >= 4),
+                None)
+        used = {col for col in column_mapping.values() if col}
+
+        sources = {std_col: position[col] if col else None for std_col, col in column_mapping.items()}
+        for col in header:
+            if col not in used:
+                sources[col] = position[col]
+
+        final_columns = list(self.columns) + [col for col in header
+                                              if col not in self.columns and col not in used]
+        return [(name, sources[name], False) for name in final_columns]
+
+    def cell_funcs(self, header):
+        for i, col in enumerate(header):
+            if check_column_match(col, "Sector") >= 4:
+                return {i: self.cells['Sector']} if 'Sector' in self.cells else {}
+        return {}
+
+
+# ============================================================================
+# 引擎
+# ============================================================================
+
+class NormalizedTable:
+    """規範化結果"""
+
+    def __init__(self, frame, raw, raw_header, header, delimiter, encoding, missing, filled):
+        self.frame = frame
+        self.raw = raw
+        self.raw_header = raw_header
+        self.header = header
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self.missing = missing
+        self.filled = filled
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def columns(self):
+        return list(self.frame.columns)
+
+    def rows(self):
+        """按輸出列順序的行列表（保留 Python 原值）"""
+        return self.frame.astype(object).values.tolist()
+
+
+def map_unique(values, func, na_value=np.nan):
+    """factorize 後只對唯一值調用 func，再用 take 展開到整列"""
+    codes, uniques = pd.factorize(values)
+    table = np.empty(len(uniques) + 1, dtype=object)
+    table[:-1] = [func(u) for u in uniques.tolist()]
+    table[-1] = func(na_value)  # codes 中的 -1（缺失值）取最後一項
+    return table[codes]
+
+
+def _fill(values, default):
+    values = np.asarray(values, dtype=object)
+    mask = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+    count = int(mask.sum())
+    if count:
+        values = values.copy()
+        values[mask] = default
+    return values, count
+
+
+def read_table(path, dialect):
+    """
+    按方言讀取文件，返回 (原始列名, 按位置編號列的 DataFrame, 分隔符, 編碼)
+    文件為空時原始列名為 None
+    """
+    last_error = None
+    for encoding in dialect.encodings:
+        try:
+            delimiter = dialect.delimiter(path, encoding)
+            if dialect.reader == 'frame':
+                frame = pd.read_csv(path, sep=delimiter, encoding=encoding)
+                raw_header = list(frame.columns)
+                frame.columns = range(len(raw_header))
+                return raw_header, frame, delimiter, encoding
+
+            with open(path, "r", newline="", encoding=encoding) as f:
+                rows = list(csv.reader(f, delimiter=delimiter))
+            break
+        except UnicodeDecodeError as e:
+            last_error = e
+    else:
+        raise ValueError(f"無法讀取CSV文件，嘗試了多種編碼: {path}") from last_error
+
+    if not rows:
+        return None, pd.DataFrame(), delimiter, encoding
+
+    raw_header = rows[0]
+    width = len(raw_header)
+    body = [r if len(r) == width else (r[:width] + [''] * (width - len(r))) for r in rows[1:]]
+    frame = pd.DataFrame(body, columns=range(width), dtype=object)
+    return raw_header, frame, delimiter, encoding
+
+
+def normalize(path, dialect):
+    """用指定方言規範化一個文件，返回 NormalizedTable"""
+    raw_header, raw, delimiter, encoding = read_table(path, dialect)
+    if raw_header is None:
+        raise ValueError(f"Empty input: {path}")
+
+    header = dialect.header(raw_header)
+    funcs = dialect.cell_funcs(header)
+    na_value = np.nan if dialect.reader == 'frame' else None
+    n = len(raw)
+
+    cleaned = {}
+    data = {}
+    missing = []
+    filled = {}
+    for name, i, use_raw in dialect.plan(header):
+        if i is None:
+            missing.append(name)
+            if dialect.missing == 'drop':
+                continue
+            if dialect.missing == 'blank':
+                values = np.full(n, '', dtype=object)
+            else:
+                func = dialect.cells.get(name)
+                values = np.full(n, func(None) if func else None, dtype=object)
+        elif use_raw or i not in funcs:
+            values = raw[i]
+        else:
+            if i not in cleaned:
+                cleaned[i] = map_unique(raw[i], funcs[i], na_value)
+            values = cleaned[i]
+
+        if dialect.fill is not None:
+            values, filled[name] = _fill(values, dialect.fill.get(name, dialect.fill_default))
+        data[name] = values
+
+    frame = pd.DataFrame(data, index=raw.index) if data else pd.DataFrame()
+    return NormalizedTable(frame, raw, raw_header, header, delimiter, encoding, missing, filled)
+
+
+# ============================================================================
+# 內置方言
+# ============================================================================
+
+def broker_dialect(config, sector_mapping=None, registry=None, source=None):
+    """
+    normalize_eod：eod_config.json 的 schema/map/fill/sector_lookup
+    Code 去 ="..." 包裝，其餘列解析為數字，Sector 按前綴映射
+    dialect.unmapped 收集映射不到的行業代碼（每個文件用新的實例）
+    registry（header_registry.HeaderRegistry）: 按表頭指紋解析列名，
+    處理別名覆蓋不到的表頭漂移；None 時只用配置別名
+    """
+    sector_mapping = dict(sector_mapping or {})
+    for code, name in config.get("sector_lookup", {}).items():
+        sector_mapping.setdefault(code, name)
+
+    def parse(value, is_percentage=False):
+        if value is None:
+            return None
+        value = clean_numeric_value(value.strip(), is_percentage)
+        return None if value == "" else value
+
+    def code(value):
+        if value is None:
+            return None
+        value = clean_code_value(value.strip())
+        return value if value != "" and value is not None else None
+
+    def sector(value):
+        sector_code = parse(value)
+        if not sector_code:
+            return "Unknown"
+        name = sector_by_prefix(sector_code, sector_mapping)
+        if name == "Unknown":
+            dialect.unmapped.add(sector_code)
+        return name
+
+    schema = config["schema"]
+    cells = {c: parse for c in schema}
+    cells.update({"Code": code, "Chg": lambda v: parse(v, True), "Sector": sector})
+    fill = dict(config.get("fill", {}))
+    fill["Sector"] = "Unknown"
+
+    aliases = config.get("map", {})
+    header = registry.resolver(schema, aliases, source) if registry is not None else alias_header(aliases)
+    dialect = Dialect('broker', columns=schema, header=header, cells=cells, fill=fill)
+    dialect.sector_mapping = sector_mapping
+    dialect.unmapped = set()
+    return dialect
+
+
+def simple_dialect(config):
+    """normalize_eod_simple：只做空值識別、="..."去包裝和行業表映射，全部保留字符串"""
+    sector_lookup = config.get("sector_lookup", {})
+
+    def value(v):
+        v = v.strip() if v is not None else ''
+        return None if v in NULL_TOKENS else v
+
+    cells = {c: value for c in config.get("schema", [])}
+    cells["Code"] = lambda v: unwrap_excel_code(value(v))
+    cells["Sector"] = lambda v: sector_by_first_digit(value(v), sector_lookup)
+
+    return Dialect('simple', columns=config.get("schema", []),
+                   header=alias_header(config.get("map", {})), cells=cells,
+                   fill=config.get("fill", {}), delimiter=first_line_delimiter)
+
+
+REORDER_COLUMNS = [
+    'Code', 'Stock', 'Sector', 'Sector_Code', 'Sector_Name', 'Open', 'Last', 'Prv Close',
+    'Chg%', 'High', 'Low', 'Y-High', 'Y-Low', 'Vol', 'DY*', 'B%', 'Vol MA (20)',
+    'RSI (14)', 'MACD (26, 12)', 'EPS*', 'P/E', 'Status'
+]
+
+
+def reorder_dialect(sector_mapping=None, convert_sector=True):
+    """reorder_eod：目標列順序 + 額外列，Sector 轉行業名稱"""
+    cells = {}
+    if convert_sector:
+        cells['Sector'] = lambda v: sector_with_groups(v, sector_mapping or {})[0]
+    return ReorderDialect('reorder', columns=REORDER_COLUMNS, cells=cells, missing='blank',
+                          extra=True, reader='frame', delimiter=comma_delimiter)
+
+
+def processor_dialect(sector_table=SECTOR_MAP):
+    """eod_processor：模糊匹配標準列，內置行業表"""
+    return ProcessorDialect('processor', columns=STANDARD_COLUMNS, header=list,
+                            cells={'Sector': lambda v: sector_from_table(v, sector_table)},
+                            missing='blank', reader='frame', delimiter=comma_delimiter,
+                            encodings=('utf-8', 'utf-8-sig', 'latin-1', 'cp1252'))
+
+
+PICKER_COLUMNS = {
+    'Code': 'code',
+    'Stock': 'name',
+    'Sector': 'sector',
+    'Sector_Code': 'sector_code',
+    'Sector_Name': 'sector_name',
+    'Last': 'last_price',
+    'Open': 'open',
+    'High': 'high',
+    'Low': 'low',
+    'Prv Close': 'prev_close',
+    'Chg%': 'change_percent',
+    'Vol': 'volume'
+}
+
+
+def picker_dialect():
+    """ai_stock_picker_full：固定的小寫列名映射，只保留存在的列"""
+    def header(raw_header):
+        # 只認映射表中的原始列名；已經是小寫的列不會原樣通過（與舊版一致）
+        return [PICKER_COLUMNS.get(col) for col in strip_header(raw_header)]
+
+    return Dialect('picker', columns=list(PICKER_COLUMNS.values()), header=header,
+                   missing='drop', reader='frame', delimiter=comma_delimiter)
+
+
+DIALECTS = {
+    'broker': broker_dialect,
+    'simple': simple_dialect,
+    'reorder': reorder_dialect,
+    'processor': processor_dialect,
+    'picker': picker_dialect,
+}
+
+
+def register_dialect(name, factory):
+    """註冊新方言，factory(**kwargs) 返回 Dialect"""
+    DIALECTS[name] = factory
+
+
+def get_dialect(name, **kwargs):
+    if name not in DIALECTS:
+        raise KeyError(f"未知方言: {name}（可用: {', '.join(sorted(DIALECTS))}）")
+    return DIALECTS[name](**kwargs)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+✅ EOD 數據校驗引擎 - 聲明式規則，整列向量化計算
+======================================================================
+每條規則是一個返回「違規掩碼」的函數，在一天或整段歷史上一次算完，
+不逐行循環。報告按規則給出檢查行數、違規數和違規行的索引樣例:
+
+  required_columns code / last / vol 存在且有值（數據非空）
+  code_format      代碼為 2-12 位大寫字母/數字（可含 . - &），沒有 =" 殘留
+  price_positive   Open/Last/High/Low 有值時 > 0
+  high_ge_low      High >= Low
+  last_in_range    Low <= Last <= High
+  chg_consistent   Chg% 與 (Last - Prv Close) / Prv Close 一致
+  volume_nonneg    Vol >= 0
+
+空值（'-'、停牌）不算違規，只檢查有值的行
+required_columns 缺少列、整列為空或數據為空時未通過閘門；
+其他規則需要的列不在這份數據的 schema 中（例如 Close/Volume/Change% 的 schema 沒有 Prv Close）
+時記為「不適用」跳過，不影響閘門
+
+用法（代碼中）:
+    report = validate(eod_df)                  # 規範化後的 DataFrame
+    report.print_summary()
+    report.check_gate()                        # 超過允許比例時拋 ValidationError
+
+命令行:
+  python eod_validation.py file.csv [file2.csv ...]
+  python eod_validation.py --db [--since 2025-12-01]   # 校驗數據庫中的全部歷史
+  python eod_validation.py file.csv --json report.json
+======================================================================
+"""
+
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from eod_database import eod_columns
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CODE_PATTERN = r"^[0-9A-Z][0-9A-Z.&\-]{1,11}$"
+PRICE_COLUMNS = ["open", "last", "high", "low"]
+REQUIRED_COLUMNS = ["code", "last", "vol"]
+
+# 價格比較的容差（三位小數報價）
+PRICE_TOLERANCE = 1e-6
+# Chg% 容差：0.05 個百分點 + 1%（兩位小數取整和報價取整）
+CHG_ABS_TOLERANCE = 0.05
+CHG_REL_TOLERANCE = 0.01
+
+
+class ValidationError(Exception):
+    """校驗未通過流水線閘門"""
+
+
+class Rule:
+    """
+    校驗規則
+      check     frame -> (適用行掩碼, 違規掩碼)，都是與 frame 等長的布爾數組
+      columns   需要的列，缺少或整列為空時規則不能檢查（跳過）
+      max_rate  流水線閘門允許的違規比例（違規數 / 適用行數）
+      required  跳過時判為未通過閘門（只有 required_columns）；其他規則跳過時為不適用
+    """
+
+    def __init__(self, name, description, columns, check, max_rate=0.0, required=False):
+        self.name = name
+        self.description = description
+        self.columns = columns
+        self.check = check
+        self.max_rate = max_rate
+        self.required = required
+
+    def __repr__(self):
+        return f"Rule({self.name!r})"
+
+
+def _notna(frame, *columns):
+    mask = np.ones(len(frame), dtype=bool)
+    for col in columns:
+        mask &= frame[col].notna().to_numpy()
+    return mask
+
+
+def check_required(frame):
+    """列級檢查在 validate 中完成（缺列 / 整列為空 / 沒有數據）；能運行到這裡即全部通過"""
+    return np.ones(len(frame), dtype=bool), np.zeros(len(frame), dtype=bool)
+
+
+def check_code_format(frame):
+    codes = frame["code"]
+    valid = codes.str.fullmatch(CODE_PATTERN).fillna(False).to_numpy(dtype=bool)
+    return np.ones(len(frame), dtype=bool), ~valid
+
+
+def check_price_positive(frame):
+    columns = [c for c in PRICE_COLUMNS if c in frame.columns]
+    prices = frame[columns].to_numpy(dtype=float)
+    has_value = ~np.isnan(prices)
+    return has_value.any(axis=1), (has_value & (prices <= 0)).any(axis=1)
+
+
+def check_high_ge_low(frame):
+    applies = _notna(frame, "high", "low")
+    return applies, applies & (frame["high"].to_numpy() < frame["low"].to_numpy() - PRICE_TOLERANCE)
+
+
+def check_last_in_range(frame):
+    applies = _notna(frame, "last", "high", "low")
+    last = frame["last"].to_numpy()
+    outside = (last < frame["low"].to_numpy() - PRICE_TOLERANCE) | \
+              (last > frame["high"].to_numpy() + PRICE_TOLERANCE)
+    return applies, applies & outside
+
+
+def check_chg_consistent(frame):
+    prv_close = frame["prv_close"].to_numpy()
+    applies = _notna(frame, "chg", "last", "prv_close") & (np.nan_to_num(prv_close) > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        expected = (frame["last"].to_numpy() - prv_close) / prv_close * 100
+    diff = np.abs(frame["chg"].to_numpy() - expected)
+    tolerance = CHG_ABS_TOLERANCE + CHG_REL_TOLERANCE * np.abs(expected)
+    return applies, applies & (diff > tolerance)
+
+
+def check_volume_nonneg(frame):
+    applies = _notna(frame, "vol")
+    return applies, applies & (frame["vol"].to_numpy() < 0)
+
+
+RULES = [
+    Rule("required_columns", "必需列 code/last/vol 有值", REQUIRED_COLUMNS, check_required, required=True),
+    Rule("code_format", "代碼格式", ["code"], check_code_format, max_rate=0.01),
+    Rule("price_positive", "價格 > 0", ["last"], check_price_positive, max_rate=0.05),
+    Rule("high_ge_low", "High >= Low", ["high", "low"], check_high_ge_low, max_rate=0.01),
+    Rule("last_in_range", "Low <= Last <= High", ["last", "high", "low"], check_last_in_range, max_rate=0.05),
+    Rule("chg_consistent", "Chg% 與 Last/Prv Close 一致", ["chg", "last", "prv_close"],
+         check_chg_consistent, max_rate=0.10),
+    Rule("volume_nonneg", "Vol >= 0", ["vol"], check_volume_nonneg, max_rate=0.0),
+]
+
+
+class RuleResult:
+    def __init__(self, rule, checked, violations, examples, skipped=False):
+        self.rule = rule
+        self.checked = checked
+        self.violations = violations
+        self.examples = examples
+        self.skipped = skipped
+
+    @property
+    def rate(self):
+        return self.violations / self.checked if self.checked else 0.0
+
+    @property
+    def passed_gate(self):
+        if self.skipped:
+            return not self.rule.required
+        return self.rate <= self.rule.max_rate
+
+    def to_dict(self):
+        return {
+            "rule": self.rule.name,
+            "description": self.rule.description,
+            "checked": self.checked,
+            "violations": self.violations,
+            "rate": round(self.rate, 6),
+            "max_rate": self.rule.max_rate,
+            "skipped": self.skipped,
+            "examples": self.examples,
+        }
+
+
+class ValidationReport:
+    """每條規則一行的校驗報告"""
+
+    def __init__(self, results, rows):
+        self.results = results
+        self.rows = rows
+
+    @property
+    def violations(self):
+        return sum(r.violations for r in self.results)
+
+    @property
+    def ok(self):
+        return all(r.passed_gate for r in self.results)
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "violations": self.violations,
+            "passed": self.ok,
+            "rules": [r.to_dict() for r in self.results],
+        }
+
+    def print_summary(self):
+        print(f"🔎 校驗 {self.rows} 行:")
+        for r in self.results:
+            if r.skipped:
+                if r.rule.required:
+                    print(f"  ❌ {r.rule.name:<16} 缺少列或沒有數據（{', '.join(r.rule.columns)}），無法檢查")
+                else:
+                    print(f"  ➖ {r.rule.name:<16} 不適用（沒有 {', '.join(r.rule.columns)} 的數據）")
+                continue
+            icon = "✅" if not r.violations else ("⚠️ " if r.passed_gate else "❌")
+            print(f"  {icon} {r.rule.name:<16} {r.violations:>6} / {r.checked:<6} "
+                  f"({r.rate:6.2%}，允許 {r.rule.max_rate:.0%})  {r.rule.description}")
+            for example in r.examples[:3]:
+                detail = ", ".join(f"{k}={v}" for k, v in example.items() if k != "row")
+                print(f"       行 {example['row']}: {detail}")
+
+    def check_gate(self):
+        failed = [r for r in self.results if not r.passed_gate]
+        if failed:
+            detail = ", ".join(f"{r.rule.name} 缺少列或沒有數據" if r.skipped
+                               else f"{r.rule.name} {r.rate:.1%} > {r.rule.max_rate:.0%}" for r in failed)
+            raise ValidationError(f"數據校驗未通過: {detail}")
+        return self
+
+
+def prepare(df):
+    """轉為校驗使用的列（code/last/high/...）；已經是 eod 表的列時原樣使用"""
+    if "code" in df.columns and "Code" not in df.columns:
+        return df
+    frame = eod_columns(df)
+    if "Date" in df.columns:
+        frame["date"] = df["Date"]
+    return frame
+
+
+def validate(df, rules=RULES, examples=5):
+    """對整個 DataFrame 運行全部規則，返回 ValidationReport"""
+    frame = prepare(df)
+    label_columns = [c for c in ("date", "code", "last", "high", "low", "prv_close", "chg", "vol")
+                     if c in frame.columns]
+    results = []
+    for rule in rules:
+        missing = [c for c in rule.columns if c not in frame.columns or frame[c].isna().all()]
+        if missing or frame.empty:
+            results.append(RuleResult(rule, 0, 0, [], skipped=True))
+            continue
+
+        applies, violated = rule.check(frame)
+        hits = np.flatnonzero(violated)
+        sample = frame.iloc[hits[:examples]][label_columns]
+        sample_rows = [
+            {"row": idx, **{k: (None if pd.isna(v) else v) for k, v in row.items()}}
+            for idx, row in zip(sample.index.tolist(), sample.astype(object).to_dict("records"))
+        ]
+        results.append(RuleResult(rule, int(applies.sum()), len(hits), sample_rows))
+    return ValidationReport(results, len(frame))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EOD 數據校驗")
+    parser.add_argument("files", nargs="*", help="EOD CSV（原始或規範化）")
+    parser.add_argument("--db", action="store_true", help="校驗 EOD 數據庫中的全部歷史")
+    parser.add_argument("--since", help="--db 時的開始日期 YYYY-MM-DD")
+    parser.add_argument("--config", default=os.path.join(SCRIPT_DIR, "eod_config.json"),
+                        help="原始CSV規範化使用的配置")
+    parser.add_argument("--examples", type=int, default=5, help="每條規則保留的違規樣例數")
+    parser.add_argument("--json", help="把報告寫入 JSON 文件")
+    args = parser.parse_args()
+
+    if not args.files and not args.db:
+        parser.error("需要CSV文件或 --db")
+
+    reports = {}
+    if args.db:
+        from eod_database import EODDatabase
+        with EODDatabase() as db:
+            db.sync()
+            history = db.query("SELECT * FROM eod WHERE date >= COALESCE(?, '')", (args.since,))
+        reports["database"] = validate(history, examples=args.examples)
+
+    if args.files:
+        from eod_normalizer import get_dialect, normalize
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        for path in args.files:
+            try:
+                table = normalize(path, get_dialect("broker", config=config))
+            except (OSError, ValueError) as e:
+                print(f"❌ {path}: {e}")
+                continue
+            reports[path] = validate(table.frame, examples=args.examples)
+
+    for name, report in reports.items():
+        print(f"\n📁 {'EOD 數據庫' if name == 'database' else os.path.basename(name)}")
+        report.print_summary()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({name: r.to_dict() for name, r in reports.items()}, f,
+                      ensure_ascii=False, indent=2, default=str)
+        print(f"\n💾 報告已保存: {args.json}")
+    return 0 if all(r.ok for r in reports.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+👀 EOD 文件到達監聽 - 新交易日文件落地即觸發流水線
+======================================================================
+  • Linux 使用 inotify（通過 ctypes 調用 libc，無需額外依賴）
+  • 其他平台或 inotify 不可用時退回定時輪詢目錄
+  • 防抖: 文件被重命名進目錄（IN_MOVED_TO）視為寫入完成；
+          否則等待文件大小和修改時間穩定 settle 秒
+  • 每個交易日文件只觸發一次（按 大小+修改時間 指紋記錄在狀態文件中，
+    文件被替換為新內容時才會再次觸發）
+  • 鎖文件保證同一時間只有一條流水線在運行
+
+用法（代碼中）:
+    watcher = EODWatcher(raw_dir, on_file, state_file)
+    watcher.run()                 # on_file(target_date, path) -> True / False / None(忙，稍後重試)
+
+    with PipelineLock(lock_file) as lock:
+        if lock.acquired:
+            ...
+
+命令行（只監聽並打印，不運行流水線）:
+    python eod_watcher.py data/raw --settle 5
+======================================================================
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import fnmatch
+import select
+import struct
+import argparse
+from datetime import date, datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# inotify 事件掩碼（見 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+EVENT_HEADER = struct.Struct('iIII')
+
+# 文件名中的交易日期: 2025-12-24_raw.csv / 20251224.csv / eod_2025_12_24.csv
+DATE_PATTERN = re.compile(r'(20\d{2})[-_]?(\d{2})[-_]?(\d{2})')
+
+# 下載工具的臨時文件
+TEMP_SUFFIXES = ('.tmp', '.part', '.crdownload', '.partial', '.swp')
+
+
+def parse_trade_date(filename):
+    """從文件名解析交易日期，無法解析時返回 None"""
+    match = DATE_PATTERN.search(filename)
+    if not match:
+        return None
+    try:
+        return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    except ValueError:
+        return None
+
+
+class _Inotify:
+    """最小化的 inotify 封裝"""
+
+    def __init__(self, directory):
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失敗')
+        if self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f'inotify_add_watch 失敗: {directory}')
+
+    def read(self, timeout):
+        """等待最多 timeout 秒，返回 [(文件名, 掩碼), ...]"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+            events.append((name, mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PipelineLock:
+    """
+    基於鎖文件的互斥
+      • POSIX: 對鎖文件加 fcntl.flock（非阻塞），持有進程退出時由內核釋放，不存在過期的鎖；
+        鎖文件保留不刪除（刪除後重建會讓兩個進程鎖住不同的文件），內容為持有者的 pid
+      • 其他平台: O_CREAT | O_EXCL 創建鎖文件並寫入 pid；持有進程已退出的舊鎖
+        先原子地改名，確認改名得到的仍是過期的鎖後再刪除
+    """
+
+    def __init__(self, path, stale_seconds=6 * 3600):
+        self.path = path
+        self.stale_seconds = stale_seconds
+        self.acquired = False
+        self._fd = None
+
+    def _is_stale(self, path=None):
+        path = path or self.path
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                pid = int(f.read().split()[0])
+        except (OSError, ValueError, IndexError):
+            pid = None
+
+        if pid and os.name != 'nt':
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                return True
+            except PermissionError:
+                return False
+            return False
+
+        # Windows 或無法讀取 pid: 按鎖文件年齡判斷
+        try:
+            return time.time() - os.path.getmtime(path) > self.stale_seconds
+        except OSError:
+            return True
+
+    def _owner(self):
+        return f"{os.getpid()} {datetime.now().isoformat()}\n"
+
+    def _acquire_flock(self):
+        fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, self._owner().encode('utf-8'))
+        self._fd = fd
+        return True
+
+    def _remove_stale(self):
+        """把過期的鎖改名後再確認；改名得到的是剛被別人創建的新鎖時放回原處"""
+        claimed = f"{self.path}.{os.getpid()}.stale"
+        try:
+            os.rename(self.path, claimed)
+        except FileNotFoundError:
+            return True
+        except OSError:
+            return False
+        if self._is_stale(claimed):
+            print(f"  🔓 清除過期的鎖文件: {self.path}")
+            os.remove(claimed)
+            return True
+        try:
+            os.rename(claimed, self.path)
+        except OSError:
+            os.remove(claimed)
+        return False
+
+    def _acquire_exclusive(self):
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self._is_stale() and self._remove_stale():
+                    continue
+                return False
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self._owner())
+            return True
+        return False
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if fcntl is not None:
+            self.acquired = self._acquire_flock()
+        else:
+            self.acquired = self._acquire_exclusive()
+        return self.acquired
+
+    def release(self):
+        if not self.acquired:
+            return
+        if self._fd is not None:
+            os.ftruncate(self._fd, 0)
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        else:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+        self.acquired = False
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class EODWatcher:
+    """監聽 EOD 輸入目錄，每個新交易日文件觸發一次回調"""
+
+    def __init__(self, watch_dir, callback, state_file, pattern='*.csv',
+                 settle_seconds=5.0, poll_interval=10.0, use_inotify=True):
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.callback = callback
+        self.state_file = state_file
+        self.pattern = pattern
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.pending = {}  # path -> {'size', 'mtime_ns', 'stable_since', 'renamed'}
+        self.state = self._load_state()
+
+    # ------------------------------------------------------------------
+    # 狀態（已觸發的交易日）
+    # ------------------------------------------------------------------
+
+    def _load_state(self):
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            print(f"⚠️  無法讀取監聽狀態 {self.state_file}，將重新記錄")
+            return {}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_file)), exist_ok=True)
+        tmp_file = self.state_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_file, self.state_file)
+
+    @staticmethod
+    def _fingerprint(stat):
+        return [stat.st_size, stat.st_mtime_ns]
+
+    # ------------------------------------------------------------------
+    # 文件跟蹤
+    # ------------------------------------------------------------------
+
+    def _matches(self, name):
+        if name.startswith(('.', '~')) or name.lower().endswith(TEMP_SUFFIXES):
+            return False
+        return fnmatch.fnmatch(name, self.pattern) and parse_trade_date(name) is not None
+
+    def _already_done(self, path, stat):
+        entry = self.state.get(parse_trade_date(os.path.basename(path)).isoformat())
+        return bool(entry) and entry.get('fingerprint') == self._fingerprint(stat) \
+            and entry.get('status') in ('ok', 'failed', 'baseline')
+
+    def note(self, path, renamed=False):
+        """記錄一個可能有變化的文件"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.pending.pop(path, None)
+            return
+        if self._already_done(path, stat):
+            self.pending.pop(path, None)
+            return
+
+        now = time.monotonic()
+        entry = self.pending.get(path)
+        if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            self.pending[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                  'stable_since': now, 'renamed': renamed or bool(entry and entry['renamed'])}
+        elif renamed:
+            entry['renamed'] = True
+
+    def scan(self):
+        """掃描整個目錄（輪詢模式、啟動時、inotify 隊列溢出時）"""
+        try:
+            names = os.listdir(self.watch_dir)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if self._matches(name):
+                self.note(os.path.join(self.watch_dir, name))
+
+    def baseline(self):
+        """
+        首次啟動（沒有狀態文件）時，目錄中已有的文件只記錄不觸發；
+        有狀態時，比最近一次觸發日期更新的文件會補處理
+        """
+        if self.state:
+            return
+        for name in sorted(os.listdir(self.watch_dir)) if os.path.isdir(self.watch_dir) else []:
+            if not self._matches(name):
+                continue
+            path = os.path.join(self.watch_dir, name)
+            self.state[parse_trade_date(name).isoformat()] = {
+                'file': path,
+                'fingerprint': self._fingerprint(os.stat(path)),
+                'status': 'baseline',
+            }
+        if self.state:
+            print(f"  📌 首次啟動，已有 {len(self.state)} 個文件記錄為基線（不觸發）")
+            self._save_state()
+
+    def ready_files(self):
+        """返回已寫入完成的文件（按交易日期排序）"""
+        now = time.monotonic()
+        ready = []
+        for path, entry in list(self.pending.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                del self.pending[path]
+                continue
+            if stat.st_size != entry['size'] or stat.st_mtime_ns != entry['mtime_ns']:
+                self.note(path)
+                continue
+            if stat.st_size > 0 and (entry['renamed'] or now - entry['stable_since'] >= self.settle_seconds):
+                ready.append(path)
+        return sorted(ready, key=lambda p: parse_trade_date(os.path.basename(p)))
+
+    def trigger(self, path):
+        """為一個已完成的文件調用回調；回調返回 None 表示忙，保留待下次重試"""
+        target_date = parse_trade_date(os.path.basename(path))
+        stat = os.stat(path)
+        print(f"\n📥 新的EOD文件: {os.path.basename(path)} ({stat.st_size} bytes) -> {target_date}")
+
+        result = self.callback(target_date, path)
+        if result is None:
+            print("  ⏳ 流水線正忙，稍後重試")
+            self.pending[path]['stable_since'] = time.monotonic()
+            return None
+
+        self.pending.pop(path, None)
+        self.state[target_date.isoformat()] = {
+            'file': path,
+            'fingerprint': self._fingerprint(stat),
+            'status': 'ok' if result else 'failed',
+            'processed_at': datetime.now().isoformat(),
+        }
+        self._save_state()
+        return result
+
+    # ------------------------------------------------------------------
+    # 主循環
+    # ------------------------------------------------------------------
+
+    def _open_inotify(self):
+        if not (self.use_inotify and sys.platform.startswith('linux')):
+            return None
+        try:
+            return _Inotify(self.watch_dir)
+        except (OSError, AttributeError) as e:
+            print(f"  ⚠️  inotify 不可用，改用輪詢: {e}")
+            return None
+
+    def run(self, stop_after=None):
+        """持續監聽；stop_after 秒後返回（None 表示一直運行）"""
+        os.makedirs(self.watch_dir, exist_ok=True)
+        notifier = self._open_inotify()
+        mode = "inotify" if notifier else f"輪詢 每{self.poll_interval:g}s"
+        print(f"👀 監聽EOD目錄: {self.watch_dir} ({self.pattern}, {mode}, 穩定 {self.settle_seconds:g}s)")
+
+        self.baseline()
+        self.scan()
+        deadline = None if stop_after is None else time.monotonic() + stop_after
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                # 有待定文件時縮短等待，以便及時判斷是否穩定
+                timeout = min(1.0, self.settle_seconds) if self.pending else self.poll_interval
+                if notifier:
+                    for name, mask in notifier.read(timeout):
+                        if mask & IN_Q_OVERFLOW:
+                            self.scan()
+                        elif not mask & IN_ISDIR and self._matches(name):
+                            self.note(os.path.join(self.watch_dir, name), renamed=bool(mask & IN_MOVED_TO))
+                else:
+                    time.sleep(timeout)
+                    self.scan()
+
+                for path in self.ready_files():
+                    self.trigger(path)
+        except KeyboardInterrupt:
+            print("\n👋 停止監聽")
+        finally:
+            if notifier:
+                notifier.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='監聽EOD文件到達（只打印，不運行流水線）')
+    parser.add_argument('directory', help='EOD 輸入目錄')
+    parser.add_argument('--pattern', default='*.csv', help='文件名匹配模式')
+    parser.add_argument('--settle', type=float, default=5.0, help='文件大小穩定秒數')
+    parser.add_argument('--poll', type=float, default=10.0, help='輪詢間隔秒數')
+    parser.add_argument('--no-inotify', action='store_true', help='強制使用輪詢')
+    parser.add_argument('--state', default=os.path.join('logs', 'watcher_state.json'), help='狀態文件')
+    args = parser.parse_args()
+
+    def report(target_date, path):
+        print(f"  ✅ {target_date}: {path}")
+        return True
+
+    EODWatcher(args.directory, report, args.state, pattern=args.pattern, settle_seconds=args.settle,
+               poll_interval=args.poll, use_inotify=not args.no_inotify).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,182 @@
 #!/usr/bin/env python3
+"""
+======================================================================
+🏷️  提取全部股票代码 → Sector代码 映射（增量 + 多进程）
+======================================================================
+每个CSV文件的提取结果（部分结果）按文件内容哈希缓存（stage_cache.py），
+每次运行只扫描新增或内容有变化的文件，再把全部部分结果合并成
+all_sector_codes.json:
+  • 文件大小和修改时间没变 → 不重新计算哈希
+  • 哈希已有缓存 → 直接使用部分结果
+  • 其余文件在进程池中并行扫描，只读取 Code 和 Sector 两列
+
+命令行:
+  python extract_all_sector_codes.py
+  python extract_all_sector_codes.py --input-dir EOD/ --workers 4
+  python extract_all_sector_codes.py --rebuild     # 忽略缓存重新扫描
+======================================================================
+"""
 import os
 import csv
 import json
-from collections import defaultdict
+import argparse
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from eod_normalizer import sniff_delimiter
+from stage_cache import StageCache, file_hash, code_version
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+INPUT_DIR = "/storage/emulated/0/eskay9761/stock_data/Myx_Data/EOD"
+OUTPUT_FILE = "all_sector_codes.json"
+# 文件状态 → 哈希 的索引（避免每次重新读取全部文件计算哈希）
+INDEX_FILE = os.path.join(SCRIPT_DIR, "cache", "sector_codes_index.json")
+
+CODE_COLUMNS = ["code", "stock code", "代码"]
+MAX_WORKERS = 8
+
+def clean_code(code):
+    """清理Code格式: ="1234" 或 "1234" """
+    code = code.strip()
+    if code.startswith('="') and code.endswith('"'):
+        return code[2:-1]
+    if code.startswith('"') and code.endswith('"'):
+        return code[1:-1]
+    return code
+
+def scan_file(filepath):
+    """
+    提取一个CSV文件的部分结果:
+      {"has_sector": bool, "rows": 有Sector的行数,
+       "codes": {代码: [Sector...]}, "sector_counts": {Sector: 行数}}
+    """
+    delimiter = sniff_delimiter(filepath)
+    with open(filepath, 'r', newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f, delimiter=delimiter), [])
+
+    partial = {"has_sector": "Sector" in header, "rows": 0, "codes": {}, "sector_counts": {}}
+    if not partial["has_sector"]:
+        return partial
+
+    sector_idx = header.index("Sector")
+    code_idx = next((i for i, col in enumerate(header) if col.lower() in CODE_COLUMNS), -1)
+    if code_idx == -1:
+        return partial
+
+    # 只读取两列
+    df = pd.read_csv(filepath, sep=delimiter, usecols=[code_idx, sector_idx], dtype=str,
+                     keep_default_na=False, encoding='utf-8', on_bad_lines='skip')
+    code_col, sector_col = (0, 1) if code_idx < sector_idx else (1, 0)
+
+    pairs = [(code, sector) for code, sector in zip(map(clean_code, df.iloc[:, code_col].tolist()),
+                                                    map(str.strip, df.iloc[:, sector_col].tolist()))
+             if code and sector and sector != "-"]
+
+    codes = {}
+    for code, sector in dict.fromkeys(pairs):
+        codes.setdefault(code, []).append(sector)
+
+    partial["rows"] = len(pairs)
+    partial["sector_counts"] = dict(Counter(sector for _, sector in pairs))
+    partial["codes"] = codes
+    return partial
+
+def load_index(path=INDEX_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_index(index, path=INDEX_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+def load_partials(input_dir, csv_files, workers=None, rebuild=False):
+    """返回 ({文件名: 部分结果}, 扫描的文件数)；出错的文件不在结果中"""
+    cache = StageCache(verbose=False)
+    version = code_version(scan_file)
+    index = {} if rebuild else load_index()
+    new_index = {}
+
+    partials = {}
+    pending = {}   # 文件路径 → (文件名, 缓存键)
+    for filename in csv_files:
+        filepath = os.path.join(input_dir, filename)
+        stat = os.stat(filepath)
+        state = [stat.st_size, stat.st_mtime_ns]
+        known = index.get(filename)
+        digest = known["hash"] if known and known["state"] == state else file_hash(filepath)
+        new_index[filename] = {"state": state, "hash": digest}
 
-def extract_sector_codes():
+        key = cache.key('sector_codes', digest, version)
+        partial = None if rebuild else cache.get('sector_codes', key)
+        if partial is None:
+            pending[filepath] = (filename, key)
+        else:
+            partials[filename] = partial
+
+    if pending:
+        workers = max(1, min(workers or os.cpu_count() or 1, MAX_WORKERS, len(pending)))
+        print(f"扫描 {len(pending)} 个新文件（已缓存 {len(partials)} 个，进程数: {workers}）")
+        for filepath, partial in _scan_files(list(pending), workers):
+            filename, key = pending[filepath]
+            if isinstance(partial, Exception):
+                print(f"处理 {filename} 时出错: {partial}")
+                new_index.pop(filename, None)
+                continue
+            partials[filename] = cache.put('sector_codes', key, partial)
+    else:
+        print(f"没有新文件（已缓存 {len(partials)} 个）")
+
+    save_index(new_index)
+    return partials, len(pending)
+
+def _scan_files(paths, workers):
+    """按完成顺序产出 (文件路径, 部分结果或异常)；单进程时不建进程池"""
+    if workers == 1:
+        for filepath in paths:
+            try:
+                yield filepath, scan_file(filepath)
+            except Exception as e:
+                yield filepath, e
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(scan_file, p): p for p in paths}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
+
+def merge_partials(partials, csv_files):
+    """按文件名（日期）顺序合并部分结果"""
+    code_to_sectors = defaultdict(dict)   # 股票代码 -> Sector代码（保持首次出现顺序）
+    sector_stats = defaultdict(int)       # Sector代码统计
+    file_sector_counts = []               # 每个文件有Sector列的行数
+
+    for filename in csv_files:
+        partial = partials.get(filename)
+        if partial is None:
+            continue
+        for code, sectors in partial["codes"].items():
+            code_to_sectors[code].update(dict.fromkeys(sectors))
+        for sector, count in partial["sector_counts"].items():
+            sector_stats[sector] += count
+        if partial["has_sector"]:
+            file_sector_counts.append((filename, partial["rows"]))
+
+    return {code: list(sectors) for code, sectors in code_to_sectors.items()}, sector_stats, file_sector_counts
+
+def extract_sector_codes(input_dir=INPUT_DIR, output_file=OUTPUT_FILE, workers=None, rebuild=False):
     """从所有CSV文件中提取股票代码和Sector代码"""
     
-    input_dir = "/storage/emulated/0/eskay9761/stock_data/Myx_Data/EOD"
-    output_file = "all_sector_codes.json"
-    
-    # 存储结果
-    code_to_sectors = defaultdict(set)  # 股票代码 -> Sector代码集合
-    sector_stats = defaultdict(int)     # Sector代码统计
-    file_sector_counts = []             # 每个文件有Sector列的行数
-    
     if not os.path.exists(input_dir):
         print(f"目录不存在: {input_dir}")
         return
@@ -27,79 +189,29 @@ def extract_sector_codes():
     for f in csv_files[-10:]:
         print(f"  {f}")
     
-    for filename in csv_files:
-        filepath = os.path.join(input_dir, filename)
-        has_sector = False
-        sector_count = 0
-        
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                # 尝试检测编码和分隔符
-                first_line = f.readline()
-                f.seek(0)
-                
-                # 检查是否有Sector列
-                reader = csv.reader(f)
-                header = next(reader)
-                
-                if "Sector" in header:
-                    has_sector = True
-                    sector_idx = header.index("Sector")
-                    
-                    # 找到Code列
-                    code_idx = -1
-                    for i, col in enumerate(header):
-                        if col.lower() in ["code", "stock code", "代码"]:
-                            code_idx = i
-                            break
-                    
-                    if code_idx != -1:
-                        for row in reader:
-                            if len(row) > max(code_idx, sector_idx):
-                                code = row[code_idx].strip()
-                                sector = row[sector_idx].strip()
-                                
-                                # 清理Code格式
-                                if code.startswith('="') and code.endswith('"'):
-                                    code = code[2:-1]
-                                elif code.startswith('"') and code.endswith('"'):
-                                    code = code[1:-1]
-                                
-                                if code and sector and sector != "-" and sector != "":
-                                    code_to_sectors[code].add(sector)
-                                    sector_stats[sector] += 1
-                                    sector_count += 1
-            
-            if has_sector:
-                file_sector_counts.append((filename, sector_count))
-                
-        except Exception as e:
-            print(f"处理 {filename} 时出错: {e}")
-            continue
-    
-    # 转换集合为列表以便JSON序列化
-    code_to_sectors_serializable = {}
-    for code, sectors in code_to_sectors.items():
-        code_to_sectors_serializable[code] = list(sectors)
+    partials, scanned = load_partials(input_dir, csv_files, workers, rebuild)
+    code_to_sectors, sector_stats, file_sector_counts = merge_partials(partials, csv_files)
     
     # 保存结果
     result = {
         "total_files_scanned": len(csv_files),
         "files_with_sector_column": len(file_sector_counts),
-        "total_unique_codes": len(code_to_sectors_serializable),
-        "total_sector_mappings": sum(len(sectors) for sectors in code_to_sectors_serializable.values()),
+        "total_unique_codes": len(code_to_sectors),
+        "total_sector_mappings": sum(len(sectors) for sectors in code_to_sectors.values()),
         "sector_code_statistics": dict(sector_stats),
         "files_with_sector_details": file_sector_counts,
-        "code_to_sectors": code_to_sectors_serializable
+        "code_to_sectors": code_to_sectors
     }
     
-    with open(output_file, 'w', encoding='utf-8') as f:
+    tmp_file = output_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
         json.dump(result, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, output_file)
     
     print(f"\n✓ 提取完成！结果已保存到 {output_file}")
-    print(f"  扫描文件数: {len(csv_files)}")
+    print(f"  扫描文件数: {len(csv_files)}（本次新扫描 {scanned}）")
     print(f"  有Sector列的文件: {len(file_sector_counts)}")
-    print(f"  唯一股票代码数: {len(code_to_sectors_serializable)}")
+    print(f"  唯一股票代码数: {len(code_to_sectors)}")
     print(f"  总映射数量: {result['total_sector_mappings']}")
     
     # 显示最近文件的Sector情况
@@ -114,5 +226,14 @@ def extract_sector_codes():
     
     return result
 
+def main():
+    parser = argparse.ArgumentParser(description="提取股票代码 → Sector代码映射")
+    parser.add_argument("--input-dir", default=INPUT_DIR, help="EOD CSV目录")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="输出JSON")
+    parser.add_argument("--workers", type=int, help=f"进程数（默认CPU核数，最多{MAX_WORKERS}）")
+    parser.add_argument("--rebuild", action="store_true", help="忽略缓存，重新扫描全部文件")
+    args = parser.parse_args()
+    extract_sector_codes(args.input_dir, args.output, args.workers, args.rebuild)
+
 if __name__ == "__main__":
-    extract_sector_codes()
+    main()
@@ -1,9 +1,34 @@
 #!/usr/bin/env python3
 import os
-import glob
 import json
 from collections import Counter
-import csv
+
+import pandas as pd
+
+from eod_database import EODDatabase, DB_PATH, DATA_DIR
+from audit_rollup import AuditRollup
+
+REPORT_DB_DIR = os.path.join(DATA_DIR, "reports")
+
+
+def report_database(output_dir):
+    """
+    报告目录对应的数据库，已同步到目录的当前内容
+    共享的 data/eod.sqlite 载入过该目录时直接查询；否则用按目录保存的
+    data/reports/<目录名>.sqlite（不能写入共享库，同一交易日载入会整天替换
+    流水线的数据），每次只载入新文件和改动过的文件
+    """
+    if os.path.exists(DB_PATH):
+        db = EODDatabase(DB_PATH)
+        if not db.files(output_dir).empty:
+            return db
+        db.close()
+    name = os.path.basename(os.path.abspath(output_dir))
+    db = EODDatabase(os.path.join(REPORT_DB_DIR, f"{name}.sqlite"))
+    db.prune_missing(output_dir)
+    db.ingest_paths([output_dir], verbose=False)
+    return db
+
 
 def generate_report():
     print("=== 最终处理报告 ===")
@@ -21,47 +46,49 @@ def generate_report():
     output_dir = sorted(output_dirs)[-1]
     print(f"\n使用目录: {output_dir}")
     
-    # 获取所有CSV文件
-    csv_files = glob.glob(os.path.join(output_dir, "*.csv"))
-    if not csv_files:
+    # 审计汇总（每个审计文件只载入一次）提供文件行数和趋势，不再逐个读取CSV
+    rollup = AuditRollup()
+    rollup.sync()
+    names = set(os.listdir(output_dir))
+    trend = rollup.row_trend()
+    trend = trend[trend['output_file'].isin(names)]
+    audit_dir = None
+    if not trend.empty:
+        # 同一批输出可能被多个审计目录记录，取匹配文件最多的目录
+        audit_dir = trend.groupby('directory').size().idxmax()
+        trend = trend[trend['directory'] == audit_dir].drop_duplicates('output_file', keep='last')
+        print(f"审计目录: {os.path.relpath(audit_dir)}")
+    
+    # 行业分布和文件行数从数据库查询，不再每次重新载入全部CSV
+    with report_database(output_dir) as db:
+        if trend.empty:
+            # 没有审计日志的目录：行数取自数据库的文件记录
+            files = db.files(output_dir)
+            trend = pd.DataFrame({
+                'output_file': files['path'].map(os.path.basename),
+                'rows_out': files['row_count'],
+            })
+        distribution = db.sector_distribution(output_dir)
+    if trend.empty:
         print("目录中没有CSV文件")
         return
     
-    print(f"找到 {len(csv_files)} 个处理后的文件")
+    print(f"找到 {len(trend)} 个处理后的文件")
     
     # 统计信息
-    total_rows = 0
-    sector_counter = Counter()
-    file_stats = []
-    
-    # 分析每个文件
-    for csv_file in sorted(csv_files):
-        filename = os.path.basename(csv_file)
-        try:
-            with open(csv_file, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                rows = list(reader)
-            
-            if len(rows) < 2:
-                continue
-                
-            file_rows = len(rows) - 1  # 减去标题行
-            total_rows += file_rows
-            
-            # 统计Sector
-            for row in rows[1:]:
-                if len(row) > 2:  # 确保有Sector列
-                    sector = row[2].strip()
-                    sector_counter[sector] += 1
-            
-            file_stats.append({
-                'file': filename,
-                'rows': file_rows,
-                'date': filename.replace('normalized_', '').replace('.csv', '')
-            })
-            
-        except Exception as e:
-            print(f"  读取 {filename} 失败: {e}")
+    total_rows = int(trend['rows_out'].sum())
+    sector_counter = Counter({
+        (sector if isinstance(sector, str) else ''): int(count)
+        for sector, count in zip(distribution['sector'], distribution['row_count'])
+    })
+    file_stats = [
+        {
+            'file': name,
+            'rows': int(rows),
+            'date': name.replace('normalized_', '').replace('.csv', '')
+        }
+        for name, rows in zip(trend['output_file'], trend['rows_out'])
+    ]
     
     print(f"\n总行数: {total_rows}")
     print(f"总文件数: {len(file_stats)}")
@@ -96,6 +123,19 @@ def generate_report():
     else:
         print(f"  ⚠ 需要改进！Unknown比例较高")
     
+    # 审计趋势
+    trends = rollup.summary(audit_dir)
+    if trends.get('audits'):
+        print(f"\n审计趋势 ({trends['first_date']} ~ {trends['last_date']}, {trends['audits']} 个审计):")
+        rows = trends['rows']
+        print(f"  每日行数: {rows['min']} ~ {rows['max']} (平均 {rows['mean']})")
+        print(f"  有丢弃行的天数: {rows['days_with_dropped_rows']}")
+        print(f"  列变化事件: {trends['column_drift']['events']}")
+        for column, first in list(trends['column_drift']['first_removed'].items())[:5]:
+            print(f"    {column or '(空列名)'}: {first} 首次消失")
+        print(f"  有未映射行业代码的天数: {trends['unmapped']['days']} "
+              f"(共 {trends['unmapped']['codes']} 个代码)")
+    
     # 保存详细报告
     report_data = {
         "output_directory": output_dir,
@@ -106,7 +146,8 @@ def generate_report():
         "unknown_statistics": {
             "count": unknown_count,
             "percentage": unknown_percent
-        }
+        },
+        "audit_trends": trends
     }
     
     with open('processing_final_report.json', 'w', encoding='utf-8') as f:
@@ -13,6 +13,12 @@ import glob
 from datetime import datetime, timedelta
 import re
 
+from stage_cache import StageCache, file_hash, code_version
+from instrument_master import attach as attach_instruments, classify, load_master, master_version
+from search_index import build_index, write_search_index
+from market_summary import build_summary, write_market_summary
+from records import Record, PriceRecord, PickRecord, json_default
+
 def load_eod_csv(csv_path):
     """
     加载经纪商提供的EOD CSV文件
@@ -161,6 +167,11 @@ def create_ai_picks(df, column_mapping, top_n=20):
         print(f"⚠  缺少必要列: {missing_cols}")
         return []
     
+    # 证券类型：按代码合并证券主表（instrument_master.py），不再逐行猜测
+    instruments = attach_instruments(df, column_mapping['code'], column_mapping['name'],
+                                     column_mapping.get('sector', 'sector'))
+    instrument_types = instruments['instrument_type']
+    
     # 提取数据
     for idx, row in df.iterrows():
         if len(picks) >= top_n:
@@ -240,11 +251,8 @@ def create_ai_picks(df, column_mapping, top_n=20):
             potential_score = score + (change_percent * 0.5)
             potential_score = max(0, min(100, potential_score))
             
-            # 判断股票类型
-            instrument_type = "Stock"
-            if isinstance(code, str):
-                if '-' in code or code[-1].isalpha():
-                    instrument_type = "Warrant"
+            # 股票类型
+            instrument_type = instrument_types[idx]
             
             # 风险等级
             risk_level = "中"
@@ -288,23 +296,26 @@ def create_ai_picks(df, column_mapping, top_n=20):
                 recommendation += "（Warrant）"
             
             # 添加到选股列表
-            pick = {
-                "rank": len(picks) + 1,
-                "code": code,
-                "name": name,
-                "instrument_type": instrument_type,
-                "sector": sector,
-                "current_price": round(last_price, 3),
-                "daily_change": round(change_percent, 2),
-                "score": round(score, 1),
-                "potential_score": int(potential_score),
-                "potential_reasons": "，".join(potential_reasons[:2]),
-                "recommendation": recommendation,
-                "risk_level": risk_level,
-                "rsi": round(50 + (change_percent * 0.5), 1),  # 模拟RSI
-                "volume": volume,
-                "status": "推薦" if score >= 60 else "觀望"
-            }
+            underlying = instruments['underlying'][idx]
+            pick = PickRecord(
+                rank=len(picks) + 1,
+                code=code,
+                name=name,
+                instrument_type=instrument_type,
+                instrument_class=instruments['instrument_class'][idx],
+                underlying=underlying if pd.notna(underlying) else None,
+                sector=sector,
+                current_price=round(last_price, 3),
+                daily_change=round(change_percent, 2),
+                score=round(score, 1),
+                potential_score=int(potential_score),
+                potential_reasons="，".join(potential_reasons[:2]),
+                recommendation=recommendation,
+                risk_level=risk_level,
+                rsi=round(50 + (change_percent * 0.5), 1),  # 模拟RSI
+                volume=volume,
+                status="推薦" if score >= 60 else "觀望"
+            )
             
             picks.append(pick)
             
@@ -313,11 +324,11 @@ def create_ai_picks(df, column_mapping, top_n=20):
             continue
     
     # 按潜力评分排序
-    picks.sort(key=lambda x: x['potential_score'], reverse=True)
+    picks.sort(key=lambda x: x.potential_score, reverse=True)
     
     # 更新排名
     for i, pick in enumerate(picks):
-        pick['rank'] = i + 1
+        pick.rank = i + 1
     
     print(f"✅ 成功生成 {len(picks)} 个AI选股推荐")
     return picks
@@ -391,19 +402,19 @@ def create_latest_price_json(df, column_mapping):
             high_price = last_price * 1.02  # 模拟最高价
             low_price = last_price * 0.98   # 模拟最低价
             
-            stock_data = {
-                'code': code,
-                'name': name,
-                'last_price': round(last_price, 3),
-                'change': round(change, 3),
-                'change_percent': round(change_percent, 2),
-                'volume': volume,
-                'sector': sector,
-                'open': round(open_price, 3),
-                'high': round(high_price, 3),
-                'low': round(low_price, 3),
-                'last_updated': datetime.now().strftime('%H:%M:%S')
-            }
+            stock_data = PriceRecord(
+                code=code,
+                name=name,
+                last_price=round(last_price, 3),
+                change=round(change, 3),
+                change_percent=round(change_percent, 2),
+                volume=volume,
+                sector=sector,
+                open=round(open_price, 3),
+                high=round(high_price, 3),
+                low=round(low_price, 3),
+                last_updated=datetime.now().strftime('%H:%M:%S')
+            )
             
             stocks_list.append(stock_data)
             
@@ -425,7 +436,7 @@ def save_json(data, filename, output_dir="."):
         os.makedirs(output_dir, exist_ok=True)
         
         with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+            json.dump(data, f, ensure_ascii=False, indent=2, default=json_default)
         
         print(f"💾 保存到: {output_path} ({os.path.getsize(output_path)} bytes)")
         return True
@@ -473,22 +484,45 @@ def main():
     
     print(f"\n📁 使用文件: {csv_path}")
     
-    # 1. 加载CSV文件
-    df = load_eod_csv(csv_path)
-    
-    if df is None or len(df) == 0:
-        print("❌ 无法加载数据，程序退出")
-        return
-    
-    # 2. 检测和清理列
-    column_mapping = detect_and_clean_columns(df)
-    
-    if not column_mapping:
-        print("❌ 无法识别数据列，程序退出")
-        return
+    # 缓存键: 输入文件 + 阶段代码版本（输入没变时直接读取上次的结果）
+    cache = StageCache()
+    load_key = cache.key('eod_load', file_hash(csv_path),
+                         code_version(load_eod_csv, detect_and_clean_columns))
+    picks_key = cache.key('eod_picks', load_key, 20, master_version(load_master()),
+                          code_version(create_ai_picks, attach_instruments, classify, Record, PickRecord))
+    price_key = cache.key('eod_prices', load_key, code_version(create_latest_price_json, Record, PriceRecord))
+    
+    # 1-2. 加载CSV文件，检测和清理列
+    cached = cache.get('eod_load', load_key)
+    if cached is not None:
+        df, column_mapping = cached
+    else:
+        df = load_eod_csv(csv_path)
+        
+        if df is None or len(df) == 0:
+            print("❌ 无法加载数据，程序退出")
+            return
+        
+        column_mapping = detect_and_clean_columns(df)
+        
+        if not column_mapping:
+            print("❌ 无法识别数据列，程序退出")
+            return
+        cache.put('eod_load', load_key, (df, column_mapping))
     
     # 3. 生成AI选股数据
-    picks_data = create_ai_picks(df, column_mapping, top_n=20)
+    picks_data = cache.get('eod_picks', picks_key)
+    if picks_data is None:
+        picks_data = cache.put('eod_picks', picks_key, create_ai_picks(df, column_mapping, top_n=20))
+    
+    date_str = datetime.now().strftime('%Y%m%d')
+    outputs = ["picks_latest.json", os.path.join("history", f"picks_{date_str}.json"),
+               "latest_price.json", "search_index.json", "market_summary.json", "data.json"]
+    emit_key = cache.key('eod_emit', picks_key, price_key, date_str, os.path.basename(csv_path),
+                         code_version(build_index, build_summary))
+    if cache.outputs_current(emit_key, outputs):
+        print("\n🎉 输入和代码都没有变化，JSON文件已是最新")
+        return
     
     if picks_data:
         # 创建完整的picks_latest.json结构
@@ -504,12 +538,13 @@ def main():
         save_json(picks_json, "picks_latest.json", ".")
         
         # 同时保存一个带日期的版本
-        date_str = datetime.now().strftime('%Y%m%d')
         history_dir = "history"
         save_json(picks_json, f"picks_{date_str}.json", history_dir)
     
     # 4. 生成最新股价数据
-    price_data = create_latest_price_json(df, column_mapping)
+    price_data = cache.get('eod_prices', price_key)
+    if price_data is None:
+        price_data = cache.put('eod_prices', price_key, create_latest_price_json(df, column_mapping))
     
     if price_data:
         # 创建完整的latest_price.json结构
@@ -519,11 +554,27 @@ def main():
             "total_stocks": len(price_data),
             "market": "Bursa Malaysia",
             "source": "Broker EOD Data",
-            "stocks": price_data
+            "stocks": price_data,
+            # 涨跌排行 / 涨跌家数 / 成交额（整体和各行业）
+            "summary": build_summary(price_data)
         }
         
         # 保存latest_price.json
         save_json(price_json, "latest_price.json", ".")
+        
+        # 单独的市场概要文件
+        try:
+            summary_path = write_market_summary(price_json["summary"], ".", data_date=price_json["data_date"])
+            print(f"💾 保存到: {summary_path} ({os.path.getsize(summary_path)} bytes)")
+        except Exception as e:
+            print(f"⚠  市场概要生成失败: {e}")
+        
+        # 代码 / 名称搜索索引
+        try:
+            index_path = write_search_index(price_data, ".")
+            print(f"💾 保存到: {index_path} ({os.path.getsize(index_path)} bytes)")
+        except Exception as e:
+            print(f"⚠  搜索索引生成失败: {e}")
     
     # 5. 生成HTML数据文件（简化版，供HTML直接使用）
     html_data = {
@@ -534,6 +585,7 @@ def main():
     }
     
     save_json(html_data, "data.json", ".")
+    cache.record_outputs(emit_key, outputs)
     
     print("\n" + "="*70)
     print("🎉 JSON文件生成完成！")
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+🧬 表頭方言登記表 - 按表頭指紋緩存列名映射
+======================================================================
+經紀商導出的表頭會漂移（Chg / Chg%、MACD (26, 12) / MACD (26,12)、
+英文 / 中文列名）。每種表頭按指紋登記一次，記錄它解析到的規範列名:
+  • 指紋 = 各列去BOM、去空白、小寫後的 SHA1（空格和大小寫差異視為同一方言）
+  • 已知方言直接查表（字典查找）
+  • 未見過的方言：先按配置別名精確匹配，再按指紋形式比較，
+    剩下的列交給 eod_normalizer.check_column_match 模糊匹配（>=7分），
+    結果寫回登記表，並提示新方言首次出現
+
+登記表保存在 config/header_dialects.json:
+  {指紋: {"columns": 原始表頭, "first_seen": ..., "source": 文件,
+          "resolutions": {目標schema指紋: {"header": 規範列名, "fuzzy": {...}}}}}
+
+用法（代碼中）:
+    registry = HeaderRegistry()
+    dialect = get_dialect("broker", config=config, registry=registry)
+
+命令行:
+  python header_registry.py list
+  python header_registry.py show <指紋前綴>
+  python header_registry.py check file.csv [--config eod_config.json]
+======================================================================
+"""
+
+import os
+import re
+import sys
+import csv
+import json
+import hashlib
+import argparse
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from eod_normalizer import check_column_match, sniff_delimiter
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_FILE = os.path.join(SCRIPT_DIR, "config", "header_dialects.json")
+
+# 模糊匹配的最低分數（7 = 列名變體包含；6分的關鍵詞匹配會把 Prv Close 配到 Close）
+FUZZY_MIN_SCORE = 7
+
+
+def canonical_column(name):
+    """列名的指紋形式：去BOM、去所有空白、小寫"""
+    return re.sub(r"\s+", "", str(name).replace("\ufeff", "")).lower()
+
+
+def fingerprint(columns):
+    return hashlib.sha1("\x1f".join(canonical_column(c) for c in columns).encode("utf-8")).hexdigest()
+
+
+def resolve_header(raw_header, schema, aliases):
+    """
+    把原始表頭解析為規範列名，返回 (規範列名列表, {原始列: (規範列, 分數)} 模糊匹配記錄)
+    精確部分與 alias_header 一致（去空格、Chg% → Chg、配置別名）
+    """
+    header = []
+    for col in raw_header:
+        c = col.strip()
+        if c == "Chg%":
+            c = "Chg"
+        header.append(aliases.get(c, c))
+
+    targets = {canonical_column(c): c for c in schema}
+    covered = {c for c in header if c in schema}
+
+    # 指紋形式相同（空格、大小寫、BOM 不同）
+    for i, name in enumerate(header):
+        if name in schema:
+            continue
+        target = targets.get(canonical_column(name))
+        if target and target not in covered:
+            header[i] = target
+            covered.add(target)
+
+    # 模糊匹配：按分數從高到低分配，每個規範列只用一次
+    candidates = []
+    for i, name in enumerate(header):
+        if name in schema:
+            continue
+        for order, target in enumerate(schema):
+            if target in covered:
+                continue
+            score = check_column_match(raw_header[i], target)
+            if score >= FUZZY_MIN_SCORE:
+                candidates.append((-score, order, i, target))
+
+    fuzzy = {}
+    for neg_score, _, i, target in sorted(candidates):
+        if target in covered or header[i] in schema:
+            continue
+        fuzzy[raw_header[i]] = (target, -neg_score)
+        header[i] = target
+        covered.add(target)
+    return header, fuzzy
+
+
+class HeaderRegistry:
+    """表頭方言登記表（JSON 文件，只在出現新方言或新解析時寫入）"""
+
+    def __init__(self, path=REGISTRY_FILE, verbose=True):
+        self.path = path
+        self.verbose = verbose
+        self.dialects = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.dialects = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  無法讀取表頭登記表 {path}: {e}")
+        self.last = None  # 最近一次解析的 (指紋, 是否新方言)
+
+    @contextmanager
+    def _locked(self):
+        """讀取-合併-替換期間對 <登記表>.lock 加排他鎖（fcntl.flock，阻塞等待；無 fcntl 的平台不加鎖）"""
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(self.path + ".lock", os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def save(self):
+        """
+        寫入登記表；先合併文件中其他進程（回填工作進程）新登記的方言
+        讀取、合併、替換在文件鎖內完成，並發保存的進程不會丟失彼此的方言
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._locked():
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        on_disk = json.load(f)
+                except (OSError, ValueError):
+                    on_disk = {}
+                for key, entry in on_disk.items():
+                    mine = self.dialects.setdefault(key, entry)
+                    for target, resolution in entry.get("resolutions", {}).items():
+                        mine["resolutions"].setdefault(target, resolution)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.dialects, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+
+    @staticmethod
+    def target_key(schema, aliases):
+        return fingerprint(list(schema) + [f"{k}={v}" for k, v in sorted(aliases.items())])[:12]
+
+    def resolve(self, raw_header, schema, aliases, source=None):
+        """返回規範列名列表；已知方言直接查表"""
+        key = fingerprint(raw_header)
+        target = self.target_key(schema, aliases)
+        entry = self.dialects.get(key)
+        if entry is not None:
+            resolution = entry["resolutions"].get(target)
+            if resolution is not None:
+                self.last = (key, False)
+                return list(resolution["header"])
+
+        header, fuzzy = resolve_header(raw_header, schema, aliases)
+        is_new = entry is None
+        if is_new:
+            entry = self.dialects[key] = {
+                "columns": list(raw_header),
+                "first_seen": datetime.now().isoformat(timespec="seconds"),
+                "source": os.path.basename(source) if source else None,
+                "resolutions": {},
+            }
+        entry["resolutions"][target] = {
+            "header": header,
+            "fuzzy": {raw: {"column": col, "score": score} for raw, (col, score) in fuzzy.items()},
+            "missing": [c for c in schema if c not in header],
+        }
+        self.last = (key, is_new)
+        self.save()
+        if self.verbose:
+            self.report(key, target, is_new)
+        return list(header)
+
+    def report(self, key, target, is_new):
+        entry = self.dialects[key]
+        resolution = entry["resolutions"][target]
+        label = "🆕 新表頭方言" if is_new else "🧬 表頭方言新增解析"
+        print(f"{label} {key[:12]}（{len(entry['columns'])} 列，來源: {entry['source'] or '-'}）")
+        closest = self.closest(key)
+        if is_new and closest:
+            other = self.dialects[closest]["columns"]
+            added = [c for c in entry["columns"] if c not in other]
+            removed = [c for c in other if c not in entry["columns"]]
+            print(f"   與 {closest[:12]} 相比  新增: {added or '-'}  缺少: {removed or '-'}")
+        for raw, match in resolution["fuzzy"].items():
+            print(f"   ≈ {raw!r} → {match['column']!r}（{match['score']}分）")
+        if resolution["missing"]:
+            print(f"   ⚠️  未匹配的列: {', '.join(resolution['missing'])}")
+
+    def closest(self, key):
+        """列集合重疊最多的其他已知方言"""
+        columns = {canonical_column(c) for c in self.dialects[key]["columns"]}
+        best, best_overlap = None, -1
+        for other, entry in self.dialects.items():
+            if other == key:
+                continue
+            overlap = len(columns & {canonical_column(c) for c in entry["columns"]})
+            if overlap > best_overlap:
+                best, best_overlap = other, overlap
+        return best
+
+    def resolver(self, schema, aliases, source=None):
+        """供 Dialect.header 使用的函數"""
+        return lambda raw_header: self.resolve(raw_header, schema, aliases, source)
+
+
+def read_header(path):
+    delimiter = sniff_delimiter(path)
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return next(csv.reader(f, delimiter=delimiter), None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="表頭方言登記表")
+    parser.add_argument("--registry", default=REGISTRY_FILE, help="登記表文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="列出已知方言")
+    p = sub.add_parser("show", help="顯示某個方言的解析結果")
+    p.add_argument("key", help="指紋或前綴")
+    p = sub.add_parser("check", help="解析CSV的表頭（新方言會登記）")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--config", default=os.path.join(SCRIPT_DIR, "eod_config.json"))
+    args = parser.parse_args()
+
+    registry = HeaderRegistry(args.registry)
+
+    if args.command == "list":
+        if not registry.dialects:
+            print("📭 登記表為空")
+            return 1
+        for key, entry in sorted(registry.dialects.items(), key=lambda kv: kv[1]["first_seen"]):
+            fuzzy = sum(len(r["fuzzy"]) for r in entry["resolutions"].values())
+            print(f"  {key[:12]}  {entry['first_seen']}  {len(entry['columns']):>3} 列  "
+                  f"模糊匹配 {fuzzy}  {entry['source'] or '-'}")
+        return 0
+
+    if args.command == "show":
+        matches = [k for k in registry.dialects if k.startswith(args.key)]
+        if len(matches) != 1:
+            print(f"❌ 找到 {len(matches)} 個匹配的指紋")
+            return 1
+        print(json.dumps(registry.dialects[matches[0]], ensure_ascii=False, indent=2))
+        return 0
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    for path in args.files:
+        raw_header = read_header(path)
+        if raw_header is None:
+            print(f"⏭️  空文件: {path}")
+            continue
+        registry.resolve(raw_header, config["schema"], config.get("map", {}), source=path)
+        key, is_new = registry.last
+        print(f"{'🆕' if is_new else '✅'} {os.path.basename(path)}: {key[:12]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
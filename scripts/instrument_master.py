@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+🧾 證券主表 - 每個代碼一行：類型、正股、首次/最後出現日期、最新名稱
+======================================================================
+由 EOD 數據庫的 stocks 表（代碼、最新名稱/行業、首次/最後出現日期）生成，
+保存在 instruments 表（與 EODDatabase 共用 data/eod.sqlite）:
+  • 第一次運行時按全部歷史生成；之後只重新分類新增、名稱或行業有變化的代碼，
+    其餘代碼只更新首次/最後出現日期
+  • 分類規則只有這一份，選股器用向量化的 attach() 按代碼合併，
+    不再逐行猜測；主表中還沒有的代碼（當天新上市）按同樣的規則即時分類
+
+類型（type）:
+  stock         普通股                 5326；LEAP 市場的5位代碼 03017（其權證 03023W SMILE-WA 按名稱後綴分類）
+  warrant       公司權證               5326WA / 99SMART-WA
+  call_warrant  結構性權證（認購）     1155C5 / MAYBANK-C5；11552A MAYBANKC2A；0138AJ ZETRIX-CAJ；
+                                       0652KG HSI-CWKG；058246 ALIBABA-C46
+  put_warrant   結構性權證（認沽）     1155HA / MAYBANK-HA；0650EE FBMKLCI-HEE；0652NV HSI-PWNV
+  etf           交易所交易基金         0800EA / 0829EB（份額類別），或名稱/行業含 ETF
+  reit          房地產投資信託         名稱/行業含 REIT；5235SS（KLCC 合訂證券）
+  spac          特殊目的收購公司       名稱/行業含 SPAC
+  preference    優先股                 5326PA
+  loan          貸款股（ICULS 等）     5326LA
+  other         無法識別的代碼（網頁顯示為 Other，不當作普通股）
+權證、優先股、貸款股的 underlying 為正股代碼（先按代碼，再按名稱）；
+指數 / 外國股票的結構性權證（HSI、ALIBABA ...）的 underlying 為代碼前4位（交易所分配的標的代碼）
+
+結構性權證的名稱 = 標的名稱 + 類別（C / H / CW / PW）+ 代碼後綴（名稱可以不帶 '-'）:
+名稱以 類別 + 代碼後綴 結尾時按類別判為認購 / 認沽，優先於代碼後綴的規則（0650EE 不是 ETF）
+
+用法（代碼中）:
+    with InstrumentMaster() as master:
+        master.update()                        # 只重新分類新增和有變化的代碼
+        master.derivatives('1155')             # 某正股的權證 / 結構性權證
+    df = attach(df)                            # 加上 instrument_class / instrument_type / underlying 列
+
+命令行:
+  python instrument_master.py update [--full]
+  python instrument_master.py show 1155 1155C5 99SMART-WA
+  python instrument_master.py types
+  python instrument_master.py derivatives 1155
+======================================================================
+"""
+
+import os
+import sys
+import sqlite3
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from eod_database import EODDatabase, DB_PATH
+
+# 網頁和選股JSON使用的類型名稱（網頁按 'Warrant' 篩選，結構性權證也歸入 Warrant）
+LABELS = {
+    "stock": "Stock",
+    "warrant": "Warrant",
+    "call_warrant": "Warrant",
+    "put_warrant": "Warrant",
+    "etf": "ETF",
+    "reit": "REIT",
+    "spac": "SPAC",
+    "preference": "Preference",
+    "loan": "Loan Stock",
+    "other": "Other",
+}
+# 可以作為正股的類型 / 有正股的類型
+UNDERLYING_TYPES = ("stock", "reit", "spac")
+DERIVATIVE_TYPES = ("warrant", "call_warrant", "put_warrant", "preference", "loan")
+
+# 代碼 = 4位數字 + 可選後綴（字母開頭，或結構性權證的 數字+字母/數字）；名稱 = 正股名稱 + '-' + 後綴
+CODE_PATTERN = r"^(?P<base>\d{4})(?P<suffix>[A-Z][0-9A-Z]{0,2}|[0-9][0-9A-Z])?$"
+NAME_PATTERN = r"^(?P<base>.+)-(?P<suffix>[A-Z][0-9A-Z]{0,3})$"
+# LEAP 市場: 普通股為5位數字代碼；權證 / 優先股為 5位正股代碼 + 1位序號（類型按名稱後綴）
+LEAP_CODE_PATTERN = r"^\d{5}$"
+LEAP_DERIVATIVE_PATTERN = r"^\d{5}[0-9A-Z]$"
+# 結構性權證名稱結尾: 類別 + 系列（系列 = 代碼後綴）
+STRUCTURED_NAME_PATTERN = r"(?P<kind>CW|PW|C|H)(?P<series>[0-9A-Z]{2})$"
+STRUCTURED_KINDS = {"C": "call_warrant", "CW": "call_warrant", "H": "put_warrant", "PW": "put_warrant"}
+# 後綴 → 類型（按順序匹配）
+SUFFIX_TYPES = [
+    (r"^W[0-9A-Z]$", "warrant"),
+    (r"^C[0-9A-Z]{1,2}$", "call_warrant"),
+    (r"^H[0-9A-Z]{1,2}$", "put_warrant"),
+    (r"^E[A-Z]$", "etf"),
+    (r"^SS$", "reit"),
+    (r"^P[A-Z]$", "preference"),
+    (r"^L[A-Z]$", "loan"),
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS instruments (
+    code TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    underlying TEXT,
+    name TEXT,
+    sector TEXT,
+    first_seen TEXT,
+    last_seen TEXT,
+    updated_at TEXT
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_instruments_underlying ON instruments (underlying);
+"""
+COLUMNS = ["code", "type", "underlying", "name", "sector", "first_seen", "last_seen", "updated_at"]
+
+
+def _text(series, index):
+    if series is None:
+        return pd.Series("", index=index, dtype=object)
+    return series.astype(object).where(series.notna(), "").astype(str).str.strip()
+
+
+def _codes(series, index):
+    """代碼列：去掉 Excel 導出的 ="1234" 包裹，轉大寫"""
+    return _text(series, index).str.replace(r'^=?"(.*)"$', r"\1", regex=True).str.upper()
+
+
+def classify(codes, names=None, sectors=None, known_names=None):
+    """
+    向量化分類，返回與 codes 同索引的 DataFrame: type、underlying
+    known_names: {正股名稱: 正股代碼}，用於按名稱找正股（codes 中的正股會自動加入）
+    """
+    index = codes.index
+    code = _codes(codes, index)
+    name = _text(names, index)
+    sector = _text(sectors, index)
+
+    by_code = code.str.extract(CODE_PATTERN)
+    by_name = name.str.upper().str.extract(NAME_PATTERN)
+    # 名稱以 類別 + 代碼後綴 結尾的結構性權證（MAYBANKC2A、HSI-CWKG、FBMKLCI-HEE）
+    structured = name.str.upper().str.extract(STRUCTURED_NAME_PATTERN)
+    structured_kind = structured["kind"].where(
+        by_code["suffix"].notna() & structured["series"].eq(by_code["suffix"])).map(STRUCTURED_KINDS)
+    # 不是結構性權證的 5位數字 + 1位序號: LEAP 權證 / 優先股（03023W SMILE-WA），正股為前5位
+    leap = code.str.match(LEAP_DERIVATIVE_PATTERN) & structured_kind.isna()
+    code_base = by_code["base"].where(~leap, code.str[:5])
+    # 代碼能解析時用代碼的後綴，否則（包括 LEAP 權證）用名稱的後綴
+    suffix = by_code["suffix"].where(by_code["base"].notna() & ~leap, by_name["suffix"]).fillna("")
+
+    conditions, choices = [], []
+    for kind in ("call_warrant", "put_warrant"):
+        conditions.append(structured_kind.eq(kind))
+        choices.append(kind)
+    for pattern, kind in SUFFIX_TYPES:
+        conditions.append(suffix.str.match(pattern))
+        choices.append(kind)
+    plain = suffix.eq("")
+    text = name + " " + sector
+    conditions += [
+        plain & text.str.contains(r"\bREITS?\b|REAL ESTATE INVESTMENT TRUST", case=False, regex=True),
+        plain & text.str.contains(r"\bSPAC\b|SPECIAL PURPOSE ACQUISITION", case=False, regex=True),
+        plain & text.str.contains(r"\bETFS?\b|EXCHANGE[- ]TRADED FUND", case=False, regex=True),
+        plain & (code_base.notna() | code.str.match(r"^[0-9A-Z]{4}$") | code.str.match(LEAP_CODE_PATTERN)),
+    ]
+    choices += ["reit", "spac", "etf", "stock"]
+    kind = pd.Series(np.select(conditions, choices, default="other"), index=index, dtype=object)
+
+    # 正股: 代碼能解析時取代碼中的正股部分（4位，LEAP 為5位），否則按名稱查找
+    names_map = dict(known_names or {})
+    ordinary = kind.isin(UNDERLYING_TYPES) & name.ne("")
+    names_map.update(zip(name[ordinary].str.upper(), code[ordinary]))
+    derivative = kind.isin(DERIVATIVE_TYPES)
+    underlying = code_base.where(code_base.notna(), by_name["base"].map(names_map))
+    underlying = underlying.where(derivative & underlying.ne(code), None)
+    return pd.DataFrame({"type": kind, "underlying": underlying.astype(object)}, index=index)
+
+
+def load_master(path=DB_PATH):
+    """只讀載入主表（按代碼索引）；數據庫或表不存在時返回空表，不創建數據庫"""
+    empty = pd.DataFrame(columns=COLUMNS).set_index("code")
+    if not os.path.exists(path):
+        return empty
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+    except sqlite3.Error:
+        return empty
+    try:
+        return pd.read_sql_query("SELECT * FROM instruments", conn).set_index("code")
+    except (sqlite3.Error, pd.errors.DatabaseError):
+        return empty
+    finally:
+        conn.close()
+
+
+def master_version(master):
+    """主表內容版本（用於緩存鍵）"""
+    if master.empty:
+        return "empty"
+    return f"{len(master)}:{master['updated_at'].max()}"
+
+
+def attach(df, code_column="code", name_column="name", sector_column="sector", master=None):
+    """
+    按代碼合併主表，返回加上 instrument_class、instrument_type、underlying 三列的副本
+    主表中沒有的代碼按同樣規則即時分類
+    """
+    master = load_master() if master is None else master
+    out = df.copy()
+    codes = _codes(out[code_column], out.index)
+
+    kind = codes.map(master["type"]).astype(object)
+    underlying = codes.map(master["underlying"]).astype(object)
+    missing = kind.isna()
+    if missing.any():
+        ordinary = master[master["type"].isin(UNDERLYING_TYPES) & master["name"].notna()]
+        known = dict(zip(ordinary["name"].str.upper(), ordinary.index))
+        column = lambda c: out.loc[missing, c] if c in out.columns else None
+        fresh = classify(codes[missing], column(name_column), column(sector_column), known)
+        kind[missing] = fresh["type"]
+        underlying[missing] = fresh["underlying"]
+
+    out["instrument_class"] = kind
+    out["instrument_type"] = kind.map(LABELS)
+    out["underlying"] = underlying.where(underlying.notna(), None)
+    return out
+
+
+class InstrumentMaster:
+    """證券主表（與 EODDatabase 共用同一個 SQLite 文件）"""
+
+    def __init__(self, path=DB_PATH):
+        self.db = EODDatabase(path)
+        self.conn = self.db.conn
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def changed(self):
+        """
+        需要重新分類的代碼: stocks 表中新增、名稱或行業有變化的代碼，還沒找到正股的衍生品，
+        以及之前無法識別（other）的代碼（分類規則擴充後重新分類）
+        """
+        return self.query(
+            f"""SELECT s.code, s.name, s.sector, s.first_seen, s.last_seen
+                FROM stocks s LEFT JOIN instruments i ON i.code = s.code
+                WHERE i.code IS NULL OR i.name IS NOT s.name OR i.sector IS NOT s.sector OR i.type = 'other'
+                   OR (i.underlying IS NULL AND i.type IN ({', '.join('?' * len(DERIVATIVE_TYPES))}))""",
+            DERIVATIVE_TYPES)
+
+    def update(self, full=False):
+        """
+        更新主表，返回重新分類的代碼數（full=True 時全部重建）
+        只有首次/最後出現日期變化的代碼（每個交易日的大多數代碼）只更新日期，不重新分類
+        """
+        with self.conn:
+            if full:
+                self.conn.execute("DELETE FROM instruments")
+            self.conn.execute(
+                """UPDATE instruments SET
+                       first_seen = (SELECT first_seen FROM stocks s WHERE s.code = instruments.code),
+                       last_seen = (SELECT last_seen FROM stocks s WHERE s.code = instruments.code)
+                   WHERE EXISTS (SELECT 1 FROM stocks s WHERE s.code = instruments.code
+                                 AND (s.first_seen IS NOT instruments.first_seen
+                                      OR s.last_seen IS NOT instruments.last_seen))""")
+        rows = self.changed()
+        if rows.empty:
+            return 0
+
+        ordinary = self.query(
+            f"SELECT name, code FROM instruments WHERE name IS NOT NULL AND type IN "
+            f"({', '.join('?' * len(UNDERLYING_TYPES))})", UNDERLYING_TYPES)
+        known = dict(zip(ordinary["name"].str.upper(), ordinary["code"]))
+        rows = rows.join(classify(rows["code"], rows["name"], rows["sector"], known))
+        rows["updated_at"] = datetime.now().isoformat(timespec="seconds")
+
+        records = rows[COLUMNS].astype(object).where(rows[COLUMNS].notna(), None).values.tolist()
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO instruments ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})", records)
+        return len(records)
+
+    # ------------------------------------------------------------------
+    # 查詢
+    # ------------------------------------------------------------------
+
+    def query(self, sql, params=()):
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def get(self, codes):
+        codes = [c.upper() for c in codes]
+        return self.query(f"SELECT * FROM instruments WHERE code IN ({', '.join('?' * len(codes))})", codes)
+
+    def derivatives(self, code):
+        """某正股的權證、結構性權證、優先股等（按類型和代碼排序）"""
+        return self.query("SELECT * FROM instruments WHERE underlying = ? ORDER BY type, code", (code.upper(),))
+
+    def type_counts(self):
+        return self.query("SELECT type, COUNT(*) AS count, MAX(last_seen) AS last_seen "
+                          "FROM instruments GROUP BY type ORDER BY count DESC")
+
+
+def print_instruments(df):
+    df = df.astype(object).where(df.notna(), "-")
+    for row in df.itertuples(index=False):
+        print(f"  {row.code:<10} {row.type:<13} {row.underlying:<6} {row.name:<16} "
+              f"{row.first_seen} → {row.last_seen}  {row.sector}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="證券主表")
+    parser.add_argument("--db", default=DB_PATH, help="數據庫文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("update", help="更新主表（只重新分類新增和有變化的代碼）")
+    p.add_argument("--full", action="store_true", help="按全部歷史重建")
+    p = sub.add_parser("show", help="顯示代碼的類型和正股")
+    p.add_argument("codes", nargs="+")
+    sub.add_parser("types", help="各類型代碼數")
+    p = sub.add_parser("derivatives", help="某正股的權證 / 結構性權證")
+    p.add_argument("code")
+    args = parser.parse_args()
+
+    with InstrumentMaster(args.db) as master:
+        master.db.sync()
+        count = master.update(full=getattr(args, "full", False))
+        if args.command == "update":
+            print(f"✅ 重新分類 {count} 個代碼")
+            return 0
+
+        if args.command == "types":
+            df = master.type_counts()
+            for row in df.itertuples(index=False):
+                print(f"  {row.type:<13} {row.count:>6}  最後出現 {row.last_seen or '-'}")
+            return 0
+
+        df = master.get(args.codes) if args.command == "show" else master.derivatives(args.code)
+        if df.empty:
+            print("📭 沒有結果")
+            return 1
+        print_instruments(df)
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,15 +4,15 @@ Bursa Malaysia投资计算器 - Python版
 功能：读取处理后的EOD数据，计算投资回报，生成详细分析报告
 """
 
-import pandas as pd
-import numpy as np
 import sys
 import os
 import json
+import math
 from datetime import datetime
-from tabulate import tabulate
 import argparse
 
+# pandas / tabulate 在需要时才导入，--help 和费用计算不加载它们
+
 # ============================================================================
 # 费用配置（马来西亚交易所标准）
 # ============================================================================
@@ -40,11 +40,81 @@ FEE_CONFIG = {
 # 核心计算函数
 # ============================================================================
 
+def calculate_trade_fees(buy_price, sell_price, total_shares, fees=None):
+    """
+    计算一次买入+卖出的全部费用和回报（不打印，供计算器和查询服务共用）
+    """
+    fees = fees or FEE_CONFIG
+    
+    buy_total = buy_price * total_shares
+    sell_total = sell_price * total_shares
+    
+    # 1. 经纪佣金
+    buy_brokerage = max(buy_total * fees['brokerage_rate'], fees['brokerage_min'])
+    sell_brokerage = max(sell_total * fees['brokerage_rate'], fees['brokerage_min'])
+    total_brokerage = buy_brokerage + sell_brokerage
+    
+    # 2. 清算费
+    buy_clearing = min(buy_total * fees['clearing_fee_rate'], fees['clearing_fee_cap'])
+    sell_clearing = min(sell_total * fees['clearing_fee_rate'], fees['clearing_fee_cap'])
+    total_clearing = buy_clearing + sell_clearing
+    
+    # 3. 印花税
+    buy_stamp = min(math.ceil(buy_total / 1000) * fees['stamp_duty_per_1000'], fees['stamp_duty_cap'])
+    sell_stamp = min(math.ceil(sell_total / 1000) * fees['stamp_duty_per_1000'], fees['stamp_duty_cap'])
+    total_stamp = buy_stamp + sell_stamp
+    
+    # 4. 服务税
+    service_tax = total_brokerage * fees['service_tax_rate']
+    
+    # 总费用
+    total_fees = total_brokerage + total_clearing + total_stamp + service_tax
+    
+    # 净回报
+    net_profit = sell_total - buy_total - total_fees
+    profit_percentage = (net_profit / buy_total) * 100 if buy_total > 0 else 0
+    
+    # 计算盈亏平衡价格
+    buy_cost_per_share = (buy_total + buy_brokerage + buy_clearing + buy_stamp + (service_tax / 2)) / total_shares
+    sell_costs = sell_brokerage + sell_clearing + sell_stamp + (service_tax / 2)
+    break_even_price = (buy_cost_per_share * total_shares + sell_costs) / total_shares
+    
+    # 计算达到目标利润的价格
+    target_profit_price = (buy_cost_per_share * total_shares + sell_costs + fees['min_profit_target']) / total_shares
+    
+    return {
+        'buy_price': buy_price,
+        'sell_price': sell_price,
+        'total_shares': total_shares,
+        'buy_total': buy_total,
+        'sell_total': sell_total,
+        'gross_profit': sell_total - buy_total,
+        'fees_detail': {
+            'brokerage': total_brokerage,
+            'clearing': total_clearing,
+            'stamp_duty': total_stamp,
+            'service_tax': service_tax,
+            'total': total_fees
+        },
+        'fees_by_side': {
+            'buy': {'brokerage': buy_brokerage, 'clearing': buy_clearing, 'stamp_duty': buy_stamp},
+            'sell': {'brokerage': sell_brokerage, 'clearing': sell_clearing, 'stamp_duty': sell_stamp},
+        },
+        'net_profit': net_profit,
+        'profit_percentage': profit_percentage,
+        'break_even_price': break_even_price,
+        'target_profit_price': target_profit_price,
+        'min_profit_target': fees['min_profit_target']
+    }
+
 def load_stock_data(file_path):
     """
     加载处理后的股票数据
     支持CSV和JSON格式
     """
+    import pandas as pd
+    from tabulate import tabulate
+    
     print(f"📁 加载数据文件: {file_path}")
     
     try:
@@ -73,6 +143,8 @@ def display_stock_list(df):
     """
     显示股票列表，类似HTML版本
     """
+    import pandas as pd
+    
     if df is None or len(df) == 0:
         print("❌ 没有股票数据可显示")
         return
@@ -165,73 +237,84 @@ def display_stock_list(df):
                 print(f"   💡 {reason}")
                 break
 
-def select_stock_interactive(df):
+def select_stock_interactive(df, index_file=None):
     """
-    交互式选择股票
+    交互式选择股票: 输入代码或名称（部分即可）查找，再输入编号选择
+    查找使用搜索索引 search_index.json（与数据文件不一致时按数据文件即时建立）
     """
+    import pandas as pd
+    from search_index import SearchIndex, INDEX_FILE, clean_code
+    
     if df is None or len(df) == 0:
         print("❌ 没有股票数据")
         return None
     
-    # 显示选择菜单
+    code_col = 'Code' if 'Code' in df.columns else df.columns[0]
+    name_col = next((c for c in ['Stock', 'Name', 'name'] if c in df.columns), None)
+    codes = df[code_col].astype(str).map(clean_code).tolist()
+    names = df[name_col].fillna('').astype(str).tolist() if name_col else [''] * len(df)
+    
+    # 代码 → 行位置（重复代码取第一行）
+    positions = {}
+    for pos, code in enumerate(codes):
+        positions.setdefault(code.upper(), pos)
+    index = SearchIndex.load_or_build([{'code': c, 'name': n} for c, n in zip(codes, names)],
+                                      index_file or INDEX_FILE)
+    
+    def show(rows):
+        for number, pos in enumerate(rows, 1):
+            row = df.iloc[pos]
+            price = 0.0
+            for price_col in ['Last', 'Current_Price', 'Price']:
+                if price_col in row and pd.notna(row[price_col]):
+                    price = float(row[price_col])
+                    break
+            print(f"{number:2d}. {codes[pos]:8s} - {names[pos][:20]:20s} (RM {price:.3f})")
+        print("\n" + "-"*80)
+    
+    # 显示选择菜单（先列出前20只）
     print("\n" + "="*80)
-    print("🎯 请选择要计算的股票")
+    print(f"🎯 请选择要计算的股票（共 {len(df)} 只，可输入代码或名称查找）")
     print("="*80)
-    
-    # 创建简化的选择列表
-    stock_list = []
-    
-    for idx, row in df.iterrows():
-        if idx >= 20:  # 只显示前20只
-            break
-        
-        # 提取基本信息
-        code_col = 'Code' if 'Code' in df.columns else df.columns[0]
-        code = str(row[code_col]) if code_col in row else f"Stock_{idx+1}"
-        
-        name = row.get('Stock', row.get('Name', '未知股票'))
-        name_display = name[:20] if len(name) > 20 else name
-        
-        # 获取价格
-        price = 0.0
-        for price_col in ['Last', 'Current_Price', 'Price']:
-            if price_col in row and pd.notna(row[price_col]):
-                price = float(row[price_col])
-                break
-        
-        stock_list.append({
-            'index': idx + 1,
-            'code': code,
-            'name': name_display,
-            'price': price
-        })
-    
-    # 显示选择菜单
-    for stock in stock_list:
-        print(f"{stock['index']:2d}. {stock['code']:8s} - {stock['name']:20s} (RM {stock['price']:.3f})")
-    
-    print("\n" + "-"*80)
+    choices = list(range(min(20, len(df))))
+    show(choices)
     
     # 获取用户选择
     while True:
         try:
-            choice = input("请选择股票编号 (1-20), 或输入'q'退出: ").strip()
+            choice = input(f"请输入编号 (1-{len(choices)}) 选择，或输入代码/名称查找，'q'退出: ").strip()
             
+            if not choice:
+                continue
             if choice.lower() == 'q':
                 return None
             
-            choice_idx = int(choice) - 1
-            
-            if 0 <= choice_idx < len(stock_list):
-                selected_stock = stock_list[choice_idx]
-                original_idx = selected_stock['index'] - 1
-                print(f"\n✅ 已选择: {selected_stock['code']} - {selected_stock['name']}")
-                return df.iloc[original_idx]
-            else:
+            # 1-2位数字是编号（股票代码至少4位）
+            if choice.isdigit() and len(choice) <= 2:
+                choice_idx = int(choice) - 1
+                if 0 <= choice_idx < len(choices):
+                    pos = choices[choice_idx]
+                    print(f"\n✅ 已选择: {codes[pos]} - {names[pos]}")
+                    return df.iloc[pos]
                 print("❌ 无效的选择，请重试")
+                continue
+            
+            # 完整代码直接选中
+            exact = index.get(choice)
+            if exact and exact['code'].upper() in positions:
+                pos = positions[exact['code'].upper()]
+                print(f"\n✅ 已选择: {codes[pos]} - {names[pos]}")
+                return df.iloc[pos]
+            
+            matches = [positions[r['code'].upper()] for r in index.search(choice, limit=20)
+                       if r['code'].upper() in positions]
+            if not matches:
+                print(f"❌ 没有找到 '{choice}'，请换个代码或名称")
+                continue
+            choices = matches
+            print(f"\n🔎 '{choice}' 找到 {len(choices)} 只:")
+            show(choices)
                 
-        except ValueError:
-            print("❌ 请输入有效的数字")
         except Exception as e:
             print(f"❌ 选择出错: {e}")
 
@@ -338,6 +421,8 @@ def calculate_investment_return(stock_data, user_inputs):
     """
     计算投资回报（核心计算逻辑）
     """
+    import pandas as pd
+    
     print("\n" + "="*80)
     print("🧮 计算投资回报")
     print("="*80)
@@ -381,92 +466,46 @@ def calculate_investment_return(stock_data, user_inputs):
     total_shares = user_inputs['total_shares']
     fees = user_inputs['fees']
     
-    # 计算买入和卖出总额
-    buy_total = buy_price * total_shares
-    sell_total = sell_price * total_shares
+    results = calculate_trade_fees(buy_price, sell_price, total_shares, fees)
+    buy_total = results['buy_total']
+    sell_total = results['sell_total']
+    buy_side = results['fees_by_side']['buy']
+    sell_side = results['fees_by_side']['sell']
+    detail = results['fees_detail']
     
     print(f"\n📊 基础计算:")
     print(f"   买入价: RM {buy_price:.3f} × {total_shares:,} 股 = RM {buy_total:.2f}")
     print(f"   卖出价: RM {sell_price:.3f} × {total_shares:,} 股 = RM {sell_total:.2f}")
     print(f"   毛利润: RM {sell_total - buy_total:.2f}")
     
-    # 计算各项费用
+    # 费用明细
     print(f"\n💸 费用明细:")
     
-    # 1. 经纪佣金
-    buy_brokerage = max(buy_total * fees['brokerage_rate'], fees['brokerage_min'])
-    sell_brokerage = max(sell_total * fees['brokerage_rate'], fees['brokerage_min'])
-    total_brokerage = buy_brokerage + sell_brokerage
-    
-    print(f"   经纪佣金: RM {total_brokerage:.2f}")
-    print(f"     • 买入: RM {buy_brokerage:.2f} (RM {buy_total:.2f} × {fees['brokerage_rate']*100:.2f}%, 最低RM {fees['brokerage_min']:.2f})")
-    print(f"     • 卖出: RM {sell_brokerage:.2f} (RM {sell_total:.2f} × {fees['brokerage_rate']*100:.2f}%, 最低RM {fees['brokerage_min']:.2f})")
-    
-    # 2. 清算费
-    buy_clearing = min(buy_total * fees['clearing_fee_rate'], fees['clearing_fee_cap'])
-    sell_clearing = min(sell_total * fees['clearing_fee_rate'], fees['clearing_fee_cap'])
-    total_clearing = buy_clearing + sell_clearing
-    
-    print(f"   清算费: RM {total_clearing:.2f}")
-    print(f"     • 买入: RM {buy_clearing:.2f} (RM {buy_total:.2f} × {fees['clearing_fee_rate']*100:.3f}%, 最高RM {fees['clearing_fee_cap']:.2f})")
-    print(f"     • 卖出: RM {sell_clearing:.2f} (RM {sell_total:.2f} × {fees['clearing_fee_rate']*100:.3f}%, 最高RM {fees['clearing_fee_cap']:.2f})")
-    
-    # 3. 印花税
-    buy_stamp = min(np.ceil(buy_total / 1000) * fees['stamp_duty_per_1000'], fees['stamp_duty_cap'])
-    sell_stamp = min(np.ceil(sell_total / 1000) * fees['stamp_duty_per_1000'], fees['stamp_duty_cap'])
-    total_stamp = buy_stamp + sell_stamp
-    
-    print(f"   印花税: RM {total_stamp:.2f}")
-    print(f"     • 买入: RM {buy_stamp:.2f} (每RM1000收RM{fees['stamp_duty_per_1000']:.2f}, 最高RM {fees['stamp_duty_cap']:.2f})")
-    print(f"     • 卖出: RM {sell_stamp:.2f} (每RM1000收RM{fees['stamp_duty_per_1000']:.2f}, 最高RM {fees['stamp_duty_cap']:.2f})")
+    print(f"   经纪佣金: RM {detail['brokerage']:.2f}")
+    print(f"     • 买入: RM {buy_side['brokerage']:.2f} (RM {buy_total:.2f} × {fees['brokerage_rate']*100:.2f}%, 最低RM {fees['brokerage_min']:.2f})")
+    print(f"     • 卖出: RM {sell_side['brokerage']:.2f} (RM {sell_total:.2f} × {fees['brokerage_rate']*100:.2f}%, 最低RM {fees['brokerage_min']:.2f})")
     
-    # 4. 服务税
-    service_tax = total_brokerage * fees['service_tax_rate']
-    print(f"   服务税: RM {service_tax:.2f} (经纪佣金 × {fees['service_tax_rate']*100:.0f}%)")
+    print(f"   清算费: RM {detail['clearing']:.2f}")
+    print(f"     • 买入: RM {buy_side['clearing']:.2f} (RM {buy_total:.2f} × {fees['clearing_fee_rate']*100:.3f}%, 最高RM {fees['clearing_fee_cap']:.2f})")
+    print(f"     • 卖出: RM {sell_side['clearing']:.2f} (RM {sell_total:.2f} × {fees['clearing_fee_rate']*100:.3f}%, 最高RM {fees['clearing_fee_cap']:.2f})")
     
-    # 总费用
-    total_fees = total_brokerage + total_clearing + total_stamp + service_tax
-    print(f"   📋 总费用: RM {total_fees:.2f}")
+    print(f"   印花税: RM {detail['stamp_duty']:.2f}")
+    print(f"     • 买入: RM {buy_side['stamp_duty']:.2f} (每RM1000收RM{fees['stamp_duty_per_1000']:.2f}, 最高RM {fees['stamp_duty_cap']:.2f})")
+    print(f"     • 卖出: RM {sell_side['stamp_duty']:.2f} (每RM1000收RM{fees['stamp_duty_per_1000']:.2f}, 最高RM {fees['stamp_duty_cap']:.2f})")
     
-    # 净回报
-    net_profit = sell_total - buy_total - total_fees
-    profit_percentage = (net_profit / buy_total) * 100 if buy_total > 0 else 0
+    print(f"   服务税: RM {detail['service_tax']:.2f} (经纪佣金 × {fees['service_tax_rate']*100:.0f}%)")
     
-    # 计算盈亏平衡价格
-    buy_cost_per_share = (buy_total + buy_brokerage + buy_clearing + buy_stamp + (service_tax / 2)) / total_shares
-    break_even_price = (buy_cost_per_share * total_shares + sell_brokerage + sell_clearing + sell_stamp + (service_tax / 2)) / total_shares
-    
-    # 计算达到目标利润的价格
-    target_profit_price = (buy_cost_per_share * total_shares + sell_brokerage + sell_clearing + sell_stamp + (service_tax / 2) + fees['min_profit_target']) / total_shares
+    print(f"   📋 总费用: RM {detail['total']:.2f}")
     
     # 返回计算结果
-    results = {
-        'buy_price': buy_price,
-        'sell_price': sell_price,
-        'total_shares': total_shares,
-        'buy_total': buy_total,
-        'sell_total': sell_total,
-        'gross_profit': sell_total - buy_total,
-        'fees_detail': {
-            'brokerage': total_brokerage,
-            'clearing': total_clearing,
-            'stamp_duty': total_stamp,
-            'service_tax': service_tax,
-            'total': total_fees
-        },
-        'net_profit': net_profit,
-        'profit_percentage': profit_percentage,
-        'break_even_price': break_even_price,
-        'target_profit_price': target_profit_price,
-        'min_profit_target': fees['min_profit_target']
-    }
-    
     return results
 
 def display_results(stock_data, results):
     """
     显示计算结果
     """
+    import pandas as pd
+    
     print("\n" + "="*80)
     print("🎉 投资回报分析结果")
     print("="*80)
@@ -596,13 +635,13 @@ def save_results_to_file(stock_data, results, output_file=None):
 # 主程序
 # ============================================================================
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description='Bursa Malaysia投资计算器')
     parser.add_argument('data_file', nargs='?', help='股票数据文件 (CSV或JSON)')
     parser.add_argument('-o', '--output', help='输出结果文件')
     parser.add_argument('--auto', action='store_true', help='自动模式（使用默认参数）')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     print("="*80)
     print("🏦 Bursa Malaysia投资计算器 - Python版")
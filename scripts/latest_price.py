@@ -6,6 +6,8 @@
 import json
 import datetime
 
+from market_summary import build_summary
+
 def create_clean_latest_price():
     """創建乾淨的latest_price.json"""
     data = {
@@ -40,14 +42,9 @@ def create_clean_latest_price():
                 "low": 2.110,
                 "last_updated": "15:31:15"
             }
-        ],
-        "summary": {
-            "avg_change": 1.51,
-            "top_gainers": [],
-            "top_losers": [],
-            "top_volume": []
-        }
+        ]
     }
+    data["summary"] = build_summary(data["stocks"])
     
     with open('../web/latest_price.json', 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
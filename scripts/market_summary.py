@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+📊 市场概要 (market_summary.json) - 涨跌排行 / 涨跌家数 / 成交额
+======================================================================
+生成 latest_price.json 时预先计算，网页不再在浏览器里对全部股票排序:
+  • 整体:  平均涨跌幅、上涨/下跌/平盘家数、成交量、成交额（价格 × 成交量）
+           涨幅前 N、跌幅前 N、成交量前 N
+  • 每个行业: 同样的统计 + 各自的前 SECTOR_TOP_N（按成交额从高到低排列）
+
+缺少或为 null 的涨跌幅 / 价格 / 成交量按 NaN 处理: 不计入平均涨跌幅和涨跌平家数，
+成交量排行只包括成交量 > 0 的股票。
+
+排行用 np.argpartition 选出前K个再只对这K个排序（O(n + K log K)），
+数值相同的按原顺序排列，结果稳定。
+
+同一份概要嵌入 latest_price.json 的 "summary" 字段，
+并单独写出 market_summary.json（只含概要，首页可以只加载这个小文件）。
+
+使用:
+  python market_summary.py ../web/latest_price.json          # 生成 ../web/market_summary.json
+  python market_summary.py ../web/latest_price.json -n 5 --print
+======================================================================
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+TOP_N = 10
+SECTOR_TOP_N = 3
+MOVER_FIELDS = ("code", "name", "last_price", "change_percent", "volume")
+
+
+def top_k(values, k):
+    """values 最大的 k 个位置（从大到小；相同数值按位置先后；NaN 不入选）"""
+    values = np.nan_to_num(np.asarray(values, dtype=np.float64), nan=-np.inf)
+    n = len(values)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        # 先分区找出第K大的值，再取所有不小于它的位置，保证边界上的并列值取舍稳定
+        kth = values[np.argpartition(values, n - k)[n - k]]
+        candidates = np.flatnonzero(values >= kth)
+    else:
+        candidates = np.arange(n)
+    candidates = candidates[np.isfinite(values[candidates])]
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order][:k]
+
+
+def _number(value):
+    """缺少、null 或不是数字的值为 NaN（不当作 0 计入统计）"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _column(stocks, field):
+    return np.fromiter((_number(s.get(field)) for s in stocks), dtype=np.float64, count=len(stocks))
+
+
+def _movers(stocks, positions):
+    return [{field: stocks[i].get(field) for field in MOVER_FIELDS} for i in positions]
+
+
+def _block(stocks, idx, change, volume, turnover, top_n):
+    """idx 这些股票的统计和排行（涨跌幅缺失的不计入均值和涨跌家数，只排成交量 > 0 的）"""
+    chg = change[idx]
+    vol = volume[idx]
+    priced = ~np.isnan(chg)
+    return {
+        "count": int(len(idx)),
+        "avg_change": round(float(chg[priced].mean()), 2) if priced.any() else 0.0,
+        "advancers": int((chg > 0).sum()),
+        "decliners": int((chg < 0).sum()),
+        "unchanged": int((chg == 0).sum()),
+        "volume": int(np.nansum(vol)),
+        "turnover": round(float(np.nansum(turnover[idx])), 2),
+        "top_gainers": _movers(stocks, idx[top_k(np.where(chg > 0, chg, np.nan), top_n)]),
+        "top_losers": _movers(stocks, idx[top_k(np.where(chg < 0, -chg, np.nan), top_n)]),
+        "top_volume": _movers(stocks, idx[top_k(np.where(vol > 0, vol, np.nan), top_n)]),
+    }
+
+
+def build_summary(stocks, top_n=TOP_N, sector_top_n=SECTOR_TOP_N):
+    """
+    stocks: latest_price.json 的 stocks 数组
+    返回 {"avg_change", "advancers", ..., "top_gainers", ..., "sectors": [{"sector", ...}]}
+    """
+    change = _column(stocks, "change_percent")
+    volume = _column(stocks, "volume")
+    turnover = _column(stocks, "last_price") * volume
+
+    summary = _block(stocks, np.arange(len(stocks)), change, volume, turnover, top_n)
+    summary["top_n"] = top_n
+
+    # 按行业分组: 稳定排序后切分，每组保持原顺序
+    sectors = np.array([str(s.get("sector") or "Unknown") for s in stocks], dtype=object)
+    names, inverse = np.unique(sectors, return_inverse=True)
+    grouped = np.argsort(inverse, kind="stable")
+    bounds = np.cumsum(np.bincount(inverse, minlength=len(names)))[:-1]
+    blocks = []
+    for sector, idx in zip(names, np.split(grouped, bounds)):
+        block = _block(stocks, idx, change, volume, turnover, sector_top_n)
+        blocks.append({"sector": sector, **block})
+    blocks.sort(key=lambda b: -b["turnover"])
+    summary["sectors"] = blocks
+    return summary
+
+
+def write_market_summary(summary, output_dir, filename="market_summary.json", data_date=None):
+    """单独写出概要文件（原子替换），返回文件路径"""
+    filepath = os.path.join(output_dir, filename)
+    os.makedirs(output_dir or ".", exist_ok=True)
+    data = {
+        "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "data_date": data_date or datetime.now().strftime("%Y-%m-%d"),
+        **summary,
+    }
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, filepath)
+    return filepath
+
+
+def _fmt(value, spec, width):
+    """缺失的值显示为 -"""
+    return format(value, spec) if value is not None else "-".rjust(width)
+
+
+def print_summary(summary):
+    print(f"📊 {summary['count']} 只  平均 {summary['avg_change']:+.2f}%  "
+          f"涨 {summary['advancers']} / 跌 {summary['decliners']} / 平 {summary['unchanged']}  "
+          f"成交额 {summary['turnover']:,.0f}")
+    for title, key in (("涨幅", "top_gainers"), ("跌幅", "top_losers"), ("成交量", "top_volume")):
+        print(f"  {title}前{len(summary[key])}:")
+        for m in summary[key]:
+            print(f"    {m['code']:<10} {m['name']:<20} {_fmt(m['last_price'], '>8.3f', 8)} "
+                  f"{_fmt(m['change_percent'], '>+7.2f', 7)}% {_fmt(m['volume'], '>12,', 12)}")
+    print("  行业（按成交额）:")
+    for b in summary["sectors"]:
+        print(f"    {b['sector']:<28} {b['count']:>4} 只 {b['avg_change']:>+6.2f}%  "
+              f"涨 {b['advancers']:>3} / 跌 {b['decliners']:>3}  成交额 {b['turnover']:>16,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="市场概要")
+    parser.add_argument("price_json", help="latest_price.json 路径")
+    parser.add_argument("-o", "--output-dir", help="输出目录（默认与 latest_price.json 相同）")
+    parser.add_argument("-n", "--top", type=int, default=TOP_N, help="整体排行数量")
+    parser.add_argument("--print", action="store_true", help="打印概要")
+    args = parser.parse_args()
+
+    with open(args.price_json, "r", encoding="utf-8") as f:
+        snapshot = json.load(f)
+    summary = build_summary(snapshot.get("stocks", []), args.top)
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.price_json))
+    path = write_market_summary(summary, output_dir, data_date=snapshot.get("data_date"))
+    if args.print:
+        print_summary(summary)
+    print(f"✅ 市场概要: {path} ({os.path.getsize(path) / 1024:.1f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+🧰 myx - Bursa 數據工具統一入口
+======================================================================
+子命令:
+  myx normalize INPUT OUTPUT [--config eod_config.json] [--audit audit.json]
+  myx pick CSV                         # AI選股 + 輸出 web JSON（ai_stock_picker_full）
+  myx publish [--date YYYY-MM-DD] [--raw FILE]
+                                       # 運行每日流水線並更新 web/history_index.json
+  myx calc --buy 0.50 --sell 0.55 --lots 10
+                                       # 交易費用（不加載 pandas）
+  myx calc FILE [--auto] [-o OUT]      # 交互式投資計算器
+  myx report sectors | rotation | runs [-n 5] | cache | audit
+  myx screen 'chg > 5 and vol > 2*vol_ma20' [--since 2025-01-01] [--sort vol] [-n 50]
+                                       # 條件表達式篩選（screener.py）
+
+  • 本文件只導入標準庫的 argparse/os/sys，各子命令需要時才導入 pandas 等重型模塊
+  • 導入時不做任何文件系統操作，`myx --help` 和 calc/report runs 啟動很快
+======================================================================
+"""
+
+import os
+import sys
+import argparse
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(SCRIPT_DIR)
+WEB_DIR = os.path.join(BASE_DIR, "web")
+
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+
+# ============================================================================
+# 子命令
+# ============================================================================
+
+def cmd_normalize(args):
+    from normalize_eod import main as normalize_main
+    config = args.config or os.path.join(SCRIPT_DIR, "eod_config.json")
+    argv = [args.input, args.output, config] + ([args.audit] if args.audit else [])
+    normalize_main(argv)
+    return 0
+
+
+def cmd_pick(args):
+    import ai_stock_picker_full
+    ai_stock_picker_full.main(args.csv)
+    return 0
+
+
+def cmd_publish(args):
+    from datetime import date
+    from update_database import DataPipeline
+
+    target_date = date.fromisoformat(args.date) if args.date else date.today()
+    ok = DataPipeline().run_pipeline(target_date, raw_file=args.raw)
+    if not ok:
+        return 1
+
+    sys.path.insert(0, WEB_DIR)
+    from generate_history_index import update_history_index
+    update_history_index(os.path.join(WEB_DIR, "history"), os.path.join(WEB_DIR, "history_index.json"))
+    return 0
+
+
+def cmd_calc(args):
+    if args.buy is None:
+        if not args.data_file:
+            print("❌ 需要 --buy（費用計算）或數據文件（交互式計算器）")
+            return 2
+        from investment_calculator import main as calculator_main
+        argv = [args.data_file] + (['--auto'] if args.auto else []) + (['-o', args.output] if args.output else [])
+        calculator_main(argv)
+        return 0
+
+    from investment_calculator import calculate_trade_fees, FEE_CONFIG
+    shares = args.shares if args.shares else args.lots * 100
+    sell = args.sell if args.sell is not None else args.buy
+    results = calculate_trade_fees(args.buy, sell, shares, FEE_CONFIG)
+
+    fees = results['fees_detail']
+    print(f"📊 RM {args.buy:.3f} → RM {sell:.3f} × {shares:,} 股")
+    print(f"   買入總額: RM {results['buy_total']:,.2f}   賣出總額: RM {results['sell_total']:,.2f}")
+    print(f"   經紀佣金: RM {fees['brokerage']:.2f}   清算費: RM {fees['clearing']:.2f}   "
+          f"印花稅: RM {fees['stamp_duty']:.2f}   服務稅: RM {fees['service_tax']:.2f}")
+    print(f"   📋 總費用: RM {fees['total']:.2f}")
+    print(f"   💰 淨回報: RM {results['net_profit']:+,.2f} ({results['profit_percentage']:+.2f}%)")
+    print(f"   盈虧平衡價: RM {results['break_even_price']:.3f}   目標利潤價: RM {results['target_profit_price']:.3f}")
+    return 0
+
+
+def cmd_report(args):
+    if args.kind == 'sectors':
+        from sector_report import generate_sector_report
+        os.chdir(SCRIPT_DIR)  # sector_report 使用相對 scripts/ 的路徑
+        generate_sector_report()
+        return 0
+
+    if args.kind == 'rotation':
+        from sector_rotation import SectorRotation, print_rotation
+        with SectorRotation() as rotation:
+            rotation.db.sync()
+            rotation.update()
+            df = rotation.latest()
+        if df.empty:
+            print("❌ 沒有行業輪動數據")
+            return 1
+        print_rotation(df, 20)
+        return 0
+
+    if args.kind == 'runs':
+        from pipeline_metrics import load_runs, print_comparison, find_regressions
+        runs = load_runs(pipeline=args.pipeline, last=args.last)
+        if not runs:
+            print("❌ 沒有找到運行記錄")
+            return 1
+        print_comparison(runs)
+        regressions = find_regressions(runs)
+        for name, value, median, ratio in regressions:
+            print(f"⚠️  {name}: {value:.3f}s vs {median:.3f}s ({ratio:.2f}×)")
+        return 2 if regressions else 0
+
+    if args.kind == 'audit':
+        from audit_rollup import AuditRollup
+        with AuditRollup() as rollup:
+            loaded, _ = rollup.sync()
+            summary = rollup.summary()
+        if not summary.get('audits'):
+            print("❌ 沒有審計記錄")
+            return 1
+        rows = summary['rows']
+        print(f"📋 {summary['audits']} 個審計  {summary['first_date']} ~ {summary['last_date']}  (本次載入 {loaded})")
+        print(f"   每日行數: {rows['min']} ~ {rows['max']}（平均 {rows['mean']}），有丟棄行 {rows['days_with_dropped_rows']} 天")
+        for column, first in summary['column_drift']['first_removed'].items():
+            print(f"   列 {column or '(空)'} 首次消失: {first}")
+        print(f"   有未映射行業代碼: {summary['unmapped']['days']} 天，{summary['unmapped']['codes']} 個代碼")
+        return 0
+
+    if args.kind == 'cache':
+        from stage_cache import StageCache
+        for stage, (count, size) in StageCache().stats().items():
+            print(f"  {stage:<12} {count:>5} 條  {size / 1024:>10.1f} KB")
+        return 0
+    return 2
+
+
+def cmd_screen(args):
+    from screener import main as screener_main
+    return screener_main(args.args)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='myx', description='Bursa Malaysia 數據工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('normalize', help='規範化經紀商EOD CSV')
+    p.add_argument('input', help='原始CSV')
+    p.add_argument('output', help='輸出CSV')
+    p.add_argument('--config', help='eod_config.json（默認 scripts/eod_config.json）')
+    p.add_argument('--audit', help='審計日誌輸出路徑')
+    p.set_defaults(func=cmd_normalize)
+
+    p = sub.add_parser('pick', help='AI選股並生成 web JSON')
+    p.add_argument('csv', help='EOD CSV 文件')
+    p.set_defaults(func=cmd_pick)
+
+    p = sub.add_parser('publish', help='運行每日流水線並更新網頁索引')
+    p.add_argument('--date', help='交易日期 YYYY-MM-DD（默認今天）')
+    p.add_argument('--raw', help='使用本地原始CSV，跳過下載')
+    p.set_defaults(func=cmd_publish)
+
+    p = sub.add_parser('calc', help='交易費用 / 投資回報計算')
+    p.add_argument('data_file', nargs='?', help='股票數據文件（交互式計算器）')
+    p.add_argument('--buy', type=float, help='買入價')
+    p.add_argument('--sell', type=float, help='賣出價（默認等於買入價）')
+    size = p.add_mutually_exclusive_group()
+    size.add_argument('--shares', type=int, help='股數')
+    size.add_argument('--lots', type=int, default=10, help='手數（1手=100股，默認10）')
+    p.add_argument('--auto', action='store_true', help='交互式計算器使用默認參數')
+    p.add_argument('-o', '--output', help='交互式計算器結果文件')
+    p.set_defaults(func=cmd_calc)
+
+    p = sub.add_parser('report', help='報告')
+    p.add_argument('kind', choices=['sectors', 'rotation', 'runs', 'cache', 'audit'], help='報告類型')
+    p.add_argument('-n', '--last', type=int, default=5, help='runs: 比較最近多少次運行')
+    p.add_argument('--pipeline', help='runs: 只看指定流水線')
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser('screen', help='條件表達式篩選（參數同 screener.py，myx screen --help 查看）')
+    p.set_defaults(func=cmd_screen, args=[])
+
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['screen']:
+        # screen 之後的參數原樣交給 screener.py 解析
+        return cmd_screen(argparse.Namespace(args=argv[1:]))
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n👋 用戶中斷")
+        sys.exit(130)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+🗄️  AI選股歷史歸檔 - 追加式 NDJSON 打包文件 + 偏移索引
+======================================================================
+每天的 picks 數據作為一行 JSON 追加到同一個文件:
+  picks_archive.ndjson      - 每行 {"date": "YYYYMMDD", "data": {...}}
+  picks_archive.idx.json    - {"YYYYMMDD": [offset, length], ...}
+
+  • 按日期隨機讀取: 一次 seek + read，O(1)
+  • 全歷史掃描: 順序讀取單個文件
+  • 同一天重複寫入: 追加新行並更新索引，舊行在壓縮時移除
+  • 索引丟失或損壞: 順序掃描數據文件自動重建
+
+使用:
+  python picks_archive.py import ../web/history   # 導入現有 picks_*.json
+  python picks_archive.py get 20251224            # 讀取某一天
+  python picks_archive.py list                    # 列出已歸檔日期
+  python picks_archive.py compact                 # 壓縮（移除被覆蓋的舊行）
+======================================================================
+"""
+
+import os
+import sys
+import json
+import glob
+import argparse
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_DIR = os.path.join(SCRIPT_DIR, "data", "bursa", "picks")
+ARCHIVE_NAME = "picks_archive"
+
+
+class PicksArchive:
+    """追加式選股歸檔"""
+
+    def __init__(self, archive_dir=ARCHIVE_DIR, name=ARCHIVE_NAME):
+        self.data_path = os.path.join(archive_dir, f"{name}.ndjson")
+        self.index_path = os.path.join(archive_dir, f"{name}.idx.json")
+        self._index = None
+
+    # ------------------------------------------------------------------
+    # 索引
+    # ------------------------------------------------------------------
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = self._load_index()
+        return self._index
+
+    def _load_index(self):
+        """讀取索引；與數據文件不一致時重建"""
+        if not os.path.exists(self.data_path):
+            return {}
+
+        data_size = os.path.getsize(self.data_path)
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    stored = json.load(f)
+                if stored.get('data_size') == data_size:
+                    return {k: tuple(v) for k, v in stored['offsets'].items()}
+            except (ValueError, KeyError, TypeError):
+                pass
+
+        print("  🔧 歸檔索引缺失或過期，正在重建...")
+        return self.rebuild_index()
+
+    def _save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        payload = {
+            'data_size': os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0,
+            'offsets': {k: list(v) for k, v in sorted(self.index.items())},
+        }
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+
+    def rebuild_index(self):
+        """順序掃描數據文件重建索引（同一日期以最後一行為準）"""
+        offsets = {}
+        offset = 0
+        with open(self.data_path, 'rb') as f:
+            for line in f:
+                length = len(line)
+                if not line.endswith(b"\n"):
+                    break  # 寫入中斷留下的半行
+                try:
+                    date_key = json.loads(line)['date']
+                    offsets[date_key] = (offset, length)
+                except (ValueError, KeyError):
+                    pass
+                offset += length
+
+        if offset < os.path.getsize(self.data_path):
+            print(f"  ⚠️  截斷歸檔末尾不完整的記錄 ({os.path.getsize(self.data_path) - offset} bytes)")
+            with open(self.data_path, 'r+b') as f:
+                f.truncate(offset)
+
+        self._index = offsets
+        self._save_index()
+        return offsets
+
+    # ------------------------------------------------------------------
+    # 讀寫
+    # ------------------------------------------------------------------
+
+    def append(self, date_key, data):
+        """追加一天的選股數據（date_key: YYYYMMDD）"""
+        os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
+        line = json.dumps({'date': date_key, 'data': data}, ensure_ascii=False,
+                          separators=(',', ':')).encode('utf-8') + b"\n"
+
+        index = self.index
+        with open(self.data_path, 'ab') as f:
+            offset = f.tell()
+            f.write(line)
+        index[date_key] = (offset, len(line))
+        self._save_index()
+        return offset
+
+    def get(self, date_key):
+        """按日期讀取，不存在時返回 None"""
+        location = self.index.get(date_key)
+        if location is None:
+            return None
+        offset, length = location
+        with open(self.data_path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length))['data']
+
+    def __contains__(self, date_key):
+        return date_key in self.index
+
+    def dates(self):
+        return sorted(self.index)
+
+    def scan(self, start=None, end=None):
+        """按日期升序掃描歷史，產出 (date_key, data)；壓縮後為純順序讀取"""
+        keys = [k for k in sorted(self.index)
+                if (start is None or k >= start) and (end is None or k <= end)]
+        if not keys:
+            return
+        with open(self.data_path, 'rb') as f:
+            for key in keys:
+                offset, length = self.index[key]
+                if f.tell() != offset:
+                    f.seek(offset)
+                yield key, json.loads(f.read(length))['data']
+
+    def compact(self):
+        """壓縮歸檔：只保留每個日期的最新一行，按日期排序重寫"""
+        if not os.path.exists(self.data_path):
+            return 0, 0
+
+        before = os.path.getsize(self.data_path)
+        tmp_path = self.data_path + ".tmp"
+        new_index = {}
+        with open(self.data_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for key in sorted(self.index):
+                offset, length = self.index[key]
+                src.seek(offset)
+                line = src.read(length)
+                new_index[key] = (dst.tell(), len(line))
+                dst.write(line)
+        os.replace(tmp_path, self.data_path)
+        self._index = new_index
+        self._save_index()
+        return before, os.path.getsize(self.data_path)
+
+    def import_directory(self, directory, overwrite=False):
+        """導入目錄中的 picks_YYYYMMDD.json 文件"""
+        imported = 0
+        for filepath in sorted(glob.glob(os.path.join(directory, "picks_*.json"))):
+            date_key = os.path.basename(filepath)[6:14]
+            if not date_key.isdigit() or len(date_key) != 8:
+                continue
+            if date_key in self and not overwrite:
+                continue
+            with open(filepath, 'r', encoding='utf-8') as f:
+                self.append(date_key, json.load(f))
+            imported += 1
+        return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AI選股歷史歸檔工具')
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR, help='歸檔目錄')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_import = sub.add_parser('import', help='導入 picks_*.json 文件')
+    p_import.add_argument('directory', help='歷史文件目錄')
+    p_import.add_argument('--overwrite', action='store_true', help='覆蓋已歸檔的日期')
+
+    p_get = sub.add_parser('get', help='讀取某一天的選股')
+    p_get.add_argument('date', help='日期 YYYYMMDD')
+
+    sub.add_parser('list', help='列出已歸檔日期')
+    sub.add_parser('compact', help='壓縮歸檔文件')
+
+    args = parser.parse_args()
+    archive = PicksArchive(args.archive_dir)
+
+    if args.command == 'import':
+        count = archive.import_directory(args.directory, args.overwrite)
+        print(f"✅ 導入 {count} 天，歸檔共 {len(archive.dates())} 天")
+    elif args.command == 'get':
+        data = archive.get(args.date.replace('-', ''))
+        if data is None:
+            print(f"❌ 未找到 {args.date}")
+            sys.exit(1)
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+    elif args.command == 'list':
+        dates = archive.dates()
+        print(f"📅 已歸檔 {len(dates)} 天")
+        for date_key in dates:
+            print(f"  {date_key}")
+    elif args.command == 'compact':
+        before, after = archive.compact()
+        print(f"✅ 壓縮完成: {before} → {after} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+🔀 進程內 DAG 流水線執行器
+======================================================================
+每個階段是一個普通函數，聲明自己的輸入和輸出名稱:
+
+    dag = PipelineDAG()
+    dag.add_stage('normalize', normalize_fn, inputs=['raw_file'], outputs=['eod_df'])
+    dag.add_stage('prices', emit_prices, inputs=['eod_df'], outputs=['price_file'])
+    dag.add_stage('scoring', score_fn, inputs=['eod_df'], outputs=['scored_df'])
+    context = dag.run({'raw_file': path})
+
+  • 數據（DataFrame 等）在內存中傳遞，不經過臨時CSV
+  • 輸入都已就緒的階段並發執行（線程池）
+  • 階段返回 None 或拋出異常時，所有下游階段被跳過
+======================================================================
+"""
+
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class Stage:
+    """流水線階段"""
+
+    def __init__(self, name, func, inputs=(), outputs=None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs) if outputs is not None else [name]
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, inputs={self.inputs}, outputs={self.outputs})"
+
+
+class PipelineDAG:
+    """按依賴關係調度階段的執行器"""
+
+    def __init__(self, max_workers=4, verbose=True):
+        self.stages = {}
+        self.producers = {}
+        self.max_workers = max_workers
+        self.verbose = verbose
+        self.results = {}
+        # 階段執行前後的鉤子: hook(stage, context) / hook(stage, context, result)
+        self.before_stage = []
+        self.after_stage = []
+
+    def add_stage(self, name, func, inputs=(), outputs=None):
+        if name in self.stages:
+            raise ValueError(f"重複的階段名稱: {name}")
+        stage = Stage(name, func, inputs, outputs)
+        for output in stage.outputs:
+            if output in self.producers:
+                raise ValueError(f"輸出 '{output}' 已由階段 '{self.producers[output]}' 產生")
+            self.producers[output] = name
+        self.stages[name] = stage
+        return stage
+
+    def dependencies(self, stage):
+        """返回階段依賴的上游階段名稱集合"""
+        return {self.producers[i] for i in stage.inputs if i in self.producers}
+
+    def validate(self, initial=()):
+        """檢查缺失的輸入和循環依賴，返回拓撲順序"""
+        available = set(initial)
+        for stage in self.stages.values():
+            missing = [i for i in stage.inputs if i not in self.producers and i not in available]
+            if missing:
+                raise ValueError(f"階段 '{stage.name}' 的輸入沒有來源: {missing}")
+
+        order = []
+        pending = {name: self.dependencies(stage) for name, stage in self.stages.items()}
+        while pending:
+            ready = sorted(name for name, deps in pending.items() if not deps)
+            if not ready:
+                raise ValueError(f"存在循環依賴: {sorted(pending)}")
+            for name in ready:
+                order.append(name)
+                del pending[name]
+            for deps in pending.values():
+                deps.difference_update(ready)
+        return order
+
+    def _call(self, stage, context):
+        kwargs = {name: context[name] for name in stage.inputs}
+        for hook in self.before_stage:
+            hook(stage, context)
+        started = time.perf_counter()
+        status, value, error = 'ok', None, None
+        try:
+            value = stage.func(**kwargs)
+        except Exception as e:
+            status, error = 'failed', f"{type(e).__name__}: {e}"
+            if self.verbose:
+                traceback.print_exc()
+        elapsed = time.perf_counter() - started
+        result = {'status': status, 'seconds': round(elapsed, 4), 'value': value, 'error': error}
+        for hook in self.after_stage:
+            hook(stage, context, result)
+        return result
+
+    def _store_outputs(self, stage, value, context):
+        """把階段返回值寫入上下文；任一輸出為 None 視為失敗"""
+        if len(stage.outputs) == 1:
+            values = {stage.outputs[0]: value}
+        elif isinstance(value, dict):
+            values = {k: value.get(k) for k in stage.outputs}
+        elif isinstance(value, (tuple, list)) and len(value) == len(stage.outputs):
+            values = dict(zip(stage.outputs, value))
+        else:
+            return False
+
+        if any(v is None for v in values.values()):
+            return False
+        context.update(values)
+        return True
+
+    def run(self, initial=None):
+        """執行流水線，返回包含所有輸出的上下文字典（self.results 記錄每個階段狀態）"""
+        context = dict(initial or {})
+        self.validate(context)
+        self.results = {}
+
+        remaining = dict(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while remaining or running:
+                # 跳過上游失敗的階段
+                for name, stage in list(remaining.items()):
+                    failed_deps = [d for d in self.dependencies(stage)
+                                   if self.results.get(d, {}).get('status') in ('failed', 'skipped')]
+                    if failed_deps:
+                        self.results[name] = {'status': 'skipped', 'seconds': 0.0,
+                                              'error': f"上游失敗: {failed_deps}"}
+                        if self.verbose:
+                            print(f"  ⏭️  跳過 {name}（上游失敗: {', '.join(failed_deps)}）")
+                        del remaining[name]
+
+                # 提交所有輸入已就緒的階段
+                for name, stage in list(remaining.items()):
+                    if all(i in context for i in stage.inputs):
+                        if self.verbose:
+                            print(f"  ▶️  開始階段: {name}")
+                        running[pool.submit(self._call, stage, dict(context))] = stage
+                        del remaining[name]
+
+                if not running:
+                    for name in remaining:
+                        self.results[name] = {'status': 'skipped', 'seconds': 0.0, 'error': '輸入未就緒'}
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    result = future.result()
+                    if result['status'] == 'ok' and not self._store_outputs(stage, result['value'], context):
+                        result['status'] = 'failed'
+                        result['error'] = result['error'] or '階段未產生輸出'
+                    result.pop('value', None)
+                    self.results[stage.name] = result
+                    if self.verbose:
+                        icon = "✅" if result['status'] == 'ok' else "❌"
+                        print(f"  {icon} 階段 {stage.name}: {result['status']} ({result['seconds']:.2f}s)")
+
+        return context
+
+    @property
+    def succeeded(self):
+        return bool(self.results) and all(r['status'] == 'ok' for r in self.results.values())
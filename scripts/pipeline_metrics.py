@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+⏱️  EOD 流水線階段監測
+======================================================================
+每個階段記錄: 牆鐘時間、CPU時間、輸入/輸出行數、每秒行數、RSS變化、進程峰值RSS、寫入字節數
+  • rss_delta_mb         階段結束與開始時的常駐內存差（Linux /proc；並發階段互相包含）
+  • process_peak_rss_mb  到階段結束為止整個進程的峰值（ru_maxrss，只增不減，不是本階段的峰值）
+每次運行輸出一個 JSON 記錄: logs/runs/run_YYYYMMDD_HHMMSS_微秒_pid_<pipeline>.json
+
+用法（代碼中）:
+    recorder = RunRecorder('ai_stock_picker_full')
+    with recorder.stage('scoring', rows_in=len(df)) as st:
+        df_scored = ai_scoring(df)
+        st.rows_out = len(df_scored)
+    recorder.save()
+
+    recorder.attach(dag)   # 自動記錄 PipelineDAG 的所有階段
+
+可選剖析（環境變量 MYX_PROFILE=cprofile 或 tracemalloc，或 RunRecorder(profile=...)）:
+  • cprofile    - 每個階段輸出 logs/runs/<run_id>_<stage>.prof
+  • tracemalloc - 每個階段記錄 Python 分配峰值
+  兩者都是進程級的鉤子，PipelineDAG 並發運行階段（max_workers > 1）時 attach() 關閉剖析
+
+比較最近 N 次運行:
+  python pipeline_metrics.py compare -n 5
+  python pipeline_metrics.py compare -n 10 --pipeline update_database --threshold 1.5
+======================================================================
+"""
+
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import threading
+import statistics
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNS_DIR = os.path.join(SCRIPT_DIR, "logs", "runs")
+
+
+def current_rss_mb():
+    """進程當前常駐內存 (MB)，只支持 Linux（讀 /proc/self/statm），其他平台返回 None"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024, 1)
+
+
+def peak_rss_mb():
+    """進程峰值常駐內存 (MB)，從進程啟動起只增不減"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 單位為 KB，macOS 為字節
+    if sys.platform == 'darwin':
+        return round(peak / 1024 / 1024, 1)
+    return round(peak / 1024, 1)
+
+
+def _row_count(value):
+    """DataFrame / list / dict 的行數，其他類型返回 None"""
+    if value is None or isinstance(value, (str, bytes)):
+        return None
+    if isinstance(value, dict):
+        for key in ('stocks', 'picks'):
+            if isinstance(value.get(key), list):
+                return len(value[key])
+        return None
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def _file_bytes(value):
+    """階段輸出若為文件路徑，返回文件大小"""
+    if isinstance(value, str) and os.path.isfile(value):
+        return os.path.getsize(value)
+    return 0
+
+
+class StageMetrics:
+    """單個階段的測量"""
+
+    def __init__(self, name, rows_in=None, profile=None, profile_path=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.bytes_written = 0
+        self.status = 'ok'
+        self.error = None
+        self.profile = profile
+        self.profile_path = profile_path
+        self._profiler = None
+        self._tracemalloc_started = False
+
+    def add_file(self, path):
+        """記錄本階段寫入的文件"""
+        if path and os.path.isfile(path):
+            self.bytes_written += os.path.getsize(path)
+
+    def start(self):
+        if self.profile == 'cprofile':
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.profile == 'tracemalloc':
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracemalloc_started = True
+            tracemalloc.reset_peak()
+        self._rss = current_rss_mb()
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+
+    def stop(self):
+        self.wall_seconds = time.perf_counter() - self._wall
+        self.cpu_seconds = time.thread_time() - self._cpu
+        rss = current_rss_mb()
+        self.rss_delta_mb = round(rss - self._rss, 1) if rss is not None and self._rss is not None else None
+        self.process_peak_rss_mb = peak_rss_mb()
+        self.tracemalloc_peak_mb = None
+
+        if self._profiler is not None:
+            self._profiler.disable()
+            os.makedirs(os.path.dirname(self.profile_path), exist_ok=True)
+            self._profiler.dump_stats(self.profile_path)
+        elif self.profile == 'tracemalloc':
+            import tracemalloc
+            self.tracemalloc_peak_mb = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+            if self._tracemalloc_started:
+                tracemalloc.stop()
+
+    def as_dict(self):
+        rows = self.rows_out if self.rows_out is not None else self.rows_in
+        record = {
+            'stage': self.name,
+            'status': self.status,
+            'wall_seconds': round(self.wall_seconds, 4),
+            'cpu_seconds': round(self.cpu_seconds, 4),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'rows_per_second': round(rows / self.wall_seconds, 1) if rows and self.wall_seconds > 0 else None,
+            'rss_delta_mb': self.rss_delta_mb,
+            'process_peak_rss_mb': self.process_peak_rss_mb,
+            'bytes_written': self.bytes_written,
+        }
+        if self.error:
+            record['error'] = self.error
+        if self.tracemalloc_peak_mb is not None:
+            record['tracemalloc_peak_mb'] = self.tracemalloc_peak_mb
+        if self._profiler is not None:
+            record['profile_file'] = self.profile_path
+        return record
+
+
+class RunRecorder:
+    """一次流水線運行的監測記錄"""
+
+    def __init__(self, pipeline, runs_dir=RUNS_DIR, profile=None):
+        self.pipeline = pipeline
+        self.runs_dir = runs_dir
+        self.profile = profile or os.environ.get('MYX_PROFILE') or None
+        self.started_at = datetime.now()
+        # 微秒和 pid: 同一秒內啟動的運行（例如並行的回填進程）不會互相覆蓋
+        self.run_id = f"run_{self.started_at.strftime('%Y%m%d_%H%M%S_%f')}_{os.getpid()}"
+        self.stages = []
+        self.extra = {}
+        self._lock = threading.Lock()
+        self._active = threading.local()
+        self._wall = time.perf_counter()
+
+    def _new_stage(self, name, rows_in=None, profile=None):
+        profile_path = os.path.join(self.runs_dir, f"{self.run_id}_{name}.prof")
+        return StageMetrics(name, rows_in, profile, profile_path)
+
+    def _finish(self, stage):
+        stage.stop()
+        with self._lock:
+            self.stages.append(stage.as_dict())
+
+    def stage(self, name, rows_in=None):
+        """上下文管理器，測量一個階段"""
+        recorder = self
+
+        class _StageContext:
+            def __enter__(self):
+                self.metrics = recorder._new_stage(name, rows_in, recorder.profile)
+                self.metrics.start()
+                return self.metrics
+
+            def __exit__(self, exc_type, exc, tb):
+                if exc_type is not None:
+                    self.metrics.status = 'failed'
+                    self.metrics.error = f"{exc_type.__name__}: {exc}"
+                recorder._finish(self.metrics)
+                return False
+
+        return _StageContext()
+
+    def attach(self, dag):
+        """掛接到 PipelineDAG，自動記錄每個階段（並發運行時不做剖析）"""
+        profile = self.profile
+        if profile and dag.max_workers > 1:
+            print(f"  ⚠️  PipelineDAG 並發運行階段（max_workers={dag.max_workers}），"
+                  f"{profile} 剖析已關閉")
+            self.extra['profile_disabled'] = f"concurrent stages (max_workers={dag.max_workers})"
+            profile = None
+
+        def before(stage, context):
+            rows = [_row_count(context.get(i)) for i in stage.inputs]
+            rows = [r for r in rows if r is not None]
+            metrics = self._new_stage(stage.name, max(rows) if rows else None, profile)
+            self._active.metrics = metrics
+            metrics.start()
+
+        def after(stage, context, result):
+            metrics = getattr(self._active, 'metrics', None)
+            if metrics is None:
+                return
+            value = result.get('value')
+            values = value if isinstance(value, (tuple, list)) and len(stage.outputs) > 1 else [value]
+            rows = [_row_count(v) for v in values]
+            rows = [r for r in rows if r is not None]
+            metrics.rows_out = max(rows) if rows else None
+            metrics.bytes_written = sum(_file_bytes(v) for v in values)
+            metrics.status = result['status']
+            metrics.error = result.get('error')
+            self._finish(metrics)
+            self._active.metrics = None
+
+        dag.before_stage.append(before)
+        dag.after_stage.append(after)
+        return self
+
+    def as_dict(self):
+        return {
+            'run_id': self.run_id,
+            'pipeline': self.pipeline,
+            'started_at': self.started_at.isoformat(),
+            'wall_seconds': round(time.perf_counter() - self._wall, 4),
+            'process_peak_rss_mb': peak_rss_mb(),
+            'profile': self.profile,
+            'stages': self.stages,
+            **self.extra,
+        }
+
+    def save(self):
+        """寫入運行記錄 JSON，返回路徑"""
+        os.makedirs(self.runs_dir, exist_ok=True)
+        path = os.path.join(self.runs_dir, f"{self.run_id}_{self.pipeline}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=2, ensure_ascii=False)
+        print(f"  ⏱️  運行記錄: {path}")
+        return path
+
+
+# ============================================================================
+# 比較最近 N 次運行
+# ============================================================================
+
+def load_runs(runs_dir=RUNS_DIR, pipeline=None, last=5):
+    """讀取最近 N 個運行記錄（按時間升序）"""
+    pattern = f"run_*_{pipeline}.json" if pipeline else "run_*.json"
+    paths = sorted(glob.glob(os.path.join(runs_dir, pattern)))[-last:]
+    runs = []
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                runs.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return runs
+
+
+def find_regressions(runs, threshold=1.25, metric='wall_seconds', min_seconds=0.05):
+    """
+    最新一次運行與之前運行的中位數比較
+    返回 [(stage, 最新值, 基線中位數, 倍數), ...]
+    """
+    if len(runs) < 2:
+        return []
+
+    history = {}
+    for run in runs[:-1]:
+        for stage in run.get('stages', []):
+            value = stage.get(metric)
+            if value is not None:
+                history.setdefault(stage['stage'], []).append(value)
+
+    regressions = []
+    for stage in runs[-1].get('stages', []):
+        baseline = history.get(stage['stage'])
+        value = stage.get(metric)
+        if not baseline or value is None:
+            continue
+        median = statistics.median(baseline)
+        if value >= min_seconds and median > 0 and value / median >= threshold:
+            regressions.append((stage['stage'], value, median, value / median))
+    return regressions
+
+
+def print_comparison(runs, metric='wall_seconds'):
+    """打印階段 × 運行 對比表"""
+    stage_names = []
+    for run in runs:
+        for stage in run.get('stages', []):
+            if stage['stage'] not in stage_names:
+                stage_names.append(stage['stage'])
+
+    header = f"{'stage':<16}" + "".join(f"{run['run_id'][4:19]:>18}" for run in runs)
+    print(header)
+    print("-" * len(header))
+    for name in stage_names:
+        cells = []
+        for run in runs:
+            match = next((s for s in run.get('stages', []) if s['stage'] == name), None)
+            value = match.get(metric) if match else None
+            cells.append(f"{value:>18.3f}" if isinstance(value, (int, float)) else f"{'-':>18}")
+        print(f"{name:<16}" + "".join(cells))
+    totals = "".join(f"{run.get('wall_seconds', 0):>18.3f}" for run in runs)
+    print(f"{'(total)':<16}" + totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EOD 流水線運行記錄工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_compare = sub.add_parser('compare', help='比較最近 N 次運行，找出性能退化')
+    p_compare.add_argument('-n', '--last', type=int, default=5, help='比較的運行次數')
+    p_compare.add_argument('--pipeline', help='只比較指定流水線（如 ai_stock_picker_full）')
+    p_compare.add_argument('--metric', default='wall_seconds',
+                           choices=['wall_seconds', 'cpu_seconds', 'rss_delta_mb', 'process_peak_rss_mb',
+                                    'bytes_written'])
+    p_compare.add_argument('--threshold', type=float, default=1.25, help='退化判定倍數')
+    p_compare.add_argument('--runs-dir', default=RUNS_DIR, help='運行記錄目錄')
+
+    args = parser.parse_args()
+
+    runs = load_runs(args.runs_dir, args.pipeline, args.last)
+    if not runs:
+        print(f"❌ 沒有找到運行記錄: {args.runs_dir}")
+        sys.exit(1)
+
+    print(f"📊 最近 {len(runs)} 次運行 ({args.metric})")
+    print_comparison(runs, args.metric)
+
+    regressions = find_regressions(runs, args.threshold, args.metric)
+    if regressions:
+        print(f"\n⚠️  發現 {len(regressions)} 個退化階段（≥ {args.threshold}× 基線中位數）:")
+        for name, value, median, ratio in regressions:
+            print(f"   {name:<16} {value:.3f} vs {median:.3f} ({ratio:.2f}×)")
+        sys.exit(2)
+    print("\n✅ 沒有發現性能退化")
+
+
+if __name__ == "__main__":
+    main()
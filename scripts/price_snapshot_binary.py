@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+📦 latest_price 二进制快照 (浏览器 TypedArray 格式)
+======================================================================
+把 latest_price.json 的股票数组写成小端序的列式二进制文件，
+浏览器端直接用 Float32Array / Uint32Array 读取，无需解析大JSON。
+
+文件布局 (latest_price.bin):
+  [0:4]   魔数 b"MYXP"
+  [4:8]   uint32 头部长度 N
+  [8:8+N] UTF-8 JSON 头部 (版本、行数、各列 offset/dtype/length)
+  之后    各列数据，每列起始位置按 8 字节对齐
+
+列:
+  last_price / change / change_percent / open / high / low  → float32（缺失为 NaN，读出为 null）
+  volume                                                   → uint32（缺失为 0xFFFFFFFF，读出为 null；
+                                                             负数或超出范围时 encode_snapshot 抛 ValueError）
+  code / name                                              → 字符串表 (uint32 offsets + UTF-8 blob)
+  sector / last_updated                                    → 字典编码 (uint16 索引，字典存于头部)
+
+浮点列读出时保留 3 位小数（与 JSON 中的精度相同），不暴露 float32 的误差（0.28499999 → 0.285）。
+头部 meta 带有 latest_price.json 的 summary（market_summary.py 的市场概要），
+只加载 .bin 的网页不需要再取 market_summary.json。
+
+使用:
+  python price_snapshot_binary.py ../web/latest_price.json            # 生成 ../web/latest_price.bin
+  python price_snapshot_binary.py ../web/latest_price.json --verify   # 生成并与JSON对比
+======================================================================
+"""
+
+import os
+import sys
+import json
+import struct
+import argparse
+
+import numpy as np
+
+MAGIC = b"MYXP"
+FORMAT_VERSION = 2
+ALIGNMENT = 8
+DECIMALS = 3
+UINT_NULL = np.iinfo(np.uint32).max
+
+FLOAT_COLUMNS = ['last_price', 'change', 'change_percent', 'open', 'high', 'low']
+UINT_COLUMNS = ['volume']
+STRING_COLUMNS = ['code', 'name']
+DICT_COLUMNS = ['sector', 'last_updated']
+
+# 与 latest_price.json 中每支股票的字段顺序一致
+FIELD_ORDER = ['code', 'name', 'last_price', 'change', 'change_percent', 'volume',
+               'sector', 'open', 'high', 'low', 'last_updated']
+
+# 头部中保留的快照级字段
+META_FIELDS = ['last_updated', 'data_date', 'total_stocks', 'market', 'source', 'summary']
+
+
+def _pad(buffer):
+    """把缓冲区补齐到 ALIGNMENT 字节"""
+    remainder = len(buffer) % ALIGNMENT
+    if remainder:
+        buffer.extend(b"\x00" * (ALIGNMENT - remainder))
+
+
+def _number(value):
+    """缺少、null 或不是数字的值为 NaN"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _text(value):
+    return '' if value is None else str(value)
+
+
+def _encode_strings(values):
+    """编码字符串表：返回 (offsets uint32[n+1], utf-8 blob)"""
+    encoded = [str(v).encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+    if encoded:
+        offsets[1:] = np.cumsum([len(e) for e in encoded], dtype=np.uint64)
+    return offsets, b"".join(encoded)
+
+
+def _decode_strings(offsets, blob):
+    """解码字符串表"""
+    return [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+
+def _encode_dictionary(values):
+    """字典编码：返回 (uint16 索引数组, 字典列表)"""
+    dictionary = {}
+    indexes = np.empty(len(values), dtype='<u2')
+    for i, value in enumerate(values):
+        key = str(value)
+        if key not in dictionary:
+            if len(dictionary) >= 0xFFFF:
+                raise ValueError("字典编码列的不同取值超过 65535 个")
+            dictionary[key] = len(dictionary)
+        indexes[i] = dictionary[key]
+    return indexes, list(dictionary)
+
+
+def encode_snapshot(data):
+    """
+    把 latest_price.json 结构编码为二进制快照字节串
+    data: {'stocks': [...], 'last_updated': ..., ...}
+    """
+    stocks = data.get('stocks', [])
+    count = len(stocks)
+
+    payload = bytearray()
+    columns = {}
+
+    def add_array(name, array, **extra):
+        _pad(payload)
+        columns[name] = dict(offset=len(payload), dtype=array.dtype.str, length=len(array), **extra)
+        payload.extend(array.tobytes())
+
+    for col in FLOAT_COLUMNS:
+        values = np.array([_number(s.get(col)) for s in stocks], dtype='<f4')
+        add_array(col, values)
+
+    for col in UINT_COLUMNS:
+        raw = np.array([_number(s.get(col)) for s in stocks], dtype=np.float64)
+        bad = np.flatnonzero(~np.isnan(raw) & ((raw < 0) | (raw >= UINT_NULL)))
+        if len(bad):
+            i = bad[0]
+            raise ValueError(f"{col} 超出 uint32 范围（0 ~ {UINT_NULL - 1}）: "
+                             f"第{i}行 {stocks[i].get('code')} = {stocks[i].get(col)}（共 {len(bad)} 行）")
+        values = np.where(np.isnan(raw), UINT_NULL, raw).astype('<u4')
+        add_array(col, values, null=int(UINT_NULL))
+
+    for col in STRING_COLUMNS:
+        offsets, blob = _encode_strings([_text(s.get(col)) for s in stocks])
+        add_array(col, offsets, kind='strings')
+        _pad(payload)
+        columns[col]['blob_offset'] = len(payload)
+        columns[col]['blob_length'] = len(blob)
+        payload.extend(blob)
+
+    for col in DICT_COLUMNS:
+        indexes, dictionary = _encode_dictionary([_text(s.get(col)) for s in stocks])
+        add_array(col, indexes, kind='dictionary', dictionary=dictionary)
+
+    header = {
+        'version': FORMAT_VERSION,
+        'rows': count,
+        'byte_order': 'little',
+        'meta': {k: data[k] for k in META_FIELDS if k in data},
+        'columns': columns,
+    }
+    header_bytes = bytearray(json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    # 数据区的 offset 相对于数据区起点，数据区起点本身也按 8 字节对齐
+    prefix_len = len(MAGIC) + 4 + len(header_bytes)
+    if prefix_len % ALIGNMENT:
+        header_bytes.extend(b" " * (ALIGNMENT - prefix_len % ALIGNMENT))
+
+    return MAGIC + struct.pack('<I', len(header_bytes)) + bytes(header_bytes) + bytes(payload)
+
+
+def decode_snapshot(buffer):
+    """
+    解码二进制快照，返回与 latest_price.json 相同结构的字典
+    （浮点列保留 DECIMALS 位小数；缺失值为 None）
+    """
+    if buffer[:4] != MAGIC:
+        raise ValueError("不是有效的价格快照文件（魔数不匹配）")
+
+    header_len = struct.unpack_from('<I', buffer, 4)[0]
+    header = json.loads(bytes(buffer[8:8 + header_len]).decode('utf-8'))
+    if header.get('version') != FORMAT_VERSION:
+        raise ValueError(f"不支持的快照版本: {header.get('version')}")
+
+    base = 8 + header_len
+    rows = header['rows']
+    columns = {}
+
+    for name, spec in header['columns'].items():
+        array = np.frombuffer(buffer, dtype=np.dtype(spec['dtype']),
+                              count=spec['length'], offset=base + spec['offset'])
+        kind = spec.get('kind')
+        if kind == 'strings':
+            start = base + spec['blob_offset']
+            blob = bytes(buffer[start:start + spec['blob_length']])
+            columns[name] = _decode_strings(array, blob)
+        elif kind == 'dictionary':
+            dictionary = spec['dictionary']
+            columns[name] = [dictionary[i] for i in array]
+        else:
+            columns[name] = array
+
+    stocks = []
+    for i in range(rows):
+        stock = {}
+        for name in FIELD_ORDER:
+            value = columns[name][i]
+            if name in FLOAT_COLUMNS:
+                value = None if np.isnan(value) else round(float(value), DECIMALS)
+            elif name in UINT_COLUMNS:
+                value = None if value == UINT_NULL else int(value)
+            stock[name] = value
+        stocks.append(stock)
+
+    data = dict(header.get('meta', {}))
+    data['stocks'] = stocks
+    return data
+
+
+def write_binary_snapshot(data, output_dir, filename='latest_price.bin'):
+    """把 latest_price 数据写为二进制快照，返回文件路径"""
+    filepath = os.path.join(output_dir, filename)
+    blob = encode_snapshot(data)
+    with open(filepath, 'wb') as f:
+        f.write(blob)
+    print(f"  💾 保存二进制快照: {filepath} ({len(blob)} bytes)")
+    return filepath
+
+
+def read_binary_snapshot(filepath):
+    """读取二进制快照文件"""
+    with open(filepath, 'rb') as f:
+        return decode_snapshot(f.read())
+
+
+def verify_round_trip(json_path, bin_path, tolerance=1e-3):
+    """
+    对比 latest_price.json 与二进制快照
+    返回不一致的记录列表 [(行号, 字段, json值, bin值), ...]
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        original = json.load(f)
+    decoded = read_binary_snapshot(bin_path)
+
+    mismatches = []
+    if len(original.get('stocks', [])) != len(decoded['stocks']):
+        mismatches.append((-1, 'rows', len(original.get('stocks', [])), len(decoded['stocks'])))
+        return mismatches
+
+    for i, (expected, actual) in enumerate(zip(original['stocks'], decoded['stocks'])):
+        for field in FLOAT_COLUMNS:
+            want = _number(expected.get(field))
+            got = actual[field]
+            if np.isnan(want) or got is None:
+                if not (np.isnan(want) and got is None):
+                    mismatches.append((i, field, expected.get(field), got))
+            elif abs(want - got) > tolerance * max(1.0, abs(want)):
+                mismatches.append((i, field, want, got))
+        for field in UINT_COLUMNS:
+            want = _number(expected.get(field))
+            want = None if np.isnan(want) else int(want)
+            if want != actual[field]:
+                mismatches.append((i, field, expected.get(field), actual[field]))
+        for field in STRING_COLUMNS + DICT_COLUMNS:
+            if _text(expected.get(field)) != actual[field]:
+                mismatches.append((i, field, expected.get(field), actual[field]))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='latest_price.json → 二进制 TypedArray 快照')
+    parser.add_argument('input', help='latest_price.json 路径')
+    parser.add_argument('-o', '--output', help='输出目录（默认与输入相同）')
+    parser.add_argument('--verify', action='store_true', help='生成后与JSON逐行对比')
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    output_dir = args.output or os.path.dirname(os.path.abspath(args.input))
+    bin_path = write_binary_snapshot(data, output_dir)
+
+    json_size = os.path.getsize(args.input)
+    bin_size = os.path.getsize(bin_path)
+    print(f"📊 JSON: {json_size} bytes → BIN: {bin_size} bytes ({bin_size / json_size * 100:.1f}%)")
+
+    if args.verify:
+        mismatches = verify_round_trip(args.input, bin_path)
+        if mismatches:
+            print(f"❌ 发现 {len(mismatches)} 处不一致:")
+            for row, field, want, got in mismatches[:10]:
+                print(f"   行{row} {field}: {want!r} != {got!r}")
+            sys.exit(1)
+        print(f"✅ 往返校验通过: {len(data.get('stocks', []))} 支股票")
+
+
+if __name__ == "__main__":
+    main()
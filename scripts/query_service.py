@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+🛰️  本地行情查詢服務 - 常駐內存，毫秒級響應
+======================================================================
+啟動時加載一次（之後流水線發布新數據會自動重新加載）:
+  • web/latest_price.json       - 最新行情快照
+  • sector_mapping.json         - 行業代碼 → 行業名稱
+  • web/history/picks_*.json    - 最近 N 天的AI選股
+
+只監聽 127.0.0.1（默認端口 8765），所有響應都是 JSON:
+  GET /health                                  服務狀態、數據日期
+  GET /stock/<code>                            個股行情 + 行業 + 最近入選記錄
+  GET /search?q=<名稱或代碼片段>&limit=20       名稱/代碼模糊查找
+  GET /sectors                                 所有行業匯總
+  GET /sector/<行業代碼或名稱>                  單個行業匯總 + 漲幅前列
+  GET /screener?sector=&min_price=&max_price=&min_change=&max_change=
+               &min_volume=&type=&expr=&sort=change_percent&order=desc&limit=50
+               （type: Stock / Warrant / ETF / REIT ... 或 call_warrant、put_warrant 等主表類型）
+               （expr: screener.py 條件表達式，如 chg > 5 and turnover > 1e6）
+  GET /fees?buy=0.5&sell=0.55&shares=1000      交易費用（與 investment_calculator 相同算法）
+           &lots=10                            （或按手數，1手=100股）
+  GET /stats                                   各端點響應時間 p50/p99
+
+用法:
+  python query_service.py                      # 默認端口 8765
+  python query_service.py --port 9000 --history-days 20
+  curl http://127.0.0.1:8765/stock/5681
+======================================================================
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import threading
+import argparse
+from collections import deque, defaultdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+
+import numpy as np
+import pandas as pd
+
+from instrument_master import attach as attach_instruments
+from search_index import SearchIndex, clean_code
+from screener import Snapshot
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+WEB_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), "web")
+SNAPSHOT_FILE = os.path.join(WEB_DIR, "latest_price.json")
+HISTORY_DIR = os.path.join(WEB_DIR, "history")
+SECTOR_MAPPING_FILE = os.path.join(SCRIPT_DIR, "sector_mapping.json")
+
+DEFAULT_PORT = 8765
+LOT_SIZE = 100  # Bursa 每手股數
+
+SORT_FIELDS = ('last_price', 'change_percent', 'volume', 'change', 'turnover')
+
+
+class MarketState:
+    """一次加載的不可變行情狀態；重新加載時整體替換"""
+
+    def __init__(self, snapshot_file, sector_mapping_file, history_dir, history_days):
+        started = time.perf_counter()
+        with open(snapshot_file, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+
+        self.meta = {k: v for k, v in snapshot.items() if k != 'stocks'}
+        self.stocks = snapshot.get('stocks', [])
+        self.source_mtime = os.path.getmtime(snapshot_file)
+
+        self.sector_names = {}
+        if os.path.exists(sector_mapping_file):
+            with open(sector_mapping_file, 'r', encoding='utf-8') as f:
+                mapping = json.load(f)
+            self.sector_names = mapping.get('mapping', mapping)
+
+        # 證券類型和正股：按代碼合併證券主表（與選股器相同）
+        instruments = attach_instruments(pd.DataFrame({
+            'code': [str(s.get('code', '')) for s in self.stocks],
+            'name': [s.get('name') for s in self.stocks],
+            'sector': [s.get('sector') for s in self.stocks],
+        }))
+        for stock, label, kind, underlying in zip(self.stocks, instruments['instrument_type'],
+                                                  instruments['instrument_class'], instruments['underlying']):
+            stock['sector_name'] = self.sector_names.get(str(stock.get('sector')), stock.get('sector'))
+            stock['instrument_type'] = label
+            stock['instrument_class'] = kind
+            stock['underlying'] = underlying
+        self.by_code = {clean_code(s['code']).upper(): s for s in self.stocks}
+
+        # 列式數組，篩選器用向量化掩碼
+        self.columns = {
+            'last_price': np.array([s.get('last_price') or 0 for s in self.stocks], dtype=np.float64),
+            'change': np.array([s.get('change') or 0 for s in self.stocks], dtype=np.float64),
+            'change_percent': np.array([s.get('change_percent') or 0 for s in self.stocks], dtype=np.float64),
+            'volume': np.array([s.get('volume') or 0 for s in self.stocks], dtype=np.float64),
+        }
+        self.columns['turnover'] = self.columns['last_price'] * self.columns['volume']
+        self.sector_codes = np.array([str(s.get('sector')) for s in self.stocks], dtype=object)
+        self.types = np.array([s['instrument_type'].lower() for s in self.stocks], dtype=object)
+        self.classes = np.array([s['instrument_class'] for s in self.stocks], dtype=object)
+        self.search_index = SearchIndex.from_stocks(self.stocks)
+        # 條件表達式篩選 + 每個排序字段預先計算的排列（請求時不再排序）
+        self.snapshot = Snapshot.from_frame(pd.DataFrame(self.stocks).assign(turnover=self.columns['turnover']))
+        for field in SORT_FIELDS:
+            for ascending in (False, True):
+                self.snapshot.order(field, ascending)
+
+        self.sectors = self._summarize_sectors()
+        self.history_dates, self.pick_history = self._load_history(history_dir, history_days)
+        self.load_seconds = time.perf_counter() - started
+
+    def _summarize_sectors(self):
+        """預先計算每個行業的匯總，請求時直接返回"""
+        summaries = {}
+        change = self.columns['change_percent']
+        for sector in np.unique(self.sector_codes):
+            idx = np.flatnonzero(self.sector_codes == sector)
+            sector_change = change[idx]
+            top = idx[np.argsort(-sector_change, kind='stable')[:5]]
+            summaries[sector] = {
+                'sector': sector,
+                'sector_name': self.sector_names.get(sector, sector),
+                'count': int(len(idx)),
+                'advancers': int((sector_change > 0).sum()),
+                'decliners': int((sector_change < 0).sum()),
+                'unchanged': int((sector_change == 0).sum()),
+                'avg_change_percent': round(float(sector_change.mean()), 3),
+                'total_volume': int(self.columns['volume'][idx].sum()),
+                'turnover': round(float(self.columns['turnover'][idx].sum()), 2),
+                'top_gainers': [self.stocks[i]['code'] for i in top],
+            }
+        return summaries
+
+    @staticmethod
+    def _load_history(history_dir, days):
+        """最近 N 天的選股，按代碼索引: code -> [{date, rank, score}, ...]"""
+        files = sorted(f for f in glob.glob(os.path.join(history_dir, "picks_*.json"))
+                       if os.path.basename(f)[6:14].isdigit())[-days:]
+        history = defaultdict(list)
+        dates = []
+        for path in files:
+            date_key = os.path.basename(path)[6:14]
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            dates.append(date_key)
+            picks = data.get('picks', []) if isinstance(data, dict) else data
+            for pick in picks:
+                history[clean_code(str(pick.get('code', ''))).upper()].append({
+                    'date': date_key,
+                    'rank': pick.get('rank'),
+                    'score': pick.get('score'),
+                    'recommendation': pick.get('recommendation'),
+                })
+        return dates, dict(history)
+
+    # ------------------------------------------------------------------
+    # 查詢
+    # ------------------------------------------------------------------
+
+    def lookup(self, code):
+        key = clean_code(code).upper()
+        stock = self.by_code.get(key)
+        if stock is None:
+            return None
+        return dict(stock, recent_picks=self.pick_history.get(key, []))
+
+    def search(self, query, limit=20):
+        """代碼 / 名稱前綴、子串、模糊查找（search_index.py）"""
+        exact = self.by_code.get(clean_code(query).upper())
+        results = [exact] if exact else []
+        for match in self.search_index.search(query, limit):
+            stock = self.by_code.get(match['code'].upper())
+            if stock is not None and stock is not exact and len(results) < limit:
+                results.append(stock)
+        return results
+
+    def sector(self, name):
+        if name in self.sectors:
+            return self.sectors[name]
+        lowered = name.lower()
+        for summary in self.sectors.values():
+            if str(summary['sector_name']).lower() == lowered:
+                return summary
+        return None
+
+    def screen(self, params):
+        """按查詢參數組合掩碼篩選"""
+        mask = np.ones(len(self.stocks), dtype=bool)
+        for field, column in (('price', 'last_price'), ('change', 'change_percent'), ('volume', 'volume')):
+            low = params.get(f'min_{field}')
+            high = params.get(f'max_{field}')
+            if low is not None:
+                mask &= self.columns[column] >= float(low)
+            if high is not None:
+                mask &= self.columns[column] <= float(high)
+
+        if params.get('sector'):
+            wanted = set(params['sector'].split(','))
+            codes = {code for code, summary in self.sectors.items()
+                     if code in wanted or summary['sector_name'] in wanted}
+            mask &= np.isin(self.sector_codes, list(codes))
+        if params.get('type'):
+            # 類型名稱（Warrant 包括結構性權證）或主表類型（call_warrant ...）
+            wanted = params['type'].lower()
+            mask &= (self.types == wanted) | (self.classes == wanted)
+        if params.get('expr'):
+            # ScreenError 是 ValueError，返回 400
+            mask &= self.snapshot.mask(params['expr'])
+
+        sort = params.get('sort', 'change_percent')
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"sort 只能是: {', '.join(SORT_FIELDS)}")
+        limit = min(int(params.get('limit', 50)), 500)
+
+        idx = self.snapshot.select(mask, sort, params.get('order') == 'asc')
+        return {
+            'matched': int(len(idx)),
+            'sort': sort,
+            'results': [self.stocks[i] for i in idx[:limit]],
+        }
+
+
+class QueryService:
+    """持有當前狀態，後台線程檢測到新數據時重新加載"""
+
+    def __init__(self, snapshot_file=SNAPSHOT_FILE, sector_mapping_file=SECTOR_MAPPING_FILE,
+                 history_dir=HISTORY_DIR, history_days=10, reload_interval=2.0):
+        self.snapshot_file = snapshot_file
+        self.sector_mapping_file = sector_mapping_file
+        self.history_dir = history_dir
+        self.history_days = history_days
+        self.reload_interval = reload_interval
+        self.reloads = 0
+        self.latencies = defaultdict(lambda: deque(maxlen=2000))
+        self.state = self._load()
+
+        # 費用算法與 investment_calculator 共用
+        from investment_calculator import calculate_trade_fees, FEE_CONFIG
+        self.calculate_trade_fees = calculate_trade_fees
+        self.fee_config = FEE_CONFIG
+
+    def _load(self):
+        state = MarketState(self.snapshot_file, self.sector_mapping_file,
+                            self.history_dir, self.history_days)
+        print(f"📦 已加載 {len(state.stocks)} 支股票 ({state.meta.get('data_date')})，"
+              f"{len(state.sectors)} 個行業，{len(state.history_dates)} 天選股，"
+              f"用時 {state.load_seconds * 1000:.0f}ms")
+        return state
+
+    def _history_signature(self):
+        return max((os.path.getmtime(f) for f in glob.glob(os.path.join(self.history_dir, "picks_*.json"))),
+                   default=0)
+
+    def watch(self):
+        """後台線程：快照文件更新後重新加載，新狀態構建完成才替換（查詢不受影響）"""
+        last_history = self._history_signature()
+        while True:
+            time.sleep(self.reload_interval)
+            try:
+                mtime = os.path.getmtime(self.snapshot_file)
+                history = self._history_signature()
+                if mtime != self.state.source_mtime or history != last_history:
+                    # 等待寫入完成（mtime 穩定）
+                    time.sleep(0.5)
+                    if os.path.getmtime(self.snapshot_file) != mtime:
+                        continue
+                    self.state = self._load()
+                    last_history = history
+                    self.reloads += 1
+            except (OSError, ValueError) as e:
+                print(f"⚠️  重新加載失敗，繼續使用舊數據: {e}")
+
+    def record(self, endpoint, seconds):
+        self.latencies[endpoint].append(seconds)
+
+    def stats(self):
+        result = {}
+        for endpoint, samples in self.latencies.items():
+            values = np.array(samples) * 1000
+            result[endpoint] = {
+                'count': int(len(values)),
+                'p50_ms': round(float(np.percentile(values, 50)), 3),
+                'p99_ms': round(float(np.percentile(values, 99)), 3),
+                'max_ms': round(float(values.max()), 3),
+            }
+        return result
+
+    # ------------------------------------------------------------------
+    # 路由
+    # ------------------------------------------------------------------
+
+    def handle(self, path, params):
+        """返回 (endpoint, status, payload)"""
+        state = self.state
+        parts = [unquote(p) for p in path.strip('/').split('/') if p]
+        endpoint = parts[0] if parts else 'health'
+
+        if endpoint == 'health':
+            return endpoint, 200, {
+                'status': 'ok',
+                'data_date': state.meta.get('data_date'),
+                'last_updated': state.meta.get('last_updated'),
+                'stocks': len(state.stocks),
+                'history_dates': state.history_dates,
+                'reloads': self.reloads,
+            }
+        if endpoint == 'stock' and len(parts) == 2:
+            stock = state.lookup(parts[1])
+            if stock is None:
+                return endpoint, 404, {'error': f"未找到代碼 {parts[1]}"}
+            return endpoint, 200, stock
+        if endpoint == 'search':
+            query = params.get('q', '').strip()
+            if not query:
+                return endpoint, 400, {'error': '缺少參數 q'}
+            return endpoint, 200, {'results': state.search(query, min(int(params.get('limit', 20)), 200))}
+        if endpoint == 'sectors':
+            return endpoint, 200, {'sectors': sorted(state.sectors.values(), key=lambda s: -s['count'])}
+        if endpoint == 'sector' and len(parts) == 2:
+            summary = state.sector(parts[1])
+            if summary is None:
+                return endpoint, 404, {'error': f"未找到行業 {parts[1]}"}
+            return endpoint, 200, dict(summary, top_gainers=[state.by_code[clean_code(c).upper()] for c in summary['top_gainers']])
+        if endpoint == 'screener':
+            return endpoint, 200, state.screen(params)
+        if endpoint == 'fees':
+            return endpoint, 200, self.fees(params, state)
+        if endpoint == 'stats':
+            return endpoint, 200, self.stats()
+        return 'unknown', 404, {'error': f"未知路徑 {path}"}
+
+    def fees(self, params, state):
+        if 'shares' in params:
+            shares = int(params['shares'])
+        elif 'lots' in params:
+            shares = int(params['lots']) * LOT_SIZE
+        else:
+            raise ValueError("需要參數 shares 或 lots")
+        if shares <= 0:
+            raise ValueError("股數必須大於0")
+
+        stock = state.lookup(params['code']) if 'code' in params else None
+        if 'buy' in params:
+            buy = float(params['buy'])
+        elif stock and stock.get('last_price') is not None:
+            buy = float(stock['last_price'])
+        else:
+            raise ValueError("需要參數 buy 或有最新價的 code")
+        sell = float(params.get('sell', buy))
+        return self.calculate_trade_fees(buy, sell, shares, self.fee_config)
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            started = time.perf_counter()
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                endpoint, status, payload = service.handle(url.path, params)
+            except (ValueError, KeyError) as e:
+                endpoint, status, payload = 'error', 400, {'error': str(e)}
+
+            body = json.dumps(payload, ensure_ascii=False, default=float).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            service.record(endpoint, time.perf_counter() - started)
+
+        def log_message(self, format, *args):
+            pass  # 不逐條打印請求，響應時間見 /stats
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地行情查詢服務')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='監聽端口（僅 127.0.0.1）')
+    parser.add_argument('--snapshot', default=SNAPSHOT_FILE, help='行情快照 latest_price.json')
+    parser.add_argument('--history-days', type=int, default=10, help='加載最近多少天的選股')
+    parser.add_argument('--reload-interval', type=float, default=2.0, help='檢查新數據的間隔秒數')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.snapshot):
+        print(f"❌ 快照文件不存在: {args.snapshot}")
+        sys.exit(1)
+
+    service = QueryService(args.snapshot, history_days=args.history_days,
+                           reload_interval=args.reload_interval)
+    threading.Thread(target=service.watch, daemon=True).start()
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(service))
+    print(f"🛰️  查詢服務已啟動: http://127.0.0.1:{args.port}/health")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 服務已停止")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+🧾 行情 / 選股記錄類型 - __slots__ 記錄，批量轉換 DataFrame / JSON
+======================================================================
+latest_price.json 的每支股票（PriceRecord）和 picks_*.json 的每個推薦（PickRecord）
+用帶 __slots__ 的記錄類表示，不再為每行建一個十幾個鍵的 dict:
+  • 每條記錄只存字段值（沒有 __dict__），內存約為同樣內容 dict 的 1/4
+  • from_frame 按列整體轉換（pandas 向量化清洗後 zip 構造），不再 iterrows
+  • to_frame / from_dicts / to_dicts 批量轉換
+  • 寫 JSON 時 json.dump(..., default=json_default)，字段順序即 FIELDS 的順序
+  • 記錄支持 record.get(field, default)，按 dict 讀取股票列表的代碼
+    （搜索索引、市場概要、二進制快照）不用修改
+
+字段定義（SCHEMA）: (字段, 類型, 默認值)
+  類型 str / float / int 按列清洗，空值用默認值；None 表示原樣保留（空值為 None）
+  PriceRecord 的價格和成交量默認為 None: 停牌或沒有成交的股票寫成 null，
+  不會被當成 0 價 / 0 成交量計入市場概要
+
+用法（代碼中）:
+    stocks = PriceRecord.from_frame(df, last_updated='15:30:22')
+    picks = PickRecord.from_frame(df_picks)
+    json.dump({'stocks': stocks}, f, default=json_default)
+    df = PriceRecord.to_frame(stocks)
+======================================================================
+"""
+
+from operator import attrgetter
+
+import pandas as pd
+
+
+class Record:
+    """記錄基類；子類定義 SCHEMA，__slots__ 和 FIELDS 由 SCHEMA 生成"""
+
+    __slots__ = ()
+    SCHEMA = ()
+    FIELDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELDS = tuple(field for field, _, _ in cls.SCHEMA)
+        cls._DEFAULTS = {field: default for field, _, default in cls.SCHEMA}
+        cls._values = attrgetter(*cls.FIELDS)
+
+    def __init__(self, *args, **kwargs):
+        values = dict(self._DEFAULTS)
+        values.update(zip(self.FIELDS, args))
+        values.update(kwargs)
+        for field in self.FIELDS:
+            setattr(self, field, values[field])
+
+    def get(self, field, default=None):
+        return getattr(self, field, default)
+
+    def __getstate__(self):
+        return self._values(self)
+
+    def __setstate__(self, state):
+        for field, value in zip(self.FIELDS, state):
+            setattr(self, field, value)
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self._values(self) == self._values(other)
+
+    def __repr__(self):
+        fields = ", ".join(f"{f}={getattr(self, f)!r}" for f in self.FIELDS[:3])
+        return f"{type(self).__name__}({fields}, ...)"
+
+    def to_dict(self):
+        return dict(zip(self.FIELDS, self._values(self)))
+
+    @classmethod
+    def _make(cls, values):
+        """按 FIELDS 順序的值構造（不做默認值處理）"""
+        record = cls.__new__(cls)
+        for field, value in zip(cls.FIELDS, values):
+            setattr(record, field, value)
+        return record
+
+    @classmethod
+    def from_frame(cls, df, **defaults):
+        """
+        DataFrame → 記錄列表，按列清洗（列名即字段名；缺少的列用默認值）
+        defaults 覆蓋 SCHEMA 中的默認值
+        """
+        n = len(df)
+        columns = []
+        for field, kind, default in cls.SCHEMA:
+            default = defaults.get(field, default)
+            if field not in df.columns:
+                columns.append([default] * n)
+            elif kind is str:
+                # 與 str(value) 相同（空值為 'nan'，和逐行轉換時一致）
+                columns.append([str(v) for v in df[field].tolist()])
+            elif kind in (float, int):
+                values = pd.to_numeric(df[field], errors="coerce")
+                present = values.notna().to_numpy()
+                converted = values.to_numpy(dtype=float, na_value=0).astype(kind).tolist()
+                columns.append([v if ok else default for v, ok in zip(converted, present)])
+            else:
+                columns.append([None if pd.isna(v) else v for v in df[field].tolist()])
+        return [cls._make(values) for values in zip(*columns)]
+
+    @classmethod
+    def from_dicts(cls, rows):
+        """dict 列表（例如讀入的 JSON）→ 記錄列表；多餘的鍵忽略"""
+        fields = cls.FIELDS
+        return [cls(**{k: row[k] for k in fields if k in row}) for row in rows]
+
+    @classmethod
+    def to_frame(cls, records):
+        return pd.DataFrame([cls._values(r) for r in records], columns=list(cls.FIELDS))
+
+    @staticmethod
+    def to_dicts(records):
+        return [r.to_dict() for r in records]
+
+
+def json_default(obj):
+    """json.dump 的 default: 記錄按 FIELDS 順序寫成對象"""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError(f"無法序列化類型: {type(obj)}")
+
+
+class PriceRecord(Record):
+    """latest_price.json 中的一支股票"""
+
+    SCHEMA = (
+        ("code", str, ""),
+        ("name", str, ""),
+        ("last_price", float, None),
+        ("change", float, None),
+        ("change_percent", float, None),
+        ("volume", int, None),
+        ("sector", str, "Unknown"),
+        ("open", float, None),
+        ("high", float, None),
+        ("low", float, None),
+        ("last_updated", str, ""),
+    )
+    __slots__ = tuple(field for field, _, _ in SCHEMA)
+
+
+class PickRecord(Record):
+    """picks_*.json 中的一個推薦"""
+
+    SCHEMA = (
+        ("rank", int, 0),
+        ("code", str, ""),
+        ("name", str, ""),
+        ("instrument_type", str, "Stock"),
+        ("instrument_class", str, "stock"),
+        ("underlying", None, None),
+        ("sector", str, ""),
+        ("current_price", float, 0),
+        ("daily_change", float, 0),
+        ("score", float, 0),
+        ("potential_score", int, 0),
+        ("potential_reasons", str, ""),
+        ("recommendation", str, ""),
+        ("risk_level", str, ""),
+        ("rsi", float, 0),
+        ("volume", int, 0),
+        ("status", str, ""),
+    )
+    __slots__ = tuple(field for field, _, _ in SCHEMA)
@@ -5,41 +5,20 @@
 ======================================================================
 功能: 自动将下载的EOD CSV文件重新排列为标准格式，并转换行业代码
 使用: python reorder_eod.py [输入文件] [输出文件]
+读取、列重排和行业代码转换都在 eod_normalizer（reorder 方言）
 ======================================================================
 """
 
 import sys
 import os
-import pandas as pd
 import json
 from datetime import datetime
 import argparse
 
-# 目标列顺序
-TARGET_COLUMNS = [
-    'Code',
-    'Stock', 
-    'Sector',
-    'Sector_Code',  # 新增：保留原始行业代码
-    'Sector_Name',  # 新增：行业名称
-    'Open',
-    'Last',
-    'Prv Close',
-    'Chg%',
-    'High',
-    'Low',
-    'Y-High',
-    'Y-Low',
-    'Vol',
-    'DY*',
-    'B%',
-    'Vol MA (20)',
-    'RSI (14)',
-    'MACD (26, 12)',
-    'EPS*',
-    'P/E',
-    'Status'
-]
+from eod_normalizer import get_dialect, normalize, REORDER_COLUMNS, sector_with_groups
+
+# 目标列顺序（Sector_Code 保留原始行业代码，Sector_Name 为行业名称）
+TARGET_COLUMNS = REORDER_COLUMNS
 
 # 行业代码转换函数
 def load_sector_mapping():
@@ -65,53 +44,8 @@ def load_sector_mapping():
         }
         return default_mapping
 
-def map_sector_code(code, sector_mapping):
-    """转换行业代码为行业名称"""
-    if pd.isna(code) or code in ["", "-", "N/A", "NULL"]:
-        return "Unknown", ""
-    
-    code_str = str(code).strip()
-    
-    # 尝试直接匹配
-    if code_str in sector_mapping:
-        return sector_mapping[code_str], code_str
-    
-    # 尝试去除前导零匹配
-    if code_str.startswith('0'):
-        code_no_zero = code_str.lstrip('0')
-        if code_no_zero in sector_mapping:
-            return sector_mapping[code_no_zero], code_str
-    
-    # 尝试3位代码匹配
-    if len(code_str) > 3:
-        code_3digit = code_str[:3]
-        if code_3digit in sector_mapping:
-            return sector_mapping[code_3digit], code_str
-    
-    # 尝试2位代码匹配
-    if len(code_str) >= 2:
-        code_2digit = code_str[:2]
-        # 检查是否是数字
-        if code_2digit.isdigit():
-            code_int = int(code_2digit)
-            if 1 <= code_int <= 10:
-                default_map = {
-                    "1": "Industrial & Consumer Products",
-                    "2": "Technology",
-                    "3": "Property",
-                    "4": "Telecommunications & Media", 
-                    "5": "Transportation & Logistics",
-                    "6": "Utilities",
-                    "7": "Medical",
-                    "8": "Financial",
-                    "9": "Energy",
-                    "10": "Consumer"
-                }
-                if str(code_int) in default_map:
-                    return default_map[str(code_int)], code_str
-    
-    # 未找到匹配
-    return f"Unknown ({code_str})", code_str
+# 转换规则在 eod_normalizer（reorder 方言）
+map_sector_code = sector_with_groups
 
 def process_eod_file(input_file, output_file=None, convert_sector=True):
     """处理EOD文件"""
@@ -121,64 +55,50 @@ def process_eod_file(input_file, output_file=None, convert_sector=True):
     print("="*60)
     
     # 加载行业映射
+    sector_mapping = None
     if convert_sector:
         sector_mapping = load_sector_mapping()
         print(f"📊 加载行业映射: {len(sector_mapping)} 个代码")
     
     try:
-        # 读取CSV文件
-        df = pd.read_csv(input_file)
-        print(f"✅ 成功读取: {len(df)} 行 × {len(df.columns)} 列")
+        # 读取并规范化CSV文件
+        dialect = get_dialect('reorder', sector_mapping=sector_mapping, convert_sector=convert_sector)
+        table = normalize(input_file, dialect)
+        print(f"✅ 成功读取: {len(table)} 行 × {len(table.raw_header)} 列")
     except Exception as e:
         print(f"❌ 读取失败: {e}")
         return False
     
     # 显示原始列
     print(f"\n📋 原始列名:")
-    for i, col in enumerate(df.columns, 1):
+    for i, col in enumerate(table.raw_header, 1):
         print(f"  {i:2d}. {col}")
     
-    # 清理列名
-    df.columns = [col.strip() for col in df.columns]
+    df = table.frame
     
     # 行业代码转换
-    if convert_sector and 'Sector' in df.columns:
+    if convert_sector and 'Sector' in table.header:
         print(f"\n🏢 行业代码转换:")
         
-        # 获取原始行业代码分布
-        sector_counts = df['Sector'].value_counts()
+        # 原始行业代码分布
+        sector_counts = df['Sector_Code'].value_counts()
+        sector_names = dict(zip(df['Sector_Code'], df['Sector_Name']))
         print(f"  发现 {len(sector_counts)} 个不同行业代码")
         
-        # 转换行业代码
-        sector_info = []
-        for code in df['Sector'].unique():
-            if pd.notna(code):
-                name, _ = map_sector_code(code, sector_mapping)
-                count = sector_counts.get(code, 0)
-                sector_info.append((code, name, count))
-        
         # 显示前10个最常见的行业
-        sector_info.sort(key=lambda x: x[2], reverse=True)
+        sector_info = [(code, sector_names[code], count) for code, count in sector_counts.items()]
         print(f"  前10个行业:")
         for code, name, count in sector_info[:10]:
             print(f"    {code}: {name} ({count} 支股票)")
         
         if len(sector_info) > 10:
             print(f"    ... 还有 {len(sector_info)-10} 个行业")
-        
-        # 应用转换
-        df['Sector_Code'] = df['Sector']
-        df['Sector_Name'] = df['Sector'].apply(lambda x: map_sector_code(x, sector_mapping)[0])
-        
-        # 更新Sector列为行业名称
-        df['Sector'] = df['Sector_Name']
     
-    # 重新排列列顺序
+    # 列顺序：目标列 + 额外列（缺失的目标列已填空）
     print(f"\n📊 重新排列列顺序...")
     
-    # 找到实际存在的列
-    existing_columns = [col for col in TARGET_COLUMNS if col in df.columns]
-    missing_columns = [col for col in TARGET_COLUMNS if col not in df.columns]
+    existing_columns = [col for col in TARGET_COLUMNS if col not in table.missing]
+    missing_columns = table.missing
     
     print(f"✅ 存在的列 ({len(existing_columns)}):")
     for i, col in enumerate(existing_columns, 1):
@@ -187,24 +107,13 @@ def process_eod_file(input_file, output_file=None, convert_sector=True):
     if missing_columns:
         print(f"⚠️  缺失的列 ({len(missing_columns)}): {missing_columns}")
         
-        # 为缺失的列创建空列
-        for col in missing_columns:
-            if col == 'Chg%' and 'Last' in df.columns and 'Prv Close' in df.columns:
-                # 计算涨跌幅
-                try:
-                    df['Chg%'] = ((df['Last'] - df['Prv Close']) / df['Prv Close'] * 100).round(2)
-                    print(f"  📈 计算Chg%列")
-                except:
-                    df['Chg%'] = 0
-            elif col not in df.columns:
-                df[col] = ''
-    
-    # 保留原始数据中额外的列（添加到最后）
-    extra_columns = [col for col in df.columns if col not in TARGET_COLUMNS]
-    
-    # 最终列顺序：目标列 + 额外列
-    final_columns = [col for col in TARGET_COLUMNS if col in df.columns] + extra_columns
-    df = df[final_columns]
+        if 'Chg%' in missing_columns:
+            # 计算涨跌幅（Last/Prv Close 缺失时是空列，计算失败记为0）
+            try:
+                df['Chg%'] = ((df['Last'] - df['Prv Close']) / df['Prv Close'] * 100).round(2)
+                print(f"  📈 计算Chg%列")
+            except:
+                df['Chg%'] = 0
     
     # 生成输出文件名
     if output_file is None:
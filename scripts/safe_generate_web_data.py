@@ -10,6 +10,8 @@ import numpy as np
 from datetime import datetime
 import re
 
+from instrument_master import attach as attach_instruments
+
 def safe_column_name(col_name):
     """将列名转换为安全的标识符"""
     if not isinstance(col_name, str):
@@ -229,6 +231,8 @@ def create_picks_json_from_ai_data(normalized_csv_path, output_dir, top_n=15):
         
         # 4. 排序并选择前N个
         df_sorted = df.sort_values('score', ascending=False).head(top_n)
+        # 证券类型：按代码合并证券主表（instrument_master.py）
+        df_sorted = attach_instruments(df_sorted, 'code', 'stock', 'sector')
         
         # 5. 生成推荐
         for idx, row in enumerate(df_sorted.itertuples(), 1):
@@ -258,9 +262,7 @@ def create_picks_json_from_ai_data(normalized_csv_path, output_dir, top_n=15):
                 risk_level = "中高"
                 color = "orange"
             
-            # 判断是否为权证
-            is_warrant = '-' in code or any(x in code for x in ['WA', 'WB', 'WC', 'WR'])
-            instrument_type = "Warrant" if is_warrant else "Stock"
+            instrument_type = row.instrument_type
             
             pick = {
                 'rank': idx,
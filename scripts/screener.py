@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+🧪 選股篩選器 - 聲明式條件表達式，編譯為 NumPy 布爾掩碼
+======================================================================
+條件用表達式書寫，字段可以用 EOD 原始列名（帶空格/符號的用引號或反引號）、
+數據庫列名或選股器列名:
+
+  Vol > 2*"Vol MA (20)" and "RSI (14)" < 35 and Sector == "Technology"
+  `Chg%` >= 3 and 0.1 <= Last <= 1
+  sector in ("Technology", "Energy") and not isna(pe) and pe < 15
+
+  • 運算: and / or / not、& | ~、比較（可連寫 0.1 <= Last <= 1）、in / not in、
+          + - * / % **、函數 abs() isna() notna() log()
+  • 引號中的文字是已知字段名時當作字段，否則是字符串（Sector == "Technology"）
+  • 空值參與的比較為 False
+  • 表達式只編譯一次（按表達式和可用字段緩存），之後每次篩選只計算掩碼
+
+快照（Snapshot）在建立時預先計算常用排序鍵（成交量、漲跌幅、評分、成交額、價格）
+的排列索引，重複篩選不再排序: 排好序的結果 = 排列[掩碼[排列]]
+歷史篩選按緊湊表示載入（EODDatabase.load_history），float32 列與常數在 float32 下比較
+
+用法（代碼中）:
+    snap = Snapshot.from_db(db)                # 數據庫最新交易日；也可 from_csv / from_frame
+    snap.screen('Vol > 2*"Vol MA (20)" and "RSI (14)" < 35', sort='vol', limit=20)
+    screen_history(db, '"RSI (14)" < 25', start='2025-12-01')   # 整段歷史一次計算
+
+命令行:
+  python screener.py '"RSI (14)" < 35 and Vol > 2*"Vol MA (20)"' [--sort vol] [-n 20]
+  python screener.py 'Chg >= 5' --csv data/normalized/20251223.csv
+  python screener.py '"RSI (14)" < 25' --since 2025-12-01 [--until 2025-12-31]
+  python screener.py --fields
+======================================================================
+"""
+
+import re
+import ast
+import sys
+import argparse
+from functools import lru_cache, reduce
+
+import numpy as np
+import pandas as pd
+
+from eod_database import EODDatabase, DB_PATH, COLUMN_ALIASES, TEXT_COLUMNS, NUMERIC_COLUMNS, eod_columns
+
+# 選股器 / latest_price.json 的列名 → 數據庫列名
+PICKER_ALIASES = {
+    "last_price": "last",
+    "current_price": "last",
+    "price": "last",
+    "change_percent": "chg",
+    "daily_change": "chg",
+    "volume": "vol",
+    "rsi": "rsi14",
+}
+# 快照建立時預先計算排列索引的排序鍵
+SORT_KEYS = ("vol", "chg", "score", "value", "last")
+
+FUNCTIONS = {
+    "abs": np.abs,
+    "log": np.log,
+    "isna": pd.isna,
+    "notna": pd.notna,
+}
+
+_QUOTED = re.compile(r'`([^`]+)`|"([^"\\]*)"|\'([^\'\\]*)\'')
+
+
+class ScreenError(ValueError):
+    """表達式無法解析或引用了未知字段"""
+
+
+def _aliases():
+    aliases = {c: c for c in TEXT_COLUMNS + NUMERIC_COLUMNS + ["date"]}
+    aliases.update(COLUMN_ALIASES)
+    aliases.update(PICKER_ALIASES)
+    return {k.lower(): v for k, v in aliases.items()}
+
+
+ALIASES = _aliases()
+
+
+def resolve_field(name, available):
+    """字段名（原始列名、數據庫列名或選股器列名，不分大小寫）→ 快照中的列名，找不到時返回 None"""
+    if name in available:
+        return name
+    lowered = name.strip().lower()
+    for candidate in (ALIASES.get(lowered), lowered):
+        if candidate in available:
+            return candidate
+    matches = [c for c in available if c.lower() == lowered]
+    return matches[0] if matches else None
+
+
+def _preprocess(expr, available):
+    """把引號/反引號中的字段名換成標識符，返回 (Python 表達式, {標識符: 列名})"""
+    fields = {}
+
+    def replace(match):
+        backtick, double, single = match.groups()
+        text = backtick if backtick is not None else double if double is not None else single
+        column = resolve_field(text, available)
+        if column is None:
+            if backtick is not None:
+                raise ScreenError(f"未知字段: {text}")
+            return repr(text)
+        ident = f"__f{len(fields)}"
+        fields[ident] = column
+        return ident
+
+    return _QUOTED.sub(replace, expr), fields
+
+
+class _Compiler:
+    """AST → 閉包，閉包接收 {列名: 數組} 返回數組或標量"""
+
+    COMPARE = {
+        ast.Eq: np.equal, ast.NotEq: np.not_equal,
+        ast.Lt: np.less, ast.LtE: np.less_equal,
+        ast.Gt: np.greater, ast.GtE: np.greater_equal,
+    }
+    BINARY = {
+        ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply,
+        ast.Div: np.true_divide, ast.Mod: np.mod, ast.Pow: np.power,
+        ast.BitAnd: np.logical_and, ast.BitOr: np.logical_or,
+    }
+
+    def __init__(self, fields, available):
+        self.fields = fields
+        self.available = available
+        self.used = set()
+
+    def compile(self, node):
+        method = getattr(self, f"_{type(node).__name__}", None)
+        if method is None:
+            raise ScreenError(f"不支持的語法: {ast.unparse(node)}")
+        return method(node)
+
+    def _Expression(self, node):
+        return self.compile(node.body)
+
+    def _Name(self, node):
+        column = self.fields.get(node.id) or resolve_field(node.id, self.available)
+        if column is None:
+            raise ScreenError(f"未知字段: {node.id}")
+        self.used.add(column)
+        return lambda cols: cols[column]
+
+    def _Constant(self, node):
+        value = node.value
+        if not isinstance(value, (int, float, str, bool)):
+            raise ScreenError(f"不支持的常量: {value!r}")
+        return lambda cols: value
+
+    def _BoolOp(self, node):
+        parts = [self.compile(v) for v in node.values]
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        # 逐個合併（常量與數組混合時按廣播規則，不能先拼成一個數組）
+        return lambda cols: reduce(combine, (_as_mask(p(cols)) for p in parts))
+
+    def _UnaryOp(self, node):
+        operand = self.compile(node.operand)
+        if isinstance(node.op, (ast.Not, ast.Invert)):
+            return lambda cols: ~_as_mask(operand(cols))
+        if isinstance(node.op, ast.USub):
+            return lambda cols: -operand(cols)
+        if isinstance(node.op, ast.UAdd):
+            return operand
+        raise ScreenError("不支持的一元運算")
+
+    def _BinOp(self, node):
+        func = self.BINARY.get(type(node.op))
+        if func is None:
+            raise ScreenError("不支持的運算符")
+        left, right = self.compile(node.left), self.compile(node.right)
+
+        def evaluate(cols):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return func(_numeric(left(cols)), _numeric(right(cols)))
+        return evaluate
+
+    def _Compare(self, node):
+        terms = [self.compile(node.left)]
+        steps = []
+        for op, comparator in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)):
+                if not isinstance(comparator, (ast.Tuple, ast.List, ast.Set)) or \
+                        not all(isinstance(e, ast.Constant) for e in comparator.elts):
+                    raise ScreenError("in 後面需要常量列表 (值1, 值2, ...)")
+                values = [self.compile(e)({}) for e in comparator.elts]
+                steps.append((op, values))
+                terms.append(None)
+            else:
+                func = self.COMPARE.get(type(op))
+                if func is None:
+                    raise ScreenError("不支持的比較")
+                steps.append((func, None))
+                terms.append(self.compile(comparator))
+
+        def evaluate(cols):
+            mask = None
+            left = terms[0](cols)
+            for (func, values), term in zip(steps, terms[1:]):
+                if term is None:
+                    result = pd.Series(np.asarray(left, dtype=object)).isin(values).to_numpy()
+                    if isinstance(func, ast.NotIn):
+                        result = ~result & pd.notna(left)
+                    left_next = left
+                else:
+                    right = term(cols)
+                    result = _compare(func, left, right)
+                    left_next = right
+                mask = result if mask is None else mask & result
+                left = left_next
+            return mask
+        return evaluate
+
+    def _Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+            raise ScreenError(f"不支持的函數（可用: {', '.join(FUNCTIONS)}）")
+        func = FUNCTIONS[node.func.id]
+        args = [self.compile(a) for a in node.args]
+
+        def evaluate(cols):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return func(*[a(cols) for a in args])
+        return evaluate
+
+
+def _numeric(value):
+    if isinstance(value, np.ndarray) and value.dtype == object:
+        return pd.to_numeric(pd.Series(value), errors="coerce").to_numpy(dtype=float)
+    return value
+
+
+def _as_mask(value):
+    return np.asarray(value, dtype=bool)
+
+
+def _compare(func, left, right):
+    """比較；字符串與文字列比較，數字與數字列比較，空值為 False"""
+    text = isinstance(left, str) or isinstance(right, str)
+    if text:
+        left_arr, right_arr = np.asarray(left, dtype=object), np.asarray(right, dtype=object)
+        valid = pd.notna(left_arr) & pd.notna(right_arr)
+        if func in (np.equal, np.not_equal):
+            result = func(left_arr, right_arr)
+        else:
+            result = func(left_arr.astype(str), right_arr.astype(str))
+        return np.asarray(result, dtype=bool) & valid
+    with np.errstate(invalid="ignore"):
+        return np.asarray(func(_numeric(left), _numeric(right)), dtype=bool)
+
+
+class Screen:
+    """編譯好的篩選條件"""
+
+    def __init__(self, expr, available):
+        self.expr = expr
+        source, fields = _preprocess(expr, available)
+        try:
+            tree = ast.parse(source.strip(), mode="eval")
+        except SyntaxError as e:
+            raise ScreenError(f"表達式語法錯誤: {e.msg}") from None
+        compiler = _Compiler(fields, set(available))
+        self._evaluate = compiler.compile(tree)
+        self.fields = sorted(compiler.used)
+
+    def mask(self, columns, length):
+        """在 {列名: 數組} 上計算布爾掩碼"""
+        try:
+            result = self._evaluate(columns)
+            return np.broadcast_to(_as_mask(result), (length,))
+        except ScreenError:
+            raise
+        except (ValueError, TypeError, ArithmeticError) as e:
+            raise ScreenError(f"表達式無法計算: {e}") from None
+
+
+@lru_cache(maxsize=256)
+def compile_screen(expr, available):
+    """編譯表達式（available 為可用列名的 frozenset），按兩者緩存"""
+    return Screen(expr, available)
+
+
+class Snapshot:
+    """一個快照（或一段歷史）的列式數組 + 預先計算的排列索引"""
+
+    def __init__(self, frame):
+        self.frame = frame.reset_index(drop=True)
+        self.columns = {}
+        for column in self.frame.columns:
+            series = self.frame[column]
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                # 緊湊表示的 float32 列保持 float32
+                dtype = np.float32 if series.dtype == np.float32 else float
+                self.columns[column] = series.to_numpy(dtype=dtype, na_value=np.nan)
+            else:
+                self.columns[column] = series.astype(object).where(series.notna(), None).to_numpy()
+        self.available = frozenset(self.columns)
+        self._orders = {}
+        for key in SORT_KEYS:
+            if key in self.columns and np.issubdtype(self.columns[key].dtype, np.floating):
+                self.order(key)
+
+    def __len__(self):
+        return len(self.frame)
+
+    @classmethod
+    def from_frame(cls, df):
+        """規範化數據（原始列名）、數據庫行或選股器數據 → 快照；其他列（date、score 等）原樣保留"""
+        renamed = df.rename(columns={k: v for k, v in PICKER_ALIASES.items()
+                                     if k in df.columns and v not in df.columns})
+        canonical = eod_columns(renamed)
+        extras = [c for c in renamed.columns if c not in COLUMN_ALIASES and c not in canonical.columns]
+        frame = pd.concat([canonical, renamed[extras]], axis=1)
+        frame = frame.loc[:, ~frame.columns.duplicated()]
+        return cls(frame)
+
+    @classmethod
+    def from_csv(cls, path):
+        return cls.from_frame(pd.read_csv(path, dtype=str, keep_default_na=False))
+
+    @classmethod
+    def from_db(cls, db, trade_date=None):
+        """數據庫中某交易日（默認最新）的快照"""
+        trade_date = trade_date or db.latest_date()
+        return cls.from_frame(db.query("SELECT * FROM eod WHERE date = ? ORDER BY code", (trade_date,)))
+
+    def order(self, key, ascending=False):
+        """按 key 排序的排列索引（空值在最後），每個快照只計算一次"""
+        column = resolve_field(key, self.available)
+        if column is None:
+            raise ScreenError(f"未知排序字段: {key}")
+        cache_key = (column, ascending)
+        if cache_key not in self._orders:
+            values = self.columns[column]
+            if not np.issubdtype(values.dtype, np.floating):
+                values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+            # 穩定排序；NaN 在 argsort 中排在最後
+            self._orders[cache_key] = np.argsort(values if ascending else -values, kind="stable")
+        return self._orders[cache_key]
+
+    def mask(self, expr):
+        return compile_screen(expr, self.available).mask(self.columns, len(self))
+
+    def select(self, mask, sort=None, ascending=False, limit=None):
+        """掩碼 → 行位置（按 sort 排序時用預先計算的排列）"""
+        if sort:
+            order = self.order(sort, ascending)
+            idx = order[mask[order]]
+        else:
+            idx = np.flatnonzero(mask)
+        return idx[:limit] if limit else idx
+
+    def screen(self, expr, sort=None, ascending=False, limit=None):
+        """篩選，返回符合條件的行（DataFrame）"""
+        return self.frame.iloc[self.select(self.mask(expr), sort, ascending, limit)]
+
+
+def screen_history(db, expr, start=None, end=None, sort=None, ascending=False, limit=None, compact=True):
+    """
+    在 start ~ end 的全部歷史上一次計算掩碼，返回符合條件的 (date, code, ...) 行
+    compact=True 時按緊湊表示載入（字典編碼文字、float32 價格），長歷史內存約為完整表示的 1/4
+    """
+    if compact:
+        return Snapshot(db.load_history(start, end)).screen(expr, sort, ascending, limit)
+    df = db.load_history(start, end, compact=False)
+    return Snapshot.from_frame(df).screen(expr, sort, ascending, limit)
+
+
+def print_results(df, fields):
+    shown = [c for c in ["date", "code", "name", "sector", "last", "chg", "vol"] if c in df.columns]
+    shown += [f for f in fields if f not in shown and f in df.columns]
+    if df.empty:
+        print("📭 沒有符合條件的股票")
+        return
+    print(df[shown].to_string(index=False, na_rep="-", max_colwidth=24))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="選股篩選器（聲明式條件表達式）")
+    parser.add_argument("expr", nargs="?", help="條件表達式")
+    parser.add_argument("--db", default=DB_PATH, help="數據庫文件")
+    parser.add_argument("--csv", help="在規範化CSV上篩選（不讀數據庫）")
+    parser.add_argument("--date", help="交易日 YYYY-MM-DD（默認最新）")
+    parser.add_argument("--since", help="在歷史上篩選: 開始日期")
+    parser.add_argument("--until", help="在歷史上篩選: 結束日期")
+    parser.add_argument("--sort", help=f"排序字段（預先計算: {', '.join(SORT_KEYS)}）")
+    parser.add_argument("--asc", action="store_true", help="升序")
+    parser.add_argument("-n", "--limit", type=int, default=50)
+    parser.add_argument("--fields", action="store_true", help="列出可用字段")
+    args = parser.parse_args(argv)
+
+    if args.fields:
+        for alias, column in sorted(ALIASES.items(), key=lambda x: (x[1], x[0])):
+            print(f"  {alias:<16} → {column}")
+        return 0
+    if not args.expr:
+        parser.error("需要條件表達式")
+
+    try:
+        if args.csv:
+            snap = Snapshot.from_csv(args.csv)
+            result = snap.screen(args.expr, args.sort, args.asc, args.limit)
+        else:
+            with EODDatabase(args.db) as db:
+                db.sync()
+                if args.since or args.until:
+                    result = screen_history(db, args.expr, args.since, args.until,
+                                            args.sort, args.asc, args.limit)
+                else:
+                    snap = Snapshot.from_db(db, args.date)
+                    result = snap.screen(args.expr, args.sort, args.asc, args.limit)
+        fields = compile_screen(args.expr, frozenset(result.columns)).fields
+    except ScreenError as e:
+        print(f"❌ {e}")
+        return 2
+
+    print_results(result, fields)
+    print(f"🧪 {len(result)} 行符合: {args.expr}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+🔎 股票搜索索引 (search_index.json) - 代码 / 名称 / 别名 即时查找
+======================================================================
+生成 latest_price.json 时同时写出一个小的搜索索引文件，
+query_service、investment_calculator 和 retail-inv.html 的搜索框
+（web/search_index_loader.js）直接查索引，不再逐行扫描股票列表。
+
+文件内容 (紧凑JSON):
+  entries  [[代码, 名称], ...]             按代码排序，序号即条目ID
+  aliases  {"条目ID": [别名...], ...}      只含有别名的条目
+  grams    {"MAY": [3, 1, 40, ...], ...}   三字母组 → 条目ID（差分编码: 第一个为ID，之后为与前一个的差）
+                                           只索引名称和别名；代码用前缀查找，不建三字母组
+  common   ["BER", "HAD", ...]             出现在超过 COMMON_GRAM_RATIO 条目中的三字母组，不写倒排表，
+                                           查找时不用来筛选（查询只含这些时逐条验证）
+
+检索键（代码、名称、别名规范化后）的有序数组在加载时建立，不写入文件。
+
+规范化: 转大写并去掉空格和标点（"99smart wa" 与 "99SMART-WA" 相同）
+别名: config/stock_aliases.json（可选）{"1155": ["MALAYAN BANKING"], ...}
+
+查找顺序（SearchIndex.search）:
+  1. 前缀匹配    有序检索键上二分查找（代码、名称、别名）
+  2. 子串匹配    查询的三字母组倒排表求交集后验证（名称、别名）
+  3. 模糊匹配    共有三字母组的 Dice 系数 >= FUZZY_THRESHOLD（名称、别名）
+
+使用:
+  python search_index.py build ../web/latest_price.json         # 生成 ../web/search_index.json
+  python search_index.py find maybank                            # 查找
+  python search_index.py find 115 --index ../web/search_index.json -n 10
+======================================================================
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import bisect
+import argparse
+from itertools import accumulate
+from datetime import datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_FILE = os.path.join(os.path.dirname(SCRIPT_DIR), "web", "search_index.json")
+ALIAS_FILE = os.path.join(SCRIPT_DIR, "config", "stock_aliases.json")
+
+FORMAT_VERSION = 2
+GRAM = 3
+FUZZY_THRESHOLD = 0.4
+COMMON_GRAM_RATIO = 0.05   # 出现在超过这个比例条目中的三字母组不写倒排表（如 BERHAD 的 BER/HAD）
+
+_NON_WORD = re.compile(r"[\W_]+")
+_EXCEL_CODE = re.compile(r'^=?"(.*)"$')
+
+
+def clean_code(code):
+    """去掉 Excel 导出的 ="1234" 包裹"""
+    code = str(code or "").strip()
+    match = _EXCEL_CODE.match(code)
+    return match.group(1) if match else code
+
+
+def normalize_key(text):
+    """检索键: 大写，去掉空格和标点"""
+    return _NON_WORD.sub("", str(text or "").upper())
+
+
+def grams(key):
+    return {key[i:i + GRAM] for i in range(len(key) - GRAM + 1)}
+
+
+def load_aliases(path=ALIAS_FILE):
+    """可选的别名文件 {代码: [别名...]}；不存在时返回空字典"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _delta(ids):
+    """有序ID → 差分编码"""
+    return [ids[0]] + [b - a for a, b in zip(ids, ids[1:])]
+
+
+def _text_keys(name, aliases):
+    """名称和别名的检索键（建立三字母组）"""
+    keys = {normalize_key(name)}
+    keys.update(normalize_key(alias) for alias in aliases)
+    keys.discard("")
+    return keys
+
+
+def build_index(stocks, aliases=None):
+    """
+    stocks: [{"code": ..., "name": ...}, ...]（latest_price.json 的 stocks 数组）
+    返回可直接序列化的索引字典
+    """
+    aliases = load_aliases() if aliases is None else aliases
+    entries = {}
+    for stock in stocks:
+        code = clean_code(stock.get("code"))
+        if code:
+            entries[code] = str(stock.get("name") or "")
+    entries = sorted(entries.items())
+
+    entry_aliases = {}
+    postings = {}
+    for entry_id, (code, name) in enumerate(entries):
+        if aliases.get(code):
+            entry_aliases[str(entry_id)] = list(aliases[code])
+        entry_grams = set()
+        for key in _text_keys(name, aliases.get(code, [])):
+            entry_grams.update(grams(key))
+        for gram in entry_grams:
+            postings.setdefault(gram, []).append(entry_id)
+    limit = max(1, int(len(entries) * COMMON_GRAM_RATIO))
+
+    return {
+        "version": FORMAT_VERSION,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "gram": GRAM,
+        "entries": [[code, name] for code, name in entries],
+        "aliases": entry_aliases,
+        "common": sorted(gram for gram, ids in postings.items() if len(ids) > limit),
+        "grams": {gram: _delta(ids) for gram, ids in sorted(postings.items()) if len(ids) <= limit},
+    }
+
+
+def write_search_index(stocks, output_dir, filename="search_index.json", aliases=None):
+    """写出搜索索引（原子替换），返回文件路径"""
+    filepath = os.path.join(output_dir, filename)
+    os.makedirs(output_dir or ".", exist_ok=True)
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(build_index(stocks, aliases), f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, filepath)
+    return filepath
+
+
+class SearchIndex:
+    """内存中的搜索索引，查找结果为 {"code", "name", "match"} 字典列表"""
+
+    def __init__(self, data):
+        if data.get("version") != FORMAT_VERSION:
+            raise ValueError(f"不支持的索引版本: {data.get('version')}")
+        self.entries = [tuple(e) for e in data["entries"]]
+        self.postings = {gram: frozenset(accumulate(ids)) for gram, ids in data["grams"].items()}
+        self.common = frozenset(data["common"])
+        self.by_code = {code.upper(): i for i, (code, _) in enumerate(self.entries)}
+
+        pairs = set()
+        self.text_keys = []
+        for entry_id, (code, name) in enumerate(self.entries):
+            keys = _text_keys(name, data["aliases"].get(str(entry_id), []))
+            self.text_keys.append([(key, grams(key)) for key in sorted(keys)])
+            pairs.update((key, entry_id) for key in keys)
+            if normalize_key(code):
+                pairs.add((normalize_key(code), entry_id))
+        pairs = sorted(pairs)
+        self.keys = [key for key, _ in pairs]
+        self.ids = [entry_id for _, entry_id in pairs]
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_stocks(cls, stocks, aliases=None):
+        return cls(build_index(stocks, aliases))
+
+    @classmethod
+    def load_or_build(cls, stocks, path=INDEX_FILE, aliases=None):
+        """索引文件包含 stocks 的全部代码时直接使用，否则按 stocks 在内存中建立"""
+        try:
+            index = cls.load(path)
+        except (OSError, ValueError, KeyError):
+            return cls.from_stocks(stocks, aliases)
+        codes = {clean_code(s.get("code")).upper() for s in stocks}
+        if codes.issubset(index.by_code):
+            return index
+        return cls.from_stocks(stocks, aliases)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _result(self, entry_id, match):
+        code, name = self.entries[entry_id]
+        return {"code": code, "name": name, "match": match}
+
+    def prefix_ids(self, key, limit):
+        """检索键以 key 开头的条目（完全相等的在前）"""
+        found = {}
+        i = bisect.bisect_left(self.keys, key)
+        while i < len(self.keys) and len(found) < limit and self.keys[i].startswith(key):
+            found.setdefault(self.ids[i], None)
+            i += 1
+        return list(found)
+
+    def _candidates(self, query, combine):
+        """查询三字母组的倒排表按 combine 合并；全是常见三字母组时返回全部条目"""
+        lists = [self.postings.get(g, frozenset()) for g in query if g not in self.common]
+        if not lists:
+            return range(len(self.entries))
+        lists.sort(key=len)
+        return combine(lists[0], *lists[1:])
+
+    def contains_ids(self, key, limit):
+        """名称或别名包含 key 的条目（key 至少 GRAM 个字符）"""
+        query = grams(key)
+        if not query:
+            return []
+        candidates = self._candidates(query, frozenset.intersection)
+        found = sorted(i for i in candidates if any(key in k for k, _ in self.text_keys[i]))
+        return found[:limit]
+
+    def fuzzy_ids(self, key, limit, threshold=FUZZY_THRESHOLD):
+        """按共有三字母组的 Dice 系数（每个条目取最相近的名称或别名）排序的近似匹配"""
+        query = grams(key)
+        if not query:
+            return []
+        best = {}
+        for entry_id in self._candidates(query, frozenset.union):
+            score = max((2 * len(query & key_grams) / (len(query) + len(key_grams))
+                         for _, key_grams in self.text_keys[entry_id]), default=0)
+            if score >= threshold:
+                best[entry_id] = score
+        return sorted(best, key=lambda i: (-best[i], i))[:limit]
+
+    def search(self, query, limit=20, fuzzy=True):
+        """前缀 → 子串 → 模糊（纯数字的代码查询不做模糊匹配），去重后最多返回 limit 条"""
+        key = normalize_key(clean_code(query))
+        if not key:
+            return []
+        fuzzy = fuzzy and not key.isdigit()
+        results = {}
+        for match, finder in (("prefix", self.prefix_ids), ("contains", self.contains_ids),
+                              ("fuzzy", self.fuzzy_ids if fuzzy else None)):
+            if finder is None or len(results) >= limit:
+                continue
+            for entry_id in finder(key, limit):
+                results.setdefault(entry_id, match)
+        return [self._result(i, m) for i, m in list(results.items())[:limit]]
+
+    def get(self, code):
+        entry_id = self.by_code.get(clean_code(code).upper())
+        return self._result(entry_id, "exact") if entry_id is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="股票搜索索引")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="由 latest_price.json 生成 search_index.json")
+    p.add_argument("price_json", help="latest_price.json 路径")
+    p.add_argument("-o", "--output-dir", help="输出目录（默认与 latest_price.json 相同）")
+    p = sub.add_parser("find", help="查找代码或名称")
+    p.add_argument("query")
+    p.add_argument("--index", default=INDEX_FILE, help="search_index.json 路径")
+    p.add_argument("-n", "--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        with open(args.price_json, "r", encoding="utf-8") as f:
+            stocks = json.load(f).get("stocks", [])
+        output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.price_json))
+        path = write_search_index(stocks, output_dir)
+        print(f"✅ 索引 {len(stocks)} 支股票: {path} ({os.path.getsize(path) / 1024:.1f} KB)")
+        return 0
+
+    try:
+        index = SearchIndex.load(args.index)
+    except (OSError, ValueError) as e:
+        print(f"❌ 无法加载索引 {args.index}: {e}")
+        return 1
+    started = time.perf_counter()
+    results = index.search(args.query, args.limit)
+    elapsed = (time.perf_counter() - started) * 1e6
+    for result in results:
+        print(f"  {result['code']:<10} {result['name']:<24} [{result['match']}]")
+    print(f"🔎 {len(results)} 条结果，{elapsed:.0f} µs")
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+🧭 代碼 → 行業推斷 - 按EOD歷史投票，權證繼承正股
+======================================================================
+每個代碼的行業由 EOD 數據庫（eod 表）中觀察到的行業投票決定:
+  • 每個交易日一票，權重按時間衰減: 0.5 ** (距最新交易日天數 / HALF_LIFE_DAYS)
+  • 得票最多的行業勝出；'Unknown' 和空值不投票
+  • 權證 / 結構性權證（以及優先股、貸款股）繼承正股的行業，
+    正股按 instrument_master.classify 的規則確定（與證券主表同一份規則）:
+      代碼  5326WA、5326C1、5326HB  → 正股 5326
+      名稱  99SMART-WA、99SMART-C1  → 名稱為 99SMART 的正股
+    正股沒有結果時使用權證自己的投票
+  • 觀察到多個行業、或勝出行業得票比例低於 CONFLICT_SHARE、
+    或繼承結果與自身投票不同的代碼寫入衝突報告
+
+輸出:
+  config/code_sectors.json          查找表 {"sectors": [...], "codes": {代碼: 序號}, "names": {名稱: 序號}}
+  data/reports/sector_conflicts.json 衝突報告（按得票比例從低到高）
+
+用法（代碼中）:
+    lookup = SectorLookup()                    # 載入查找表
+    lookup.get('5326C1')                       # 字典查找；未收錄的權證按正股代碼查
+    lookup.get(None, name='99SMART-C1')
+
+命令行:
+  python sector_inference.py build [--half-life 180]
+  python sector_inference.py lookup 5326 5326C1 99SMART-C1
+  python sector_inference.py conflicts [-n 20]
+======================================================================
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from eod_database import EODDatabase, DB_PATH, DATA_DIR
+from instrument_master import classify
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+LOOKUP_FILE = os.path.join(SCRIPT_DIR, "config", "code_sectors.json")
+CONFLICT_FILE = os.path.join(DATA_DIR, "reports", "sector_conflicts.json")
+
+HALF_LIFE_DAYS = 180
+CONFLICT_SHARE = 0.8
+UNKNOWN_SECTORS = ("", "Unknown", "-")
+
+
+def _underlying(codes, names, known_names=None):
+    """代碼 / 名稱對應的正股（instrument_master.classify），不是衍生品時為 None"""
+    return classify(codes, names, known_names=known_names)["underlying"]
+
+
+def vote(history, half_life_days=HALF_LIFE_DAYS):
+    """
+    history: code/sector/date（每個代碼每個交易日一行）
+    返回每個 (code, sector) 一行: weight、share（在該代碼中的權重比例）、days、first、last
+    """
+    history = history[history["sector"].notna() & ~history["sector"].isin(UNKNOWN_SECTORS)]
+    if history.empty:
+        return pd.DataFrame(columns=["code", "sector", "weight", "share", "days", "first", "last"])
+
+    dates = pd.to_datetime(history["date"])
+    age = (dates.max() - dates).dt.days.to_numpy()
+    weighted = history.assign(weight=np.power(0.5, age / half_life_days))
+
+    votes = weighted.groupby(["code", "sector"], sort=False).agg(
+        weight=("weight", "sum"), days=("date", "size"), first=("date", "min"), last=("date", "max"))
+    votes = votes.reset_index()
+    votes["share"] = votes["weight"] / votes.groupby("code")["weight"].transform("sum")
+    # 權重相同時最近出現的行業優先
+    return votes.sort_values(["code", "weight", "last"], ascending=[True, False, False], ignore_index=True)
+
+
+def infer_sectors(history, half_life_days=HALF_LIFE_DAYS):
+    """
+    返回 (結果 DataFrame, 衝突列表)
+    結果每個代碼一行: code、name、sector、share、source（'vote' / 'underlying'）、underlying
+    """
+    votes = vote(history, half_life_days)
+    winners = votes.drop_duplicates("code").set_index("code")
+
+    # 每個代碼最近的名稱
+    names = history.sort_values("date").drop_duplicates("code", keep="last").set_index("code")["name"]
+
+    result = pd.DataFrame({"name": names})
+    result["sector"] = winners["sector"]
+    result["share"] = winners["share"]
+    result["source"] = np.where(result["sector"].notna(), "vote", None)
+
+    # 權證繼承正股：先按代碼，再按名稱
+    own_sector = result["sector"].copy()
+    underlying = _underlying(pd.Series(names.index, index=names.index), names)
+    underlying = underlying.where(underlying.isin(set(names.index)), None)
+    inherited = underlying.map(own_sector)
+    use = inherited.notna()
+    result.loc[use, "sector"] = inherited[use]
+    result.loc[use, "share"] = underlying[use].map(result["share"])
+    result.loc[use, "source"] = "underlying"
+    result["underlying"] = underlying
+    result = result.reset_index(names="code")
+
+    conflicts = []
+    multi = votes[votes.duplicated("code", keep=False)]
+    grouped = {code: group for code, group in multi.groupby("code", sort=False)}
+    for row in result.itertuples(index=False):
+        group = grouped.get(row.code)
+        own = own_sector.get(row.code)
+        overridden = row.source == "underlying" and pd.notna(own) and own != row.sector
+        if group is None and not overridden:
+            continue
+        share = float(group["share"].iloc[0]) if group is not None else 1.0
+        if overridden:
+            reason = "underlying_differs"
+        elif share < CONFLICT_SHARE:
+            reason = "low_share"
+        else:
+            reason = "multiple"
+        conflicts.append({
+            "code": row.code,
+            "name": row.name if pd.notna(row.name) else None,
+            "sector": row.sector if pd.notna(row.sector) else None,
+            "source": row.source,
+            "underlying": row.underlying if pd.notna(row.underlying) else None,
+            "own_sector": own if pd.notna(own) else None,
+            "share": round(share, 4),
+            "reason": reason,
+            "votes": [
+                {"sector": v.sector, "share": round(float(v.share), 4), "days": int(v.days),
+                 "first": v.first, "last": v.last}
+                for v in (group.itertuples(index=False) if group is not None else [])
+            ],
+        })
+    conflicts.sort(key=lambda c: (c["share"], c["code"]))
+    return result, conflicts
+
+
+def build(db=None, lookup_file=LOOKUP_FILE, conflict_file=CONFLICT_FILE, half_life_days=HALF_LIFE_DAYS):
+    """從 EOD 數據庫生成查找表和衝突報告，返回 (結果, 衝突列表)"""
+    own_db = db is None
+    db = db or EODDatabase()
+    try:
+        db.sync()
+        history = db.query("SELECT code, name, sector, date FROM eod")
+    finally:
+        if own_db:
+            db.close()
+
+    result, conflicts = infer_sectors(history, half_life_days)
+    resolved = result[result["sector"].notna()]
+    sectors = sorted(resolved["sector"].unique())
+    index = {sector: i for i, sector in enumerate(sectors)}
+
+    lookup = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "half_life_days": half_life_days,
+        "sectors": sectors,
+        "codes": {code: index[sector] for code, sector in zip(resolved["code"], resolved["sector"])},
+        "names": {name: index[sector] for name, sector in zip(resolved["name"], resolved["sector"])
+                  if isinstance(name, str)},
+    }
+    _write_json(lookup_file, lookup, compact=True)
+
+    report = {
+        "generated_at": lookup["generated_at"],
+        "codes": len(result),
+        "resolved": len(resolved),
+        "inherited": int((resolved["source"] == "underlying").sum()),
+        "conflicts": len(conflicts),
+        "conflict_share": CONFLICT_SHARE,
+        "items": conflicts,
+    }
+    _write_json(conflict_file, report)
+    return result, conflicts
+
+
+def _write_json(path, data, compact=False):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        if compact:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        else:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+class SectorLookup:
+    """代碼 → 行業查找表（config/code_sectors.json）"""
+
+    def __init__(self, path=LOOKUP_FILE):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        sectors = data["sectors"]
+        self.codes = {code: sectors[i] for code, i in data["codes"].items()}
+        self.names = {name: sectors[i] for name, i in data["names"].items()}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self.codes
+
+    def get(self, code, name=None, default=None):
+        """按代碼查找；未收錄的權證按正股代碼，再按名稱 / 正股名稱查找"""
+        sector = self.codes.get(code)
+        if sector is None and name:
+            sector = self.names.get(name)
+        if sector is None and (code or name):
+            # 正股名稱映射到自身，classify 按名稱找到的「正股代碼」即查找表中的名稱
+            underlying = _underlying(pd.Series([code or ""]), pd.Series([name or ""]),
+                                     known_names={n.upper(): n for n in self.names}).iloc[0]
+            if underlying is not None:
+                sector = self.codes.get(underlying) or self.names.get(underlying)
+        return sector if sector is not None else default
+
+
+def main():
+    parser = argparse.ArgumentParser(description="代碼 → 行業推斷")
+    parser.add_argument("--db", default=DB_PATH, help="數據庫文件")
+    parser.add_argument("--lookup", default=LOOKUP_FILE, help="查找表文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="從 EOD 歷史生成查找表和衝突報告")
+    p.add_argument("--half-life", type=float, default=HALF_LIFE_DAYS, help="投票權重半衰期（天）")
+    p.add_argument("--conflicts", default=CONFLICT_FILE, help="衝突報告文件")
+    p = sub.add_parser("lookup", help="查找代碼（或名稱）的行業")
+    p.add_argument("codes", nargs="+")
+    p = sub.add_parser("conflicts", help="顯示衝突報告")
+    p.add_argument("--file", default=CONFLICT_FILE)
+    p.add_argument("-n", "--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        with EODDatabase(args.db) as db:
+            result, conflicts = build(db, args.lookup, args.conflicts, args.half_life)
+        resolved = result["sector"].notna()
+        inherited = (result["source"] == "underlying").sum()
+        print(f"✅ {resolved.sum()} / {len(result)} 個代碼有行業（繼承正股 {inherited}），衝突 {len(conflicts)} 個")
+        print(f"💾 查找表: {args.lookup}")
+        print(f"💾 衝突報告: {args.conflicts}")
+        return 0
+
+    if args.command == "lookup":
+        try:
+            lookup = SectorLookup(args.lookup)
+        except FileNotFoundError:
+            print(f"❌ 查找表不存在（先運行 python sector_inference.py build）: {args.lookup}")
+            return 1
+        for code in args.codes:
+            print(f"  {code:<14} {lookup.get(code, name=code, default='-')}")
+        return 0
+
+    try:
+        with open(args.file, "r", encoding="utf-8") as f:
+            report = json.load(f)
+    except FileNotFoundError:
+        print(f"❌ 衝突報告不存在: {args.file}")
+        return 1
+    print(f"⚠️  {report['conflicts']} 個衝突（{report['resolved']} / {report['codes']} 個代碼有行業）")
+    for item in report["items"][:args.limit]:
+        votes = ", ".join(f"{v['sector']} {v['share']:.0%}" for v in item["votes"]) or "-"
+        print(f"  {item['code']:<10} {item['name'] or '-':<14} → {item['sector'] or '-':<28} "
+              f"[{item['reason']}] {votes}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,92 +1,118 @@
 #!/usr/bin/env python3
 """
 行业分析报告脚本
+数据来自 EOD 数据库（eod_database.py），按 (sector, date) 索引查询最新交易日；
+涨跌家数、成交量加权涨跌幅和52周新高/新低来自物化表 sector_daily
 """
 
 import json
-import pandas as pd
 import os
+import sys
 from datetime import datetime
 
-def generate_sector_report():
-    """生成行业分析报告"""
-    
-    # 读取行业映射
-    with open('sector_mapping.json', 'r') as f:
-        sector_mapping = json.load(f)
-    
-    # 读取最新的规范化数据
-    data_file = '../web/normalized_stocks.csv'
-    
-    if not os.path.exists(data_file):
-        print("❌ 数据文件不存在")
+import pandas as pd
+
+from eod_database import EODDatabase
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORT_FILE = os.path.join(os.path.dirname(SCRIPT_DIR), 'web', 'sector_report.json')
+
+def generate_sector_report(trade_date=None, db=None):
+    """生成行业分析报告（默认最新交易日）"""
+
+    db = db or EODDatabase()
+    # 增量载入新的规范化文件
+    db.sync()
+
+    trade_date = trade_date or db.latest_date()
+    if not trade_date:
+        print("❌ 数据库中没有数据（先运行 python eod_database.py ingest）")
+        return
+
+    summary = db.sector_summary(trade_date)
+    if summary.empty:
+        print(f"❌ {trade_date} 没有数据")
         return
-    
-    df = pd.read_csv(data_file)
-    
+
+    total = int(summary['stocks'].sum())
+
     print("="*60)
     print("🏢 行业分析报告")
     print(f"📅 报告时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"📆 交易日: {trade_date}")
     print("="*60)
-    
-    # 检查必要的列
-    if 'Sector' not in df.columns:
-        print("❌ 数据中没有Sector列")
-        return
-    
+
     # 行业分布
-    sector_counts = df['Sector'].value_counts()
-    
-    print(f"\n📊 行业分布 (总计 {len(df)} 支股票):")
+    print(f"\n📊 行业分布 (总计 {total} 支股票):")
     print("-" * 50)
-    
-    for sector, count in sector_counts.items():
-        percentage = (count / len(df)) * 100
-        print(f"{sector:<40} {count:>4} 支 ({percentage:>5.1f}%)")
-    
+
+    for row in summary.itertuples(index=False):
+        percentage = (row.stocks / total) * 100
+        print(f"{row.sector:<40} {row.stocks:>4} 支 ({percentage:>5.1f}%)")
+
     # 按行业的价格统计
-    if 'Last' in df.columns:
+    priced = summary[summary['priced'] > 0].sort_values('avg_last', ascending=False)
+    if not priced.empty:
         print(f"\n💰 各行业平均价格:")
         print("-" * 50)
-        
-        sector_stats = df.groupby('Sector')['Last'].agg(['mean', 'min', 'max', 'count'])
-        sector_stats = sector_stats.sort_values('mean', ascending=False)
-        
-        for sector, stats in sector_stats.iterrows():
-            print(f"{sector:<40} 平均: RM{stats['mean']:.3f}  "
-                  f"范围: RM{stats['min']:.3f}-{stats['max']:.3f}  "
-                  f"({int(stats['count'])} 支)")
-    
+
+        for row in priced.itertuples(index=False):
+            print(f"{row.sector:<40} 平均: RM{row.avg_last:.3f}  "
+                  f"范围: RM{row.min_last:.3f}-{row.max_last:.3f}  "
+                  f"({int(row.priced)} 支)")
+
     # 按行业的涨跌幅统计
-    if 'Chg%' in df.columns:
+    changed = summary[summary['changed'] > 0].sort_values('avg_chg', ascending=False)
+    if not changed.empty:
         print(f"\n📈 各行业涨跌幅:")
         print("-" * 50)
-        
-        sector_changes = df.groupby('Sector')['Chg%'].agg(['mean', 'count'])
-        sector_changes = sector_changes.sort_values('mean', ascending=False)
-        
-        for sector, stats in sector_changes.iterrows():
-            change_color = "🟢" if stats['mean'] > 0 else "🔴" if stats['mean'] < 0 else "⚪"
-            print(f"{change_color} {sector:<38} 平均: {stats['mean']:>+6.2f}%  "
-                  f"({int(stats['count'])} 支)")
-    
+
+        for row in changed.itertuples(index=False):
+            change_color = "🟢" if row.avg_chg > 0 else "🔴" if row.avg_chg < 0 else "⚪"
+            print(f"{change_color} {row.sector:<38} 平均: {row.avg_chg:>+6.2f}%  "
+                  f"({int(row.changed)} 支)")
+
+    # 市场宽度（物化表 sector_daily）
+    breadth = db.sector_series(start=trade_date, end=trade_date)
+    if not breadth.empty:
+        print(f"\n📶 各行业涨跌家数:")
+        print("-" * 50)
+
+        for row in breadth.sort_values('vw_chg', ascending=False, na_position='last').itertuples(index=False):
+            vw_chg = f"{row.vw_chg:>+6.2f}%" if pd.notna(row.vw_chg) else "     -"
+            print(f"{row.sector:<30} 涨 {row.advancers:>3} 跌 {row.decliners:>3} 平 {row.unchanged:>3}  "
+                  f"量加权: {vw_chg}  新高 {row.new_highs} 新低 {row.new_lows}")
+
     # 生成JSON报告
     report = {
         "report_date": datetime.now().strftime('%Y-%m-%d'),
         "report_time": datetime.now().strftime('%H:%M:%S'),
-        "total_stocks": len(df),
-        "sectors_count": len(sector_counts),
-        "sector_distribution": sector_counts.to_dict(),
+        "trade_date": trade_date,
+        "total_stocks": total,
+        "sectors_count": len(summary),
+        "sector_distribution": {row.sector: int(row.stocks) for row in summary.itertuples(index=False)},
+        "sector_breadth": {
+            row.sector: {
+                "advancers": int(row.advancers),
+                "decliners": int(row.decliners),
+                "unchanged": int(row.unchanged),
+                "volume": row.volume if pd.notna(row.volume) else None,
+                "vw_chg": round(row.vw_chg, 3) if pd.notna(row.vw_chg) else None,
+                "new_highs": int(row.new_highs),
+                "new_lows": int(row.new_lows),
+            }
+            for row in breadth.itertuples(index=False)
+        },
         "generated_at": datetime.now().isoformat()
     }
-    
+
     # 保存报告
-    report_file = '../web/sector_report.json'
-    with open(report_file, 'w', encoding='utf-8') as f:
+    with open(REPORT_FILE, 'w', encoding='utf-8') as f:
         json.dump(report, f, indent=2, ensure_ascii=False)
-    
-    print(f"\n💾 报告已保存: {report_file}")
+
+    print(f"\n💾 报告已保存: {REPORT_FILE}")
     print("="*60)
+    return report
 
 if __name__ == "__main__":
-    generate_sector_report()
+    generate_sector_report(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+🔄 行業輪動 - 相對大盤強弱（5 / 20 / 60 日）與排名變化
+======================================================================
+由 EOD 數據庫的 sector_daily（每天每個行業的成交量加權漲跌幅）得到
+「交易日 × 行業」收益矩陣，整個矩陣一次做滾動計算:
+  rs{N}        N 日行業累計收益相對大盤累計收益: (1+行業)/(1+大盤) - 1
+  rank{N}      當天按 rs{N} 從強到弱的排名（1 = 最強）
+  rank{N}_chg  與 RANK_LAG 個交易日前相比排名上升的位數（正數 = 走強）
+大盤收益 = 各行業成交量加權漲跌幅按行業成交量加權
+
+結果保存在 sector_rotation 表（與 EODDatabase 共用 data/eod.sqlite），
+每個交易日記錄計算時使用的載入時間（files.ingested_at）:
+  • 新交易日或重新載入過的交易日從該日開始重算，
+    只讀取它之前 max(WINDOWS) + RANK_LAG 個交易日的數據
+  • 網頁使用的 web/sector_rotation.json 只包含最新交易日和排名走勢
+  • 選股器（ai_stock_picker_full）用 load_strength / sector_points 把
+    rank20 換算成潛力分數的行業強弱項
+
+用法（代碼中）:
+    with SectorRotation() as rotation:
+        rotation.update()                      # 只重算尾部窗口
+        rotation.latest()                      # 最新交易日各行業強弱
+        rotation.publish()                     # 寫 web/sector_rotation.json
+
+命令行:
+  python sector_rotation.py update [--full]
+  python sector_rotation.py show [--window 20] [--date 2025-12-23]
+  python sector_rotation.py publish [-o web/sector_rotation.json]
+======================================================================
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from eod_database import EODDatabase, DB_PATH
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROTATION_FILE = os.path.join(os.path.dirname(SCRIPT_DIR), "web", "sector_rotation.json")
+
+WINDOWS = (5, 20, 60)
+RANK_LAG = 5          # 排名變化與幾個交易日前比較
+MIN_COVERAGE = 0.8    # 行業在窗口內至少有數據的交易日比例
+TREND_SESSIONS = 20   # sector_rotation.json 中每個行業的排名走勢長度
+STRENGTH_WINDOW = 20  # 選股使用的排名窗口
+STRENGTH_POINTS = 5   # 選股潛力分數的行業強弱項: 最強行業 +5，最弱 -5
+
+RESULT_COLUMNS = [f"{prefix}{w}{suffix}" for w in WINDOWS
+                  for prefix, suffix in (("rs", ""), ("rank", ""), ("rank", "_chg"))]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS sector_rotation (
+    date TEXT NOT NULL,
+    sector TEXT NOT NULL,
+    chg REAL,
+    {', '.join(f'{c} REAL' for c in RESULT_COLUMNS)},
+    PRIMARY KEY (date, sector)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sector_rotation_dates (
+    date TEXT PRIMARY KEY,
+    ingested_at TEXT
+);
+"""
+
+
+def sector_matrix(daily):
+    """
+    sector_daily 行 → (收益矩陣 交易日×行業, 大盤收益 Series)，收益為小數
+    某行業某天沒有數據時為 NaN
+    """
+    returns = daily.pivot(index="date", columns="sector", values="vw_chg").astype(float) / 100
+    weights = daily.pivot(index="date", columns="sector", values="volume").astype(float)
+    weights = weights.where(returns.notna())
+    market = (returns * weights).sum(axis=1, min_count=1) / weights.sum(axis=1, min_count=1)
+    return returns, market
+
+
+def rotation_frame(returns, market, windows=WINDOWS, rank_lag=RANK_LAG):
+    """
+    整個矩陣的滾動相對強弱和排名，返回 {列名: 交易日×行業 DataFrame}
+    行業在窗口內缺少數據的天數按 0 收益計；有數據不足 MIN_COVERAGE 的行業 rs{N} 為 NaN
+    """
+    log_sector = np.log1p(returns.fillna(0.0))
+    log_market = np.log1p(market.fillna(0.0))
+    present = returns.notna().astype(float)
+
+    out = {"chg": returns * 100}
+    for w in windows:
+        excess = log_sector.rolling(w, min_periods=w).sum().sub(log_market.rolling(w, min_periods=w).sum(), axis=0)
+        enough = present.rolling(w, min_periods=w).sum() >= w * MIN_COVERAGE
+        rs = np.expm1(excess).where(enough)
+        rank = rs.rank(axis=1, ascending=False, method="min")
+        out[f"rs{w}"] = rs
+        out[f"rank{w}"] = rank
+        out[f"rank{w}_chg"] = rank.shift(rank_lag) - rank
+    return out
+
+
+def load_strength(path=DB_PATH, trade_date=None, window=STRENGTH_WINDOW):
+    """
+    只讀載入某交易日（默認最新；沒有該日時取之前最近的一天）各行業的
+    rs / rank / rank_chg（按行業索引）；數據庫或表不存在時返回空表，不創建數據庫
+    """
+    window = int(window)
+    empty = pd.DataFrame(columns=["date", "rs", "rank", "rank_chg"], index=pd.Index([], name="sector"))
+    if not os.path.exists(path):
+        return empty
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+    except sqlite3.Error:
+        return empty
+    try:
+        return pd.read_sql_query(
+            f"""SELECT sector, date, rs{window} AS rs, rank{window} AS rank, rank{window}_chg AS rank_chg
+                FROM sector_rotation WHERE date = (SELECT MAX(date) FROM sector_rotation
+                                                   WHERE date <= COALESCE(?, '9999'))""",
+            conn, params=(trade_date,)).set_index("sector")
+    except (sqlite3.Error, pd.errors.DatabaseError):
+        return empty
+    finally:
+        conn.close()
+
+
+def strength_version(strength):
+    """行業強弱內容版本（用於緩存鍵）"""
+    if strength.empty:
+        return "empty"
+    return f"{strength['date'].iloc[0]}:{len(strength)}"
+
+
+def sector_points(strength, points=STRENGTH_POINTS):
+    """{行業: 強弱分}，按排名線性從 +points（第1名）到 -points（最後一名）；沒有排名的行業不在其中"""
+    rank = pd.to_numeric(strength["rank"], errors="coerce").dropna()
+    if rank.empty or rank.max() <= 1:
+        return {}
+    return (points * (1 - 2 * (rank - 1) / (rank.max() - 1))).round(1).to_dict()
+
+
+class SectorRotation:
+    """行業輪動（與 EODDatabase 共用同一個 SQLite 文件）"""
+
+    def __init__(self, path=DB_PATH):
+        self.db = EODDatabase(path)
+        self.conn = self.db.conn
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # 計算
+    # ------------------------------------------------------------------
+
+    def stale_from(self):
+        """需要重算的第一個交易日（新交易日或載入時間變化的交易日），都是最新時返回 None"""
+        row = self.conn.execute(
+            """SELECT MIN(f.date) FROM files f LEFT JOIN sector_rotation_dates r ON f.date = r.date
+               WHERE r.date IS NULL OR r.ingested_at IS NOT f.ingested_at""").fetchone()
+        removed = self.conn.execute(
+            """SELECT MIN(r.date) FROM sector_rotation_dates r LEFT JOIN files f ON f.date = r.date
+               WHERE f.date IS NULL""").fetchone()
+        candidates = [d for d in (row[0], removed[0]) if d]
+        return min(candidates) if candidates else None
+
+    def update(self, full=False):
+        """重算過期的尾部交易日，返回重算的交易日數"""
+        start = None if full else self.stale_from()
+        if not full and start is None:
+            return 0
+
+        dates = self.db.dates()
+        if start is None:
+            first = 0
+        else:
+            first = next((i for i, d in enumerate(dates) if d >= start), len(dates))
+        context_start = dates[max(0, first - (max(WINDOWS) + RANK_LAG - 1))] if dates else None
+        recompute_from = dates[first] if first < len(dates) else None
+
+        daily = self.db.sector_series(start=context_start)
+        with self.conn:
+            # 從 start 起的舊結果全部作廢（包括已不在 files 表中的交易日）
+            self.conn.execute("DELETE FROM sector_rotation WHERE date >= ?", (start or "",))
+            self.conn.execute("DELETE FROM sector_rotation_dates WHERE date >= ?", (start or "",))
+            if daily.empty or recompute_from is None:
+                return 0
+
+            frames = rotation_frame(*sector_matrix(daily))
+            frames["stocks"] = daily.pivot(index="date", columns="sector", values="stocks")
+            long = pd.concat({name: frame.stack(future_stack=True) for name, frame in frames.items()}, axis=1)
+            # 只保留當天有數據的行業
+            long = long[(long.index.get_level_values("date") >= recompute_from) & long["stocks"].notna()]
+            long = long.reset_index()
+
+            columns = ["date", "sector", "chg"] + RESULT_COLUMNS
+            records = long[columns].astype(object).where(long[columns].notna(), None).values.tolist()
+            self.conn.executemany(
+                f"INSERT INTO sector_rotation ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                records)
+            self.conn.execute(
+                "INSERT INTO sector_rotation_dates (date, ingested_at) "
+                "SELECT date, ingested_at FROM files WHERE date >= ?", (recompute_from,))
+        return len(dates) - first
+
+    # ------------------------------------------------------------------
+    # 查詢
+    # ------------------------------------------------------------------
+
+    def query(self, sql, params=()):
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def latest(self, trade_date=None, window=20):
+        """某交易日（默認最新）各行業強弱，按 rank{window} 排序"""
+        trade_date = trade_date or self.conn.execute("SELECT MAX(date) FROM sector_rotation").fetchone()[0]
+        return self.query(
+            f"SELECT * FROM sector_rotation WHERE date = ? ORDER BY rank{int(window)} IS NULL, "
+            f"rank{int(window)}, sector", (trade_date,))
+
+    def rank_trend(self, sessions=TREND_SESSIONS, window=20):
+        """最近 sessions 個交易日的 rank{window}（交易日 × 行業）"""
+        df = self.query(
+            f"SELECT date, sector, rank{int(window)} AS rank FROM sector_rotation "
+            "WHERE date IN (SELECT DISTINCT date FROM sector_rotation ORDER BY date DESC LIMIT ?)",
+            (sessions,))
+        return df.pivot(index="date", columns="sector", values="rank").sort_index()
+
+    def market_returns(self, trade_date=None):
+        """大盤各窗口累計收益（%）"""
+        trade_date = trade_date or self.db.latest_date()
+        dates = [d for d in self.db.dates() if d <= trade_date][-max(WINDOWS):]
+        if not dates:
+            return {}
+        _, market = sector_matrix(self.db.sector_series(start=dates[0], end=trade_date))
+        log_market = np.log1p(market.fillna(0.0))
+        result = {"chg": round(float(market.iloc[-1] * 100), 3) if pd.notna(market.iloc[-1]) else None}
+        for w in WINDOWS:
+            result[f"r{w}"] = round(float(np.expm1(log_market.iloc[-w:].sum()) * 100), 3) \
+                if len(market) >= w else None
+        return result
+
+    def publish(self, output_file=ROTATION_FILE, window=20):
+        """寫入網頁使用的 sector_rotation.json（只有最新交易日和排名走勢），返回文件路徑"""
+        latest = self.latest(window=window)
+        if latest.empty:
+            print("❌ 沒有行業輪動數據（先運行 python sector_rotation.py update）")
+            return None
+
+        trend = self.rank_trend(window=window)
+
+        def value(v, digits=None):
+            if pd.isna(v):
+                return None
+            return round(float(v), digits) if digits is not None else int(v)
+
+        sectors = []
+        for row in latest.to_dict("records"):
+            entry = {"sector": row["sector"], "chg": value(row["chg"], 3)}
+            for w in WINDOWS:
+                entry[f"rs{w}"] = value(row[f"rs{w}"] * 100 if pd.notna(row[f"rs{w}"]) else None, 3)
+                entry[f"rank{w}"] = value(row[f"rank{w}"])
+                entry[f"rank{w}_chg"] = value(row[f"rank{w}_chg"])
+            column = trend[row["sector"]] if row["sector"] in trend.columns else pd.Series(dtype=float)
+            entry["trend"] = [value(v) for v in column.tolist()]
+            sectors.append(entry)
+
+        trade_date = latest["date"].iloc[0]
+        report = {
+            "trade_date": trade_date,
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "windows": list(WINDOWS),
+            "rank_window": window,
+            "rank_lag": RANK_LAG,
+            "trend_dates": trend.index.tolist(),
+            "market": self.market_returns(trade_date),
+            "sectors": sectors,
+        }
+
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        tmp_file = output_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_file, output_file)
+        return output_file
+
+
+def print_rotation(df, window):
+    print(f"🔄 行業輪動 {df['date'].iloc[0]}（按 {window} 日相對強弱排名）")
+    print(f"  {'排名':>4}  {'行業':<32} {'今日':>7} " +
+          " ".join(f"{f'RS{w}':>8}" for w in WINDOWS) + f"  {'排名變化':>6}")
+    for row in df.itertuples(index=False):
+        rank = getattr(row, f"rank{window}")
+        change = getattr(row, f"rank{window}_chg")
+        rs = " ".join(f"{getattr(row, f'rs{w}') * 100:>+7.2f}%" if pd.notna(getattr(row, f"rs{w}"))
+                      else f"{'-':>8}" for w in WINDOWS)
+        arrow = "-" if pd.isna(change) else ("↑" if change > 0 else "↓" if change < 0 else "=")
+        print(f"  {'-' if pd.isna(rank) else int(rank):>4}  {row.sector:<32} "
+              f"{'-' if pd.isna(row.chg) else f'{row.chg:+.2f}%':>7} {rs}  "
+              f"{arrow}{'' if pd.isna(change) else abs(int(change)):>5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="行業輪動 / 相對強弱")
+    parser.add_argument("--db", default=DB_PATH, help="數據庫文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("update", help="重算新的和重新載入過的交易日")
+    p.add_argument("--full", action="store_true", help="重算全部歷史")
+    p = sub.add_parser("show", help="顯示某交易日各行業強弱")
+    p.add_argument("--window", type=int, choices=WINDOWS, default=20)
+    p.add_argument("--date", help="交易日 YYYY-MM-DD，默認最新")
+    p = sub.add_parser("publish", help="寫入 sector_rotation.json")
+    p.add_argument("-o", "--output", default=ROTATION_FILE)
+    args = parser.parse_args()
+
+    with SectorRotation(args.db) as rotation:
+        rotation.db.sync()
+        count = rotation.update(full=getattr(args, "full", False))
+        if args.command == "update":
+            print(f"✅ 重算 {count} 個交易日")
+            return 0
+
+        if args.command == "publish":
+            path = rotation.publish(args.output)
+            if path:
+                print(f"💾 已保存: {path}")
+            return 0 if path else 1
+
+        df = rotation.latest(args.date, args.window)
+        if df.empty:
+            print("📭 沒有結果")
+            return 1
+        print_rotation(df, args.window)
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+======================================================================
+♻️  流水線階段緩存 - 按內容尋址
+======================================================================
+緩存鍵 = (輸入文件哈希, 配置哈希, 階段代碼版本, 上游階段鍵)
+  • 輸入CSV和配置都沒變時，規範化/評分結果直接從緩存讀取
+  • 只修改評分權重時，規範化命中緩存，只重新運行評分和輸出
+  • 修改某個階段的函數代碼時，該階段及其下游自動失效
+  • 中間結果用 pickle 保存（DataFrame 讀寫比CSV/JSON快一個數量級）
+  • 輸出階段記錄文件清單（大小+修改時間），文件沒被改動就跳過重寫
+
+用法（代碼中）:
+    cache = StageCache()
+    key = cache.key('normalize', file_hash(csv_path), code_version(normalize_csv_file))
+    df = cache.get('normalize', key)
+    if df is None:
+        df = cache.put('normalize', key, normalize_csv_file(csv_path)[0])
+
+設置環境變量 MYX_NO_CACHE=1 可禁用緩存
+
+命令行:
+  python stage_cache.py stats            # 各階段緩存條目和大小
+  python stage_cache.py prune --days 14  # 刪除14天未使用的條目
+  python stage_cache.py clear            # 清空緩存
+======================================================================
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import shutil
+import hashlib
+import inspect
+import argparse
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SCRIPT_DIR, "cache", "stages")
+
+
+def file_hash(path):
+    """文件內容的 SHA1；文件不存在時返回 None"""
+    if not path or not os.path.exists(path):
+        return None
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def config_hash(config):
+    """配置對象（dict/list）的穩定哈希"""
+    payload = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def code_version(*funcs):
+    """階段代碼版本：函數源代碼的哈希，修改函數即失效"""
+    h = hashlib.sha1()
+    for func in funcs:
+        try:
+            source = inspect.getsource(func)
+        except (OSError, TypeError):
+            source = repr(getattr(getattr(func, '__code__', None), 'co_code', func))
+        h.update(f"{func.__module__}.{func.__qualname__}\n".encode('utf-8'))
+        h.update(source.encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+class StageCache:
+    """按內容尋址的階段緩存"""
+
+    def __init__(self, cache_dir=CACHE_DIR, enabled=None, verbose=True):
+        self.cache_dir = cache_dir
+        self.verbose = verbose
+        if enabled is None:
+            enabled = os.environ.get('MYX_NO_CACHE', '') in ('', '0')
+        self.enabled = enabled
+        self.hits = []
+        self.misses = []
+
+    def key(self, stage, *parts):
+        """由階段名和各組成部分生成緩存鍵"""
+        payload = json.dumps([stage, *parts], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, stage, key, ext='.pkl'):
+        return os.path.join(self.cache_dir, stage, f"{key}{ext}")
+
+    # ------------------------------------------------------------------
+    # 中間結果
+    # ------------------------------------------------------------------
+
+    def get(self, stage, key):
+        """讀取緩存，未命中或讀取失敗時返回 None"""
+        if not self.enabled:
+            return None
+        path = self._path(stage, key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses.append(stage)
+            return None
+        except Exception as e:
+            print(f"  ⚠️  緩存損壞，重新計算 {stage}: {e}")
+            self.misses.append(stage)
+            return None
+
+        os.utime(path)  # 記錄最近使用時間，供 prune 使用
+        self.hits.append(stage)
+        if self.verbose:
+            print(f"  ♻️  使用緩存: {stage} ({key[:10]})")
+        return value
+
+    def put(self, stage, key, value):
+        """寫入緩存（原子替換），返回 value 以便鏈式使用"""
+        if not self.enabled or value is None:
+            return value
+        path = self._path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"  ⚠️  無法寫入緩存 {stage}: {e}")
+        return value
+
+    # ------------------------------------------------------------------
+    # 輸出文件
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _file_state(path):
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def outputs_current(self, key, paths):
+        """上次用同一個鍵寫出的文件都還在且沒被改動時返回 True"""
+        if not self.enabled:
+            return False
+        manifest_path = self._path('emit', key, '.json')
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            current = all(manifest.get(p) == self._file_state(p) for p in paths)
+        except (OSError, ValueError):
+            return False
+        if current:
+            self.hits.append('emit')
+            print(f"  ♻️  輸出文件已是最新，跳過寫入 ({key[:10]})")
+        return current
+
+    def record_outputs(self, key, paths):
+        """記錄本次寫出的文件狀態"""
+        if not self.enabled:
+            return
+        manifest = {p: self._file_state(p) for p in paths if p and os.path.exists(p)}
+        manifest_path = self._path('emit', key, '.json')
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    # ------------------------------------------------------------------
+    # 維護
+    # ------------------------------------------------------------------
+
+    def stats(self):
+        """返回 {stage: (條目數, 字節數)}"""
+        result = {}
+        if not os.path.isdir(self.cache_dir):
+            return result
+        for stage in sorted(os.listdir(self.cache_dir)):
+            stage_dir = os.path.join(self.cache_dir, stage)
+            if not os.path.isdir(stage_dir):
+                continue
+            files = [os.path.join(stage_dir, f) for f in os.listdir(stage_dir)]
+            result[stage] = (len(files), sum(os.path.getsize(f) for f in files))
+        return result
+
+    def prune(self, max_age_days=30):
+        """刪除超過 max_age_days 天未使用的條目，返回刪除數量"""
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for stage in self.stats():
+            stage_dir = os.path.join(self.cache_dir, stage)
+            for name in os.listdir(stage_dir):
+                path = os.path.join(stage_dir, name)
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+        return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='流水線階段緩存工具')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='緩存目錄')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('stats', help='顯示緩存統計')
+    p_prune = sub.add_parser('prune', help='刪除長期未使用的條目')
+    p_prune.add_argument('--days', type=int, default=30, help='保留最近多少天使用過的條目')
+    sub.add_parser('clear', help='清空緩存')
+    args = parser.parse_args()
+
+    cache = StageCache(args.cache_dir)
+    if args.command == 'stats':
+        stats = cache.stats()
+        if not stats:
+            print(f"📭 緩存為空: {args.cache_dir}")
+            return
+        for stage, (count, size) in stats.items():
+            print(f"  {stage:<12} {count:>5} 條  {size / 1024:>10.1f} KB")
+    elif args.command == 'prune':
+        print(f"✅ 刪除 {cache.prune(args.days)} 個過期條目")
+    elif args.command == 'clear':
+        if os.path.isdir(args.cache_dir):
+            shutil.rmtree(args.cache_dir)
+        print(f"✅ 已清空緩存: {args.cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
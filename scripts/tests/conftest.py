@@ -0,0 +1,10 @@
+"""scripts/ 下的模塊按文件名直接導入（與命令行運行時相同）"""
+
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
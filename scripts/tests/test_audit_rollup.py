@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from audit_rollup import AuditRollup
+from conftest import SCRIPTS_DIR
+
+SHIPPED_DIRS = [os.path.join(SCRIPTS_DIR, d) for d in ("audit_logs", "audit_logs_v2", "audit_final_simple")]
+RAW_COLUMNS = ["Code", "Stock", "Last", "Vol", "Prv Close", "Chg%"]
+
+
+@pytest.fixture(scope="module")
+def rollup(tmp_path_factory):
+    with AuditRollup(str(tmp_path_factory.mktemp("audit") / "eod.sqlite")) as rollup:
+        rollup.sync(SHIPPED_DIRS)
+        yield rollup
+
+
+def test_normalized_output_audits_are_not_ingested(rollup):
+    audits = rollup.audits()
+
+    assert not audits["source_file"].str.contains("normalized", case=False).any()
+    assert not audits.duplicated(["directory", "trade_date"]).any()
+
+
+def test_row_trend_has_one_row_per_day(rollup):
+    rows = rollup.row_trend()
+
+    assert not rows.dropna(subset=["trade_date"]).duplicated(["directory", "trade_date"]).any()
+
+
+def test_raw_columns_are_not_reported_removed_on_last_day(rollup):
+    drift = rollup.column_drift(os.path.join(SCRIPTS_DIR, "audit_logs_v2"))
+    last_day = drift[drift["trade_date"] == "2025-12-24"]
+
+    assert not last_day["column"].isin(RAW_COLUMNS).any()
+    assert not last_day["column"].isin(["last_price", "change_percent", "prev_close"]).any()
+
+    first_removed = rollup.summary()["column_drift"]["first_removed"]
+    assert all(first_removed.get(column) != "2025-12-24" for column in RAW_COLUMNS)
+
+
+def test_resync_keeps_normalized_audit_out(rollup):
+    assert rollup.sync(SHIPPED_DIRS) == (0, 0)
+    assert len(rollup.audits()) == len(rollup.row_trend())
@@ -0,0 +1,57 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import SCRIPTS_DIR
+from eod_validation import ValidationError, validate
+
+
+def default_schema_frame():
+    """config/eod_config.json 的 schema（Close/Volume/Change%，沒有 Prv Close）的規範化數據"""
+    with open(os.path.join(SCRIPTS_DIR, "config", "eod_config.json"), encoding="utf-8") as f:
+        schema = json.load(f)["schema"]
+    rows = [
+        ["2025-12-24", "5326", "99SMART", 1.20, 1.25, 1.18, 1.22, 120000, 146400, 0.02, 1.67, "-", "Technology"],
+        ["2025-12-24", "1155", "MAYBANK", 9.80, 9.95, 9.78, 9.90, 2500000, 24750000, 0.10, 1.02, "-", "Finance"],
+        ["2025-12-24", "5326WA", "99SMART-WA", "-", "-", "-", "-", "-", "-", "-", "-", "-", "Technology"],
+    ]
+    return pd.DataFrame(rows, columns=schema)
+
+
+def test_default_config_schema_passes_gate():
+    report = validate(default_schema_frame())
+    results = {r.rule.name: r for r in report.results}
+
+    assert results["chg_consistent"].skipped
+    assert results["chg_consistent"].passed_gate
+    assert report.ok
+    report.check_gate()
+
+
+def test_missing_required_column_fails_gate():
+    frame = default_schema_frame().drop(columns=["Volume"])
+    report = validate(frame)
+
+    assert not report.ok
+    with pytest.raises(ValidationError, match="required_columns"):
+        report.check_gate()
+
+
+def test_empty_data_fails_gate():
+    report = validate(default_schema_frame().iloc[0:0])
+
+    assert not report.ok
+    with pytest.raises(ValidationError):
+        report.check_gate()
+
+
+def test_violations_above_rate_fail_gate():
+    frame = default_schema_frame()
+    frame.loc[0, "Volume"] = -5
+    report = validate(frame)
+
+    assert not {r.rule.name: r for r in report.results}["volume_nonneg"].passed_gate
+    with pytest.raises(ValidationError, match="volume_nonneg"):
+        report.check_gate()
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from instrument_master import LABELS, classify
+from sector_inference import infer_sectors
+
+# web/latest_price.json 中的真實代碼和名稱
+REAL_INSTRUMENTS = [
+    # 代碼, 名稱, 類型, 正股
+    ("1155", "MAYBANK", "stock", None),
+    ("03017", "UNIWALL", "stock", None),
+    ("11552A", "MAYBANKC2A", "call_warrant", "1155"),
+    ("31823U", "GENTINGC3U", "call_warrant", "3182"),
+    ("526465", "MALAKOFC65", "call_warrant", "5264"),
+    ("16193V", "DRBHCOMC3V", "call_warrant", "1619"),
+    ("0138AJ", "ZETRIX-CAJ", "call_warrant", "0138"),
+    ("0652KG", "HSI-CWKG", "call_warrant", "0652"),
+    ("0652NV", "HSI-PWNV", "put_warrant", "0652"),
+    ("0650EE", "FBMKLCI-HEE", "put_warrant", "0650"),
+    ("0650Q2", "FBMKLCI-CQ2", "call_warrant", "0650"),
+    ("060007", "FCPO-CW07", "call_warrant", "0600"),
+    ("058246", "ALIBABA-C46", "call_warrant", "0582"),
+    ("065659", "SP500-H59", "put_warrant", "0656"),
+    ("05821F", "ALIBABA-H1F", "put_warrant", "0582"),
+    ("0829EA", "CHINAETF-MYR", "etf", None),
+    ("0829EB", "CHINAETF-USD", "etf", None),
+    ("0823EA", "PAM-C50", "etf", None),
+    ("0304WA", "FPHB-WA", "warrant", "0304"),
+    ("03023W", "SMILE-WA", "warrant", "03023"),
+    ("030501", "SUNMOW-PA", "preference", "03050"),
+    ("0400GB", "DIN045801028", "other", None),
+]
+
+
+@pytest.fixture(scope="module")
+def classified():
+    codes, names, _, _ = zip(*REAL_INSTRUMENTS)
+    return classify(pd.Series(codes), pd.Series(names)).assign(code=codes)
+
+
+@pytest.mark.parametrize("position", range(len(REAL_INSTRUMENTS)),
+                         ids=[code for code, *_ in REAL_INSTRUMENTS])
+def test_classify_real_codes(classified, position):
+    code, name, kind, underlying = REAL_INSTRUMENTS[position]
+    row = classified.iloc[position]
+
+    assert row["type"] == kind
+    assert (row["underlying"] if pd.notna(row["underlying"]) else None) == underlying
+
+
+def test_unrecognised_codes_are_not_labelled_stock():
+    assert LABELS["other"] == "Other"
+
+
+def test_structured_warrant_inherits_underlying_sector():
+    history = pd.DataFrame(
+        [("1155", "MAYBANK", "Finance", "2025-12-24"),
+         ("11552A", "MAYBANKC2A", "Unknown", "2025-12-24"),
+         ("0650EE", "FBMKLCI-HEE", "Structured Warrants", "2025-12-24")],
+        columns=["code", "name", "sector", "date"])
+    result = infer_sectors(history)[0].set_index("code")
+
+    assert result.loc["11552A", "underlying"] == "1155"
+    assert result.loc["11552A", "sector"] == "Finance"
+    assert result.loc["11552A", "source"] == "underlying"
+    # 指數權證的標的不在數據中: 使用自己的投票
+    assert result.loc["0650EE", "sector"] == "Structured Warrants"
@@ -0,0 +1,104 @@
+"""
+eod_normalizer 各方言與舊腳本輸出一致
+
+fixtures/normalizer_parity/<方言>.csv 是原始輸入，expected/ 下是引入
+eod_normalizer 之前的腳本（fe8b64a^）對同一輸入的輸出:
+  broker     normalize_eod        規範化行 + 審計日誌（去掉 timestamp）
+  simple     normalize_eod_simple 輸出CSV
+  reorder    reorder_eod          輸出CSV
+  processor  eod_processor        輸出CSV + JSON
+  picker     normalize_csv_file   規範化CSV（去掉 last_updated）
+"""
+
+import os
+import io
+import csv
+import glob
+import json
+import contextlib
+
+import pandas as pd
+import pytest
+
+from conftest import SCRIPTS_DIR, FIXTURES_DIR
+
+PARITY_DIR = os.path.join(FIXTURES_DIR, "normalizer_parity")
+EXPECTED_DIR = os.path.join(PARITY_DIR, "expected")
+CONFIG_PATH = os.path.join(SCRIPTS_DIR, "eod_config.json")
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def run_broker(path, outdir):
+    import normalize_eod as mod
+    config = mod.load_config(CONFIG_PATH)
+    schema, rows, audit = mod.normalize_eod(path, config, mod.load_sector_mapping(), verbose=False)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(schema)
+    writer.writerows(rows)
+    audit = {k: v for k, v in audit.items() if k != "timestamp"}
+    return {"broker.csv": buffer.getvalue(),
+            "broker_audit.json": json.dumps(audit, sort_keys=True, ensure_ascii=False, default=str, indent=2) + "\n"}
+
+
+def run_simple(path, outdir, monkeypatch):
+    import normalize_eod_simple as mod
+    output = os.path.join(outdir, "simple.csv")
+    monkeypatch.setattr("sys.argv", ["normalize_eod_simple.py", path, output, CONFIG_PATH])
+    mod.main()
+    return {"simple.csv": _read(output)}
+
+
+def run_reorder(path, outdir):
+    import reorder_eod as mod
+    output = os.path.join(outdir, "reorder.csv")
+    mod.process_eod_file(path, output, True)
+    return {"reorder.csv": _read(output)}
+
+
+def run_processor(path, outdir):
+    import eod_processor as mod
+    mod.process_eod_csv(path, outdir)
+    # 文件名帶時間戳，只比較內容
+    outputs = {}
+    for ext in ("csv", "json"):
+        matches = glob.glob(os.path.join(outdir, f"*_processed_*.{ext}"))
+        assert len(matches) == 1, matches
+        outputs[f"processor.{ext}"] = _read(matches[0])
+    return outputs
+
+
+def run_picker(path, outdir):
+    import ai_stock_picker_full as mod
+    output = os.path.join(outdir, "picker.csv")
+    mod.normalize_csv_file(path, output, os.path.join(outdir, "picker_config.json"))
+    df = pd.read_csv(output, dtype=str, keep_default_na=False)
+    return {"picker.csv": df.drop(columns=["last_updated"], errors="ignore").to_csv(index=False)}
+
+
+RUNNERS = {
+    "broker": run_broker,
+    "simple": run_simple,
+    "reorder": run_reorder,
+    "processor": run_processor,
+    "picker": run_picker,
+}
+
+
+@pytest.mark.parametrize("dialect", list(RUNNERS))
+def test_matches_legacy_output(dialect, tmp_path, monkeypatch):
+    # normalize_eod / reorder_eod 按當前目錄查找行業映射文件
+    monkeypatch.chdir(SCRIPTS_DIR)
+    runner = RUNNERS[dialect]
+    args = (os.path.join(PARITY_DIR, f"{dialect}.csv"), str(tmp_path))
+    if dialect == "simple":
+        args += (monkeypatch,)
+    with contextlib.redirect_stdout(io.StringIO()):
+        outputs = runner(*args)
+
+    for name, actual in outputs.items():
+        assert actual == _read(os.path.join(EXPECTED_DIR, name)), name
@@ -0,0 +1,105 @@
+import json
+import struct
+
+import pytest
+
+from price_snapshot_binary import (FIELD_ORDER, MAGIC, UINT_NULL, decode_snapshot, encode_snapshot,
+                                   verify_round_trip, write_binary_snapshot)
+
+
+def stock(code, **fields):
+    row = {"code": code, "name": f"NAME {code}", "last_price": 1.0, "change": 0.01, "change_percent": 1.0,
+           "volume": 100, "sector": "Technology", "open": 1.0, "high": 1.1, "low": 0.9,
+           "last_updated": "15:30:22"}
+    row.update(fields)
+    return row
+
+
+def round_trip(data):
+    return decode_snapshot(encode_snapshot(data))
+
+
+def test_round_trip_values_and_meta():
+    data = {"data_date": "2025-12-24", "last_updated": "2025-12-24 18:00:00",
+            "summary": {"count": 2, "top_gainers": [{"code": "5326"}]},
+            "stocks": [stock("5326", last_price=0.285, change_percent=-2.35, volume=4_000_000_000),
+                       stock("1155", last_price=9.9)]}
+    decoded = round_trip(data)
+
+    assert decoded["data_date"] == "2025-12-24"
+    assert decoded["summary"] == data["summary"]
+    assert [list(s) for s in decoded["stocks"]] == [FIELD_ORDER] * 2
+    first = decoded["stocks"][0]
+    # float32 的误差不暴露（0.285 不读成 0.28499999）
+    assert first["last_price"] == 0.285
+    assert first["change_percent"] == -2.35
+    assert first["volume"] == 4_000_000_000
+
+
+def test_nulls_round_trip_as_none():
+    decoded = round_trip({"stocks": [stock("5326", last_price=None, change=None, volume=None, name=None),
+                                      stock("1155", change_percent="-", volume="-")]})
+    first, second = decoded["stocks"]
+
+    assert first["last_price"] is None and first["change"] is None
+    assert first["volume"] is None
+    assert first["name"] == ""
+    assert second["change_percent"] is None and second["volume"] is None
+    assert second["last_price"] == 1.0
+
+
+def test_volume_sentinel_is_recorded_in_header():
+    blob = encode_snapshot({"stocks": [stock("5326", volume=None), stock("1155", volume=0)]})
+    header_len = struct.unpack_from("<I", blob, 4)[0]
+    header = json.loads(blob[8:8 + header_len])
+
+    assert header["columns"]["volume"]["null"] == UINT_NULL
+    assert [s["volume"] for s in decode_snapshot(blob)["stocks"]] == [None, 0]
+
+
+@pytest.mark.parametrize("volume", [-1, UINT_NULL, 2 ** 40])
+def test_volume_out_of_range_fails(volume):
+    with pytest.raises(ValueError, match="uint32"):
+        encode_snapshot({"stocks": [stock("5326", volume=volume)]})
+
+
+def test_empty_snapshot():
+    blob = encode_snapshot({"stocks": [], "data_date": "2025-12-24"})
+
+    assert blob[:4] == MAGIC
+    assert decode_snapshot(blob) == {"data_date": "2025-12-24", "stocks": []}
+
+
+def test_dictionary_columns():
+    sectors = ["Technology", "Finance", "Technology", None, "Finance"]
+    blob = encode_snapshot({"stocks": [stock(str(i), sector=s) for i, s in enumerate(sectors)]})
+    header_len = struct.unpack_from("<I", blob, 4)[0]
+    header = json.loads(blob[8:8 + header_len])
+
+    assert header["columns"]["sector"]["dictionary"] == ["Technology", "Finance", ""]
+    assert header["columns"]["last_updated"]["dictionary"] == ["15:30:22"]
+    assert [s["sector"] for s in decode_snapshot(blob)["stocks"]] == [s or "" for s in sectors]
+
+
+def test_version_mismatch_is_rejected():
+    blob = bytearray(encode_snapshot({"stocks": [stock("5326")]}))
+    header_len = struct.unpack_from("<I", blob, 4)[0]
+    header = blob[8:8 + header_len].replace(b'"version":2', b'"version":9')
+    blob[8:8 + header_len] = header
+
+    with pytest.raises(ValueError, match="版本"):
+        decode_snapshot(bytes(blob))
+
+
+def test_bad_magic_is_rejected():
+    with pytest.raises(ValueError, match="魔数"):
+        decode_snapshot(b"JUNK" + encode_snapshot({"stocks": []})[4:])
+
+
+def test_verify_round_trip_against_json(tmp_path):
+    data = {"stocks": [stock("5326", last_price=None), stock("1155", volume=None)]}
+    json_path = tmp_path / "latest_price.json"
+    json_path.write_text(json.dumps(data), encoding="utf-8")
+    bin_path = write_binary_snapshot(data, str(tmp_path))
+
+    assert verify_round_trip(str(json_path), bin_path) == []
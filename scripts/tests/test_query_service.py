@@ -0,0 +1,26 @@
+import json
+
+from query_service import MarketState
+
+
+def stock(code, name):
+    return {"code": code, "name": name, "last_price": 1.0, "change": 0.01, "change_percent": 1.0,
+            "volume": 100, "sector": "Technology", "open": 1.0, "high": 1.1, "low": 0.9}
+
+
+def test_lookup_matches_recent_picks_by_cleaned_code(tmp_path):
+    snapshot = tmp_path / "latest_price.json"
+    snapshot.write_text(json.dumps({"stocks": [
+        stock("0166", "INARI"), stock("11552A", "MAYBANKC2A"),
+    ]}), encoding="utf-8")
+    history = tmp_path / "history"
+    history.mkdir()
+    (history / "picks_20251224.json").write_text(json.dumps({"picks": [
+        {"code": '="0166"', "rank": 1, "score": 80},
+        {"code": "11552a", "rank": 2, "score": 70},
+    ]}), encoding="utf-8")
+    state = MarketState(str(snapshot), str(tmp_path / "missing.json"), str(history), 5)
+
+    for query in ('="0166"', " 0166 ", "0166"):
+        assert [p["rank"] for p in state.lookup(query)["recent_picks"]] == [1]
+    assert [p["rank"] for p in state.lookup("11552a")["recent_picks"]] == [2]
@@ -0,0 +1,31 @@
+import json
+
+import pandas as pd
+
+from records import PriceRecord, json_default
+from market_summary import build_summary
+
+
+def frame():
+    return pd.DataFrame({"code": ["5326", "1155", "0166"], "name": ["99SMART", "MAYBANK", "INARI"],
+                         "last_price": [None, 10.2, 2.88], "change_percent": ["-", 1.19, -0.5],
+                         "volume": [None, 8000100, 12345600], "sector": ["Consumer", "Finance", None]})
+
+
+def test_missing_prices_and_volume_are_null():
+    suspended, maybank, _ = PriceRecord.from_frame(frame(), last_updated="15:30:22")
+
+    assert suspended.last_price is None and suspended.change_percent is None
+    assert suspended.volume is None
+    # 缺少的列（change / open / high / low）也是 null，不是 0
+    assert maybank.change is None and maybank.open is None
+    assert maybank.volume == 8000100 and isinstance(maybank.volume, int)
+    assert json.loads(json.dumps(suspended, default=json_default))["volume"] is None
+
+
+def test_summary_skips_null_prices():
+    summary = build_summary(PriceRecord.from_frame(frame()))
+
+    assert summary["volume"] == 8000100 + 12345600
+    assert [m["code"] for m in summary["top_gainers"]][:1] == ["1155"]
+    assert "5326" not in [m["code"] for m in summary["top_losers"] + summary["top_volume"]]
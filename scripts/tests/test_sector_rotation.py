@@ -0,0 +1,39 @@
+import pandas as pd
+
+from sector_rotation import load_strength, sector_points, strength_version
+from ai_stock_picker_full import generate_stock_picks
+
+
+def strength(ranks):
+    return pd.DataFrame({"date": "2025-12-24", "rs": None, "rank": list(ranks.values()), "rank_chg": None},
+                        index=pd.Index(list(ranks), name="sector"))
+
+
+def test_sector_points_span_strongest_to_weakest():
+    points = sector_points(strength({"Technology": 1.0, "Energy": 2.0, "Finance": 3.0, "Property": None}))
+
+    assert points == {"Technology": 5.0, "Energy": 0.0, "Finance": -5.0}
+
+
+def test_sector_points_need_more_than_one_rank():
+    assert sector_points(strength({"Technology": 1.0, "Finance": None})) == {}
+    assert sector_points(strength({})) == {}
+
+
+def test_missing_database_gives_empty_strength(tmp_path):
+    empty = load_strength(str(tmp_path / "missing.sqlite"))
+
+    assert empty.empty and strength_version(empty) == "empty"
+    assert not (tmp_path / "missing.sqlite").exists()
+
+
+def test_sector_strength_moves_potential_score():
+    df = pd.DataFrame({"code": ["0166", "1155", "8664"], "name": ["INARI", "MAYBANK", "SPSETIA"],
+                       "sector": ["Technology", "Finance", "Property"], "score": [60.0] * 3,
+                       "change_percent": [1.0] * 3, "volume": [1000] * 3, "last_price": [1.0] * 3})
+    picks = generate_stock_picks(df, instruments=pd.DataFrame(columns=["code", "type", "underlying", "name"])
+                                 .set_index("code"),
+                                 strength=strength({"Technology": 1.0, "Finance": 2.0, "Property": 3.0}))
+
+    assert dict(zip(picks["code"], picks["potential_score"])) == {"0166": 65, "1155": 60, "8664": 55}
+    assert picks.iloc[0]["potential_reasons"] == "所屬行業走強"
@@ -1,15 +1,80 @@
 #!/usr/bin/env python3
 """
 主數據更新腳本 - 整合所有步驟
+各步驟作為進程內 DAG 階段運行（見 pipeline_dag.py），數據在內存中傳遞
 """
 import subprocess
 import os
+import io
 import json
 import schedule
 import time
-from datetime import date, timedelta
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
 import sys
 
+import pandas as pd
+
+from pipeline_dag import PipelineDAG
+from pipeline_metrics import RunRecorder
+from eod_watcher import EODWatcher, PipelineLock
+from eod_database import EODDatabase
+from sector_rotation import SectorRotation, load_strength
+from instrument_master import InstrumentMaster, load_master
+from eod_validation import validate
+from normalize_eod import normalize_eod, write_normalized_csv, write_audit
+from header_registry import HeaderRegistry
+import ai_stock_picker_full as picker
+
+# 規範化列名 → 選股器列名（兼容兩種 schema）
+PICKER_COLUMNS = {
+    'Code': 'code',
+    'Stock': 'name',
+    'Name': 'name',
+    'Last': 'last_price',
+    'Close': 'last_price',
+    'Open': 'open',
+    'High': 'high',
+    'Low': 'low',
+    'Vol': 'volume',
+    'Volume': 'volume',
+    'Chg': 'change_percent',
+    'Change%': 'change_percent',
+    'Change': 'change',
+    'Sector': 'sector',
+}
+
+# 歷史回填的進程數上限（每個進程都會加載 pandas 和整日數據）
+MAX_BACKFILL_WORKERS = 8
+
+
+def _backfill_day(date_iso):
+    """進程池工作函數：運行一天的獨立階段，輸出寫入 logs/backfill/<date>.log"""
+    pipeline = DataPipeline()
+    target_date = date.fromisoformat(date_iso)
+    log_file = os.path.join(pipeline.dirs['logs'], 'backfill', f"{date_iso}.log")
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    
+    started = time.perf_counter()
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        dag = pipeline.build_dag(backfill=True)
+        dag.verbose = False
+        context = dag.run({'target_date': target_date})
+    with open(log_file, 'w', encoding='utf-8') as f:
+        f.write(buffer.getvalue())
+    
+    failed = [name for name, r in dag.results.items() if r['status'] != 'ok']
+    return {
+        'status': 'failed' if failed else 'ok',
+        'seconds': round(time.perf_counter() - started, 2),
+        'picks_file': context.get('picks_file'),
+        'snapshot_file': context.get('price_file'),
+        'failed_stages': failed,
+        'log_file': log_file,
+    }
+
 class DataPipeline:
     def __init__(self):
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -22,7 +87,10 @@ class DataPipeline:
             'normalized': os.path.join(self.data_dir, 'normalized'),
             'picks': os.path.join(self.data_dir, 'picks'),
             'audit': os.path.join(self.data_dir, 'audit'),
+            # 校驗報告與審計日誌分開存放（audit_rollup 會載入 audit 目錄中的全部 JSON）
+            'validation': os.path.join(self.data_dir, 'validation'),
             'reports': os.path.join(self.data_dir, 'reports'),
+            'snapshots': os.path.join(self.data_dir, 'snapshots'),
             'logs': os.path.join(self.base_dir, 'logs')
         }
         
@@ -33,6 +101,8 @@ class DataPipeline:
         # 配置文件路徑
         self.config_file = os.path.join(self.config_dir, 'eod_config.json')
         self.sector_lookup_file = os.path.join(self.config_dir, 'sector_lookup.json')
+        self.lock_file = os.path.join(self.dirs['logs'], 'pipeline.lock')
+        self.header_registry = HeaderRegistry(os.path.join(self.config_dir, 'header_dialects.json'))
         
         # 檢查配置文件是否存在
         if not os.path.exists(self.config_file):
@@ -81,44 +151,94 @@ class DataPipeline:
         
         print(f"✅ 已創建默認配置: {self.config_file}")
     
-    def run_pipeline(self, target_date=None):
-        """運行完整數據流水線"""
+    def build_dag(self, backfill=False, download=True):
+        """
+        構建流水線 DAG：規範化之後，股價JSON與選股評分並行執行；
+        評分在數據庫、行業輪動和證券主表更新之後（回填時沒有這些階段）
+        backfill=True 時只包含每天獨立的階段，股價快照寫入 data/snapshots/YYYYMMDD/，
+        不更新前端的 latest_price / picks.json / 日期索引
+        download=False 時不包含下載階段，raw_file 由調用方提供
+        """
+        dag = PipelineDAG(max_workers=4)
+        if download:
+            dag.add_stage('download', self.download_raw_data,
+                          inputs=['target_date'], outputs=['raw_file'])
+        dag.add_stage('normalize', self.normalize_data,
+                      inputs=['raw_file', 'target_date'], outputs=['eod_df', 'normalized_file'])
+        dag.add_stage('validate', self.validate_data,
+                      inputs=['eod_df', 'target_date'], outputs=['valid_df'])
+        dag.add_stage('picker_frame', self.to_picker_frame,
+                      inputs=['valid_df'], outputs=['picker_df'])
+        if backfill:
+            dag.add_stage('snapshot', self.emit_snapshot,
+                          inputs=['picker_df', 'target_date'], outputs=['price_file'])
+        else:
+            dag.add_stage('latest_price', self.emit_latest_price,
+                          inputs=['picker_df'], outputs=['price_file'])
+        # 非回填時等行業輪動和證券主表更新完再評分，使用當天的行業排名和證券分類
+        scoring_inputs = ['picker_df', 'target_date']
+        if not backfill:
+            scoring_inputs += ['rotation_file', 'instrument_count']
+        dag.add_stage('scoring', self.score_stocks,
+                      inputs=scoring_inputs, outputs=['picks_df'])
+        dag.add_stage('picks_json', self.generate_picks,
+                      inputs=['picks_df', 'target_date'], outputs=['picks_file'])
+        if backfill:
+            return dag
+        dag.add_stage('database', self.store_eod,
+                      inputs=['valid_df', 'target_date', 'normalized_file'], outputs=['db_rows'])
+        dag.add_stage('sector_rotation', self.update_sector_rotation,
+                      inputs=['db_rows'], outputs=['rotation_file'])
+        dag.add_stage('instruments', self.update_instruments,
+                      inputs=['db_rows'], outputs=['instrument_count'])
+        dag.add_stage('latest_picks', self.update_latest_picks,
+                      inputs=['picks_file'], outputs=['latest_picks_file'])
+        dag.add_stage('dates_index', self.update_dates_index,
+                      inputs=['picks_file'], outputs=['dates_index_file'])
+        return dag
+    
+    def run_pipeline(self, target_date=None, raw_file=None):
+        """
+        運行完整數據流水線
+        提供 raw_file 時跳過下載；另一條流水線正在運行時返回 None
+        """
         if target_date is None:
             target_date = date.today()
         
         date_str = target_date.strftime("%Y-%m-%d")
-        print(f"\n{'='*60}")
-        print(f"🚀 運行數據流水線 - {date_str}")
-        print(f"{'='*60}")
         
-        # 步驟 1: 下載原始數據
-        print("\n📥 步驟 1: 下載原始 EOD 數據")
-        raw_file = self.download_raw_data(target_date)
-        if not raw_file:
-            print("❌ 下載失敗，跳過後續步驟")
-            return False
+        with PipelineLock(self.lock_file) as lock:
+            if not lock.acquired:
+                print(f"⏳ 另一條流水線正在運行（{self.lock_file}），跳過 {date_str}")
+                return None
+            
+            print(f"\n{'='*60}")
+            print(f"🚀 運行數據流水線 - {date_str}")
+            print(f"{'='*60}")
+            
+            dag = self.build_dag(download=raw_file is None)
+            recorder = RunRecorder('update_database', runs_dir=os.path.join(self.dirs['logs'], 'runs'))
+            recorder.extra['target_date'] = date_str
+            recorder.attach(dag)
+            initial = {'target_date': target_date}
+            if raw_file is not None:
+                initial['raw_file'] = raw_file
+                recorder.extra['raw_file'] = raw_file
+            dag.run(initial)
+            recorder.save()
         
-        # 步驟 2: 標準化處理
-        print("\n🔧 步驟 2: 標準化 EOD 數據")
-        normalized_file = self.normalize_data(raw_file, target_date)
-        if not normalized_file:
-            print("❌ 標準化失敗，跳過後續步驟")
+        if dag.results.get('normalize', {}).get('status') != 'ok':
+            print("❌ 下載或標準化失敗，跳過後續步驟")
+            return False
+        if dag.results.get('validate', {}).get('status') != 'ok':
+            print(f"❌ 數據校驗未通過，未發布（報告見 {self.dirs['validation']}）")
             return False
         
-        # 步驟 3: 生成 AI 分析
-        print("\n🤖 步驟 3: 生成 AI 推薦")
-        picks_file = self.generate_picks(normalized_file, target_date)
-        
-        # 步驟 4: 更新最新推薦
-        print("\n🔗 步驟 4: 更新最新推薦")
-        if picks_file:
-            self.update_latest_picks(picks_file)
-        
-        # 步驟 5: 更新日期索引
-        print("\n📊 步驟 5: 更新日期索引")
-        self.update_dates_index()
-        
-        print(f"\n✅ 流水線完成: {date_str}")
+        failed = [name for name, r in dag.results.items() if r['status'] != 'ok']
+        if failed:
+            print(f"\n⚠️  流水線完成但有階段未成功: {', '.join(failed)}")
+        else:
+            print(f"\n✅ 流水線完成: {date_str}")
         return True
     
     def download_raw_data(self, target_date):
@@ -157,103 +277,100 @@ class DataPipeline:
             print(f"❌ 下載錯誤: {e}")
             return None
     
+    def load_config(self):
+        """讀取配置，並合併行業映射（僅在內存中，不再寫臨時配置文件）"""
+        with open(self.config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        
+        if os.path.exists(self.sector_lookup_file):
+            with open(self.sector_lookup_file, 'r', encoding='utf-8') as f:
+                config['sector_lookup'] = json.load(f)
+        
+        return config
+    
     def normalize_data(self, raw_file, target_date):
-        """標準化數據"""
-        try:
-            date_str = target_date.strftime("%Y-%m-%d")
-            normalized_file = os.path.join(self.dirs['normalized'], f"{date_str}.csv")
-            audit_file = os.path.join(self.dirs['audit'], f"{date_str}_audit.json")
-            
-            # 構建 normalize_eod.py 命令
-            normalize_script = os.path.join(self.base_dir, 'scripts', 'normalize_eod.py')
-            
-            cmd = [
-                sys.executable,
-                normalize_script,
-                raw_file,
-                normalized_file,
-                self.config_file,
-                audit_file
-            ]
-            
-            # 如果有行業映射文件，添加到配置
-            if os.path.exists(self.sector_lookup_file):
-                # 讀取行業映射並合併到配置
-                with open(self.sector_lookup_file, 'r', encoding='utf-8') as f:
-                    sector_lookup = json.load(f)
-                
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                
-                config['sector_lookup'] = sector_lookup
-                
-                # 創建臨時配置
-                temp_config = os.path.join(self.dirs['logs'], 'temp_config.json')
-                with open(temp_config, 'w', encoding='utf-8') as f:
-                    json.dump(config, f, ensure_ascii=False, indent=2)
-                
-                cmd[3] = temp_config  # 替換配置路徑
-            
-            # 運行標準化腳本
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                encoding='utf-8'
-            )
-            
-            if result.returncode == 0:
-                print(f"✅ 標準化完成: {normalized_file}")
-                
-                # 檢查審計日誌
-                if os.path.exists(audit_file):
-                    with open(audit_file, 'r', encoding='utf-8') as f:
-                        audit = json.load(f)
-                    print(f"  處理記錄: {audit['rows_in']} -> {audit['rows_out']} 行")
-                
-                return normalized_file
-            else:
-                print(f"❌ 標準化失敗: {result.stderr}")
-                return None
-                
-        except Exception as e:
-            print(f"❌ 標準化錯誤: {e}")
-            return None
+        """標準化數據，返回 (DataFrame, 規範化文件路徑)"""
+        date_str = target_date.strftime("%Y-%m-%d")
+        normalized_file = os.path.join(self.dirs['normalized'], f"{date_str}.csv")
+        audit_file = os.path.join(self.dirs['audit'], f"{date_str}_audit.json")
+        
+        schema, rows, audit = normalize_eod(raw_file, self.load_config(), verbose=False,
+                                            registry=self.header_registry)
+        
+        # 規範化CSV和審計日誌作為存檔輸出，下游階段直接使用內存中的 DataFrame
+        write_normalized_csv(normalized_file, schema, rows)
+        write_audit(audit_file, audit, normalized_file)
+        
+        print(f"✅ 標準化完成: {normalized_file}")
+        print(f"  處理記錄: {audit['rows_in']} -> {audit['rows_out']} 行")
+        
+        return pd.DataFrame(rows, columns=schema), normalized_file
     
-    def generate_picks(self, normalized_file, target_date):
-        """生成 AI 推薦"""
-        try:
-            date_str = target_date.strftime("%Y-%m-%d")
-            
-            # 運行 generate_picks.py
-            picks_script = os.path.join(self.base_dir, 'scripts', 'generate_picks.py')
-            
-            cmd = [
-                sys.executable,
-                picks_script,
-                '--date', date_str,
-                '--input', normalized_file,
-                '--output', self.dirs['picks']
-            ]
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                encoding='utf-8'
-            )
-            
-            if result.returncode == 0:
-                picks_file = os.path.join(self.dirs['picks'], f"{date_str}.json")
-                print(f"✅ AI 推薦生成: {picks_file}")
-                return picks_file
-            else:
-                print(f"❌ AI 推薦生成失敗: {result.stderr}")
-                return None
-                
-        except Exception as e:
-            print(f"❌ AI 推薦錯誤: {e}")
-            return None
+    def validate_data(self, eod_df, target_date):
+        """校驗閘門：規則違規比例超過允許值時拋出 ValidationError，下游階段全部跳過"""
+        report = validate(eod_df)
+        report_file = os.path.join(self.dirs['validation'], f"{target_date.strftime('%Y-%m-%d')}_validation.json")
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report.to_dict(), f, ensure_ascii=False, indent=2, default=str)
+        if report.violations or not report.ok:
+            report.print_summary()
+        report.check_gate()
+        return eod_df
+    
+    def store_eod(self, valid_df, target_date, normalized_file):
+        """寫入 EOD 數據庫（回填時不寫，由回填結束後的 sync 統一載入）"""
+        with EODDatabase(os.path.join(self.data_dir, 'eod.sqlite')) as db:
+            count = db.ingest_frame(valid_df, target_date, source=normalized_file)
+        print(f"🗄️  已寫入數據庫: {count} 行")
+        return count
+    
+    def update_sector_rotation(self, db_rows):
+        """重算行業輪動的尾部窗口並生成 sector_rotation.json"""
+        with SectorRotation(os.path.join(self.data_dir, 'eod.sqlite')) as rotation:
+            rotation.update()
+            return rotation.publish(os.path.join(picker.WEB_DIR, 'sector_rotation.json'))
+    
+    def update_instruments(self, db_rows):
+        """證券主表：只重新分類新增和有變化的代碼"""
+        with InstrumentMaster(os.path.join(self.data_dir, 'eod.sqlite')) as master:
+            count = master.update()
+        print(f"🧾 證券主表: 重新分類 {count} 個代碼")
+        return count
+    
+    def to_picker_frame(self, valid_df):
+        """把校驗通過的規範化數據轉為選股器使用的列名和類型"""
+        renamed = valid_df.rename(columns=PICKER_COLUMNS)
+        renamed = renamed.loc[:, ~renamed.columns.duplicated()]
+        return picker.normalize_dataframe(renamed)
+    
+    def emit_latest_price(self, picker_df):
+        """生成 latest_price.json"""
+        return picker.create_latest_price_json(picker_df, picker.WEB_DIR)
+    
+    def emit_snapshot(self, picker_df, target_date):
+        """生成某一天的股價快照（回填用，不覆蓋前端文件）"""
+        snapshot_dir = os.path.join(self.dirs['snapshots'], target_date.strftime("%Y%m%d"))
+        os.makedirs(snapshot_dir, exist_ok=True)
+        return picker.create_latest_price_json(picker_df, snapshot_dir)
+    
+    def score_stocks(self, picker_df, target_date, rotation_file=None, instrument_count=None):
+        """技術指標 + AI評分 + 選股（行業強弱取 target_date 當天或之前最近一天的輪動排名）"""
+        df_technical = picker.calculate_technical_indicators(picker_df)
+        df_scored = picker.ai_scoring(df_technical)
+        db_path = os.path.join(self.data_dir, 'eod.sqlite')
+        instruments = load_master(db_path)
+        strength = load_strength(db_path, trade_date=target_date.isoformat())
+        return picker.generate_stock_picks(df_scored, max_picks=20, instruments=instruments,
+                                           strength=strength)
+    
+    def generate_picks(self, picks_df, target_date):
+        """保存 AI 推薦"""
+        picks_file = picker.create_picks_json(picks_df, self.dirs['picks'], target_date.strftime("%Y%m%d"))
+        if picks_file:
+            print(f"✅ AI 推薦生成: {picks_file}")
+        else:
+            print("❌ AI 推薦生成失敗")
+        return picks_file
     
     def update_latest_picks(self, picks_file):
         """更新最新推薦文件"""
@@ -273,51 +390,178 @@ class DataPipeline:
                 json.dump(picks_data, f, ensure_ascii=False, indent=2)
             
             print(f"🔗 更新最新推薦: {latest_file}")
+            return latest_file
             
         except Exception as e:
             print(f"❌ 更新最新推薦失敗: {e}")
+            return None
     
-    def update_dates_index(self):
+    def update_dates_index(self, picks_file=None):
         """更新日期索引"""
         try:
-            dates_script = os.path.join(self.base_dir, 'scripts', 'generate_dates_index.py')
-            
-            result = subprocess.run(
-                [sys.executable, dates_script],
-                capture_output=True,
-                text=True,
-                encoding='utf-8'
+            dates = sorted(
+                (f[6:14] for f in os.listdir(self.dirs['picks'])
+                 if f.startswith('picks_') and f.endswith('.json') and f[6:14].isdigit()),
+                reverse=True
             )
+            index_file = os.path.join(self.dirs['picks'], 'dates_index.json')
+            with open(index_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'count': len(dates),
+                    'latest': dates[0] if dates else None,
+                    'dates': dates
+                }, f, ensure_ascii=False, indent=2)
             
-            if result.returncode == 0:
-                print("✅ 日期索引更新完成")
-            else:
-                print(f"❌ 日期索引更新失敗: {result.stderr}")
+            print(f"✅ 日期索引更新完成 ({len(dates)} 天)")
+            return index_file
                 
         except Exception as e:
             print(f"❌ 日期索引錯誤: {e}")
+            return None
     
-    def run_historical_pipeline(self, start_date, end_date):
-        """運行歷史數據流水線"""
+    def run_historical_pipeline(self, start_date, end_date, workers=None, restart=False):
+        """
+        並行回填歷史數據
+          1. 每天獨立的階段（下載、標準化、評分、每日快照和推薦JSON）在進程池中運行
+          2. 依賴前一天結果的階段（選股歸檔、日期索引）之後按日期順序運行
+        進度保存在 logs/backfill_state.json，中斷後重新運行會跳過已完成的日期
+        """
+        trading_days = []
         current_date = start_date
-        success_count = 0
-        
-        print(f"\n📅 處理歷史數據: {start_date} 至 {end_date}")
-        
         while current_date <= end_date:
             # 跳過周末
             if current_date.weekday() < 5:
-                print(f"\n處理 {current_date.strftime('%Y-%m-%d')}...")
-                success = self.run_pipeline(current_date)
-                if success:
-                    success_count += 1
-            
+                trading_days.append(current_date.isoformat())
             current_date += timedelta(days=1)
-            time.sleep(0.5)  # 避免過載
+        
+        state_file = os.path.join(self.dirs['logs'], 'backfill_state.json')
+        state = {} if restart else self.load_backfill_state(state_file)
+        days = state.setdefault('days', {})
+        
+        pending = [d for d in trading_days if days.get(d, {}).get('status') != 'ok']
+        workers = max(1, min(workers or os.cpu_count() or 1, MAX_BACKFILL_WORKERS, len(pending) or 1))
+        
+        print(f"\n📅 處理歷史數據: {start_date} 至 {end_date}")
+        print(f"  交易日: {len(trading_days)} 天，已完成: {len(trading_days) - len(pending)} 天，"
+              f"待處理: {len(pending)} 天，進程數: {workers}")
+        
+        recorder = RunRecorder('backfill', runs_dir=os.path.join(self.dirs['logs'], 'runs'))
+        recorder.extra.update({'start_date': start_date.isoformat(), 'end_date': end_date.isoformat(),
+                               'workers': workers})
+        
+        # 第一階段：每天獨立的階段並行運行
+        with recorder.stage('per_day', rows_in=len(pending)) as st:
+            started = time.perf_counter()
+            for done, (date_iso, result) in enumerate(self._run_backfill_days(pending, workers), 1):
+                result['archived'] = False
+                days[date_iso] = result
+                self.save_backfill_state(state_file, state)
+                
+                elapsed = time.perf_counter() - started
+                eta = elapsed / done * (len(pending) - done)
+                icon = "✅" if result['status'] == 'ok' else "❌"
+                detail = f"{result['seconds']:.1f}s" if result['status'] == 'ok' else \
+                    f"{', '.join(result.get('failed_stages', [])) or result.get('error')}"
+                print(f"  [{done}/{len(pending)}] {icon} {date_iso} {detail}  (剩餘約 {eta:.0f}s)")
+            st.rows_out = sum(1 for d in pending if days[d]['status'] == 'ok')
+        
+        # 第二階段：依賴順序的階段按日期升序運行
+        with recorder.stage('ordered') as st:
+            st.rows_out = self._run_backfill_ordered(trading_days, days)
+            self.save_backfill_state(state_file, state)
+            self.update_dates_index()
+        
+        # 第三階段：新規範化的文件一次性載入數據庫（各進程不並發寫 SQLite）
+        with recorder.stage('database') as st:
+            with SectorRotation(os.path.join(self.data_dir, 'eod.sqlite')) as rotation:
+                loaded, st.rows_out = rotation.db.sync([self.dirs['normalized']])
+                rotated = rotation.update()
+            with InstrumentMaster(os.path.join(self.data_dir, 'eod.sqlite')) as master:
+                master.update()
+            if loaded:
+                print(f"🗄️  已載入數據庫: {loaded} 天, {st.rows_out} 行（行業輪動重算 {rotated} 天）")
+        
+        success_count = sum(1 for d in trading_days if days.get(d, {}).get('status') == 'ok')
+        failed = [d for d in trading_days if days.get(d, {}).get('status') != 'ok']
+        recorder.extra.update({'succeeded': success_count, 'failed_dates': failed})
+        recorder.save()
         
         print(f"\n🎉 歷史數據處理完成: {success_count} 天成功")
+        if failed:
+            print(f"⚠️  {len(failed)} 天失敗（日誌見 {os.path.join(self.dirs['logs'], 'backfill')}），"
+                  f"重新運行將只處理這些日期")
         return success_count
     
+    def _run_backfill_days(self, pending, workers):
+        """按完成順序產出 (日期, 結果)；單進程時不建進程池"""
+        if workers == 1:
+            for date_iso in pending:
+                yield date_iso, self._safe_backfill_day(date_iso)
+            return
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_backfill_day, d): d for d in pending}
+            for future in as_completed(futures):
+                date_iso = futures[future]
+                try:
+                    yield date_iso, future.result()
+                except Exception as e:
+                    yield date_iso, {'status': 'failed', 'seconds': 0.0, 'error': f"{type(e).__name__}: {e}"}
+    
+    def _safe_backfill_day(self, date_iso):
+        try:
+            return _backfill_day(date_iso)
+        except Exception as e:
+            return {'status': 'failed', 'seconds': 0.0, 'error': f"{type(e).__name__}: {e}"}
+    
+    def _run_backfill_ordered(self, trading_days, days):
+        """按日期順序把回填結果追加到選股歸檔，返回本次處理的天數"""
+        archive = picker.PicksArchive(picker.DATA_DIR)
+        count = 0
+        for date_iso in trading_days:
+            day = days.get(date_iso, {})
+            if day.get('status') != 'ok' or day.get('archived') or not day.get('picks_file'):
+                continue
+            if picker.archive_picks(day['picks_file'], archive):
+                day['archived'] = True
+                count += 1
+        if count:
+            print(f"🗄️  已按日期順序歸檔 {count} 天")
+        return count
+    
+    def load_backfill_state(self, state_file):
+        """讀取回填進度，文件不存在或損壞時從頭開始"""
+        if not os.path.exists(state_file):
+            return {}
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            print(f"⚠️  無法讀取回填進度 {state_file}，將從頭開始")
+            return {}
+    
+    def save_backfill_state(self, state_file, state):
+        """原子寫入回填進度（先寫臨時文件再替換）"""
+        state['updated_at'] = datetime.now().isoformat()
+        tmp_file = state_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_file, state_file)
+    
+    def run_watcher(self, watch_dir=None, settle_seconds=5.0, poll_interval=10.0):
+        """
+        事件驅動守護進程：EOD 文件落地即處理
+        默認監聽 data/raw/，文件名需包含交易日期（如 2025-12-24_raw.csv、20251224.csv）
+        """
+        watcher = EODWatcher(
+            watch_dir or self.dirs['raw'],
+            lambda target_date, path: self.run_pipeline(target_date, raw_file=path),
+            state_file=os.path.join(self.dirs['logs'], 'watcher_state.json'),
+            settle_seconds=settle_seconds,
+            poll_interval=poll_interval,
+        )
+        watcher.run()
+    
     def run_scheduler(self):
         """運行定時任務"""
         print("⏰ 啟動數據流水線定時任務...")
@@ -349,13 +593,22 @@ if __name__ == "__main__":
     parser.add_argument('--historical', action='store_true', help='處理歷史數據')
     parser.add_argument('--start', help='歷史數據開始日期')
     parser.add_argument('--end', help='歷史數據結束日期')
+    parser.add_argument('--workers', type=int, help=f'歷史回填進程數（默認 CPU 核數，上限 {MAX_BACKFILL_WORKERS}）')
+    parser.add_argument('--restart', action='store_true', help='忽略回填進度，從頭處理')
     parser.add_argument('--daemon', action='store_true', help='運行守護進程')
+    parser.add_argument('--watch', nargs='?', const='', metavar='DIR',
+                        help='監聽EOD目錄，新文件到達即處理（默認 data/raw）')
+    parser.add_argument('--settle', type=float, default=5.0, help='文件大小穩定多少秒後視為寫入完成')
     
     args = parser.parse_args()
     
     pipeline = DataPipeline()
     
-    if args.daemon:
+    if args.watch is not None:
+        # 事件驅動守護進程模式
+        pipeline.run_watcher(args.watch or None, settle_seconds=args.settle)
+    
+    elif args.daemon:
         # 運行守護進程模式
         pipeline.run_scheduler()
     
@@ -364,7 +617,7 @@ if __name__ == "__main__":
         start_date = date.fromisoformat(args.start) if args.start else date.today() - timedelta(days=30)
         end_date = date.fromisoformat(args.end) if args.end else date.today()
         
-        pipeline.run_historical_pipeline(start_date, end_date)
+        pipeline.run_historical_pipeline(start_date, end_date, workers=args.workers, restart=args.restart)
     
     elif args.date:
         # 處理指定日期
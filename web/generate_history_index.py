@@ -1,52 +1,137 @@
 import os
+import sys
 import json
 import glob
+import hashlib
+from collections import Counter
 from datetime import datetime
 
 # 設置路徑
-history_dir = 'history'
-index_file = 'history_index.json'
+HISTORY_DIR = 'history'
+INDEX_FILE = 'history_index.json'
 
-# 獲取所有 picks_*.json 文件
-files = glob.glob(f"{history_dir}/picks_*.json")
-history_files = []
 
-for filepath in files:
+def file_sha1(filepath):
+    """計算文件內容的 SHA1"""
+    h = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def summarize_picks(filepath):
+    """讀取 picks 文件，計算列表頁需要的摘要字段"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    picks = data.get('picks', []) if isinstance(data, dict) else data
+    scores = [p.get('score') for p in picks if isinstance(p.get('score'), (int, float))]
+    sectors = Counter(str(p.get('sector')) for p in picks if p.get('sector'))
+
+    top_pick = None
+    if picks:
+        top_pick = min(picks, key=lambda p: p.get('rank') or float('inf'))
+
+    return {
+        'pick_count': len(picks),
+        'avg_score': round(sum(scores) / len(scores), 2) if scores else None,
+        'sectors': sorted(sectors),
+        'sector_count': len(sectors),
+        'top_code': str(top_pick.get('code')) if top_pick else None,
+        'top_name': top_pick.get('name') if top_pick else None,
+    }
+
+
+def load_existing_index(path):
+    """讀取已有索引，返回 {filename: entry}"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return {entry['filename']: entry for entry in data.get('files', []) if 'filename' in entry}
+    except (ValueError, KeyError, TypeError):
+        print(f"⚠️  無法讀取舊索引 {path}，將完整重建")
+        return {}
+
+
+def build_entry(filepath, previous=None):
+    """
+    生成單個文件的索引項
+    mtime 和大小都沒變時直接沿用舊項；內容哈希沒變時只更新 mtime
+    返回 (entry, status)，status 為 'unchanged' / 'touched' / 'updated'
+    """
     filename = os.path.basename(filepath)
-    if filename.startswith('picks_') and filename.endswith('.json'):
-        # 從文件名提取日期
+    date_str = filename[6:14]  # picks_YYYYMMDD.json
+    stat = os.stat(filepath)
+
+    if previous and previous.get('mtime') == stat.st_mtime and previous.get('size') == stat.st_size \
+            and 'pick_count' in previous:
+        return previous, 'unchanged'
+
+    digest = file_sha1(filepath)
+    if previous and previous.get('sha1') == digest and 'pick_count' in previous:
+        entry = dict(previous, mtime=stat.st_mtime, size=stat.st_size)
+        return entry, 'touched'
+
+    entry = {
+        'filename': filename,
+        'path': f"history/{filename}",
+        'date': f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:8]}",
+        'date_code': date_str,
+        'size': stat.st_size,
+        'url': f"./history/{filename}",  # GitHub Pages 相對路徑
+        'mtime': stat.st_mtime,
+        'sha1': digest,
+    }
+    entry.update(summarize_picks(filepath))
+    return entry, 'updated'
+
+
+def update_history_index(history_dir=HISTORY_DIR, index_file=INDEX_FILE, force=False):
+    """增量更新 history_index.json，只重新讀取新增或修改過的文件"""
+    previous = {} if force else load_existing_index(index_file)
+
+    history_files = []
+    counts = Counter()
+
+    for filepath in glob.glob(os.path.join(history_dir, "picks_*.json")):
+        filename = os.path.basename(filepath)
+        date_str = filename[6:14]
+        if not (filename.endswith('.json') and date_str.isdigit() and len(date_str) == 8):
+            continue
         try:
-            date_str = filename[6:14]  # picks_YYYYMMDD.json
-            formatted_date = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:8]}"
-            
-            # 獲取文件大小
-            size_bytes = os.path.getsize(filepath)
-            
-            history_files.append({
-                'filename': filename,
-                'path': f"history/{filename}",
-                'date': formatted_date,
-                'date_code': date_str,
-                'size': size_bytes,
-                'url': f"./history/{filename}"  # GitHub Pages 相對路徑
-            })
-        except:
+            entry, status = build_entry(filepath, previous.get(filename))
+        except (OSError, ValueError) as e:
+            print(f"⚠️  跳過 {filename}: {e}")
             continue
+        history_files.append(entry)
+        counts[status] += 1
+
+    removed = len(set(previous) - {entry['filename'] for entry in history_files})
+
+    # 按日期排序（最新的在前）
+    history_files.sort(key=lambda x: x['date_code'], reverse=True)
+
+    # 創建索引數據
+    index_data = {
+        'generated_at': datetime.now().isoformat(),
+        'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'count': len(history_files),
+        'files': history_files,
+        'latest': history_files[0] if history_files else None
+    }
 
-# 按日期排序（最新的在前）
-history_files.sort(key=lambda x: x['date_code'], reverse=True)
+    # 寫入索引文件
+    with open(index_file, 'w', encoding='utf-8') as f:
+        json.dump(index_data, f, indent=2, ensure_ascii=False)
 
-# 創建索引數據
-index_data = {
-    'generated_at': datetime.now().isoformat(),
-    'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-    'count': len(history_files),
-    'files': history_files,
-    'latest': history_files[0] if history_files else None
-}
+    print(f"Generated {index_file} with {len(history_files)} files "
+          f"(updated {counts['updated']}, touched {counts['touched']}, "
+          f"unchanged {counts['unchanged']}, removed {removed})")
+    return index_data
 
-# 寫入索引文件
-with open(index_file, 'w', encoding='utf-8') as f:
-    json.dump(index_data, f, indent=2, ensure_ascii=False)
 
-print(f"Generated {index_file} with {len(history_files)} files")
+if __name__ == "__main__":
+    update_history_index(force='--force' in sys.argv[1:])
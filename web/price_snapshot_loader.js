@@ -0,0 +1,93 @@
+// price_snapshot_loader.js - latest_price.bin 二进制快照读取器
+// 格式由 scripts/price_snapshot_binary.py 生成，失败时回退到 latest_price.json
+// 浮点列保留 3 位小数，缺失值为 null；头部 meta 带有市场概要 (summary)
+
+window.priceSnapshot = {
+    VERSION: 2,
+    DECIMALS: 3,
+    FIELD_ORDER: ['code', 'name', 'last_price', 'change', 'change_percent', 'volume',
+                  'sector', 'open', 'high', 'low', 'last_updated'],
+
+    // 解码二进制快照，返回与 latest_price.json 相同的结构
+    decode: function(buffer) {
+        const view = new DataView(buffer);
+        const magic = String.fromCharCode(
+            view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+        if (magic !== 'MYXP') {
+            throw new Error('不是有效的价格快照文件');
+        }
+
+        const headerLen = view.getUint32(4, true);
+        const decoder = new TextDecoder('utf-8');
+        const header = JSON.parse(decoder.decode(new Uint8Array(buffer, 8, headerLen)));
+        if (header.version !== this.VERSION) {
+            throw new Error(`不支持的快照版本: ${header.version}`);
+        }
+        const base = 8 + headerLen;
+        const rows = header.rows;
+        const columns = {};
+
+        for (const [name, spec] of Object.entries(header.columns)) {
+            const offset = base + spec.offset;
+            let array;
+            if (spec.dtype === '<f4') {
+                array = new Float32Array(buffer, offset, spec.length);
+            } else if (spec.dtype === '<u4') {
+                array = new Uint32Array(buffer, offset, spec.length);
+            } else if (spec.dtype === '<u2') {
+                array = new Uint16Array(buffer, offset, spec.length);
+            } else {
+                throw new Error(`不支持的列类型: ${spec.dtype}`);
+            }
+
+            if (spec.kind === 'strings') {
+                const blob = new Uint8Array(buffer, base + spec.blob_offset, spec.blob_length);
+                const values = new Array(rows);
+                for (let i = 0; i < rows; i++) {
+                    values[i] = decoder.decode(blob.subarray(array[i], array[i + 1]));
+                }
+                columns[name] = values;
+            } else if (spec.kind === 'dictionary') {
+                const dict = spec.dictionary;
+                columns[name] = Array.from(array, idx => dict[idx]);
+            } else if (spec.dtype === '<f4') {
+                // 去掉 float32 的误差（0.28499999 → 0.285），NaN 为缺失值
+                const scale = Math.pow(10, this.DECIMALS);
+                columns[name] = Array.from(array, v => (Number.isNaN(v) ? null : Math.round(v * scale) / scale));
+            } else if (spec.null !== undefined) {
+                columns[name] = Array.from(array, v => (v === spec.null ? null : v));
+            } else {
+                columns[name] = array;
+            }
+        }
+
+        const stocks = new Array(rows);
+        for (let i = 0; i < rows; i++) {
+            const stock = {};
+            for (const name of this.FIELD_ORDER) {
+                stock[name] = columns[name][i];
+            }
+            stocks[i] = stock;
+        }
+
+        return Object.assign({}, header.meta, { stocks: stocks });
+    },
+
+    // 优先加载二进制快照，失败时回退到JSON
+    load: async function(binUrl = 'latest_price.bin', jsonUrl = 'latest_price.json') {
+        try {
+            const response = await fetch(binUrl);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return this.decode(await response.arrayBuffer());
+        } catch (error) {
+            console.log('⚠️ 二进制快照加载失败，回退到JSON:', error.message);
+            const response = await fetch(jsonUrl);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return response.json();
+        }
+    }
+};
@@ -0,0 +1,166 @@
+// search_index_loader.js - search_index.json 股票搜索索引
+// 格式由 scripts/search_index.py 生成，查找顺序与 SearchIndex.search 相同:
+// 前缀（代码、名称、别名）→ 子串（名称、别名）→ 模糊（三字母组 Dice 系数）
+
+window.stockSearch = {
+    VERSION: 2,
+    FUZZY_THRESHOLD: 0.4,
+    index: null,
+
+    // 检索键: 大写，去掉空格和标点
+    normalize: function(text) {
+        return String(text || '').toUpperCase().replace(/[^\p{L}\p{N}]+/gu, '');
+    },
+
+    cleanCode: function(code) {
+        return String(code || '').trim().replace(/^=?"(.*)"$/, '$1');
+    },
+
+    grams: function(key) {
+        const size = this.index ? this.index.gram : 3;
+        const result = new Set();
+        for (let i = 0; i + size <= key.length; i++) {
+            result.add(key.slice(i, i + size));
+        }
+        return result;
+    },
+
+    // 加载索引；失败时返回 false，调用方继续逐行筛选
+    load: async function(url = 'search_index.json') {
+        try {
+            const response = await fetch(url);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            this.build(await response.json());
+            return true;
+        } catch (error) {
+            console.log('⚠️ 搜索索引加载失败，使用逐行筛选:', error.message);
+            this.index = null;
+            return false;
+        }
+    },
+
+    build: function(data) {
+        if (data.version !== this.VERSION) {
+            throw new Error(`不支持的索引版本: ${data.version}`);
+        }
+        this.index = { gram: data.gram, entries: data.entries };
+        const index = this.index;
+        index.codes = new Set(data.entries.map(entry => entry[0]));
+
+        // 差分编码的倒排表还原为条目ID
+        index.postings = new Map();
+        for (const [gram, deltas] of Object.entries(data.grams)) {
+            const ids = new Array(deltas.length);
+            let id = 0;
+            deltas.forEach((delta, i) => { id += delta; ids[i] = id; });
+            index.postings.set(gram, ids);
+        }
+        index.common = new Set(data.common);
+
+        // 检索键在加载时建立: textKeys 为名称和别名，keys 为包括代码在内的有序数组
+        const pairs = [];
+        index.textKeys = data.entries.map(([code, name], id) => {
+            const aliases = data.aliases[String(id)] || [];
+            const keys = new Set([name, ...aliases].map(t => this.normalize(t)).filter(k => k));
+            keys.forEach(key => pairs.push([key, id]));
+            const codeKey = this.normalize(code);
+            if (codeKey && !keys.has(codeKey)) {
+                pairs.push([codeKey, id]);
+            }
+            return Array.from(keys, key => [key, this.grams(key)]);
+        });
+        pairs.sort((a, b) => (a[0] < b[0] ? -1 : a[0] > b[0] ? 1 : a[1] - b[1]));
+        index.keys = pairs.map(p => p[0]);
+        index.ids = pairs.map(p => p[1]);
+    },
+
+    prefixIds: function(key, limit) {
+        const { keys, ids } = this.index;
+        let lo = 0, hi = keys.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >> 1;
+            if (keys[mid] < key) lo = mid + 1; else hi = mid;
+        }
+        const found = new Set();
+        for (let i = lo; i < keys.length && found.size < limit && keys[i].startsWith(key); i++) {
+            found.add(ids[i]);
+        }
+        return Array.from(found);
+    },
+
+    // 非常见三字母组的倒排表；全是常见三字母组时返回 null（逐条验证）
+    postingLists: function(query) {
+        const lists = [];
+        query.forEach(gram => {
+            if (!this.index.common.has(gram)) {
+                lists.push(this.index.postings.get(gram) || []);
+            }
+        });
+        return lists.length ? lists : null;
+    },
+
+    allIds: function() {
+        return this.index.entries.map((_, id) => id);
+    },
+
+    containsIds: function(key, limit) {
+        const query = this.grams(key);
+        if (!query.size) return [];
+        const lists = this.postingLists(query);
+        let candidates;
+        if (lists) {
+            lists.sort((a, b) => a.length - b.length);
+            const others = lists.slice(1).map(list => new Set(list));
+            candidates = lists[0].filter(id => others.every(set => set.has(id)));
+        } else {
+            candidates = this.allIds();
+        }
+        return candidates
+            .filter(id => this.index.textKeys[id].some(([k]) => k.includes(key)))
+            .sort((a, b) => a - b)
+            .slice(0, limit);
+    },
+
+    fuzzyIds: function(key, limit) {
+        const query = this.grams(key);
+        if (!query.size) return [];
+        const lists = this.postingLists(query);
+        const candidates = lists ? new Set(lists.flat()) : this.allIds();
+        const best = new Map();
+        candidates.forEach(id => {
+            let score = 0;
+            for (const [, keyGrams] of this.index.textKeys[id]) {
+                let shared = 0;
+                query.forEach(gram => { if (keyGrams.has(gram)) shared++; });
+                score = Math.max(score, 2 * shared / (query.size + keyGrams.size));
+            }
+            if (score >= this.FUZZY_THRESHOLD) best.set(id, score);
+        });
+        return Array.from(best.keys())
+            .sort((a, b) => best.get(b) - best.get(a) || a - b)
+            .slice(0, limit);
+    },
+
+    // 返回 [{code, name, match}]；索引未加载时返回 null
+    search: function(query, limit = 20, fuzzy = true) {
+        if (!this.index) return null;
+        const key = this.normalize(this.cleanCode(query));
+        if (!key) return [];
+        fuzzy = fuzzy && !/^\d+$/.test(key);
+        const results = new Map();
+        const finders = [['prefix', this.prefixIds], ['contains', this.containsIds]];
+        if (fuzzy) finders.push(['fuzzy', this.fuzzyIds]);
+        for (const [match, finder] of finders) {
+            if (results.size >= limit) break;
+            for (const id of finder.call(this, key, limit)) {
+                if (!results.has(id)) results.set(id, match);
+            }
+        }
+        return Array.from(results).slice(0, limit).map(([id, match]) => {
+            const [code, name] = this.index.entries[id];
+            return { code: code, name: name, match: match };
+        });
+    }
+};